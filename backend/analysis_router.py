@@ -4,6 +4,7 @@ from typing import List, Dict, Any
 import math
 
 import crud
+import shadow_traffic
 from llm_filter import get_db
 from backend.model_registry import ModelRegistry # Import ModelRegistry
 
@@ -66,6 +67,33 @@ async def get_ab_test_summary(db: AsyncSession = Depends(get_db)):
         })
     return enhanced_summary
 
+@router.get("/judge-mode-summary", response_model=List[Dict[str, Any]])
+async def get_judge_mode_summary(db: AsyncSession = Depends(get_db)):
+    """
+    Compares fused and two-call judge modes per model version: latency and coach feedback.
+    """
+    summary = await crud.get_judge_mode_summary(db)
+    for entry in summary:
+        total = entry["total_logs"]
+        entry["avg_latency_ms"] = round(entry["avg_latency_ms"], 1) if entry["avg_latency_ms"] is not None else None
+        entry["good_feedback_rate"] = round(entry["good_feedback_count"] / total, 4) if total else 0
+        entry["bad_feedback_rate"] = round(entry["bad_feedback_count"] / total, 4) if total else 0
+    return summary
+
+@router.get("/shadow-agreement", response_model=Dict[str, Any])
+async def get_shadow_agreement(db: AsyncSession = Depends(get_db)):
+    """
+    shadow 모드에서 staging 모델 판단이 production 판단과 일치한 비율을 모델별로 반환합니다.
+    shadow 큐 상태(복제/버림 건수)도 함께 반환합니다.
+    """
+    summary = await crud.get_shadow_agreement_summary(db)
+    for entry in summary:
+        total = entry["total"]
+        entry["agreement_rate"] = round(entry["agreements"] / total, 4) if total else 0
+        entry["avg_latency_ms"] = round(entry["avg_latency_ms"], 1) if entry["avg_latency_ms"] is not None else None
+    mirror = shadow_traffic.shadow_mirror
+    return {"models": summary, "mirror": mirror.status() if mirror else None}
+
 @router.post("/model-status/{version}")
 async def set_model_status(version: str, status: str):
     """
@@ -0,0 +1,321 @@
+import asyncio
+import os
+import time
+from datetime import datetime, timedelta, timezone
+from typing import NamedTuple, Optional
+
+from fastapi import HTTPException
+from sqlalchemy import update, or_, and_
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import crud
+import models
+import schemas
+import llm_filter
+import llm_telemetry
+from database import SessionLocal
+
+# 백그라운드 카드 생성 워커 설정
+CARD_QUEUE_WORKERS = int(os.getenv("CARD_QUEUE_WORKERS", "2"))
+CARD_QUEUE_POLL_INTERVAL_SECONDS = float(os.getenv("CARD_QUEUE_POLL_INTERVAL_SECONDS", "1"))
+CARD_JOB_MAX_ATTEMPTS = int(os.getenv("CARD_JOB_MAX_ATTEMPTS", "5"))
+# 재시도 간격: base * 2^(attempts-1), 최대 max 초
+CARD_JOB_BACKOFF_BASE_SECONDS = float(os.getenv("CARD_JOB_BACKOFF_BASE_SECONDS", "2"))
+CARD_JOB_BACKOFF_MAX_SECONDS = float(os.getenv("CARD_JOB_BACKOFF_MAX_SECONDS", "300"))
+# running 상태가 이 시간보다 오래 지속되면 워커가 중단된 것으로 보고 작업을 회수합니다.
+CARD_JOB_LEASE_SECONDS = float(os.getenv("CARD_JOB_LEASE_SECONDS", "120"))
+# 복습 덱 요청 시 남은 카드 생성을 기다리는 최대 시간
+CARD_QUEUE_ENSURE_TIMEOUT_SECONDS = float(os.getenv("CARD_QUEUE_ENSURE_TIMEOUT_SECONDS", "10"))
+# 복습 덱 요청 안에서 동시에 생성하는 카드 수
+CARD_QUEUE_ENSURE_CONCURRENCY = int(os.getenv("CARD_QUEUE_ENSURE_CONCURRENCY", "4"))
+
+Job = models.CardGenerationJob
+
+
+class ClaimedJob(NamedTuple):
+    """
+    세션이 닫힌 뒤에도 사용할 수 있도록 작업 정보를 복사해 둔 스냅샷.
+    attempts는 claim 시점의 값으로, 완료 시 lease를 잃지 않았는지 확인하는 데 사용합니다.
+    """
+    job_id: int
+    attempts: int
+    status: str
+    llm_log_id: int
+    student_id: str
+    model_name: str
+    model_version: Optional[str]
+    error_context: schemas.ErrorContext
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _snapshot(job: models.CardGenerationJob) -> ClaimedJob:
+    return ClaimedJob(
+        job_id=job.job_id,
+        attempts=job.attempts,
+        status=job.status,
+        llm_log_id=job.llm_log_id,
+        student_id=job.student_id,
+        model_name=job.model_name,
+        model_version=job.model_version,
+        error_context=schemas.ErrorContext(
+            question_type=job.question_type or "",
+            concept_name=job.concept_name,
+            student_mistake_summary=job.student_mistake_summary
+        )
+    )
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(CARD_JOB_BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), CARD_JOB_BACKOFF_MAX_SECONDS)
+
+
+def _is_runnable(now: datetime):
+    # 실행 가능한 작업: 재시도 시각이 지난 pending 작업, 또는 lease가 만료된 running 작업
+    return or_(
+        and_(Job.status == 'pending', or_(Job.next_attempt_at.is_(None), Job.next_attempt_at <= now)),
+        and_(Job.status == 'running', Job.locked_at < now - timedelta(seconds=CARD_JOB_LEASE_SECONDS))
+    )
+
+
+async def claim_next_job(db: AsyncSession) -> Optional[ClaimedJob]:
+    """
+    실행 가능한 작업 하나를 running 상태로 바꾸고 스냅샷을 반환합니다. (호출자가 commit)
+    """
+    now = _utcnow()
+    result = await db.execute(select(Job).where(_is_runnable(now)).order_by(Job.job_id).limit(1))
+    job = result.scalars().first()
+    if job is None:
+        return None
+
+    # 다른 워커가 먼저 가져가지 않았을 때만 claim 합니다. (attempts를 fencing token으로 사용)
+    claimed = await db.execute(
+        update(Job)
+        .where(Job.job_id == job.job_id, Job.status == job.status, Job.attempts == job.attempts)
+        .values(status='running', locked_at=now, attempts=Job.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    if claimed.rowcount != 1:
+        return None
+    await db.refresh(job)
+    return _snapshot(job)
+
+
+async def _create_card_once(db: AsyncSession, claimed: ClaimedJob, question: str, answer: str):
+    existing = await db.execute(select(models.AnkiCard.card_id).where(models.AnkiCard.llm_log_id == claimed.llm_log_id))
+    if existing.first() is None:
+        await crud.create_anki_card(db, schemas.AnkiCardCreate(
+            student_id=claimed.student_id,
+            llm_log_id=claimed.llm_log_id,
+            question=question,
+            answer=answer
+        ))
+
+
+async def complete_job(db: AsyncSession, claimed: ClaimedJob, question: str, answer: str, from_llm: bool, status: str = 'done', error: Optional[str] = None) -> bool:
+    """
+    claim한 작업을 완료 처리하고 카드를 저장합니다. lease를 잃었으면(다른 곳에서 처리됨) False를 반환합니다.
+    """
+    finished = await db.execute(
+        update(Job)
+        .where(Job.job_id == claimed.job_id, Job.status == 'running', Job.attempts == claimed.attempts)
+        .values(status=status, completed_at=_utcnow(), locked_at=None, last_error=error)
+        .execution_options(synchronize_session=False)
+    )
+    if finished.rowcount != 1:
+        return False
+    await _create_card_once(db, claimed, question, answer)
+    if from_llm and claimed.model_version:
+        llm_filter.remember_card_content(claimed.model_version, claimed.error_context, question, answer)
+    return True
+
+
+async def fail_job(db: AsyncSession, claimed: ClaimedJob, error: str) -> bool:
+    """
+    실패한 작업을 backoff 후 재시도하도록 되돌립니다.
+    최대 시도 횟수를 넘으면 fallback 문구로 카드를 만들고 failed 상태로 남깁니다.
+    """
+    if claimed.attempts >= CARD_JOB_MAX_ATTEMPTS:
+        question, answer = llm_filter.fallback_card_content(claimed.error_context)
+        return await complete_job(db, claimed, question, answer, from_llm=False, status='failed', error=error)
+
+    retried = await db.execute(
+        update(Job)
+        .where(Job.job_id == claimed.job_id, Job.status == 'running', Job.attempts == claimed.attempts)
+        .values(status='pending', locked_at=None, last_error=error, next_attempt_at=_utcnow() + timedelta(seconds=backoff_seconds(claimed.attempts)))
+        .execution_options(synchronize_session=False)
+    )
+    return retried.rowcount == 1
+
+
+async def generate_for_job(claimed: ClaimedJob, timeout: Optional[float] = None) -> tuple:
+    return await llm_filter.generate_card_content(claimed.error_context, claimed.model_name, timeout=timeout)
+
+
+async def run_once(session_factory=SessionLocal) -> bool:
+    """
+    작업 하나를 가져와 처리합니다. 처리할 작업이 없으면 False를 반환합니다.
+    LLM 호출 동안에는 DB 트랜잭션을 열어 두지 않습니다.
+    """
+    async with session_factory() as db:
+        claimed = await claim_next_job(db)
+        await db.commit()
+    if claimed is None:
+        return False
+
+    with llm_telemetry.collect_calls() as llm_calls:
+        try:
+            question, answer, from_llm = await generate_for_job(claimed)
+        except Exception as e:
+            error = e.detail if isinstance(e, HTTPException) else str(e)
+            print(f"Warning: Card generation job {claimed.job_id} failed (attempt {claimed.attempts}): {error}")
+            async with session_factory() as db:
+                await fail_job(db, claimed, str(error))
+                await llm_telemetry.persist_calls(db, claimed.llm_log_id, llm_calls)
+                await db.commit()
+            return True
+
+    async with session_factory() as db:
+        await complete_job(db, claimed, question, answer, from_llm)
+        await llm_telemetry.persist_calls(db, claimed.llm_log_id, llm_calls)
+        await db.commit()
+    return True
+
+
+def _job_is_runnable(job: models.CardGenerationJob, now: datetime) -> bool:
+    # _is_runnable과 같은 조건을 이미 읽어 온 작업에 적용합니다.
+    if job.status == 'pending':
+        return job.next_attempt_at is None or job.next_attempt_at <= now
+    return job.locked_at is None or job.locked_at < now - timedelta(seconds=CARD_JOB_LEASE_SECONDS)
+
+
+async def _generate_before_deadline(job: ClaimedJob, deadline: float, semaphore: asyncio.Semaphore):
+    """
+    제한 시간 안에 시작할 수 있으면 카드를 생성합니다. 시작하지 못했으면 None을 반환합니다.
+    """
+    async with semaphore:
+        remaining = deadline - time.monotonic()
+        if remaining <= 0:
+            return None
+        with llm_telemetry.collect_calls() as llm_calls:
+            try:
+                return await generate_for_job(job, timeout=remaining), None, llm_calls
+            except Exception as e:
+                return None, (e.detail if isinstance(e, HTTPException) else str(e)), llm_calls
+
+
+async def ensure_cards_for_student(db: AsyncSession, student_id: str, timeout: float = None):
+    """
+    학생의 남은 카드 생성 작업을 복습 덱 조회 전에 마무리합니다.
+    실행 가능한 작업은 요청 안에서 최대 CARD_QUEUE_ENSURE_CONCURRENCY개씩 동시에 생성하고, 워커가 처리 중인 작업은 제한 시간까지 기다립니다.
+    제한 시간이 지나면 더 생성하지 않으며, 실패한 작업은 fail_job으로 backoff 후 재시도되므로
+    fallback 카드는 워커와 같이 CARD_JOB_MAX_ATTEMPTS번 실패한 뒤에만 만들어집니다.
+    """
+    deadline = time.monotonic() + (timeout if timeout is not None else CARD_QUEUE_ENSURE_TIMEOUT_SECONDS)
+    semaphore = asyncio.Semaphore(max(CARD_QUEUE_ENSURE_CONCURRENCY, 1))
+    while True:
+        now = _utcnow()
+        result = await db.execute(
+            select(Job)
+            .where(Job.student_id == student_id, Job.status.in_(['pending', 'running']))
+            .order_by(Job.job_id)
+            .execution_options(populate_existing=True)
+        )
+        jobs = result.scalars().all()
+        runnable = [_snapshot(job) for job in jobs if _job_is_runnable(job, now)]
+        in_progress = [job for job in jobs if job.status == 'running' and not _job_is_runnable(job, now)]
+
+        outcomes = await asyncio.gather(*(_generate_before_deadline(job, deadline, semaphore) for job in runnable))
+        for job, outcome in zip(runnable, outcomes):
+            if outcome is None:
+                continue # 제한 시간이 지나 시작하지 못한 작업은 워커가 처리합니다.
+            generated, error, llm_calls = outcome
+            await llm_telemetry.persist_calls(db, job.llm_log_id, llm_calls)
+
+            # 그 사이 워커가 가져간 작업이면 생성 결과를 버립니다.
+            taken = await db.execute(
+                update(Job)
+                .where(Job.job_id == job.job_id, Job.status == job.status, Job.attempts == job.attempts)
+                .values(status='running', locked_at=_utcnow(), attempts=Job.attempts + 1)
+                .execution_options(synchronize_session=False)
+            )
+            if taken.rowcount != 1:
+                continue
+            claimed = job._replace(attempts=job.attempts + 1)
+            if generated is None:
+                print(f"Warning: Card generation job {job.job_id} failed in deck request (attempt {claimed.attempts}): {error}")
+                await fail_job(db, claimed, str(error))
+            else:
+                question, answer, from_llm = generated
+                await complete_job(db, claimed, question, answer, from_llm)
+
+        if not in_progress or time.monotonic() >= deadline:
+            return
+        await asyncio.sleep(0.1)
+
+
+async def get_queue_status(db: AsyncSession) -> schemas.CardGenerationQueueStatus:
+    counts = await crud.get_card_generation_job_counts(db)
+    oldest = await crud.get_oldest_pending_card_job_created_at(db)
+    return schemas.CardGenerationQueueStatus(
+        pending=counts.get('pending', 0),
+        running=counts.get('running', 0),
+        done=counts.get('done', 0),
+        failed=counts.get('failed', 0),
+        backlog=counts.get('pending', 0) + counts.get('running', 0),
+        oldest_pending_age_seconds=round((_utcnow() - oldest).total_seconds(), 1) if oldest else None,
+        workers=worker_pool.size if worker_pool else 0
+    )
+
+
+class CardGenerationWorkerPool:
+    """
+    카드 생성 작업 큐를 비우는 인프로세스 워커 풀. lifespan에서 시작/종료합니다.
+    """
+
+    def __init__(self, size: int = CARD_QUEUE_WORKERS, session_factory=SessionLocal):
+        self.size = size
+        self.session_factory = session_factory
+        self._tasks = []
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run(worker_id)) for worker_id in range(self.size)]
+
+    async def stop(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker_id: int):
+        while True:
+            try:
+                processed = await run_once(self.session_factory)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: Card generation worker {worker_id} error: {e}")
+                processed = False
+            if not processed:
+                await asyncio.sleep(CARD_QUEUE_POLL_INTERVAL_SECONDS)
+
+
+worker_pool: Optional[CardGenerationWorkerPool] = None
+
+
+async def start_workers(size: int = CARD_QUEUE_WORKERS):
+    global worker_pool
+    if size <= 0:
+        return
+    worker_pool = CardGenerationWorkerPool(size=size)
+    worker_pool.start()
+
+
+async def stop_workers():
+    global worker_pool
+    if worker_pool is not None:
+        await worker_pool.stop()
+        worker_pool = None
@@ -3,6 +3,7 @@ from sqlalchemy.ext.asyncio import AsyncSession
 
 import crud
 import schemas
+import card_queue
 from llm_filter import get_db
 
 router = APIRouter(
@@ -10,6 +11,13 @@ router = APIRouter(
     tags=["Cards"],
 )
 
+@router.get("/generation-queue", response_model=schemas.CardGenerationQueueStatus)
+async def get_card_generation_queue(db: AsyncSession = Depends(get_db)):
+    """
+    지연 카드 생성 큐의 적체 현황(backlog)과 가장 오래된 대기 작업의 나이를 반환합니다.
+    """
+    return await card_queue.get_queue_status(db)
+
 @router.post("/{card_id}/review", response_model=schemas.AnkiCardResponse)
 async def review_card(card_id: int, review: schemas.CardReviewRequest, db: AsyncSession = Depends(get_db)):
     db_card = await crud.update_anki_card_schedule(db, card_id=card_id, quality=review.quality)
@@ -0,0 +1,185 @@
+"""
+코칭 제안 생성과 결과 캐시.
+
+결과는 (student_id, days_back, model)별로 캐시하고, 학생 데이터의 fingerprint(기간, 최대 log_id,
+최대 card_id, 최근 복습 시각, 최대 memo_id)가 같으면 LLM을 다시 호출하지 않습니다.
+COACHING_STALE_WHILE_REVALIDATE가 켜져 있으면 데이터가 바뀐 경우에도 이전 결과를 바로 돌려주고
+백그라운드에서 새로 생성해 캐시를 갱신합니다.
+"""
+import asyncio
+import os
+from datetime import date, timedelta
+from typing import Dict, Hashable, NamedTuple, Optional, Set, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import models
+from database import SessionLocal
+from llm_filter import call_ollama_api
+from llm_telemetry import record_prompt_context
+from prompt_context import ContextBuilder, aggregate_by_concept, log_item, card_item, memo_item, rank_logs, rank_cards, rank_memos
+from ttl_cache import LRUTTLCache
+
+# 코칭 제안 생성은 프롬프트가 길어 판단 호출보다 긴 타임아웃을 사용합니다.
+COACHING_LLM_TIMEOUT = float(os.getenv("COACHING_LLM_TIMEOUT", "60"))
+COACHING_MODEL = os.getenv("COACHING_MODEL", "llama2:latest")
+COACHING_CACHE_MAX_ENTRIES = int(os.getenv("COACHING_CACHE_MAX_ENTRIES", "2048"))
+# fingerprint가 같아도 이 시간이 지나면 다시 생성합니다.
+COACHING_CACHE_TTL_SECONDS = float(os.getenv("COACHING_CACHE_TTL_SECONDS", "86400"))
+COACHING_STALE_WHILE_REVALIDATE = os.getenv("COACHING_STALE_WHILE_REVALIDATE", "false").lower() == "true"
+
+FALLBACK_ASSESSMENT = "LLM 분석 실패"
+
+CACHE_HIT = "hit"
+CACHE_MISS = "miss"
+CACHE_STALE = "stale" # 이전 결과를 반환하고 백그라운드에서 갱신 중
+
+coaching_cache = LRUTTLCache(max_entries=COACHING_CACHE_MAX_ENTRIES, ttl_seconds=COACHING_CACHE_TTL_SECONDS)
+# 백그라운드 갱신에서 사용할 세션 팩토리 (요청 세션은 응답 후 닫히므로 따로 엽니다)
+session_factory = SessionLocal
+
+# 실행 중인 백그라운드 갱신 (GC로 사라지지 않도록 참조를 유지하고, 같은 키는 하나만 실행합니다)
+_pending_refreshes: Dict[Hashable, asyncio.Task] = {}
+
+
+class CachedCoaching(NamedTuple):
+    fingerprint: tuple
+    result: dict # {"overall_assessment", "suggestions"}
+
+
+def coaching_period(days_back: int, today: Optional[date] = None) -> Tuple[date, date]:
+    end_date = today or date.today()
+    return end_date - timedelta(days=days_back - 1), end_date
+
+
+async def data_fingerprint(db: AsyncSession, student_id: str, start_date: date, end_date: date) -> tuple:
+    return (start_date, end_date) + await crud.get_student_data_fingerprint(db, student_id, start_date, end_date)
+
+
+async def build_coaching_prompt(db: AsyncSession, student: models.Student, start_date: date, end_date: date) -> str:
+    llm_logs = await crud.get_llm_logs(db, student_id=student.student_id, start_date=start_date, end_date=end_date, limit=None)
+    anki_cards = await crud.get_anki_cards_with_concepts(db, student_id=student.student_id) # (card, concept_name), 전체 카드
+    coach_memos = await crud.get_coach_memos(db, student_id=student.student_id, start_date=start_date, end_date=end_date, limit=None)
+
+    # 전체 데이터는 개념별 집계로 요약하고, 원본 항목은 중요도 순으로 토큰 예산만큼만 넣습니다.
+    builder = ContextBuilder()
+    builder.set_header(student_name=student.name, analysis_period=f"{start_date} to {end_date}")
+    builder.add_section("concept_summary", aggregate_by_concept(llm_logs, anki_cards, today=end_date))
+    builder.add_section("llm_judgments", [log_item(log) for log in rank_logs(llm_logs)], raw_items=({
+        "concept_name": log.concept_name,
+        "decision": log.decision,
+        "reason": log.reason,
+        "coach_feedback": log.coach_feedback,
+        "model_version": log.model_version,
+        "created_at": log.created_at.isoformat()
+    } for log in llm_logs))
+    builder.add_section("anki_card_progress", [card_item(card, concept) for card, concept in rank_cards(anki_cards)], raw_items=({
+        "question": card.question,
+        "answer": card.answer,
+        "repetitions": card.repetitions,
+        "ease_factor": card.ease_factor,
+        "next_review_date": card.next_review_date.isoformat() if card.next_review_date else None,
+        "last_reviewed_at": card.last_reviewed_at.isoformat() if card.last_reviewed_at else None
+    } for card, _ in anki_cards))
+    builder.add_section("coach_memos", [memo_item(memo) for memo in rank_memos(coach_memos)], raw_items=({
+        "memo_text": memo.memo_text,
+        "created_at": memo.created_at.isoformat()
+    } for memo in coach_memos))
+    student_data_context = builder.build()
+    record_prompt_context("coaching", student_data_context.tokens, student_data_context.raw_tokens)
+
+    return f"""[SYSTEM]
+You are an AI assistant that analyzes student learning data and generates proactive coaching suggestions. Your output must be in JSON format with two keys: "overall_assessment" (string) and "suggestions" (array of objects).
+
+[INSTRUCTIONS]
+- Analyze the provided student learning data, including LLM judgments, Anki card progress, and coach memos.
+- "concept_summary" aggregates all data per concept. The item lists contain only the most relevant items; "omitted" counts the items left out.
+- The "overall_assessment" should be a concise summary of the student's current learning status, strengths, and areas needing attention.
+- Each suggestion object in the "suggestions" array must have "category" (string), "suggestion" (string), and "priority" (string: High, Medium, Low) keys.
+- Suggestions should be actionable, personalized, and cover areas like concept reinforcement, study habits, motivation, or specific topic focus.
+- All outputs should be in Korean.
+
+[STUDENT LEARNING DATA]
+{student_data_context.text}
+
+Your JSON Response:"""
+
+
+async def generate_coaching(db: AsyncSession, student: models.Student, start_date: date, end_date: date, model_name: str) -> Tuple[dict, bool]:
+    """
+    LLM으로 코칭 제안을 생성합니다. 반환값: (결과 dict, LLM 생성 성공 여부). 실패하면 fallback 결과를 반환합니다.
+    """
+    llm_prompt = await build_coaching_prompt(db, student, start_date, end_date)
+    try:
+        llm_response_data = await call_ollama_api(llm_prompt, model_name=model_name, timeout=COACHING_LLM_TIMEOUT, route="coaching")
+    except Exception as e:
+        print(f"Warning: Failed to generate coaching suggestions with LLM: {e}. Using fallback.")
+        return {"overall_assessment": FALLBACK_ASSESSMENT, "suggestions": []}, False
+    result = {
+        "overall_assessment": llm_response_data.get("overall_assessment", FALLBACK_ASSESSMENT),
+        "suggestions": llm_response_data.get("suggestions", []),
+    }
+    return result, "overall_assessment" in llm_response_data
+
+
+async def _generate_and_cache(db: AsyncSession, student: models.Student, days_back: int, model_name: str) -> dict:
+    start_date, end_date = coaching_period(days_back)
+    # 생성 전에 fingerprint를 읽으므로, 생성 중에 들어온 데이터는 다음 요청에서 다시 반영됩니다.
+    fingerprint = await data_fingerprint(db, student.student_id, start_date, end_date)
+    result, generated = await generate_coaching(db, student, start_date, end_date, model_name)
+    if generated:
+        coaching_cache.set((student.student_id, days_back, model_name), CachedCoaching(fingerprint, result))
+    return result
+
+
+async def _refresh(student_id: str, days_back: int, model_name: str):
+    async with session_factory() as db:
+        student = await crud.get_student(db, student_id=student_id)
+        if student is not None:
+            await _generate_and_cache(db, student, days_back, model_name)
+
+
+def schedule_refresh(student_id: str, days_back: int, model_name: str) -> Optional[asyncio.Task]:
+    key = (student_id, days_back, model_name)
+    task = _pending_refreshes.get(key)
+    if task is not None and not task.done():
+        return task
+    task = asyncio.get_running_loop().create_task(_refresh(student_id, days_back, model_name))
+    _pending_refreshes[key] = task
+    task.add_done_callback(lambda t: _pending_refreshes.pop(key, None) if _pending_refreshes.get(key) is t else None)
+    return task
+
+
+async def wait_for_refreshes():
+    await asyncio.gather(*list(_pending_refreshes.values()), return_exceptions=True)
+
+
+async def cancel_pending_refreshes():
+    tasks = list(_pending_refreshes.values())
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
+
+
+async def get_coaching_suggestions(
+    db: AsyncSession,
+    student: models.Student,
+    days_back: int,
+    model_name: Optional[str] = None,
+    stale_while_revalidate: Optional[bool] = None,
+) -> Tuple[dict, str]:
+    """
+    반환값: (결과 dict, 캐시 상태 hit/miss/stale)
+    """
+    model_name = model_name or COACHING_MODEL
+    stale_while_revalidate = COACHING_STALE_WHILE_REVALIDATE if stale_while_revalidate is None else stale_while_revalidate
+    cached: Optional[CachedCoaching] = coaching_cache.get((student.student_id, days_back, model_name))
+    if cached is not None:
+        start_date, end_date = coaching_period(days_back)
+        if cached.fingerprint == await data_fingerprint(db, student.student_id, start_date, end_date):
+            return cached.result, CACHE_HIT
+        if stale_while_revalidate:
+            schedule_refresh(student.student_id, days_back, model_name)
+            return cached.result, CACHE_STALE
+    return await _generate_and_cache(db, student, days_back, model_name), CACHE_MISS
@@ -1,10 +1,11 @@
 import json
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy import func, and_
+from sqlalchemy import func, and_, case, delete
+from sqlalchemy.exc import IntegrityError
 from sqlalchemy.orm import selectinload
 from sqlalchemy.future import select
-from datetime import date, timedelta, datetime
-from typing import List, Optional, Dict, Any # Optional, Dict, Any 추가
+from datetime import date, timedelta, datetime, timezone
+from typing import List, Optional, Dict, Any, Iterable # Optional, Dict, Any 추가
 
 import models
 import schemas
@@ -13,7 +14,7 @@ import anki_engine
 async def get_llm_logs(
     db: AsyncSession,
     skip: int = 0,
-    limit: int = 20,
+    limit: Optional[int] = 20,
     start_date: Optional[date] = None,
     end_date: Optional[date] = None,
     student_id: Optional[str] = None
@@ -27,8 +28,8 @@ async def get_llm_logs(
         # end_date는 해당 날짜의 자정까지 포함해야 하므로, 다음 날의 자정 직전으로 설정
         conditions.append(models.LLMLog.created_at < (end_date + timedelta(days=1)))
     if student_id:
-        # submission_id에서 학생 ID를 추출하여 비교 (submission_id 형식: "{student_id}-{...}")
-        conditions.append(models.LLMLog.submission_id.like(f"{student_id}-%"))
+        # (student_id, created_at) 인덱스로 학생의 기간 범위만 읽습니다.
+        conditions.append(models.LLMLog.student_id == student_id)
 
     if conditions:
         query = query.where(and_(*conditions))
@@ -36,13 +37,22 @@ async def get_llm_logs(
     result = await db.execute(query)
     return result.scalars().all()
 
-async def create_llm_log(db: AsyncSession, submission_id: int, decision: str, reason: str, concept_name: str, model_version: str) -> models.LLMLog:
-    db_log = models.LLMLog(submission_id=submission_id, decision=decision, reason=reason, concept_name=concept_name, model_version=model_version)
+async def create_llm_log(db: AsyncSession, submission_id: int, decision: str, reason: str, concept_name: str, model_version: str, judge_mode: Optional[str] = None, latency_ms: Optional[int] = None, student_mistake_summary: Optional[str] = None, student_id: Optional[str] = None) -> models.LLMLog:
+    db_log = models.LLMLog(submission_id=submission_id, student_id=student_id, decision=decision, reason=reason, concept_name=concept_name, student_mistake_summary=student_mistake_summary, model_version=model_version, judge_mode=judge_mode, latency_ms=latency_ms)
     db.add(db_log)
     await db.flush()
     await db.refresh(db_log)
+    await invalidate_daily_summaries(db, student_id, [activity_day(db_log.created_at)])
     return db_log
 
+async def create_llm_logs_bulk(db: AsyncSession, db_logs: List[models.LLMLog]) -> List[models.LLMLog]:
+    # 한 번의 flush로 여러 로그를 저장하고 log_id를 채웁니다.
+    db.add_all(db_logs)
+    await db.flush()
+    for student_id in {db_log.student_id for db_log in db_logs if db_log.student_id}:
+        await invalidate_daily_summaries(db, student_id, [activity_day(None)])
+    return db_logs
+
 async def update_llm_log_feedback(db: AsyncSession, feedback: schemas.FeedbackRequest) -> models.LLMLog:
     result = await db.execute(select(models.LLMLog).where(models.LLMLog.log_id == int(feedback.log_id)))
     db_log = result.scalars().first()
@@ -51,8 +61,12 @@ async def update_llm_log_feedback(db: AsyncSession, feedback: schemas.FeedbackRe
         db_log.coach_feedback = feedback.feedback
         db_log.reason_code = feedback.reason_code
         db_log.memo = feedback.memo
+        # 같은 초 안의 수정도 구분되도록 마이크로초까지 저장합니다.
+        db_log.feedback_updated_at = datetime.now(timezone.utc).replace(tzinfo=None)
         await db.flush()
         await db.refresh(db_log)
+        # 일일 요약 프롬프트에 코치 피드백이 들어가므로 로그가 기록된 날의 요약을 다시 만들게 합니다.
+        await invalidate_daily_summaries(db, db_log.student_id, [activity_day(db_log.created_at)])
     return db_log
 
 async def create_anki_card(db: AsyncSession, card: schemas.AnkiCardCreate) -> models.AnkiCard:
@@ -70,8 +84,60 @@ async def create_anki_card(db: AsyncSession, card: schemas.AnkiCardCreate) -> mo
     db.add(db_card)
     await db.flush()
     await db.refresh(db_card)
+    await invalidate_daily_summaries(db, db_card.student_id, [activity_day(db_card.created_at)])
     return db_card
 
+async def create_anki_cards_bulk(db: AsyncSession, cards: List[schemas.AnkiCardCreate]) -> List[models.AnkiCard]:
+    next_review_date, interval_days, ease_factor, repetitions = anki_engine.get_initial_anki_schedule()
+    db_cards = [
+        models.AnkiCard(
+            student_id=card.student_id,
+            llm_log_id=card.llm_log_id,
+            question=card.question,
+            answer=card.answer,
+            next_review_date=next_review_date,
+            interval_days=interval_days,
+            ease_factor=int(ease_factor * 100), # Convert float to int for storage
+            repetitions=repetitions
+        )
+        for card in cards
+    ]
+    db.add_all(db_cards)
+    await db.flush()
+    for student_id in {card.student_id for card in db_cards}:
+        await invalidate_daily_summaries(db, student_id, [activity_day(None)])
+    return db_cards
+
+async def create_card_generation_job(db: AsyncSession, llm_log_id: int, student_id: str, error_context: schemas.ErrorContext, model_name: str, model_version: Optional[str]) -> models.CardGenerationJob:
+    db_job = models.CardGenerationJob(
+        llm_log_id=llm_log_id,
+        student_id=student_id,
+        question_type=error_context.question_type,
+        concept_name=error_context.concept_name,
+        student_mistake_summary=error_context.student_mistake_summary,
+        model_name=model_name,
+        model_version=model_version,
+        status='pending',
+        attempts=0
+    )
+    db.add(db_job)
+    await db.flush()
+    return db_job
+
+async def get_card_generation_job_counts(db: AsyncSession) -> Dict[str, int]:
+    result = await db.execute(
+        select(models.CardGenerationJob.status, func.count(models.CardGenerationJob.job_id))
+        .group_by(models.CardGenerationJob.status)
+    )
+    return {status: count for status, count in result.all()}
+
+async def get_oldest_pending_card_job_created_at(db: AsyncSession) -> Optional[datetime]:
+    result = await db.execute(
+        select(func.min(models.CardGenerationJob.created_at))
+        .where(models.CardGenerationJob.status.in_(['pending', 'running']))
+    )
+    return result.scalar()
+
 async def update_anki_card_schedule(db: AsyncSession, card_id: int, quality: int) -> models.AnkiCard:
     result = await db.execute(select(models.AnkiCard).where(models.AnkiCard.card_id == card_id))
     db_card = result.scalars().first()
@@ -86,6 +152,7 @@ async def update_anki_card_schedule(db: AsyncSession, card_id: int, quality: int
         db_card.last_reviewed_at = func.now()
         await db.flush()
         await db.refresh(db_card)
+        await invalidate_daily_summaries(db, db_card.student_id, [activity_day(db_card.last_reviewed_at)])
     return db_card
 
 async def create_student(db: AsyncSession, student: schemas.StudentCreate) -> models.Student:
@@ -155,15 +222,71 @@ async def assign_parent_to_student(db: AsyncSession, student_id: str, parent_id:
         await db.refresh(db_student)
     return db_student
 
-async def get_due_anki_cards(db: AsyncSession, student_id: str, today: date) -> List[models.AnkiCard]:
-    result = await db.execute(
+async def get_due_anki_cards(db: AsyncSession, student_id: str, today: date, limit: Optional[int] = None) -> List[models.AnkiCard]:
+    """
+    기한이 지난 카드를 복습 우선순위(오래된 복습일, 낮은 ease, card_id) 순으로 반환합니다.
+    정렬 순서가 (student_id, next_review_date, ease_factor) 인덱스 순서와 같아 limit만큼만 읽습니다.
+    """
+    query = (
         select(models.AnkiCard)
         .where(models.AnkiCard.student_id == student_id)
         .where(models.AnkiCard.next_review_date <= today)
-        .order_by(models.AnkiCard.next_review_date, models.AnkiCard.ease_factor.asc())
+        .order_by(models.AnkiCard.next_review_date, models.AnkiCard.ease_factor.asc(), models.AnkiCard.card_id)
     )
+    if limit is not None:
+        query = query.limit(limit)
+    result = await db.execute(query)
     return result.scalars().all()
 
+async def count_due_anki_cards(db: AsyncSession, student_id: str, today: date) -> int:
+    result = await db.execute(
+        select(func.count(models.AnkiCard.card_id))
+        .where(models.AnkiCard.student_id == student_id)
+        .where(models.AnkiCard.next_review_date <= today)
+    )
+    return result.scalar_one()
+
+async def get_anki_cards_with_concepts(db: AsyncSession, student_id: str, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[tuple]:
+    """
+    학생의 카드와, 카드를 만든 판단의 concept_name을 (AnkiCard, concept_name) 쌍으로 최근 생성 순으로 반환합니다.
+    기간을 주면 그 기간에 만들어졌거나 복습된 카드만 반환합니다. 판단이 기간 밖에 있어도 concept_name을 채웁니다.
+    """
+    query = (
+        select(models.AnkiCard, models.LLMLog.concept_name)
+        .outerjoin(models.LLMLog, models.LLMLog.log_id == models.AnkiCard.llm_log_id)
+        .where(models.AnkiCard.student_id == student_id)
+        .order_by(models.AnkiCard.created_at.desc(), models.AnkiCard.card_id.desc())
+    )
+    if start_date and end_date:
+        period_end = end_date + timedelta(days=1)
+        query = query.where(
+            and_(models.AnkiCard.created_at >= start_date, models.AnkiCard.created_at < period_end)
+            | and_(models.AnkiCard.last_reviewed_at >= start_date, models.AnkiCard.last_reviewed_at < period_end)
+        )
+    result = await db.execute(query)
+    return [tuple(row) for row in result.all()]
+
+async def get_student_data_fingerprint(db: AsyncSession, student_id: str, start_date: date, end_date: date) -> tuple:
+    """
+    코칭 제안/리포트 초안의 입력 데이터가 바뀌었는지 판단하는 값들을 한 번의 쿼리로 읽습니다.
+    (기간 내 최대 log_id, 기간 내 로그의 최근 피드백 수정 시각, 최대 card_id, 최근 복습 시각, 기간 내 최대 memo_id)
+    """
+    period_end = end_date + timedelta(days=1)
+    period_logs = (
+        models.LLMLog.student_id == student_id,
+        models.LLMLog.created_at >= start_date, models.LLMLog.created_at < period_end
+    )
+    max_log_id = select(func.max(models.LLMLog.log_id)).where(*period_logs).scalar_subquery()
+    feedback_updated_at = select(func.max(models.LLMLog.feedback_updated_at)).where(*period_logs).scalar_subquery()
+    max_card_id = select(func.max(models.AnkiCard.card_id)).where(models.AnkiCard.student_id == student_id).scalar_subquery()
+    last_reviewed_at = select(func.max(models.AnkiCard.last_reviewed_at)).where(models.AnkiCard.student_id == student_id).scalar_subquery()
+    max_memo_id = select(func.max(models.CoachMemo.memo_id)).where(
+        models.CoachMemo.student_id == student_id,
+        models.CoachMemo.created_at >= start_date, models.CoachMemo.created_at < period_end
+    ).scalar_subquery()
+    result = await db.execute(select(max_log_id, feedback_updated_at, max_card_id, last_reviewed_at, max_memo_id))
+    return tuple(result.one())
+
 async def create_coach_memo(db: AsyncSession, memo: schemas.CoachMemoCreate) -> models.CoachMemo:
     db_memo = models.CoachMemo(
         coach_id=memo.coach_id,
@@ -173,12 +296,17 @@ async def create_coach_memo(db: AsyncSession, memo: schemas.CoachMemoCreate) ->
     db.add(db_memo)
     await db.flush()
     await db.refresh(db_memo)
+    await invalidate_daily_summaries(db, db_memo.student_id, [activity_day(db_memo.created_at)])
     return db_memo
 
-async def get_coach_memos(db: AsyncSession, student_id: str, coach_id: Optional[str] = None, skip: int = 0, limit: int = 100) -> List[models.CoachMemo]:
+async def get_coach_memos(db: AsyncSession, student_id: str, coach_id: Optional[str] = None, skip: int = 0, limit: Optional[int] = 100, start_date: Optional[date] = None, end_date: Optional[date] = None) -> List[models.CoachMemo]:
     query = select(models.CoachMemo).where(models.CoachMemo.student_id == student_id)
     if coach_id:
         query = query.where(models.CoachMemo.coach_id == coach_id)
+    if start_date:
+        query = query.where(models.CoachMemo.created_at >= start_date)
+    if end_date:
+        query = query.where(models.CoachMemo.created_at < (end_date + timedelta(days=1)))
     query = query.order_by(models.CoachMemo.created_at.desc()).offset(skip).limit(limit)
     result = await db.execute(query)
     return result.scalars().all()
@@ -227,20 +355,112 @@ async def get_feedback_summary_by_model_version(db: AsyncSession) -> List[Dict[s
 
     return [dict(row) for row in summary]
 
+async def get_judge_mode_summary(db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    Compares judge modes (two_call, fused, ...) per model_version: request count,
+    average latency and coach feedback counts.
+    """
+    query = (
+        select(
+            models.LLMLog.model_version,
+            models.LLMLog.judge_mode,
+            func.count(models.LLMLog.log_id).label('total_logs'),
+            func.avg(models.LLMLog.latency_ms).label('avg_latency_ms'),
+            func.sum(case((models.LLMLog.coach_feedback == 'GOOD', 1), else_=0)).label('good_feedback_count'),
+            func.sum(case((models.LLMLog.coach_feedback == 'BAD', 1), else_=0)).label('bad_feedback_count')
+        )
+        .group_by(models.LLMLog.model_version, models.LLMLog.judge_mode)
+        .order_by(models.LLMLog.model_version, models.LLMLog.judge_mode)
+    )
+
+    result = await db.execute(query)
+    return [dict(row._mapping) for row in result.all()]
+
+async def create_shadow_judgment(db: AsyncSession, shadow: models.ShadowJudgment) -> models.ShadowJudgment:
+    db.add(shadow)
+    await db.flush()
+    return shadow
+
+async def create_llm_call_metrics(db: AsyncSession, metrics: List[models.LLMCallMetric]) -> List[models.LLMCallMetric]:
+    db.add_all(metrics)
+    await db.flush()
+    return metrics
+
+async def get_shadow_agreement_summary(db: AsyncSession) -> List[Dict[str, Any]]:
+    """
+    staging(shadow) 모델별로 production 판단과 decision이 일치한 비율과 shadow 호출 지연을 집계합니다.
+    """
+    query = (
+        select(
+            models.ShadowJudgment.model_version,
+            models.ShadowJudgment.production_model_version,
+            func.count(models.ShadowJudgment.shadow_id).label('total'),
+            func.sum(case((models.ShadowJudgment.decision == models.ShadowJudgment.production_decision, 1), else_=0)).label('agreements'),
+            func.sum(case((and_(models.ShadowJudgment.decision == 'APPROVE', models.ShadowJudgment.production_decision == 'REJECT'), 1), else_=0)).label('shadow_only_approvals'),
+            func.sum(case((and_(models.ShadowJudgment.decision == 'REJECT', models.ShadowJudgment.production_decision == 'APPROVE'), 1), else_=0)).label('shadow_only_rejections'),
+            func.avg(models.ShadowJudgment.latency_ms).label('avg_latency_ms')
+        )
+        .group_by(models.ShadowJudgment.model_version, models.ShadowJudgment.production_model_version)
+        .order_by(models.ShadowJudgment.model_version, models.ShadowJudgment.production_model_version)
+    )
+
+    result = await db.execute(query)
+    return [dict(row._mapping) for row in result.all()]
+
 def json_serial(obj):
     """JSON serializer for objects not serializable by default json code"""
     if isinstance(obj, (datetime, date)):
         return obj.isoformat()
     raise TypeError ("Type %s not serializable" % type(obj))
 
-async def create_weekly_report(db: AsyncSession, report_data: schemas.WeeklyReportResponse) -> models.WeeklyReport:
+def activity_day(created_at: Optional[datetime]) -> date:
+    # server_default=func.now()(SQLite CURRENT_TIMESTAMP)는 UTC 기준이므로, 값을 아직 읽지 않은 행은 UTC 오늘로 봅니다.
+    return created_at.date() if created_at else datetime.now(timezone.utc).date()
+
+async def invalidate_daily_summaries(db: AsyncSession, student_id: str, days: Iterable[date]) -> int:
+    """
+    해당 날짜들의 일일 요약을 삭제해 다음 리포트 생성 때 다시 요약되게 합니다.
+    """
+    days = set(days)
+    if not student_id or not days:
+        return 0
+    result = await db.execute(
+        delete(models.DailySummary)
+        .where(models.DailySummary.student_id == student_id, models.DailySummary.summary_date.in_(days))
+        .execution_options(synchronize_session=False)
+    )
+    return result.rowcount
+
+async def get_daily_summaries(db: AsyncSession, student_id: str, start_date: date, end_date: date) -> List[models.DailySummary]:
+    result = await db.execute(
+        select(models.DailySummary)
+        .where(models.DailySummary.student_id == student_id, models.DailySummary.summary_date.between(start_date, end_date))
+        .order_by(models.DailySummary.summary_date)
+    )
+    return result.scalars().all()
+
+async def save_daily_summary(db: AsyncSession, daily: models.DailySummary) -> models.DailySummary:
+    """
+    같은 날짜를 다른 요청이 먼저 저장했으면(유니크 제약 위반) 저장된 행을 반환합니다.
+    """
+    try:
+        async with db.begin_nested():
+            db.add(daily)
+        return daily
+    except IntegrityError:
+        result = await db.execute(
+            select(models.DailySummary)
+            .where(models.DailySummary.student_id == daily.student_id, models.DailySummary.summary_date == daily.summary_date)
+        )
+        return result.scalars().one()
+
+def _weekly_report_fields(report_data: schemas.WeeklyReportResponse) -> Dict[str, Any]:
     # Convert Pydantic models to dictionaries for JSON serialization
     # and handle datetime objects
     anki_summaries = json.loads(json.dumps([s.model_dump() for s in report_data.anki_card_summaries], default=json_serial))
     llm_summaries = json.loads(json.dumps([s.model_dump() for s in report_data.llm_log_summaries], default=json_serial))
     coach_summaries = json.loads(json.dumps([s.model_dump() for s in report_data.coach_memo_summaries], default=json_serial))
-
-    db_report = models.WeeklyReport(
+    return dict(
         student_id=report_data.student_id,
         student_name=report_data.student_name,
         report_period_start=report_data.report_period_start,
@@ -253,13 +473,64 @@ async def create_weekly_report(db: AsyncSession, report_data: schemas.WeeklyRepo
         llm_log_summaries=llm_summaries,
         coach_memo_summaries=coach_summaries,
         overall_summary=report_data.overall_summary,
-        status='draft'
     )
+
+async def create_weekly_report(db: AsyncSession, report_data: schemas.WeeklyReportResponse) -> models.WeeklyReport:
+    db_report = models.WeeklyReport(**_weekly_report_fields(report_data), status='draft')
     db.add(db_report)
     await db.flush()
     await db.refresh(db_report)
     return db_report
 
+async def get_report_draft(db: AsyncSession, student_id: str, start_date: date, end_date: date) -> Optional[models.WeeklyReport]:
+    result = await db.execute(
+        select(models.WeeklyReport).where(
+            models.WeeklyReport.student_id == student_id,
+            models.WeeklyReport.report_period_start == start_date,
+            models.WeeklyReport.report_period_end == end_date,
+            models.WeeklyReport.status == 'draft',
+        )
+    )
+    return result.scalars().first()
+
+async def save_weekly_report_draft(
+    db: AsyncSession,
+    report_data: schemas.WeeklyReportResponse,
+    data_fingerprint: Optional[str],
+    draft: Optional[models.WeeklyReport] = None,
+) -> models.WeeklyReport:
+    """
+    (학생, 기간)의 초안을 저장합니다. 기존 초안이 있으면 같은 report_id로 내용을 바꿉니다.
+    다른 요청이 먼저 같은 기간의 초안을 만들었으면(부분 유니크 인덱스 위반) 그 초안을 반환합니다.
+    """
+    fields = _weekly_report_fields(report_data)
+    if draft is not None:
+        for name, value in fields.items():
+            setattr(draft, name, value)
+        draft.data_fingerprint = data_fingerprint
+        draft.created_at = func.now() # 보관 기간은 마지막 생성 시각부터 셉니다.
+        await db.flush()
+        await db.refresh(draft)
+        return draft
+    db_report = models.WeeklyReport(**fields, status='draft', data_fingerprint=data_fingerprint)
+    try:
+        async with db.begin_nested():
+            db.add(db_report)
+    except IntegrityError:
+        return await get_report_draft(db, report_data.student_id, report_data.report_period_start, report_data.report_period_end)
+    await db.refresh(db_report)
+    return db_report
+
+async def prune_stale_report_drafts(db: AsyncSession, created_before: datetime) -> int:
+    """
+    created_before보다 오래된 초안을 삭제합니다. 승인/발송된 리포트는 남깁니다.
+    """
+    result = await db.execute(
+        delete(models.WeeklyReport)
+        .where(models.WeeklyReport.status == 'draft', models.WeeklyReport.created_at < created_before)
+    )
+    return result.rowcount
+
 async def get_weekly_report(db: AsyncSession, report_id: int) -> Optional[models.WeeklyReport]:
     result = await db.execute(select(models.WeeklyReport).where(models.WeeklyReport.report_id == report_id))
     return result.scalars().first()
@@ -0,0 +1,152 @@
+"""
+주간 리포트용 일일 요약(map 단계).
+
+학생별 하루 활동(판단, 새 카드, 복습, 코치 메모)을 한 번만 LLM으로 요약해 daily_summaries에 저장하고,
+주간 리포트는 저장된 일일 요약을 합쳐 만듭니다(reduce 단계). 리포트를 다시 만들거나 기간을 늘려도
+아직 요약되지 않은 날만 요약합니다. 그날 데이터가 새로 생기면 crud에서 해당 날짜의 요약을 삭제합니다.
+야간 배치는 scripts/generate_daily_summaries.py로 전날 요약을 미리 만들어 둡니다.
+"""
+import os
+from datetime import date, datetime, timedelta
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import models
+from llm_filter import call_ollama_api
+from prompt_context import ContextBuilder, aggregate_by_concept, card_item, clip, log_item, memo_item, rank_cards, rank_logs, rank_memos
+from report_data import ReportData, load_report_data
+
+DAILY_SUMMARY_LLM_TIMEOUT = float(os.getenv("DAILY_SUMMARY_LLM_TIMEOUT", "30"))
+# 하루치 데이터는 작으므로 주간 컨텍스트보다 작은 예산을 사용합니다.
+DAILY_SUMMARY_TOKEN_BUDGET = int(os.getenv("DAILY_SUMMARY_TOKEN_BUDGET", "1200"))
+DAILY_SUMMARY_MODEL = os.getenv("DAILY_SUMMARY_MODEL", "llama2:latest")
+
+
+class DayActivity(NamedTuple):
+    logs: List[models.LLMLog]
+    new_cards: List[Tuple[models.AnkiCard, Optional[str]]]
+    reviewed_cards: List[Tuple[models.AnkiCard, Optional[str]]]
+    memos: List[models.CoachMemo]
+
+    @property
+    def is_empty(self) -> bool:
+        return not (self.logs or self.new_cards or self.reviewed_cards or self.memos)
+
+
+def _day_of(value: Optional[datetime]) -> Optional[date]:
+    return value.date() if value else None
+
+
+async def load_activity(db: AsyncSession, student_id: str, start_date: date, end_date: date, data: Optional[ReportData] = None) -> Dict[date, DayActivity]:
+    """
+    기간의 활동을 한 번에 읽어 날짜별로 나눕니다. 이 기간을 포함하는 data를 이미 읽었다면 다시 조회하지 않습니다.
+    """
+    if data is None:
+        data = await load_report_data(db, student_id, start_date, end_date)
+
+    days: Dict[date, DayActivity] = {}
+
+    def bucket(day: Optional[date]) -> Optional[DayActivity]:
+        if day is None or not start_date <= day <= end_date:
+            return None
+        return days.setdefault(day, DayActivity([], [], [], []))
+
+    for log in data.logs:
+        if (activity := bucket(_day_of(log.created_at))) is not None:
+            activity.logs.append(log)
+    for card, concept in data.cards:
+        if (activity := bucket(_day_of(card.created_at))) is not None:
+            activity.new_cards.append((card, concept))
+        if (activity := bucket(_day_of(card.last_reviewed_at))) is not None:
+            activity.reviewed_cards.append((card, concept))
+    for memo in data.memos:
+        if (activity := bucket(_day_of(memo.created_at))) is not None:
+            activity.memos.append(memo)
+    return days
+
+
+def build_daily_prompt(student_name: str, day: date, activity: DayActivity) -> str:
+    builder = ContextBuilder(token_budget=DAILY_SUMMARY_TOKEN_BUDGET)
+    builder.set_header(student_name=student_name, date=day.isoformat())
+    builder.add_section("concept_summary", aggregate_by_concept(activity.logs, activity.new_cards + activity.reviewed_cards, today=day))
+    builder.add_section("llm_judgments", [log_item(log) for log in rank_logs(activity.logs)])
+    builder.add_section("reviewed_cards", [card_item(card, concept) for card, concept in rank_cards(activity.reviewed_cards)])
+    builder.add_section("new_cards", [{"q": clip(card.question), "concept": concept or "N/A"} for card, concept in activity.new_cards])
+    builder.add_section("coach_memos", [memo_item(memo) for memo in rank_memos(activity.memos)])
+    context = builder.build()
+    return f"""[SYSTEM]
+You are an AI assistant that summarizes one day of a student's learning activity. Your output must be in JSON format with one key: "daily_summary" (string). Do not add any other text.
+
+[INSTRUCTIONS]
+- Summarize in 2-3 Korean sentences what the student worked on, which concepts they struggled with, and any coach observations.
+- "concept_summary" aggregates all data of the day per concept. The item lists contain only the most relevant items; "omitted" counts the items left out.
+
+[STUDENT LEARNING DATA]
+{context.text}
+
+Your JSON Response:"""
+
+
+async def summarize_day(db: AsyncSession, student: models.Student, day: date, activity: DayActivity, model_name: str = None) -> models.DailySummary:
+    """
+    하루 활동을 요약해 저장합니다. 활동이 없는 날은 LLM 없이 빈 요약을 저장하고,
+    LLM 호출이 실패하면 저장하지 않은(summary=None) 행을 반환해 다음 번에 다시 시도합니다.
+    """
+    model_name = model_name or DAILY_SUMMARY_MODEL
+    daily = models.DailySummary(
+        student_id=student.student_id,
+        summary_date=day,
+        judgments_count=len(activity.logs),
+        reviews_count=len(activity.reviewed_cards),
+        new_cards_count=len(activity.new_cards),
+        memos_count=len(activity.memos),
+    )
+    if not activity.is_empty:
+        try:
+            response = await call_ollama_api(build_daily_prompt(student.name, day, activity), model_name=model_name, timeout=DAILY_SUMMARY_LLM_TIMEOUT, route="daily_summary")
+        except Exception as e:
+            print(f"Warning: Failed to summarize {student.student_id} on {day}: {e}. Will retry on the next report.")
+            return daily
+        if not isinstance(response.get("daily_summary"), str):
+            print(f"Warning: Daily summary response for {student.student_id} on {day} has no 'daily_summary'. Will retry on the next report.")
+            return daily
+        daily.summary = response["daily_summary"]
+        daily.model_name = model_name
+    return await crud.save_daily_summary(db, daily)
+
+
+async def ensure_daily_summaries(
+    db: AsyncSession,
+    student: models.Student,
+    start_date: date,
+    end_date: date,
+    today: Optional[date] = None,
+    data: Optional[ReportData] = None,
+) -> List[models.DailySummary]:
+    """
+    기간의 일일 요약을 날짜 순으로 반환합니다. 저장된 요약은 그대로 쓰고, 없는 날(오늘 이후 제외)만 새로 요약합니다.
+    data는 리포트가 이미 읽은 같은 기간의 데이터입니다.
+    """
+    today = today or crud.activity_day(None)
+    existing = {daily.summary_date: daily for daily in await crud.get_daily_summaries(db, student.student_id, start_date, end_date)}
+    missing = [start_date + timedelta(days=offset) for offset in range((min(end_date, today) - start_date).days + 1)]
+    missing = [day for day in missing if day not in existing]
+    if missing:
+        activity = await load_activity(db, student.student_id, missing[0], missing[-1], data=data)
+        empty = DayActivity([], [], [], [])
+        for day in missing:
+            existing[day] = await summarize_day(db, student, day, activity.get(day, empty))
+    return [existing[day] for day in sorted(existing)]
+
+
+def daily_summary_item(daily: models.DailySummary) -> dict:
+    return {
+        "date": daily.summary_date.isoformat(),
+        "summary": daily.summary,
+        "judged": daily.judgments_count,
+        "reviews": daily.reviews_count,
+        "new_cards": daily.new_cards_count,
+        "memos": daily.memos_count,
+    }
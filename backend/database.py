@@ -1,9 +1,21 @@
+import os
+from sqlalchemy import event
 from sqlalchemy.ext.asyncio import create_async_engine, async_sessionmaker
 from sqlalchemy.orm import declarative_base
 
-DATABASE_URL = "sqlite+aiosqlite:///./pacer.db"
+# 부하 테스트/벤치마크에서는 임시 DB를 지정할 수 있습니다.
+DATABASE_URL = os.getenv("DATABASE_URL", "sqlite+aiosqlite:///./pacer.db")
 
 engine = create_async_engine(DATABASE_URL, connect_args={"check_same_thread": False})
+
+if DATABASE_URL.startswith("sqlite"):
+    @event.listens_for(engine.sync_engine, "connect")
+    def _set_sqlite_pragmas(dbapi_connection, connection_record):
+        # WAL 모드에서는 읽기 트랜잭션이 쓰기 커밋을 막지 않아, 동시 요청에서 "database is locked"가 크게 줄어듭니다.
+        cursor = dbapi_connection.cursor()
+        cursor.execute("PRAGMA journal_mode=WAL")
+        cursor.execute("PRAGMA synchronous=NORMAL")
+        cursor.close()
 SessionLocal = async_sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
 Base = declarative_base()
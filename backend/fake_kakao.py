@@ -0,0 +1,154 @@
+"""
+로컬 개발/테스트/부하 테스트용 카카오 메시지 API 대역(fake) 서버.
+
+/v1/api/talk/friends/message/default/send 요청을 받아 보낸 메시지를 기록하고, 실제 API처럼
+{"successful_receiver_uuids": [...]}를 돌려줍니다. 지연 시간, 실패율(5xx), 초당 한도(429 + Retry-After),
+존재하지 않는 수신자(400)를 설정으로 흉내 냅니다.
+
+    python fake_kakao.py --port 8090 --rate-limit-per-second 10
+"""
+import argparse
+import asyncio
+import json
+import random
+import threading
+import time
+from collections import deque
+from typing import Any, Dict, List, Optional, Set
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse
+
+
+class FakeKakaoConfig:
+    def __init__(self, latency_ms: float = 0.0, failure_rate: float = 0.0, rate_limit_per_second: Optional[float] = None, invalid_receivers: Optional[Set[str]] = None, seed: Optional[int] = None):
+        self.latency_ms = latency_ms
+        self.failure_rate = failure_rate
+        # 지난 1초 동안 이 수를 넘는 요청은 429로 거절합니다. (None이면 제한 없음)
+        self.rate_limit_per_second = rate_limit_per_second
+        self.invalid_receivers = set(invalid_receivers or ())
+        self.rng = random.Random(seed)
+
+
+config = FakeKakaoConfig()
+# 성공적으로 "발송"된 메시지: {"receiver_uuid", "template"}
+sent_messages: List[Dict[str, Any]] = []
+request_count = 0
+rate_limited_count = 0
+max_inflight = 0
+_inflight = 0
+_recent_requests: deque = deque()
+
+
+def configure(latency_ms: float = 0.0, failure_rate: float = 0.0, rate_limit_per_second: Optional[float] = None, invalid_receivers: Optional[Set[str]] = None, seed: Optional[int] = None):
+    global config, request_count, rate_limited_count, max_inflight, _inflight
+    config = FakeKakaoConfig(latency_ms=latency_ms, failure_rate=failure_rate, rate_limit_per_second=rate_limit_per_second, invalid_receivers=invalid_receivers, seed=seed)
+    sent_messages.clear()
+    _recent_requests.clear()
+    request_count = 0
+    rate_limited_count = 0
+    max_inflight = 0
+    _inflight = 0
+
+
+app = FastAPI(title="Fake Kakao")
+
+
+@app.post("/v1/api/talk/friends/message/default/send")
+async def send_message(request: Request):
+    global request_count, rate_limited_count, max_inflight, _inflight
+    request_count += 1
+    # application/x-www-form-urlencoded 본문 (python-multipart 없이 직접 파싱)
+    form = {key: values[0] for key, values in parse_qs((await request.body()).decode("utf-8")).items()}
+    authorization = request.headers.get("Authorization")
+    if not authorization or not authorization.startswith("KakaoAK "):
+        return JSONResponse(status_code=401, content={"code": -401, "msg": "invalid app key"})
+
+    if config.rate_limit_per_second is not None:
+        now = time.monotonic()
+        while _recent_requests and now - _recent_requests[0] >= 1.0:
+            _recent_requests.popleft()
+        if len(_recent_requests) >= config.rate_limit_per_second:
+            rate_limited_count += 1
+            return JSONResponse(status_code=429, headers={"Retry-After": "1"}, content={"code": -10, "msg": "API limit has been exceeded."})
+        _recent_requests.append(now)
+
+    _inflight += 1
+    max_inflight = max(max_inflight, _inflight)
+    try:
+        if config.latency_ms:
+            await asyncio.sleep(config.latency_ms / 1000)
+        if config.failure_rate and config.rng.random() < config.failure_rate:
+            return JSONResponse(status_code=503, content={"code": -9798, "msg": "service temporarily unavailable"})
+    finally:
+        _inflight -= 1
+
+    receivers = json.loads(form.get("receiver_uuids", "[]"))
+    invalid = [receiver for receiver in receivers if receiver in config.invalid_receivers]
+    if invalid and len(invalid) == len(receivers):
+        return JSONResponse(status_code=400, content={"code": -532, "msg": "receiver not found", "failure_info": [{"code": -532, "receiver_uuids": invalid}]})
+    template = json.loads(form.get("template_object", "{}"))
+    successful = [receiver for receiver in receivers if receiver not in config.invalid_receivers]
+    sent_messages.extend({"receiver_uuid": receiver, "template": template} for receiver in successful)
+    response = {"successful_receiver_uuids": successful}
+    if invalid:
+        response["failure_info"] = [{"code": -532, "receiver_uuids": invalid}]
+    return response
+
+
+class FakeKakaoServer:
+    """
+    fake Kakao를 백그라운드 스레드에서 uvicorn으로 실행합니다. (port=0 이면 임의의 빈 포트 사용)
+
+        with FakeKakaoServer(rate_limit_per_second=10) as server:
+            client = KakaoClient(base_url=server.url, api_key="test")
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **config_kwargs):
+        self.host = host
+        self.port = port
+        self.config_kwargs = config_kwargs
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        configure(**self.config_kwargs)
+        self._server = uvicorn.Server(uvicorn.Config(app, host=self.host, port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a fake Kakao message API server.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8090)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--rate-limit-per-second", type=float, default=None)
+    parser.add_argument("--invalid-receiver", action="append", default=[], help="Receiver uuid that the fake rejects with 400 (repeatable).")
+    parser.add_argument("--seed", type=int, default=None)
+    args = parser.parse_args()
+
+    configure(latency_ms=args.latency_ms, failure_rate=args.failure_rate, rate_limit_per_second=args.rate_limit_per_second, invalid_receivers=set(args.invalid_receiver), seed=args.seed)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
@@ -0,0 +1,257 @@
+"""
+로컬 개발/테스트/벤치마크용 Ollama 대역(fake) 서버.
+
+실제 Ollama의 /api/generate 응답 형식을 흉내 내며, 프롬프트 종류(판단, 카드 생성, 리포트, 코칭)에 따라
+결정적인(deterministic) JSON 응답을 돌려줍니다. 지연 시간과 실패율은 설정으로 조절합니다.
+
+    python fake_ollama.py --port 11434 --latency-ms 50
+"""
+import argparse
+import asyncio
+import json
+import math
+import random
+import threading
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List, Optional
+
+import uvicorn
+from fastapi import FastAPI
+from fastapi.responses import JSONResponse, StreamingResponse
+
+
+# 응답 지연 분포: uniform(latency_ms ± jitter_ms), exponential(평균 latency_ms), lognormal(중앙값 latency_ms, jitter_ms/latency_ms를 sigma로 사용)
+LATENCY_DISTRIBUTIONS = ("uniform", "exponential", "lognormal")
+
+
+class FakeOllamaConfig:
+    def __init__(self, latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None, token_latency_ms: float = 0.0, prompt_token_latency_ms: float = 0.0, latency_distribution: str = "uniform"):
+        if latency_distribution not in LATENCY_DISTRIBUTIONS:
+            raise ValueError(f"Unknown latency distribution: {latency_distribution}")
+        self.latency_ms = latency_ms
+        self.latency_distribution = latency_distribution
+        # 프롬프트 토큰 하나를 평가하는 시간. context로 넘겨받은 토큰은 다시 평가하지 않습니다.
+        self.prompt_token_latency_ms = prompt_token_latency_ms
+        # 토큰 하나를 생성하는 데 걸리는 시간 (느린 모델 흉내). 스트리밍/비스트리밍 모두 적용됩니다.
+        self.token_latency_ms = token_latency_ms
+        self.jitter_ms = jitter_ms
+        self.failure_rate = failure_rate
+        self.rng = random.Random(seed)
+
+    def draw_latency_ms(self) -> float:
+        if not self.latency_ms:
+            return 0.0
+        if self.latency_distribution == "exponential":
+            return self.rng.expovariate(1.0 / self.latency_ms)
+        if self.latency_distribution == "lognormal":
+            return self.rng.lognormvariate(math.log(self.latency_ms), self.jitter_ms / self.latency_ms)
+        return max(0.0, self.latency_ms + self.rng.uniform(-self.jitter_ms, self.jitter_ms))
+
+
+config = FakeOllamaConfig()
+# 실제로 응답을 생성한 요청 수 (모델 로드/prefix 평가만 하는 warm-up 요청은 warmup_count로 따로 셉니다)
+request_count = 0
+warmup_count = 0
+# 스트리밍 응답을 끝까지 보내기 전에 클라이언트가 연결을 끊은 횟수
+cancelled_streams = 0
+# 메모리에 올라간 모델 -> 마지막으로 받은 keep_alive 값
+loaded_models: Dict[str, Any] = {}
+
+# 스트리밍 시 한 번에 보내는 글자 수 (대략 토큰 하나)
+STREAM_CHUNK_CHARS = 3
+
+
+def configure(latency_ms: float = 0.0, jitter_ms: float = 0.0, failure_rate: float = 0.0, seed: Optional[int] = None, token_latency_ms: float = 0.0, prompt_token_latency_ms: float = 0.0, latency_distribution: str = "uniform"):
+    global config, request_count, warmup_count, cancelled_streams
+    config = FakeOllamaConfig(latency_ms=latency_ms, jitter_ms=jitter_ms, failure_rate=failure_rate, seed=seed, token_latency_ms=token_latency_ms, prompt_token_latency_ms=prompt_token_latency_ms, latency_distribution=latency_distribution)
+    request_count = 0
+    warmup_count = 0
+    cancelled_streams = 0
+    loaded_models.clear()
+
+
+def encode_context(text: str) -> List[int]:
+    # 실제 토크나이저 대신 글자 단위 코드 포인트를 context 토큰으로 사용합니다.
+    return [ord(char) for char in text]
+
+
+def decode_context(context: List[int]) -> str:
+    return "".join(chr(token) for token in context)
+
+
+def _prompt_tokens(text: str) -> int:
+    return max(1, len(text) // 4) if text else 0
+
+
+def _token_chunks(completion: str):
+    return [completion[i:i + STREAM_CHUNK_CHARS] for i in range(0, len(completion), STREAM_CHUNK_CHARS)]
+
+
+def build_completion(prompt: str) -> Dict[str, Any]:
+    """
+    프롬프트 종류를 판별해 모델이 생성했을 법한 JSON 객체를 만듭니다.
+    """
+    if '"daily_summary"' in prompt:
+        return {"daily_summary": "이날 학습한 개념과 복습 내용을 정리한 일일 요약입니다."}
+    if '"overall_summary"' in prompt:
+        return {
+            "overall_summary": "이번 주 학습 활동을 정리한 주간 학습 리포트입니다.",
+            "coach_comment_suggestion": "핵심 개념 복습을 꾸준히 이어가도록 격려해 주세요."
+        }
+    if '"overall_assessment"' in prompt:
+        return {
+            "overall_assessment": "전반적으로 성실하게 학습하고 있으나 일부 개념 복습이 필요합니다.",
+            "suggestions": [
+                {"category": "Concept Reinforcement", "suggestion": "틀린 개념을 카드로 다시 복습하세요.", "priority": "High"}
+            ]
+        }
+    if '"question"' in prompt and '"answer"' in prompt and "Anki flashcard" in prompt:
+        return {"question": "이 개념의 정확한 정의는 무엇인가요?", "answer": "학생이 혼동한 개념을 바르게 정리한 설명입니다."}
+
+    # 판단(judge) 프롬프트: 현재 과제 부분만 보고 결정합니다.
+    current_task = prompt.rsplit("[CURRENT TASK]", 1)[-1]
+    if any(keyword in current_task for keyword in ("계산", "오타", "typo")):
+        return {"decision": "REJECT", "reason": "개념 이해보다는 단순 실수에 가깝습니다."}
+    return {"decision": "APPROVE", "reason": "핵심 개념을 잘못 이해하고 있습니다."}
+
+
+app = FastAPI(title="Fake Ollama")
+
+
+@app.post("/api/generate")
+async def generate(payload: Dict[str, Any]):
+    global request_count, warmup_count
+    model = payload.get("model")
+    loaded_models[model] = payload.get("keep_alive", "5m")
+
+    # 빈 프롬프트(모델 로드) 또는 num_predict=0(prefix 평가) 요청은 응답을 생성하지 않습니다.
+    prompt = payload.get("prompt", "")
+    context = payload.get("context") or []
+    warmup_only = (not prompt and not context) or (payload.get("options") or {}).get("num_predict") == 0
+    if warmup_only:
+        warmup_count += 1
+    else:
+        request_count += 1
+
+    started = time.perf_counter()
+    delay_ms = config.draw_latency_ms()
+    if delay_ms:
+        await asyncio.sleep(delay_ms / 1000)
+
+    if config.failure_rate and config.rng.random() < config.failure_rate:
+        return JSONResponse(status_code=500, content={"error": "fake ollama: injected failure"})
+
+    # context로 넘어온 토큰은 이미 평가된 것으로 보고, 새 프롬프트 토큰만 평가합니다.
+    prompt_eval_started = time.perf_counter()
+    if config.prompt_token_latency_ms:
+        await asyncio.sleep(config.prompt_token_latency_ms * _prompt_tokens(prompt) / 1000)
+    prompt_eval_ns = int((time.perf_counter() - prompt_eval_started) * 1e9)
+    full_prompt = decode_context(context) + prompt
+
+    if warmup_only:
+        return _final_chunk(payload, prompt, "", started, prompt_eval_ns, encode_context(full_prompt))
+
+    completion = json.dumps(build_completion(full_prompt), ensure_ascii=False)
+    if payload.get("stream"):
+        return StreamingResponse(_stream_completion(payload, completion, started, prompt_eval_ns, full_prompt), media_type="application/x-ndjson")
+    if config.token_latency_ms:
+        await asyncio.sleep(config.token_latency_ms * len(_token_chunks(completion)) / 1000)
+    return _final_chunk(payload, prompt, completion, started, prompt_eval_ns, encode_context(full_prompt + completion))
+
+
+async def _stream_completion(payload: Dict[str, Any], completion: str, started: float, prompt_eval_ns: int, full_prompt: str):
+    global cancelled_streams
+    finished = False
+    try:
+        for chunk in _token_chunks(completion):
+            if config.token_latency_ms:
+                await asyncio.sleep(config.token_latency_ms / 1000)
+            yield json.dumps({
+                "model": payload.get("model"),
+                "created_at": datetime.now(timezone.utc).isoformat(),
+                "response": chunk,
+                "done": False,
+            }, ensure_ascii=False) + "\n"
+        final = _final_chunk(payload, payload.get("prompt", ""), completion, started, prompt_eval_ns, encode_context(full_prompt + completion))
+        yield json.dumps({**final, "response": ""}, ensure_ascii=False) + "\n"
+        finished = True
+    finally:
+        if not finished:
+            cancelled_streams += 1
+
+
+def _final_chunk(payload: Dict[str, Any], prompt: str, completion: str, started: float, prompt_eval_ns: int, context: List[int]) -> Dict[str, Any]:
+    elapsed_ns = int((time.perf_counter() - started) * 1e9)
+    return {
+        "model": payload.get("model"),
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "response": completion,
+        "done": True,
+        "done_reason": "stop" if completion else "load",
+        "context": context,
+        "total_duration": elapsed_ns,
+        "load_duration": 0,
+        "prompt_eval_count": _prompt_tokens(prompt),
+        "prompt_eval_duration": prompt_eval_ns,
+        "eval_count": max(1, len(completion) // 4) if completion else 0,
+        "eval_duration": max(0, elapsed_ns - prompt_eval_ns),
+    }
+
+
+class FakeOllamaServer:
+    """
+    fake Ollama를 백그라운드 스레드에서 uvicorn으로 실행합니다. (port=0 이면 임의의 빈 포트 사용)
+
+        with FakeOllamaServer(latency_ms=20) as server:
+            client = LLMClient(base_url=server.url)
+    """
+
+    def __init__(self, host: str = "127.0.0.1", port: int = 0, **config_kwargs):
+        self.host = host
+        self.port = port
+        self.config_kwargs = config_kwargs
+        self._server: Optional[uvicorn.Server] = None
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def start(self):
+        configure(**self.config_kwargs)
+        self._server = uvicorn.Server(uvicorn.Config(app, host=self.host, port=self.port, log_level="warning"))
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def stop(self):
+        if self._server:
+            self._server.should_exit = True
+            self._thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Run a deterministic fake Ollama server.")
+    parser.add_argument("--host", type=str, default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=11434)
+    parser.add_argument("--latency-ms", type=float, default=0.0)
+    parser.add_argument("--jitter-ms", type=float, default=0.0)
+    parser.add_argument("--latency-distribution", type=str, choices=LATENCY_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--failure-rate", type=float, default=0.0)
+    parser.add_argument("--seed", type=int, default=None)
+    parser.add_argument("--token-latency-ms", type=float, default=0.0)
+    parser.add_argument("--prompt-token-latency-ms", type=float, default=0.0)
+    args = parser.parse_args()
+
+    configure(latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, failure_rate=args.failure_rate, seed=args.seed, token_latency_ms=args.token_latency_ms, prompt_token_latency_ms=args.prompt_token_latency_ms, latency_distribution=args.latency_distribution)
+    uvicorn.run(app, host=args.host, port=args.port, log_level="warning")
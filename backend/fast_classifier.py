@@ -0,0 +1,200 @@
+"""
+LLM 판단 앞단의 경량 분류기 (문자 n-gram TF-IDF + 로지스틱 회귀).
+
+코치 피드백이 달린 LLMLog로 학습하며(scripts/train_fast_classifier.py), 확신도가 높은 오답은
+Ollama를 호출하지 않고 바로 APPROVE/REJECT를 결정합니다. 서버에 numpy/scikit-learn이 없어도 돌 수 있도록
+순수 Python 희소 벡터로 구현했고, 모델은 JSON 파일 하나로 저장해 ModelRegistry(kind="fast_classifier")에 버전으로 등록합니다.
+"""
+import json
+import math
+import random
+import re
+import unicodedata
+from collections import Counter
+from typing import Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+MODEL_KIND = "fast_classifier"
+FORMAT_VERSION = 1
+
+DECISION_APPROVE = "APPROVE"
+DECISION_REJECT = "REJECT"
+
+
+class TrainingExample(NamedTuple):
+    concept_name: str
+    student_mistake_summary: str
+    decision: str # 'APPROVE' 또는 'REJECT'
+
+
+class Prediction(NamedTuple):
+    decision: str
+    confidence: float # 예측한 decision의 확률 (0.5 ~ 1.0)
+    approve_probability: float
+
+
+def feature_text(concept_name: str, student_mistake_summary: str) -> str:
+    text = unicodedata.normalize("NFKC", f"{concept_name} | {student_mistake_summary or ''}").lower()
+    return re.sub(r"\s+", " ", text).strip()
+
+
+def char_ngrams(text: str, ngram_range: Tuple[int, int]) -> Counter:
+    padded = f" {text} "
+    counts = Counter()
+    low, high = ngram_range
+    for n in range(low, high + 1):
+        for start in range(len(padded) - n + 1):
+            counts[padded[start:start + n]] += 1
+    return counts
+
+
+def _sigmoid(z: float) -> float:
+    if z >= 0:
+        return 1.0 / (1.0 + math.exp(-z))
+    exp_z = math.exp(z)
+    return exp_z / (1.0 + exp_z)
+
+
+class FastPathClassifier:
+    """
+    학습이 끝난 분류기. 어휘(n-gram -> (특성 번호, idf))와 가중치만 들고 있으며 읽기 전용입니다.
+    """
+
+    def __init__(self, vocabulary: Dict[str, Tuple[int, float]], weights: List[float], bias: float, ngram_range: Tuple[int, int] = (1, 3), metrics: Optional[dict] = None):
+        self.vocabulary = vocabulary
+        self.weights = weights
+        self.bias = bias
+        self.ngram_range = tuple(ngram_range)
+        self.metrics = metrics or {}
+
+    def vectorize(self, text: str) -> Dict[int, float]:
+        """
+        sublinear tf * idf 후 L2 정규화한 희소 벡터를 반환합니다. 학습에 없던 n-gram은 무시합니다.
+        """
+        vector = {}
+        for gram, count in char_ngrams(text, self.ngram_range).items():
+            entry = self.vocabulary.get(gram)
+            if entry is not None:
+                index, idf = entry
+                vector[index] = (1.0 + math.log(count)) * idf
+        norm = math.sqrt(sum(value * value for value in vector.values()))
+        if norm:
+            for index in vector:
+                vector[index] /= norm
+        return vector
+
+    def approve_probability(self, concept_name: str, student_mistake_summary: str) -> float:
+        weights = self.weights
+        z = self.bias + sum(weights[index] * value for index, value in self.vectorize(feature_text(concept_name, student_mistake_summary)).items())
+        return _sigmoid(z)
+
+    def predict(self, concept_name: str, student_mistake_summary: str) -> Prediction:
+        probability = self.approve_probability(concept_name, student_mistake_summary)
+        if probability >= 0.5:
+            return Prediction(DECISION_APPROVE, probability, probability)
+        return Prediction(DECISION_REJECT, 1.0 - probability, probability)
+
+    def to_dict(self) -> dict:
+        return {
+            "kind": MODEL_KIND,
+            "format_version": FORMAT_VERSION,
+            "ngram_range": list(self.ngram_range),
+            "bias": self.bias,
+            # 특성 번호 순서대로 [n-gram, idf, weight]
+            "features": [
+                [gram, idf, self.weights[index]]
+                for gram, (index, idf) in sorted(self.vocabulary.items(), key=lambda item: item[1][0])
+            ],
+            "metrics": self.metrics,
+        }
+
+    @classmethod
+    def from_dict(cls, data: dict) -> "FastPathClassifier":
+        if data.get("kind") != MODEL_KIND or data.get("format_version") != FORMAT_VERSION:
+            raise ValueError(f"Unsupported classifier file: kind={data.get('kind')!r} format_version={data.get('format_version')!r}")
+        vocabulary = {gram: (index, idf) for index, (gram, idf, _) in enumerate(data["features"])}
+        weights = [weight for _, _, weight in data["features"]]
+        return cls(vocabulary, weights, data["bias"], tuple(data["ngram_range"]), data.get("metrics"))
+
+    def save(self, path: str):
+        with open(path, "w", encoding="utf-8") as f:
+            json.dump(self.to_dict(), f, ensure_ascii=False)
+
+    @classmethod
+    def load(cls, path: str) -> "FastPathClassifier":
+        with open(path, "r", encoding="utf-8") as f:
+            return cls.from_dict(json.load(f))
+
+
+def train_classifier(
+    examples: Sequence[TrainingExample],
+    ngram_range: Tuple[int, int] = (1, 3),
+    min_df: int = 1,
+    epochs: int = 20,
+    learning_rate: float = 0.5,
+    l2: float = 1e-4,
+    seed: int = 42,
+) -> FastPathClassifier:
+    """
+    L2 정규화 로지스틱 회귀를 SGD로 학습합니다. 클래스 불균형은 샘플 가중치로 보정합니다.
+    """
+    if not examples:
+        raise ValueError("No training examples.")
+    texts = [feature_text(example.concept_name, example.student_mistake_summary) for example in examples]
+    labels = [1.0 if example.decision == DECISION_APPROVE else 0.0 for example in examples]
+
+    document_frequency = Counter()
+    for text in texts:
+        document_frequency.update(char_ngrams(text, ngram_range).keys())
+    documents = len(texts)
+    vocabulary = {}
+    for gram, df in sorted(document_frequency.items()):
+        if df >= min_df:
+            vocabulary[gram] = (len(vocabulary), math.log((1 + documents) / (1 + df)) + 1.0)
+
+    classifier = FastPathClassifier(vocabulary, [0.0] * len(vocabulary), 0.0, ngram_range)
+    vectors = [classifier.vectorize(text) for text in texts]
+
+    positives = sum(labels)
+    negatives = documents - positives
+    class_weight = {
+        1.0: documents / (2 * positives) if positives else 1.0,
+        0.0: documents / (2 * negatives) if negatives else 1.0,
+    }
+    weights = classifier.weights
+    order = list(range(documents))
+    rng = random.Random(seed)
+    step = 0
+    for _ in range(epochs):
+        rng.shuffle(order)
+        for sample in order:
+            step += 1
+            rate = learning_rate / (1.0 + learning_rate * l2 * step)
+            vector, label = vectors[sample], labels[sample]
+            z = classifier.bias + sum(weights[index] * value for index, value in vector.items())
+            gradient = (_sigmoid(z) - label) * class_weight[label]
+            for index, value in vector.items():
+                weights[index] -= rate * (gradient * value + l2 * weights[index])
+            classifier.bias -= rate * gradient
+    return classifier
+
+
+def evaluate(classifier: FastPathClassifier, examples: Iterable[TrainingExample], threshold: float) -> dict:
+    """
+    전체 정확도와, 확신도 threshold 이상인 예측(= LLM을 건너뛸 예측)의 비율/정확도를 계산합니다.
+    """
+    total = correct = confident = confident_correct = 0
+    for example in examples:
+        prediction = classifier.predict(example.concept_name, example.student_mistake_summary)
+        hit = prediction.decision == example.decision
+        total += 1
+        correct += hit
+        if prediction.confidence >= threshold:
+            confident += 1
+            confident_correct += hit
+    return {
+        "examples": total,
+        "accuracy": round(correct / total, 4) if total else None,
+        "threshold": threshold,
+        "coverage": round(confident / total, 4) if total else None,
+        "confident_accuracy": round(confident_correct / confident, 4) if confident else None,
+    }
@@ -0,0 +1,92 @@
+import json
+from typing import Any, Dict
+
+_WHITESPACE = " \t\r\n"
+
+
+class IncrementalJSONObjectParser:
+    """
+    토큰 단위로 조금씩 도착하는 JSON 객체 텍스트를 파싱해, 최상위 필드 값이 완성되는 즉시 돌려줍니다.
+
+        parser = IncrementalJSONObjectParser()
+        parser.feed('{"decision": "APP')    # -> {}
+        parser.feed('ROVE", "reason": "핵')  # -> {"decision": "APPROVE"}
+
+    값은 뒤따르는 ',' 또는 '}'를 본 뒤에 확정하므로, 잘린 숫자("12" -> "123")를 잘못 확정하지 않습니다.
+    """
+
+    def __init__(self):
+        self._decoder = json.JSONDecoder()
+        self._buffer = ""
+        self._pos = 0
+        self._started = False
+        self.fields: Dict[str, Any] = {}
+        self.done = False
+
+    def _skip_whitespace(self, index: int) -> int:
+        while index < len(self._buffer) and self._buffer[index] in _WHITESPACE:
+            index += 1
+        return index
+
+    def feed(self, text: str) -> Dict[str, Any]:
+        """
+        텍스트 조각을 추가하고, 이번 조각으로 새로 완성된 필드들을 반환합니다.
+        형식이 잘못된 입력이면 ValueError를 발생시킵니다.
+        """
+        self._buffer += text
+        completed = {}
+        while not self.done:
+            index = self._skip_whitespace(self._pos)
+            if index >= len(self._buffer):
+                break
+            char = self._buffer[index]
+            if not self._started:
+                if char != "{":
+                    raise ValueError(f"Expected '{{' at position {index}, got {char!r}")
+                self._started = True
+                self._pos = index + 1
+                continue
+            if char == "}":
+                self.done = True
+                self._pos = index + 1
+                break
+            if char == ",":
+                self._pos = index + 1
+                continue
+
+            try:
+                key, index = self._decoder.raw_decode(self._buffer, index)
+            except json.JSONDecodeError:
+                break # 키 문자열이 아직 다 도착하지 않음
+            if not isinstance(key, str):
+                raise ValueError(f"Object key must be a string, got {key!r}")
+            index = self._skip_whitespace(index)
+            if index >= len(self._buffer):
+                break
+            if self._buffer[index] != ":":
+                raise ValueError(f"Expected ':' at position {index}")
+            index = self._skip_whitespace(index + 1)
+            if index >= len(self._buffer):
+                break
+            try:
+                value, index = self._decoder.raw_decode(self._buffer, index)
+            except json.JSONDecodeError:
+                break # 값이 아직 다 도착하지 않음
+            index = self._skip_whitespace(index)
+            if index >= len(self._buffer):
+                break
+            if self._buffer[index] not in ",}":
+                raise ValueError(f"Expected ',' or '}}' at position {index}")
+
+            self.fields[key] = value
+            completed[key] = value
+            self._pos = index
+        return completed
+
+    def result(self) -> Dict[str, Any]:
+        """
+        스트림이 끝난 뒤 전체 객체를 반환합니다. 불완전하면 json.JSONDecodeError를 발생시킵니다.
+        """
+        if self.done:
+            return dict(self.fields)
+        return json.loads(self._buffer)
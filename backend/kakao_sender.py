@@ -1,6 +1,20 @@
+"""
+카카오톡 메시지 발송 클라이언트.
+
+- 메시지마다 httpx.AsyncClient를 만들지 않고 커넥션 풀을 재사용하는 공유 KakaoClient를 사용합니다. (llm_client와 같은 방식)
+- 토큰 버킷으로 초당 발송 수를 카카오 쿼터 이하로 맞추고, 세마포어로 동시에 진행 중인 요청 수를 제한합니다.
+- 429/5xx/네트워크 오류는 지수 백오프(+jitter)로 재시도하고, Retry-After가 있으면 그 시간을 따릅니다.
+  잘못된 수신자(400)나 인증 오류(401/403)처럼 다시 보내도 실패할 요청은 바로 KakaoSendError(retryable=False)로 끝냅니다.
+- 테스트/부하 테스트에서는 set_transport(httpx.ASGITransport(app=fake_kakao.app))로 로컬 대역 서버에 보냅니다.
+"""
+import asyncio
+import json
 import os
+import random
+import time
+from typing import Any, Dict, Optional
+
 import httpx
-import json
 from dotenv import load_dotenv
 
 from schemas import WeeklyReportResponse
@@ -8,49 +22,238 @@ from schemas import WeeklyReportResponse
 load_dotenv() # .env 파일에서 환경 변수 로드
 
 KAKAO_API_KEY = os.getenv("KAKAO_API_KEY")
-KAKAO_MESSAGE_URL = "https://kapi.kakao.com/v1/api/talk/friends/message/default/send"
+KAKAO_API_BASE_URL = os.getenv("KAKAO_API_BASE_URL", "https://kapi.kakao.com")
+KAKAO_MESSAGE_PATH = "/v1/api/talk/friends/message/default/send"
+KAKAO_MESSAGE_URL = f"{KAKAO_API_BASE_URL}{KAKAO_MESSAGE_PATH}"
+REPORT_WEB_BASE_URL = os.getenv("REPORT_WEB_BASE_URL", "https://pacer.example.com")
 
-async def send_report_via_kakao(target_kakao_id: str, report: WeeklyReportResponse):
-    if not KAKAO_API_KEY:
-        raise ValueError("KAKAO_API_KEY가 설정되지 않았습니다.")
+# 앱 단위 초당 발송 한도(토큰 버킷 충전 속도)와 순간 허용량. 어느 1초 구간에서도 최대 rate + burst개가 나가므로
+# 두 값의 합이 카카오 쿼터를 넘지 않게 설정합니다.
+KAKAO_RATE_PER_SECOND = float(os.getenv("KAKAO_RATE_PER_SECOND", "8"))
+KAKAO_BURST = int(os.getenv("KAKAO_BURST", "2"))
+# 동시에 진행 중인 발송 요청 수
+KAKAO_MAX_CONCURRENT_SENDS = int(os.getenv("KAKAO_MAX_CONCURRENT_SENDS", "8"))
+KAKAO_TIMEOUT = float(os.getenv("KAKAO_TIMEOUT", "10"))
+# 재시도: 최대 시도 횟수, 대기 시간 base * 2^(attempt-1) (최대 max 초)
+KAKAO_MAX_ATTEMPTS = int(os.getenv("KAKAO_MAX_ATTEMPTS", "4"))
+KAKAO_BACKOFF_BASE_SECONDS = float(os.getenv("KAKAO_BACKOFF_BASE_SECONDS", "0.5"))
+KAKAO_BACKOFF_MAX_SECONDS = float(os.getenv("KAKAO_BACKOFF_MAX_SECONDS", "30"))
+
+# 테스트/벤치마크에서 실제 네트워크 대신 사용할 transport (예: httpx.ASGITransport)
+KAKAO_TRANSPORT: Optional[httpx.AsyncBaseTransport] = None
+
+RETRYABLE_STATUS_CODES = {429, 500, 502, 503, 504}
+
+
+class KakaoSendError(Exception):
+    def __init__(self, message: str, retryable: bool, status_code: Optional[int] = None, retry_after: Optional[float] = None):
+        super().__init__(message)
+        self.retryable = retryable
+        self.status_code = status_code
+        self.retry_after = retry_after
+        self.attempts = 1
+
+
+class TokenBucket:
+    """
+    초당 rate개씩 토큰이 차고 최대 capacity개까지 쌓이는 버킷. acquire()는 토큰이 생길 때까지 기다립니다.
+    """
+
+    def __init__(self, rate: float, capacity: int, clock=time.monotonic):
+        self.rate = rate
+        self.capacity = max(1, capacity)
+        self.clock = clock
+        self.tokens = float(self.capacity)
+        self.updated_at = clock()
+        self._lock = asyncio.Lock()
+
+    def _refill(self):
+        now = self.clock()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated_at) * self.rate)
+        self.updated_at = now
+
+    async def acquire(self):
+        if self.rate <= 0:
+            return
+        # 대기 순서를 지키도록 한 번에 한 요청만 토큰을 기다립니다.
+        async with self._lock:
+            self._refill()
+            while self.tokens < 1:
+                await asyncio.sleep((1 - self.tokens) / self.rate)
+                self._refill()
+            self.tokens -= 1
+
+
+def backoff_seconds(attempt: int, retry_after: Optional[float] = None) -> float:
+    if retry_after is not None:
+        return min(KAKAO_BACKOFF_MAX_SECONDS, retry_after)
+    delay = min(KAKAO_BACKOFF_MAX_SECONDS, KAKAO_BACKOFF_BASE_SECONDS * (2 ** (attempt - 1)))
+    return delay * random.uniform(0.5, 1.0)
+
+
+def _retry_after(response: httpx.Response) -> Optional[float]:
+    try:
+        return float(response.headers["Retry-After"])
+    except (KeyError, ValueError):
+        return None
 
-    headers = {
-        "Authorization": f"KakaoAK {KAKAO_API_KEY}"
-    }
 
-    template = {
+def build_report_template(report: WeeklyReportResponse) -> Dict[str, Any]:
+    report_url = f"{REPORT_WEB_BASE_URL}/report/{report.report_id}"
+    return {
         "object_type": "list",
         "header_title": f"{report.student_name} 주간 학습 리포트",
         "header_link": {
-            "web_url": f"https://pacer.example.com/report/{report.report_id}",
-            "mobile_web_url": f"https://pacer.example.com/report/{report.report_id}"
+            "web_url": report_url,
+            "mobile_web_url": report_url
         },
         "contents": [
             {
                 "title": f"기간: {report.report_period_start} ~ {report.report_period_end}",
                 "description": f"총 {report.llm_judgments_count}건의 AI 분석과 {report.anki_cards_reviewed_count}건의 복습이 진행되었습니다.",
-                "link": { "web_url": f"https://pacer.example.com/report/{report.report_id}" }
+                "link": { "web_url": report_url }
             },
             {
                 "title": "코치 최종 코멘트",
                 "description": report.coach_comment or "코멘트가 없습니다.",
-                "link": { "web_url": f"https://pacer.example.com/report/{report.report_id}" }
+                "link": { "web_url": report_url }
             }
         ],
         "buttons": [
             {
                 "title": "상세 리포트 확인하기",
-                "link": { "web_url": f"https://pacer.example.com/report/{report.report_id}" }
+                "link": { "web_url": report_url }
             }
         ]
     }
 
-    data = {
-        "receiver_uuids": json.dumps([target_kakao_id]),
-        "template_object": json.dumps(template)
-    }
 
-    async with httpx.AsyncClient() as client:
-        response = await client.post(KAKAO_MESSAGE_URL, headers=headers, data=data)
-        response.raise_for_status() # 오류 발생 시 예외 처리
-        return response.json()
+class KakaoClient:
+    """
+    카카오 메시지 API 호출에 사용하는 장기 수명 클라이언트. 커넥션 풀, 토큰 버킷, 동시 발송 제한을 모든 발송이 공유합니다.
+    """
+
+    def __init__(
+        self,
+        api_key: Optional[str] = None,
+        base_url: Optional[str] = None,
+        rate_per_second: Optional[float] = None,
+        burst: Optional[int] = None,
+        max_concurrent_sends: Optional[int] = None,
+        max_attempts: Optional[int] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.api_key = api_key or KAKAO_API_KEY
+        self.max_attempts = max_attempts or KAKAO_MAX_ATTEMPTS
+        self.rate_limiter = TokenBucket(
+            rate=rate_per_second if rate_per_second is not None else KAKAO_RATE_PER_SECOND,
+            capacity=burst or KAKAO_BURST,
+        )
+        self._semaphore = asyncio.Semaphore(max_concurrent_sends or KAKAO_MAX_CONCURRENT_SENDS)
+        self._client = httpx.AsyncClient(
+            base_url=base_url or KAKAO_API_BASE_URL,
+            timeout=httpx.Timeout(KAKAO_TIMEOUT),
+            limits=httpx.Limits(max_connections=max_concurrent_sends or KAKAO_MAX_CONCURRENT_SENDS),
+            transport=transport if transport is not None else KAKAO_TRANSPORT,
+        )
+        # 커넥션 풀은 생성된 이벤트 루프에 묶이므로, 어느 루프에서 만들어졌는지 기록해 둡니다.
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+    def is_usable_in_running_loop(self) -> bool:
+        if self._client.is_closed:
+            return False
+        if self._loop is None:
+            return True
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def _post_once(self, receiver_uuid: str, template: Dict[str, Any]) -> Dict[str, Any]:
+        data = {
+            "receiver_uuids": json.dumps([receiver_uuid]),
+            "template_object": json.dumps(template)
+        }
+        await self.rate_limiter.acquire()
+        async with self._semaphore:
+            try:
+                response = await self._client.post(KAKAO_MESSAGE_PATH, headers={"Authorization": f"KakaoAK {self.api_key}"}, data=data)
+            except httpx.HTTPError as e:
+                raise KakaoSendError(f"Kakao request failed: {e!r}", retryable=True)
+        if response.status_code >= 400:
+            raise KakaoSendError(
+                f"Kakao API returned {response.status_code}: {response.text[:200]}",
+                retryable=response.status_code in RETRYABLE_STATUS_CODES,
+                status_code=response.status_code,
+                retry_after=_retry_after(response),
+            )
+        body = response.json()
+        if receiver_uuid not in body.get("successful_receiver_uuids", [receiver_uuid]):
+            raise KakaoSendError(f"Kakao rejected receiver: {body.get('failure_info')}", retryable=False, status_code=response.status_code)
+        return body
+
+    async def send_message(self, receiver_uuid: str, template: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        메시지 하나를 보냅니다. 재시도할 수 있는 실패는 max_attempts까지 재시도하고, 끝내 실패하면 KakaoSendError를 던집니다.
+        반환값과 KakaoSendError에는 시도 횟수(attempts)가 남습니다.
+        """
+        if not self.api_key:
+            raise KakaoSendError("KAKAO_API_KEY가 설정되지 않았습니다.", retryable=False)
+        attempt = 0
+        while True:
+            attempt += 1
+            try:
+                result = await self._post_once(receiver_uuid, template)
+                result["attempts"] = attempt
+                return result
+            except KakaoSendError as e:
+                e.attempts = attempt
+                if not e.retryable or attempt >= self.max_attempts:
+                    raise
+                await asyncio.sleep(backoff_seconds(attempt, e.retry_after))
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_kakao_client: Optional[KakaoClient] = None
+
+
+def get_kakao_client() -> KakaoClient:
+    """
+    공유 KakaoClient를 반환합니다. lifespan 밖(스크립트, TestClient 등)에서는 현재 이벤트 루프에 맞는 클라이언트를 지연 생성합니다.
+    """
+    global _kakao_client
+    if _kakao_client is None or not _kakao_client.is_usable_in_running_loop():
+        _kakao_client = KakaoClient()
+    return _kakao_client
+
+
+async def startup_kakao_client(**kwargs) -> KakaoClient:
+    global _kakao_client
+    await shutdown_kakao_client()
+    _kakao_client = KakaoClient(**kwargs)
+    return _kakao_client
+
+
+async def shutdown_kakao_client():
+    global _kakao_client
+    client, _kakao_client = _kakao_client, None
+    if client is not None and client.is_usable_in_running_loop():
+        await client.aclose()
+
+
+def set_transport(transport: Optional[httpx.AsyncBaseTransport]):
+    """
+    이후 생성되는 클라이언트가 사용할 transport를 지정합니다. (테스트/벤치마크용)
+    """
+    global KAKAO_TRANSPORT, _kakao_client
+    KAKAO_TRANSPORT = transport
+    _kakao_client = None
+
+
+async def send_report_via_kakao(target_kakao_id: str, report: WeeklyReportResponse):
+    return await get_kakao_client().send_message(target_kakao_id, build_report_template(report))
@@ -0,0 +1,134 @@
+import asyncio
+import json
+import os
+from typing import Any, AsyncIterator, Dict, Optional
+
+import httpx
+
+# Ollama 연결 설정 (환경 변수로 재정의 가능)
+OLLAMA_BASE_URL = os.getenv("OLLAMA_BASE_URL", "http://localhost:11434")
+# 커넥션 풀 크기: Ollama 호스트 하나에 동시에 열어 둘 최대 연결 수
+LLM_MAX_CONNECTIONS = int(os.getenv("LLM_MAX_CONNECTIONS", "32"))
+# keep-alive 상태로 유지할 유휴 연결 수와 유지 시간(초)
+LLM_MAX_KEEPALIVE_CONNECTIONS = int(os.getenv("LLM_MAX_KEEPALIVE_CONNECTIONS", "16"))
+LLM_KEEPALIVE_EXPIRY = float(os.getenv("LLM_KEEPALIVE_EXPIRY", "60"))
+# 기본 타임아웃(초). 호출별 timeout 인자로 재정의할 수 있습니다.
+LLM_CONNECT_TIMEOUT = float(os.getenv("LLM_CONNECT_TIMEOUT", "5"))
+LLM_DEFAULT_TIMEOUT = float(os.getenv("LLM_DEFAULT_TIMEOUT", "30"))
+
+# 테스트/벤치마크에서 실제 네트워크 대신 사용할 transport (예: httpx.ASGITransport)
+OLLAMA_TRANSPORT: Optional[httpx.AsyncBaseTransport] = None
+
+
+class LLMClient:
+    """
+    Ollama 호출에 사용하는 장기 수명(long-lived) HTTP 클라이언트.
+    호출마다 httpx.AsyncClient를 새로 만들지 않고, 커넥션 풀과 keep-alive 연결을 재사용합니다.
+    """
+
+    def __init__(
+        self,
+        base_url: Optional[str] = None,
+        max_connections: Optional[int] = None,
+        max_keepalive_connections: Optional[int] = None,
+        keepalive_expiry: Optional[float] = None,
+        connect_timeout: Optional[float] = None,
+        default_timeout: Optional[float] = None,
+        transport: Optional[httpx.AsyncBaseTransport] = None,
+    ):
+        self.base_url = base_url or OLLAMA_BASE_URL
+        self.connect_timeout = connect_timeout if connect_timeout is not None else LLM_CONNECT_TIMEOUT
+        self.default_timeout = default_timeout if default_timeout is not None else LLM_DEFAULT_TIMEOUT
+        limits = httpx.Limits(
+            max_connections=max_connections or LLM_MAX_CONNECTIONS,
+            max_keepalive_connections=max_keepalive_connections or LLM_MAX_KEEPALIVE_CONNECTIONS,
+            keepalive_expiry=keepalive_expiry if keepalive_expiry is not None else LLM_KEEPALIVE_EXPIRY,
+        )
+        self._client = httpx.AsyncClient(
+            base_url=self.base_url,
+            limits=limits,
+            timeout=self._timeout(None),
+            transport=transport if transport is not None else OLLAMA_TRANSPORT,
+        )
+        # 커넥션 풀은 생성된 이벤트 루프에 묶이므로, 어느 루프에서 만들어졌는지 기록해 둡니다.
+        try:
+            self._loop = asyncio.get_running_loop()
+        except RuntimeError:
+            self._loop = None
+
+    def _timeout(self, timeout: Optional[float]) -> httpx.Timeout:
+        return httpx.Timeout(timeout if timeout is not None else self.default_timeout, connect=self.connect_timeout)
+
+    @property
+    def closed(self) -> bool:
+        return self._client.is_closed
+
+    def is_usable_in_running_loop(self) -> bool:
+        if self.closed:
+            return False
+        if self._loop is None:
+            return True
+        try:
+            return asyncio.get_running_loop() is self._loop
+        except RuntimeError:
+            return False
+
+    async def generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> Dict[str, Any]:
+        """
+        /api/generate 를 호출하고 Ollama 응답 본문(JSON)을 그대로 반환합니다.
+        """
+        response = await self._client.post("/api/generate", json=payload, timeout=self._timeout(timeout))
+        response.raise_for_status()
+        return response.json()
+
+    async def stream_generate(self, payload: Dict[str, Any], timeout: Optional[float] = None) -> AsyncIterator[Dict[str, Any]]:
+        """
+        /api/generate 를 stream=True로 호출하고 NDJSON 응답을 한 줄(chunk)씩 돌려줍니다.
+        소비자가 중간에 반복을 멈추고 제너레이터를 닫으면 연결이 닫혀 Ollama도 생성을 중단합니다.
+        """
+        async with self._client.stream("POST", "/api/generate", json={**payload, "stream": True}, timeout=self._timeout(timeout)) as response:
+            response.raise_for_status()
+            async for line in response.aiter_lines():
+                if line.strip():
+                    yield json.loads(line)
+
+    async def aclose(self):
+        await self._client.aclose()
+
+
+_llm_client: Optional[LLMClient] = None
+
+
+def get_llm_client() -> LLMClient:
+    """
+    공유 LLMClient를 반환합니다.
+    lifespan에서 생성된 클라이언트를 우선 사용하고, lifespan 밖(스크립트, TestClient 등)에서는
+    현재 이벤트 루프에 맞는 클라이언트를 지연 생성합니다.
+    """
+    global _llm_client
+    if _llm_client is None or not _llm_client.is_usable_in_running_loop():
+        _llm_client = LLMClient()
+    return _llm_client
+
+
+async def startup_llm_client(**kwargs) -> LLMClient:
+    global _llm_client
+    await shutdown_llm_client()
+    _llm_client = LLMClient(**kwargs)
+    return _llm_client
+
+
+async def shutdown_llm_client():
+    global _llm_client
+    client, _llm_client = _llm_client, None
+    if client is not None and client.is_usable_in_running_loop():
+        await client.aclose()
+
+
+def set_transport(transport: Optional[httpx.AsyncBaseTransport]):
+    """
+    이후 생성되는 클라이언트가 사용할 transport를 지정합니다. (테스트/벤치마크용)
+    """
+    global OLLAMA_TRANSPORT, _llm_client
+    OLLAMA_TRANSPORT = transport
+    _llm_client = None
@@ -1,25 +1,91 @@
+import asyncio
 import httpx
 import json
+import logging
 import random
 import os
+import re
+import time
+import unicodedata
+from collections import deque
 from datetime import date, timedelta
-from typing import List, Optional
+from typing import Any, Callable, Dict, List, Optional, Set, Tuple
 from fastapi import APIRouter, HTTPException, Depends, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 
 import crud
+import models
 import schemas
 from database import SessionLocal
-from backend.model_registry import ModelRegistry # Import ModelRegistry
+import llm_client
+from llm_guard import get_llm_guard, LLMUnavailableError
+from singleflight import SingleFlight
+from ttl_cache import LRUTTLCache
+from incremental_json import IncrementalJSONObjectParser
+from prompt_templates import PromptTemplate, PrefixContextCache, chat_format_for, JUDGE_TEMPLATE, CARD_TEMPLATE, FUSED_TEMPLATE
+from fast_classifier import FastPathClassifier
+import llm_telemetry
+from backend.model_registry import ModelRegistry, ModelRoute # Import ModelRegistry
+
+logger = logging.getLogger(__name__)
 
 # Initialize ModelRegistry
 model_registry = ModelRegistry()
 
+# 판단 결과 캐시: (model_version, concept_name, 정규화된 오답 요약) -> decision/reason/question/answer
+JUDGE_CACHE_MAX_ENTRIES = int(os.getenv("JUDGE_CACHE_MAX_ENTRIES", "4096"))
+JUDGE_CACHE_TTL_SECONDS = float(os.getenv("JUDGE_CACHE_TTL_SECONDS", "86400"))
+judgment_cache = LRUTTLCache(max_entries=JUDGE_CACHE_MAX_ENTRIES, ttl_seconds=JUDGE_CACHE_TTL_SECONDS)
+
+# 모델 상태가 바뀌면(승격/강등/재등록) 이전 판단 결과를 더 이상 신뢰할 수 없으므로 캐시를 비웁니다.
+ModelRegistry.add_status_listener(lambda version, status: judgment_cache.clear())
+
+# 모델을 메모리에 유지할 시간 (Ollama keep_alive 형식, 예: "30m", "-1"은 무기한)
+OLLAMA_KEEP_ALIVE = os.getenv("OLLAMA_KEEP_ALIVE", "30m")
+# 템플릿의 정적 prefix를 모델별로 한 번만 평가하고, 이후 호출은 context + suffix만 보냅니다. (채팅 템플릿은 직접 적용해 raw로 전송)
+# 실제 Ollama에서 scripts/benchmark_prompt_prefix.py --ollama_url로 효과를 측정하기 전까지는 기본으로 끕니다.
+PROMPT_PREFIX_REUSE = os.getenv("PROMPT_PREFIX_REUSE", "false").lower() == "true"
+prefix_contexts = PrefixContextCache()
+# 모델이 다시 등록/승격되면 같은 이름이라도 다른 가중치일 수 있으므로 prefix context를 다시 만듭니다.
+ModelRegistry.add_status_listener(lambda version, status: prefix_contexts.clear())
+
 # Configuration for A/B testing
 # Traffic split percentage for staging model (e.g., 0.2 for 20% traffic)
 AB_TEST_TRAFFIC_SPLIT = float(os.getenv("AB_TEST_TRAFFIC_SPLIT", "0.2"))
 # Specific staging model version to test. If not set, a random staging model will be chosen.
 AB_TEST_STAGING_MODEL_VERSION = os.getenv("AB_TEST_STAGING_MODEL_VERSION", None)
+# split: 학생 요청의 AB_TEST_TRAFFIC_SPLIT 비율을 staging 모델이 응답
+# shadow: 모든 요청을 production 모델이 응답하고, 일부를 staging 모델에 백그라운드로 복제 (shadow_traffic 참고)
+AB_TEST_MODE_SPLIT = "split"
+AB_TEST_MODE_SHADOW = "shadow"
+AB_TEST_MODE = os.getenv("AB_TEST_MODE", AB_TEST_MODE_SPLIT)
+
+# 판단 모드: two_call(판단 후 카드 생성 호출), fused(한 번의 생성으로 판단+카드)
+# 모델별 모드는 ModelRegistry 메타데이터의 "judge_mode"로 지정합니다.
+JUDGE_MODE_TWO_CALL = "two_call"
+JUDGE_MODE_FUSED = "fused"
+JUDGE_MODE_FUSED_FALLBACK = "fused_fallback" # fused 출력이 불완전해 two-call 경로로 보완한 경우
+JUDGE_MODE_CACHE = "cache" # 판단 결과 캐시에서 응답한 경우
+JUDGE_MODE_FALLBACK = "fallback" # LLM 과부하/서킷 open으로 호출하지 않고 REJECT로 응답한 경우
+JUDGE_MODE_FAST_PATH = "fast_path" # 경량 분류기가 LLM 없이 판단한 경우 (model_version은 분류기 버전)
+LLM_UNAVAILABLE_REASON = "LLM 서버 과부하로 판단을 생략했습니다."
+DEFAULT_JUDGE_MODE = os.getenv("DEFAULT_JUDGE_MODE", JUDGE_MODE_TWO_CALL)
+
+# 카드 내용 생성 방식: deferred(작업 큐에 넣고 백그라운드 워커가 생성) 또는 inline(판단 요청 안에서 생성)
+CARD_GENERATION_MODE = os.getenv("CARD_GENERATION_MODE", "deferred")
+
+# two_call 판단을 스트리밍으로 받아 decision이 확정되는 즉시 카드 생성을 시작할지 여부
+JUDGE_STREAMING = os.getenv("JUDGE_STREAMING", "false").lower() == "true"
+# 스트리밍 지연 지표(TTFT, time-to-decision)를 보관할 최근 호출 수
+STREAM_METRICS_WINDOW = int(os.getenv("STREAM_METRICS_WINDOW", "1000"))
+
+# 경량 분류기(fast path): production 상태의 fast_classifier 모델이 확신도 threshold 이상으로 예측하면 LLM을 건너뜁니다.
+FAST_PATH_ENABLED = os.getenv("FAST_PATH_ENABLED", "true").lower() == "true"
+FAST_PATH_CONFIDENCE_THRESHOLD = float(os.getenv("FAST_PATH_CONFIDENCE_THRESHOLD", "0.9"))
+
+# 배치 판단 시 동시에 진행할 LLM 판단 수 (요청별 concurrency로 줄이거나 상한까지 늘릴 수 있음)
+JUDGE_BATCH_CONCURRENCY = int(os.getenv("JUDGE_BATCH_CONCURRENCY", "8"))
+JUDGE_BATCH_MAX_CONCURRENCY = int(os.getenv("JUDGE_BATCH_MAX_CONCURRENCY", "32"))
 
 # Dependency to get DB session
 async def get_db():
@@ -30,28 +96,333 @@ async def get_db():
     finally:
         await db.close()
 
+# 동일한 (model, prompt) 생성 요청을 하나의 Ollama 호출로 합칩니다.
+ollama_singleflight = SingleFlight()
+
 router = APIRouter(
     prefix="/api/v1/filter",
     tags=["LLM Filter"],
 )
 
-async def call_ollama_api(prompt: str, model_name: str = "llama2:latest") -> dict:
+def normalize_mistake_summary(text: str) -> str:
+    """
+    같은 오답이 공백/문장부호/전각 문자 차이로 다른 캐시 키가 되지 않도록 정규화합니다.
+    """
+    text = unicodedata.normalize("NFKC", text).lower()
+    text = re.sub(r"\s+", " ", text).strip()
+    return text.rstrip(" .!?。")
+
+def judgment_cache_key(model_version: str, error_context: schemas.ErrorContext) -> tuple:
+    return (
+        model_version,
+        unicodedata.normalize("NFKC", error_context.concept_name).strip(),
+        normalize_mistake_summary(error_context.student_mistake_summary),
+    )
+
+async def _guarded_generate(payload: dict, timeout: Optional[float]) -> dict:
+    # 서킷 브레이커와 적응형 동시성 제한을 통과한 호출만 Ollama로 보냅니다. (coalescing된 호출은 한 자리만 사용)
+    return await get_llm_guard().call(lambda: llm_client.get_llm_client().generate(payload, timeout=timeout))
+
+async def _coalesced_generate(payload: dict, coalesce_key: tuple, timeout: Optional[float], route: str) -> dict:
+    """
+    singleflight로 생성하고 호출 텔레메트리(토큰 수, Ollama 측 시간, 대기 포함 지연)를 기록합니다.
+    진행 중인 생성에 합류한 호출은 coalesced로 표시하고 토큰은 leader 호출에만 집계합니다.
+    """
+    coalesced = ollama_singleflight.is_inflight(coalesce_key)
+    started = time.perf_counter()
+    ollama_response, status = None, llm_telemetry.STATUS_ERROR
+    try:
+        ollama_response = await ollama_singleflight.do(
+            coalesce_key,
+            lambda: _guarded_generate(payload, timeout)
+        )
+        status = llm_telemetry.STATUS_OK
+        return ollama_response
+    except LLMUnavailableError:
+        status = llm_telemetry.STATUS_REJECTED
+        raise
+    finally:
+        llm_telemetry.record_call(llm_telemetry.record_from_response(
+            route, payload["model"], (time.perf_counter() - started) * 1000,
+            None if coalesced else ollama_response, status, coalesced
+        ))
+
+async def _generate_json(payload: dict, coalesce_key: tuple, timeout: Optional[float], route: str) -> dict:
+    try:
+        # lifespan에서 만든 공유 클라이언트(커넥션 풀 + keep-alive)를 재사용하고,
+        # 같은 (model, prompt)로 동시에 들어온 호출은 진행 중인 하나의 생성 결과를 함께 기다립니다.
+        ollama_response = await _coalesced_generate(payload, coalesce_key, timeout, route)
+        response_text = ollama_response['response']
+        return json.loads(response_text)
+    except httpx.RequestError as e:
+        raise HTTPException(status_code=503, detail=f"Ollama service is unavailable: {e}")
+    except json.JSONDecodeError:
+        raise HTTPException(status_code=500, detail="Failed to parse LLM response as JSON.")
+
+async def call_ollama_api(prompt: str, model_name: str = "llama2:latest", timeout: Optional[float] = None, route: str = "generic") -> dict:
     payload = {
         "model": model_name,
         "prompt": prompt,
         "format": "json",
-        "stream": False
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE
+    }
+    return await _generate_json(payload, (model_name, prompt), timeout, route)
+
+def _rejects_context(error: Exception) -> bool:
+    # 요청 자체를 거부한 4xx만 context 없이 다시 보낼 이유가 됩니다. 5xx/연결 오류는 전체 프롬프트도 실패하므로 부하만 늘립니다.
+    return isinstance(error, httpx.HTTPStatusError) and 400 <= error.response.status_code < 500 and error.response.status_code != 429
+
+async def prime_prompt_prefix(template: PromptTemplate, model_name: str, timeout: Optional[float] = None) -> Optional[List[int]]:
+    """
+    템플릿 prefix만 채팅 템플릿을 직접 적용해 raw로 평가(생성 토큰 0개)하고, Ollama가 돌려준 context를 저장합니다.
+    모델도 함께 메모리에 올라갑니다. 채팅 형식을 모르는 모델이거나 context가 없으면 None을 반환합니다.
+    """
+    chat = chat_format_for(model_name)
+    if chat is None:
+        return None
+    payload = {
+        "model": model_name,
+        "prompt": template.render_raw_prefix(chat),
+        "raw": True,
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE,
+        "options": {"num_predict": 0}
+    }
+    ollama_response = await _coalesced_generate(
+        payload, ("prefix", model_name, template.name, template.prefix_hash), timeout, "prefix"
+    )
+    context = ollama_response.get("context")
+    if not context:
+        return None
+    prefix_contexts.set(model_name, template, context)
+    return context
+
+async def call_ollama_template(template: PromptTemplate, fields: dict, model_name: str = "llama2:latest", timeout: Optional[float] = None) -> dict:
+    """
+    템플릿 프롬프트로 JSON 응답을 생성합니다.
+    PROMPT_PREFIX_REUSE가 켜져 있으면 prefix context + suffix만 raw로 보내 prefix 재평가를 피합니다.
+    prefix와 suffix를 이어 붙이면 전체 프롬프트를 한 턴으로 감싼 것과 같으므로 모델이 보는 프롬프트는 바뀌지 않습니다.
+    context를 얻지 못했거나 Ollama가 4xx로 거부하면 전체 프롬프트로 호출합니다.
+    """
+    prompt = template.render(**fields)
+    chat = chat_format_for(model_name) if PROMPT_PREFIX_REUSE else None
+    context = prefix_contexts.get(model_name, template) if chat else None
+    if chat and context is None:
+        try:
+            context = await prime_prompt_prefix(template, model_name, timeout=timeout)
+        except httpx.HTTPStatusError as e:
+            if not _rejects_context(e):
+                raise
+            print(f"Warning: Failed to prime prompt prefix '{template.name}' for {model_name}: {e}")
+        except httpx.RequestError as e:
+            raise HTTPException(status_code=503, detail=f"Ollama service is unavailable: {e}")
+    if context is None:
+        return await call_ollama_api(prompt, model_name=model_name, timeout=timeout, route=template.name)
+
+    payload = {
+        "model": model_name,
+        "prompt": template.render_raw_suffix(chat, **fields),
+        "context": context,
+        "raw": True,
+        "format": "json",
+        "stream": False,
+        "keep_alive": OLLAMA_KEEP_ALIVE
     }
     try:
-        async with httpx.AsyncClient(timeout=30.0) as client:
-            response = await client.post("http://localhost:11434/api/generate", json=payload)
-            response.raise_for_status()
-            response_text = response.json()['response']
-            return json.loads(response_text)
+        # 전체 프롬프트가 같으면 같은 생성이므로 coalescing 키는 call_ollama_api와 동일하게 둡니다.
+        return await _generate_json(payload, (model_name, prompt), timeout, template.name)
+    except httpx.HTTPStatusError as e:
+        if not _rejects_context(e):
+            raise
+        print(f"Warning: Ollama rejected cached prefix context for '{template.name}' ({e}). Retrying with the full prompt.")
+        prefix_contexts.discard(model_name, template)
+        return await call_ollama_api(prompt, model_name=model_name, timeout=timeout, route=template.name)
+
+class StreamingMetrics:
+    """
+    스트리밍 호출의 최근 N건 지연 지표(첫 토큰까지, decision 확정까지, 전체)를 보관합니다.
+    """
+
+    def __init__(self, window: int = 1000):
+        self._samples = deque(maxlen=window)
+        self.total_streams = 0
+        self.stopped_early = 0
+
+    def record(self, ttft_ms: Optional[float], time_to_decision_ms: Optional[float], total_ms: float, stopped_early: bool):
+        self._samples.append((ttft_ms, time_to_decision_ms, total_ms))
+        self.total_streams += 1
+        if stopped_early:
+            self.stopped_early += 1
+
+    def reset(self):
+        self._samples.clear()
+        self.total_streams = 0
+        self.stopped_early = 0
+
+    @staticmethod
+    def _percentile(values: list, q: float) -> Optional[float]:
+        if not values:
+            return None
+        ordered = sorted(values)
+        return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+    def summary(self) -> dict:
+        summary = {"total_streams": self.total_streams, "stopped_early": self.stopped_early, "window": len(self._samples)}
+        for index, name in enumerate(("ttft_ms", "time_to_decision_ms", "total_ms")):
+            values = [sample[index] for sample in self._samples if sample[index] is not None]
+            summary[f"{name}_p50"] = self._percentile(values, 0.5)
+            summary[f"{name}_p95"] = self._percentile(values, 0.95)
+        return summary
+
+stream_metrics = StreamingMetrics(window=STREAM_METRICS_WINDOW)
+
+class FastPathStats:
+    """
+    fast path 판단 결과 집계: 분류기로 바로 응답한 건(bypassed), 확신도가 낮아 LLM으로 넘긴 건(uncertain),
+    분류기가 없거나 불러오지 못해 LLM으로 넘긴 건(unavailable).
+    """
+
+    def __init__(self):
+        self.reset()
+
+    def reset(self):
+        self.bypassed = 0
+        self.uncertain = 0
+        self.unavailable = 0
+        self.bypassed_by_decision: Dict[str, int] = {}
+
+    def record_bypassed(self, decision: str):
+        self.bypassed += 1
+        self.bypassed_by_decision[decision] = self.bypassed_by_decision.get(decision, 0) + 1
+
+    def summary(self) -> dict:
+        total = self.bypassed + self.uncertain + self.unavailable
+        active = model_registry.get_active_fast_classifier()
+        return {
+            "enabled": FAST_PATH_ENABLED,
+            "classifier_version": active[0] if active else None,
+            "confidence_threshold": FAST_PATH_CONFIDENCE_THRESHOLD,
+            "total": total,
+            "bypassed": self.bypassed,
+            "uncertain": self.uncertain,
+            "unavailable": self.unavailable,
+            "bypass_rate": round(self.bypassed / total, 4) if total else 0.0,
+            "bypassed_by_decision": dict(self.bypassed_by_decision),
+        }
+
+fast_path_stats = FastPathStats()
+
+# 버전별로 불러온 분류기. 불러오기에 실패한 버전은 None으로 기억해 매 요청마다 다시 읽지 않습니다.
+_fast_classifiers: Dict[str, Optional[FastPathClassifier]] = {}
+ModelRegistry.add_status_listener(lambda version, status: _fast_classifiers.clear())
+
+def get_fast_classifier() -> Optional[Tuple[str, FastPathClassifier]]:
+    """
+    production 상태의 fast_classifier 모델을 (version, classifier)로 반환합니다. 없거나 불러오지 못하면 None.
+    """
+    active = model_registry.get_active_fast_classifier()
+    if active is None:
+        return None
+    version, info = active
+    if version not in _fast_classifiers:
+        try:
+            _fast_classifiers[version] = FastPathClassifier.load(info["path"])
+        except (OSError, ValueError, KeyError) as e:
+            print(f"Warning: Failed to load fast classifier {version} from {info.get('path')}: {e}")
+            _fast_classifiers[version] = None
+    classifier = _fast_classifiers[version]
+    return (version, classifier) if classifier is not None else None
+
+def fast_path_judgment(error_context: schemas.ErrorContext) -> Optional[Tuple[str, dict]]:
+    """
+    분류기 확신도가 FAST_PATH_CONFIDENCE_THRESHOLD 이상이면 (분류기 버전, run_judgment와 같은 형식의 판단 결과)를 반환합니다.
+    그렇지 않으면 None을 반환하고 호출자는 LLM 판단으로 넘어갑니다.
+    """
+    if not FAST_PATH_ENABLED:
+        return None
+    started = time.perf_counter()
+    loaded = get_fast_classifier()
+    if loaded is None:
+        fast_path_stats.unavailable += 1
+        return None
+    version, classifier = loaded
+    prediction = classifier.predict(error_context.concept_name, error_context.student_mistake_summary)
+    if prediction.confidence < FAST_PATH_CONFIDENCE_THRESHOLD:
+        fast_path_stats.uncertain += 1
+        return None
+    fast_path_stats.record_bypassed(prediction.decision)
+    return version, {
+        "decision": prediction.decision,
+        "reason": f"경량 분류기 판단 (확신도 {prediction.confidence:.2f})",
+        "question": None,
+        "answer": None,
+        "judge_mode": JUDGE_MODE_FAST_PATH,
+        "latency_ms": int((time.perf_counter() - started) * 1000),
+    }
+
+async def call_ollama_api_streaming(
+    prompt: str,
+    model_name: str = "llama2:latest",
+    timeout: Optional[float] = None,
+    on_field: Optional[Callable[[str, Any], None]] = None,
+    stop_after: Optional[Set[str]] = None,
+    route: str = "judge"
+) -> dict:
+    """
+    Ollama의 NDJSON 토큰 스트림을 받아 JSON을 점진적으로 파싱합니다.
+    최상위 필드가 완성될 때마다 on_field(key, value)를 호출하고, stop_after의 필드가 모두 완성되면
+    나머지 생성을 기다리지 않고 스트림을 닫습니다(연결이 닫히면 Ollama도 생성을 멈춥니다).
+    스트리밍 호출은 singleflight로 합치지 않습니다. 토큰 수/시간은 마지막(done) 청크에만 있으므로
+    조기 종료한 호출은 텔레메트리에 지연만 기록됩니다.
+    """
+    payload = {
+        "model": model_name,
+        "prompt": prompt,
+        "format": "json",
+        "stream": True,
+        "keep_alive": OLLAMA_KEEP_ALIVE
+    }
+    parser = IncrementalJSONObjectParser()
+    started = time.perf_counter()
+    ttft_ms = time_to_decision_ms = None
+    stopped_early = False
+    final_chunk, status = None, llm_telemetry.STATUS_ERROR
+    try:
+        async with get_llm_guard().guarded():
+            stream = llm_client.get_llm_client().stream_generate(payload, timeout=timeout)
+            try:
+                async for chunk in stream:
+                    token = chunk.get("response", "")
+                    if token and ttft_ms is None:
+                        ttft_ms = (time.perf_counter() - started) * 1000
+                    for key, value in parser.feed(token).items():
+                        if key == "decision" and time_to_decision_ms is None:
+                            time_to_decision_ms = (time.perf_counter() - started) * 1000
+                        if on_field:
+                            on_field(key, value)
+                    if stop_after and stop_after.issubset(parser.fields) and not parser.done:
+                        stopped_early = True
+                        break
+                    if chunk.get("done"):
+                        final_chunk = chunk
+                        break
+            finally:
+                await stream.aclose()
+        result = dict(parser.fields) if stopped_early else parser.result()
+        status = llm_telemetry.STATUS_OK
+        return result
+    except LLMUnavailableError:
+        status = llm_telemetry.STATUS_REJECTED
+        raise
     except httpx.RequestError as e:
         raise HTTPException(status_code=503, detail=f"Ollama service is unavailable: {e}")
-    except json.JSONDecodeError:
+    except (json.JSONDecodeError, ValueError):
         raise HTTPException(status_code=500, detail="Failed to parse LLM response as JSON.")
+    finally:
+        total_ms = (time.perf_counter() - started) * 1000
+        stream_metrics.record(ttft_ms, time_to_decision_ms, total_ms, stopped_early)
+        llm_telemetry.record_call(llm_telemetry.record_from_response(route, model_name, total_ms, final_chunk, status))
 
 @router.get("/logs", response_model=List[schemas.LLMLogResponse])
 async def get_logs(
@@ -71,126 +442,339 @@ async def get_logs(
     logs = await crud.get_llm_logs(db, skip=skip, limit=limit, start_date=start_date, end_date=end_date, student_id=student_id)
     return logs
 
+def select_judge_model() -> tuple:
+    """
+    A/B 테스트 설정에 따라 이번 판단에 사용할 (Ollama 모델 이름, 모델 버전, 판단 모드)를 고릅니다.
+    판단 모드는 모델 메타데이터의 "judge_mode"("two_call" 또는 "fused")를 따릅니다.
+    라우팅 테이블은 ModelRegistry가 상태/파일 변경 시에만 다시 만들고, 여기서는 가중치 추첨만 합니다.
+    """
+    snapshot = model_registry.get_routing_snapshot(AB_TEST_TRAFFIC_SPLIT, AB_TEST_STAGING_MODEL_VERSION)
+    # shadow 모드에서는 staging 모델이 학생 요청에 응답하지 않습니다. (routes[0]은 항상 production 또는 기본 모델)
+    route = snapshot.routes[0] if AB_TEST_MODE == AB_TEST_MODE_SHADOW else snapshot.draw(random.random())
+    logger.debug("judge_model_selected version=%s model=%s role=%s", route.version, route.model_name, route.role)
+    return route.model_name, route.version, judge_mode_of(route)
+
+def judge_mode_of(route: ModelRoute) -> str:
+    judge_mode = route.judge_mode or DEFAULT_JUDGE_MODE
+    if judge_mode not in (JUDGE_MODE_TWO_CALL, JUDGE_MODE_FUSED):
+        judge_mode = JUDGE_MODE_TWO_CALL
+    return judge_mode
+
+# 판단 로그가 저장될 때마다 (LLMLog, ErrorContext)로 호출되는 콜백. 응답을 지연시키지 않도록 블로킹 없이 동작해야 합니다.
+_judgment_listeners: List[Callable[[models.LLMLog, schemas.ErrorContext], None]] = []
+
+def add_judgment_listener(listener: Callable[[models.LLMLog, schemas.ErrorContext], None]):
+    if listener not in _judgment_listeners:
+        _judgment_listeners.append(listener)
+
+def _notify_judgment(db_log: models.LLMLog, error_context: schemas.ErrorContext):
+    for listener in list(_judgment_listeners):
+        try:
+            listener(db_log, error_context)
+        except Exception as e:
+            print(f"Warning: Judgment listener failed for log {db_log.log_id}: {e}")
+
+def _template_fields(error_context: schemas.ErrorContext) -> dict:
+    return {"concept_name": error_context.concept_name, "student_mistake_summary": error_context.student_mistake_summary}
+
+def build_judge_prompt(error_context: schemas.ErrorContext) -> str:
+    return JUDGE_TEMPLATE.render(**_template_fields(error_context))
+
+def build_card_prompt(error_context: schemas.ErrorContext) -> str:
+    return CARD_TEMPLATE.render(**_template_fields(error_context))
+
+def build_fused_prompt(error_context: schemas.ErrorContext) -> str:
+    return FUSED_TEMPLATE.render(**_template_fields(error_context))
+
+def _is_valid_decision(llm_response: dict) -> bool:
+    return llm_response.get("decision") in ("APPROVE", "REJECT") and bool(llm_response.get("reason"))
+
+def _has_card_content(llm_response: dict) -> bool:
+    question, answer = llm_response.get("question"), llm_response.get("answer")
+    return isinstance(question, str) and bool(question.strip()) and isinstance(answer, str) and bool(answer.strip())
+
+def fallback_card_content(error_context: schemas.ErrorContext, note: str = "LLM 응답 실패") -> tuple:
+    return (
+        f"'''{error_context.concept_name}'''에 대해 설명하세요.",
+        f"'''{error_context.concept_name}'''은 ... 입니다. ({note})"
+    )
+
+async def generate_card_content(error_context: schemas.ErrorContext, model_name: str, timeout: Optional[float] = None) -> tuple:
+    """
+    카드 질문/답변을 생성합니다. LLM 호출 실패 시 HTTPException을 그대로 올립니다.
+    반환값: (question, answer, LLM이 두 필드를 모두 생성했는지 여부)
+    """
+    anki_llm_response = await call_ollama_template(CARD_TEMPLATE, _template_fields(error_context), model_name=model_name, timeout=timeout)
+    fallback_question, fallback_answer = fallback_card_content(error_context, note="LLM 응답 기반")
+    generated_question = anki_llm_response.get("question", fallback_question)
+    generated_answer = anki_llm_response.get("answer", fallback_answer)
+    return generated_question, generated_answer, _has_card_content(anki_llm_response)
+
+async def _generate_card_content(error_context: schemas.ErrorContext, model_name: str) -> tuple:
+    """
+    카드 질문/답변을 생성하고, LLM 호출이 실패하면 fallback 문구를 사용합니다.
+    """
+    try:
+        return await generate_card_content(error_context, model_name)
+    except HTTPException as e:
+        print(f"Warning: Failed to generate Anki card content with LLM: {e}. Using fallback.")
+        return (*fallback_card_content(error_context), False)
+
+async def _stream_judge(error_context: schemas.ErrorContext, model_name: str, start_card: bool) -> tuple:
+    """
+    판단을 스트리밍으로 받아, decision이 APPROVE로 확정되는 즉시 카드 생성을 병렬로 시작합니다.
+    (reason 생성이 끝나기를 기다리지 않음) 반환값: (판단 응답 dict, 카드 생성 Task 또는 None)
+    """
+    card_task = None
+
+    def on_field(key: str, value: Any):
+        nonlocal card_task
+        if key == "decision" and value == "APPROVE" and start_card and card_task is None:
+            card_task = asyncio.create_task(_generate_card_content(error_context, model_name))
+
+    try:
+        llm_response = await call_ollama_api_streaming(build_judge_prompt(error_context), model_name=model_name, on_field=on_field)
+    except BaseException:
+        if card_task is not None:
+            card_task.cancel()
+        raise
+    return llm_response, card_task
+
+def remember_card_content(model_version: str, error_context: schemas.ErrorContext, question: str, answer: str):
+    """
+    나중에 생성된 카드 내용을 기존 판단 캐시 항목에 덧붙입니다. (판단 항목이 없으면 무시)
+    """
+    cache_key = judgment_cache_key(model_version, error_context)
+    cache_entry = judgment_cache.pop(cache_key)
+    if cache_entry is not None:
+        judgment_cache.set(cache_key, {**cache_entry, "question": question, "answer": answer})
+
+async def run_judgment(error_context: schemas.ErrorContext, model_name: str, model_version: str, judge_mode: str = JUDGE_MODE_TWO_CALL, generate_card: bool = True) -> dict:
+    """
+    LLM 판단과 (APPROVE 시) 카드 내용 생성을 수행하고 결과 dict를 반환합니다. DB에는 쓰지 않습니다.
+    반환값: {"decision", "reason", "question", "answer", "judge_mode", "latency_ms"}
+    REJECT면 question/answer는 None이고, judge_mode는 실제로 결과를 만든 경로입니다.
+    generate_card=False이면 캐시/fused 출력에 카드 내용이 없을 때 카드 생성 호출을 하지 않습니다(question/answer가 None).
+    """
+    started = time.perf_counter()
+    judgment = {"decision": "REJECT", "reason": "LLM response format error.", "question": None, "answer": None, "judge_mode": judge_mode}
+    card_from_llm = False
+    card_task = None
+
+    # 같은 모델/개념/오답 요약에 대한 판단이 캐시에 있으면 LLM 호출을 생략합니다.
+    cache_key = judgment_cache_key(model_version, error_context)
+    cache_entry = judgment_cache.get(cache_key)
+    if cache_entry is not None:
+        judgment.update(cache_entry, judge_mode=JUDGE_MODE_CACHE)
+        llm_telemetry.record_cache_hit("judge")
+    else:
+        llm_response = None
+        try:
+            if judge_mode == JUDGE_MODE_FUSED:
+                fused_response = await call_ollama_template(FUSED_TEMPLATE, _template_fields(error_context), model_name=model_name)
+                if not _is_valid_decision(fused_response):
+                    # 판단 자체가 불완전하면 two-call 경로로 다시 판단합니다.
+                    judgment["judge_mode"] = JUDGE_MODE_FUSED_FALLBACK
+                else:
+                    llm_response = fused_response
+                    if fused_response["decision"] == "APPROVE" and _has_card_content(fused_response):
+                        judgment["question"], judgment["answer"] = fused_response["question"], fused_response["answer"]
+                        card_from_llm = True
+                    elif fused_response["decision"] == "APPROVE":
+                        # 판단은 유효하지만 카드 내용이 빠졌으면 카드 생성 호출만 추가로 수행합니다.
+                        judgment["judge_mode"] = JUDGE_MODE_FUSED_FALLBACK
+            if llm_response is None and JUDGE_STREAMING:
+                llm_response, card_task = await _stream_judge(error_context, model_name, start_card=generate_card)
+            elif llm_response is None:
+                llm_response = await call_ollama_template(JUDGE_TEMPLATE, _template_fields(error_context), model_name=model_name)
+        except LLMUnavailableError as e:
+            # 과부하/서킷 open이면 LLM을 기다리지 않고 기존 fallback(REJECT)으로 바로 응답합니다. (캐시하지 않음)
+            print(f"Warning: Skipping LLM judgment: {e.detail}. Falling back to REJECT.")
+            llm_response = {"decision": "REJECT", "reason": LLM_UNAVAILABLE_REASON}
+            judgment["judge_mode"] = JUDGE_MODE_FALLBACK
+        judgment["decision"] = llm_response.get("decision", "REJECT")
+        judgment["reason"] = llm_response.get("reason", "LLM response format error.")
+        # 형식 오류 응답과 fallback 판단은 캐시하지 않습니다.
+        if _is_valid_decision(llm_response) and judgment["judge_mode"] != JUDGE_MODE_FALLBACK:
+            cache_entry = {"decision": judgment["decision"], "reason": judgment["reason"]}
+
+    if judgment["decision"] != "APPROVE":
+        judgment["question"] = judgment["answer"] = None
+        if card_task is not None:
+            card_task.cancel()
+    elif card_task is not None:
+        # 스트리밍 판단 중 미리 시작한 카드 생성 결과를 사용합니다.
+        judgment["question"], judgment["answer"], card_from_llm = await card_task
+    elif not (judgment["question"] and judgment["answer"]) and generate_card:
+        # LLM이 APPROVE 결정을 내리면 Anki 카드 내용을 생성합니다.
+        judgment["question"], judgment["answer"], card_from_llm = await _generate_card_content(error_context, model_name)
+
+    # LLM이 생성한 카드 내용만 캐시에 함께 저장합니다. (fallback 문구는 저장하지 않음)
+    if cache_entry is not None and (judgment["judge_mode"] != JUDGE_MODE_CACHE or card_from_llm):
+        if card_from_llm:
+            cache_entry = {**cache_entry, "question": judgment["question"], "answer": judgment["answer"]}
+        judgment_cache.set(cache_key, cache_entry)
+
+    judgment["latency_ms"] = int((time.perf_counter() - started) * 1000)
+    return judgment
+
+async def judge_error_context(error_context: schemas.ErrorContext) -> tuple:
+    """
+    fast path 분류기를 먼저 시도하고, 확신도가 낮으면 A/B로 고른 LLM으로 판단합니다.
+    반환값: (카드 생성에 쓸 Ollama 모델 이름, 판단한 모델 버전, run_judgment 형식의 판단 결과)
+    판단 결과의 "llm_calls"에는 이 판단에서 일어난 LLM 호출 텔레메트리가 담깁니다. (LLMLog 저장 후 기록)
+    deferred 모드에서는 카드 내용 생성을 기다리지 않고 판단만 반환합니다.
+    """
+    with llm_telemetry.collect_calls() as llm_calls:
+        model_name, model_version, judgment = await _judge_error_context(error_context)
+    judgment["llm_calls"] = llm_calls
+    return model_name, model_version, judgment
+
+async def _judge_error_context(error_context: schemas.ErrorContext) -> tuple:
+    model_name, model_version, judge_mode = select_judge_model()
+    generate_card = CARD_GENERATION_MODE != "deferred"
+    fast_path = fast_path_judgment(error_context)
+    if fast_path is not None:
+        classifier_version, judgment = fast_path
+        if judgment["decision"] == "APPROVE" and generate_card:
+            started = time.perf_counter()
+            judgment["question"], judgment["answer"], _ = await _generate_card_content(error_context, model_name)
+            judgment["latency_ms"] += int((time.perf_counter() - started) * 1000)
+        return model_name, classifier_version, judgment
+    judgment = await run_judgment(error_context, model_name, model_version, judge_mode, generate_card=generate_card)
+    return model_name, model_version, judgment
+
 @router.post("/judge", response_model=schemas.JudgeResponse)
 async def judge_anki_necessity(request: schemas.JudgeRequest, db: AsyncSession = Depends(get_db)):
-    # --- Model Selection and A/B Testing: Traffic Splitting (Conceptual) ---
-    production_model_info = model_registry.get_active_production_model()
-    all_registered_models = model_registry.list_models()
-    
-    staging_models_info = [
-        m for v, m in all_registered_models.items() 
-        if m.get("production_status") == "staging"
-    ]
-
-    selected_model_name = "llama2:latest" # Default model name for Ollama
-    selected_model_version = "base_v1" # Default version if no registered model is active
-
-    # Determine which model to use based on A/B test configuration
-    if production_model_info and staging_models_info and random.random() < AB_TEST_TRAFFIC_SPLIT:
-        # Use a specific staging model if configured, otherwise pick a random one
-        if AB_TEST_STAGING_MODEL_VERSION:
-            selected_staging_model = next((m for v, m in all_registered_models.items() if v == AB_TEST_STAGING_MODEL_VERSION and m.get("production_status") == "staging"), None)
-            if selected_staging_model:
-                selected_model_name = selected_staging_model.get("metadata", {}).get("base_model", "llama2:latest")
-                selected_model_version = selected_staging_model["version"]
-                print(f"[A/B Test] Using configured staging model: {selected_model_version}")
-            else:
-                print(f"[A/B Test] Configured staging model {AB_TEST_STAGING_MODEL_VERSION} not found or not in staging. Falling back to production/default.")
-                # Fallback to production or default if configured staging model is not available
-                if production_model_info:
-                    selected_model_name = production_model_info.get("metadata", {}).get("base_model", "llama2:latest")
-                    selected_model_version = production_model_info["version"]
-                    print(f"[A/B Test] Falling back to production model: {selected_model_version}")
-                else:
-                    print(f"[A/B Test] Falling back to default base model: {selected_model_version}")
-        else:
-            # Pick a random staging model
-            selected_staging_model = random.choice(staging_models_info)
-            selected_model_name = selected_staging_model.get("metadata", {}).get("base_model", "llama2:latest")
-            selected_model_version = selected_staging_model["version"]
-            print(f"[A/B Test] Using random staging model: {selected_model_version}")
-    elif production_model_info:
-        selected_model_name = production_model_info.get("metadata", {}).get("base_model", "llama2:latest")
-        selected_model_version = production_model_info["version"]
-        print(f"[A/B Test] Using production model: {selected_model_version}")
-    else:
-        print(f"[A/B Test] Using default base model: {selected_model_version}")
-
-    # V1 경량화 원칙에 따라, LLM에 전달할 간결한 프롬프트를 생성합니다.
-    prompt = f"""[SYSTEM]
-You are a helpful AI assistant that functions as a JSON API. You must only answer in JSON format. Do not add any other text. Your task is to decide if a student's mistake is worth creating a review card (Anki card).
-
-[INSTRUCTIONS]
-- Analyze the user's mistake based on the provided context.
-- The JSON output must contain two keys: "decision" (string) and "reason" (string).
-- The value for "decision" must be either "APPROVE" or "REJECT".
-- "APPROVE" if the mistake is a core concept error, a misunderstanding of a definition, or a critical factual error.
-- "REJECT" if the mistake is a simple calculation error, a typo, or not educationally significant.
-- The "reason" must be a short explanation in Korean.
-
-[EXAMPLE 1]
-User Mistake Context: {{ "concept": "Pythagorean theorem", "mistake": "Student used a+b=c instead of a^2+b^2=c^2" }}
-Your JSON Response: {{"decision": "APPROVE", "reason": "핵심적인 개념인 피타고라스의 정리를 잘못 이해하고 있습니다."}}
-
-[EXAMPLE 2]
-User Mistake Context: {{ "concept": "Addition", "mistake": "Student calculated 123 + 456 as 578" }}
-Your JSON Response: {{"decision": "REJECT", "reason": "개념 이해보다는 단순 계산 실수에 가깝습니다."}}
-
-[CURRENT TASK]
-User Mistake Context: {{ "concept": "{request.error_context.concept_name}", "mistake": "{request.error_context.student_mistake_summary}" }}
-Your JSON Response:"""
-    llm_response = await call_ollama_api(prompt, model_name=selected_model_name)
-    
+    selected_model_name, selected_model_version, judgment = await judge_error_context(request.error_context)
+
     # LLM 판단 결과를 실제 DB에 저장
     new_log = await crud.create_llm_log(
         db=db, 
         submission_id=request.submission_id, 
-        decision=llm_response.get("decision", "REJECT"), 
-        reason=llm_response.get("reason", "LLM response format error."),
+        student_id=request.student_id,
+        decision=judgment["decision"], 
+        reason=judgment["reason"],
         concept_name=request.error_context.concept_name,
-        model_version=selected_model_version # Store the model version used
+        student_mistake_summary=request.error_context.student_mistake_summary,
+        model_version=selected_model_version, # Store the model version used
+        judge_mode=judgment["judge_mode"],
+        latency_ms=judgment["latency_ms"]
     )
 
-    # LLM이 APPROVE 결정을 내리면 Anki 카드를 생성합니다.
-    if new_log.decision == "APPROVE":
-        # LLM에게 Anki 카드 질문과 답변 생성을 요청하는 새로운 프롬프트
-        anki_prompt = f"""[SYSTEM]
-You are an AI assistant that generates Anki flashcards. Your output must be in JSON format with two keys: "question" (string) and "answer" (string). Do not add any other text.
-
-[INSTRUCTIONS]
-- Based on the provided concept and student's mistake, create a concise Anki flashcard.
-- The question should test the core concept the student misunderstood.
-- The answer should clearly explain the concept or correct the mistake.
-- Both question and answer should be in Korean.
-
-[CURRENT TASK]
-Concept: {request.error_context.concept_name}
-Student's Mistake Summary: {request.error_context.student_mistake_summary}
-Your JSON Response:"""
-        
-        try:
-            anki_llm_response = await call_ollama_api(anki_prompt, model_name=selected_model_name)
-            generated_question = anki_llm_response.get("question", f"'''{request.error_context.concept_name}'''에 대해 설명하세요.")
-            generated_answer = anki_llm_response.get("answer", f"'''{request.error_context.concept_name}'''은 ... 입니다. (LLM 응답 기반)")
-        except HTTPException as e:
-            print(f"Warning: Failed to generate Anki card content with LLM: {e}. Using fallback.")
-            generated_question = f"'''{request.error_context.concept_name}'''에 대해 설명하세요."
-            generated_answer = f"'''{request.error_context.concept_name}'''은 ... 입니다. (LLM 응답 실패)"
-
+    card_status = None
+    if new_log.decision == "APPROVE" and judgment["question"] and judgment["answer"]:
         anki_card_data = schemas.AnkiCardCreate(
             student_id=request.student_id,
             llm_log_id=new_log.log_id,
-            question=generated_question,
-            answer=generated_answer
+            question=judgment["question"],
+            answer=judgment["answer"]
         )
         await crud.create_anki_card(db=db, card=anki_card_data)
+        card_status = "created"
+    elif new_log.decision == "APPROVE":
+        # 카드 내용은 백그라운드 워커가 생성합니다. (작업 큐는 같은 트랜잭션으로 저장)
+        await crud.create_card_generation_job(
+            db, llm_log_id=new_log.log_id, student_id=request.student_id,
+            error_context=request.error_context, model_name=selected_model_name, model_version=selected_model_version
+        )
+        card_status = "queued"
 
+    await llm_telemetry.persist_calls(db, new_log.log_id, judgment["llm_calls"])
+    _notify_judgment(new_log, request.error_context)
     return schemas.JudgeResponse(
         log_id=str(new_log.log_id), 
         decision=new_log.decision,
-        reason=new_log.reason
+        reason=new_log.reason,
+        card_status=card_status
+    )
+
+@router.post("/judge/batch", response_model=schemas.JudgeBatchResponse)
+async def judge_anki_necessity_batch(request: schemas.JudgeBatchRequest, db: AsyncSession = Depends(get_db)):
+    """
+    여러 오답 컨텍스트를 한 번에 판단합니다.
+    LLM 호출은 세마포어로 동시 실행 수를 제한하고, 모든 LLMLog/AnkiCard는 하나의 트랜잭션으로 저장합니다.
+    일부 항목이 실패해도 나머지 결과는 저장되며, 결과는 요청 순서대로 반환됩니다.
+    """
+    concurrency = min(request.concurrency or JUDGE_BATCH_CONCURRENCY, JUDGE_BATCH_MAX_CONCURRENCY)
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def judge_one(item: schemas.JudgeRequest) -> tuple:
+        async with semaphore:
+            return await judge_error_context(item.error_context)
+
+    outcomes = await asyncio.gather(*(judge_one(item) for item in request.items), return_exceptions=True)
+
+    succeeded = [(index, item, outcome) for index, (item, outcome) in enumerate(zip(request.items, outcomes)) if not isinstance(outcome, BaseException)]
+    db_logs = await crud.create_llm_logs_bulk(db, [
+        models.LLMLog(
+            submission_id=item.submission_id,
+            student_id=item.student_id,
+            decision=judgment["decision"],
+            reason=judgment["reason"],
+            concept_name=item.error_context.concept_name,
+            student_mistake_summary=item.error_context.student_mistake_summary,
+            model_version=model_version,
+            judge_mode=judgment["judge_mode"],
+            latency_ms=judgment["latency_ms"]
+        )
+        for _, item, (_, model_version, judgment) in succeeded
+    ])
+    await crud.create_anki_cards_bulk(db, [
+        schemas.AnkiCardCreate(student_id=item.student_id, llm_log_id=db_log.log_id, question=judgment["question"], answer=judgment["answer"])
+        for (_, item, (_, _, judgment)), db_log in zip(succeeded, db_logs)
+        if db_log.decision == "APPROVE" and judgment["question"] and judgment["answer"]
+    ])
+    for (_, item, (model_name, model_version, judgment)), db_log in zip(succeeded, db_logs):
+        if db_log.decision == "APPROVE" and not (judgment["question"] and judgment["answer"]):
+            await crud.create_card_generation_job(
+                db, llm_log_id=db_log.log_id, student_id=item.student_id,
+                error_context=item.error_context, model_name=model_name, model_version=model_version
+            )
+
+    for (_, item, (_, _, judgment)), db_log in zip(succeeded, db_logs):
+        await llm_telemetry.persist_calls(db, db_log.log_id, judgment["llm_calls"])
+        _notify_judgment(db_log, item.error_context)
+
+    results = [None] * len(request.items)
+    for (index, _, _), db_log in zip(succeeded, db_logs):
+        results[index] = schemas.JudgeBatchItemResult(index=index, status="ok", log_id=str(db_log.log_id), decision=db_log.decision, reason=db_log.reason)
+    for index, outcome in enumerate(outcomes):
+        if isinstance(outcome, BaseException):
+            error = outcome.detail if isinstance(outcome, HTTPException) else str(outcome) or type(outcome).__name__
+            results[index] = schemas.JudgeBatchItemResult(index=index, status="error", error=error)
+
+    return schemas.JudgeBatchResponse(
+        results=results,
+        succeeded=len(succeeded),
+        failed=len(request.items) - len(succeeded)
     )
 
+@router.get("/cache/stats", response_model=schemas.JudgeCacheStatsResponse)
+async def get_judgment_cache_stats():
+    return judgment_cache.stats()
+
+@router.get("/llm/guard", response_model=schemas.LLMGuardStatusResponse)
+async def get_llm_guard_status():
+    """
+    LLM 호출 앞단의 적응형 동시성 한도, 대기열 길이, 서킷 브레이커 상태를 반환합니다.
+    """
+    return get_llm_guard().status()
+
+@router.get("/stream/metrics", response_model=schemas.StreamingMetricsResponse)
+async def get_streaming_metrics():
+    """
+    스트리밍 호출의 time-to-first-token, time-to-decision, 전체 생성 시간 분포(p50/p95, ms)를 반환합니다.
+    """
+    return stream_metrics.summary()
+
+@router.get("/fast-path/stats", response_model=schemas.FastPathStatsResponse)
+async def get_fast_path_stats():
+    """
+    경량 분류기가 LLM 없이 응답한 비율(bypass_rate)과 현재 분류기 버전/확신도 threshold를 반환합니다.
+    """
+    return fast_path_stats.summary()
+
 @router.post("/feedback", response_model=schemas.FeedbackResponse)
 async def submit_feedback(request: schemas.FeedbackRequest, db: AsyncSession = Depends(get_db)):
     updated_log = await crud.update_llm_log_feedback(db=db, feedback=request)
@@ -0,0 +1,279 @@
+import asyncio
+import os
+import time
+from collections import deque
+from contextlib import asynccontextmanager
+from typing import Any, Awaitable, Callable, Dict, Optional
+
+import httpx
+from fastapi import HTTPException
+
+# 적응형 동시성 제한 (AIMD) 설정
+LLM_LIMIT_INITIAL = float(os.getenv("LLM_LIMIT_INITIAL", "8"))
+LLM_LIMIT_MIN = float(os.getenv("LLM_LIMIT_MIN", "1"))
+LLM_LIMIT_MAX = float(os.getenv("LLM_LIMIT_MAX", "32"))
+# 이 지연 시간을 넘거나 실패하면 한도를 줄이고(multiplicative decrease), 그 안에 성공하면 천천히 늘립니다(additive increase).
+LLM_LATENCY_TARGET_MS = float(os.getenv("LLM_LATENCY_TARGET_MS", "10000"))
+LLM_LIMIT_BACKOFF_RATIO = float(os.getenv("LLM_LIMIT_BACKOFF_RATIO", "0.7"))
+# 동시에 몰린 실패로 한도가 한꺼번에 바닥까지 떨어지지 않도록 감소 사이에 두는 최소 간격
+LLM_LIMIT_DECREASE_COOLDOWN_SECONDS = float(os.getenv("LLM_LIMIT_DECREASE_COOLDOWN_SECONDS", "1"))
+# 한도를 넘은 요청의 대기열 크기와 최대 대기 시간. 넘으면 바로 실패(fail fast)합니다.
+LLM_MAX_QUEUE = int(os.getenv("LLM_MAX_QUEUE", "64"))
+LLM_QUEUE_TIMEOUT_SECONDS = float(os.getenv("LLM_QUEUE_TIMEOUT_SECONDS", "5"))
+
+# 서킷 브레이커 설정: 연속 실패가 임계값에 도달하면 open, reset 시간 뒤 half-open에서 한 건을 시험합니다.
+LLM_BREAKER_FAILURE_THRESHOLD = int(os.getenv("LLM_BREAKER_FAILURE_THRESHOLD", "5"))
+LLM_BREAKER_RESET_SECONDS = float(os.getenv("LLM_BREAKER_RESET_SECONDS", "30"))
+
+BREAKER_CLOSED = "closed"
+BREAKER_OPEN = "open"
+BREAKER_HALF_OPEN = "half_open"
+
+
+class LLMUnavailableError(HTTPException):
+    """
+    과부하(대기열 초과/대기 시간 초과) 또는 서킷 open으로 LLM 호출을 시도하지 않고 거절한 경우.
+    HTTPException(503)이므로 기존 fallback 처리(except HTTPException / Exception)에 그대로 걸립니다.
+    """
+
+    def __init__(self, reason: str):
+        super().__init__(status_code=503, detail=f"LLM backend unavailable: {reason}")
+        self.reason = reason
+
+
+def is_backend_failure(error: BaseException) -> bool:
+    # 연결 실패/타임아웃과 5xx만 백엔드 이상으로 봅니다. (응답 JSON 형식 오류 등은 제외)
+    if isinstance(error, httpx.RequestError):
+        return True
+    if isinstance(error, httpx.HTTPStatusError):
+        return error.response.status_code >= 500
+    return False
+
+
+class AIMDLimiter:
+    """
+    지연 시간 기반 AIMD 동시성 제한기.
+    한도 이상으로 들어온 요청은 FIFO로 대기하고, 대기열이 가득 차거나 오래 기다리면 LLMUnavailableError를 냅니다.
+    """
+
+    def __init__(
+        self,
+        initial_limit: float = LLM_LIMIT_INITIAL,
+        min_limit: float = LLM_LIMIT_MIN,
+        max_limit: float = LLM_LIMIT_MAX,
+        latency_target_ms: float = LLM_LATENCY_TARGET_MS,
+        backoff_ratio: float = LLM_LIMIT_BACKOFF_RATIO,
+        decrease_cooldown_seconds: float = LLM_LIMIT_DECREASE_COOLDOWN_SECONDS,
+        max_queue: int = LLM_MAX_QUEUE,
+        queue_timeout_seconds: float = LLM_QUEUE_TIMEOUT_SECONDS,
+    ):
+        self.limit = initial_limit
+        self.min_limit = min_limit
+        self.max_limit = max_limit
+        self.latency_target_ms = latency_target_ms
+        self.backoff_ratio = backoff_ratio
+        self.decrease_cooldown_seconds = decrease_cooldown_seconds
+        self.max_queue = max_queue
+        self.queue_timeout_seconds = queue_timeout_seconds
+        self.inflight = 0
+        self._waiters: "deque[asyncio.Future]" = deque()
+        self._last_decrease = 0.0
+        self.rejected = 0
+        self.latency_ewma_ms: Optional[float] = None
+
+    @property
+    def queue_depth(self) -> int:
+        return len(self._waiters)
+
+    def _has_capacity(self) -> bool:
+        return self.inflight < max(1, int(self.limit))
+
+    def _wake_waiters(self):
+        while self._waiters and self._has_capacity():
+            waiter = self._waiters.popleft()
+            if not waiter.done():
+                self.inflight += 1 # 깨우는 쪽에서 자리를 예약합니다.
+                waiter.set_result(True)
+
+    async def acquire(self):
+        if not self._waiters and self._has_capacity():
+            self.inflight += 1
+            return
+        if len(self._waiters) >= self.max_queue:
+            self.rejected += 1
+            raise LLMUnavailableError("concurrency queue is full")
+
+        waiter = asyncio.get_running_loop().create_future()
+        self._waiters.append(waiter)
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), timeout=self.queue_timeout_seconds)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as e:
+            if waiter.done() and not waiter.cancelled():
+                # 타임아웃과 동시에 자리를 받았으면 반납합니다.
+                self.inflight -= 1
+                self._wake_waiters()
+            else:
+                waiter.cancel()
+                try:
+                    self._waiters.remove(waiter)
+                except ValueError:
+                    pass
+            if isinstance(e, asyncio.CancelledError):
+                raise
+            self.rejected += 1
+            raise LLMUnavailableError("timed out waiting for a concurrency slot")
+
+    def release(self, latency_ms: Optional[float], succeeded: bool):
+        self.inflight -= 1
+        if latency_ms is not None:
+            self.latency_ewma_ms = latency_ms if self.latency_ewma_ms is None else 0.8 * self.latency_ewma_ms + 0.2 * latency_ms
+        if succeeded and latency_ms is not None and latency_ms <= self.latency_target_ms:
+            self.limit = min(self.max_limit, self.limit + 1.0 / max(self.limit, 1.0))
+        elif latency_ms is not None:
+            now = time.monotonic()
+            if now - self._last_decrease >= self.decrease_cooldown_seconds:
+                self.limit = max(self.min_limit, self.limit * self.backoff_ratio)
+                self._last_decrease = now
+        self._wake_waiters()
+
+    @asynccontextmanager
+    async def slot(self):
+        """
+        with 블록 동안 자리를 점유합니다. 블록에서 백엔드 오류가 나거나 목표 지연을 넘기면 한도를 줄입니다.
+        """
+        await self.acquire()
+        started = time.perf_counter()
+        try:
+            yield
+        except BaseException as e:
+            # 취소(클라이언트 이탈 등)는 백엔드 상태를 반영하지 않으므로 한도를 건드리지 않습니다.
+            self.release(None if isinstance(e, asyncio.CancelledError) or not is_backend_failure(e) else (time.perf_counter() - started) * 1000, succeeded=False)
+            raise
+        self.release((time.perf_counter() - started) * 1000, succeeded=True)
+
+
+class CircuitBreaker:
+    """
+    연속 실패 기반 서킷 브레이커. open 상태에서는 호출을 바로 거절하고,
+    reset 시간이 지나면 half-open에서 한 건만 통과시켜 결과에 따라 닫거나 다시 엽니다.
+    """
+
+    def __init__(self, failure_threshold: int = LLM_BREAKER_FAILURE_THRESHOLD, reset_seconds: float = LLM_BREAKER_RESET_SECONDS):
+        self.failure_threshold = failure_threshold
+        self.reset_seconds = reset_seconds
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at: Optional[float] = None
+        self._probe_in_flight = False
+        self.rejected = 0
+
+    def before_call(self):
+        if self.state == BREAKER_OPEN:
+            if time.monotonic() - self.opened_at < self.reset_seconds:
+                self.rejected += 1
+                raise LLMUnavailableError("circuit breaker is open")
+            self.state = BREAKER_HALF_OPEN
+            self._probe_in_flight = False
+        if self.state == BREAKER_HALF_OPEN:
+            if self._probe_in_flight:
+                self.rejected += 1
+                raise LLMUnavailableError("circuit breaker is half-open")
+            self._probe_in_flight = True
+
+    def record_success(self):
+        self.state = BREAKER_CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = None
+        self._probe_in_flight = False
+
+    def record_failure(self):
+        self.consecutive_failures += 1
+        if self.state == BREAKER_HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+            if self.state != BREAKER_OPEN:
+                print(f"Warning: LLM circuit breaker opened after {self.consecutive_failures} consecutive failures.")
+            self.state = BREAKER_OPEN
+            self.opened_at = time.monotonic()
+        self._probe_in_flight = False
+
+    def record_ignored(self):
+        # 백엔드 상태와 무관하게 끝난 호출(취소, 형식 오류)은 half-open 시험만 풀어 줍니다.
+        self._probe_in_flight = False
+
+    def retry_after_seconds(self) -> Optional[float]:
+        if self.state != BREAKER_OPEN:
+            return None
+        return round(max(0.0, self.reset_seconds - (time.monotonic() - self.opened_at)), 1)
+
+
+class LLMGuard:
+    """
+    LLM 백엔드 호출 앞에 서킷 브레이커와 적응형 동시성 제한을 둡니다.
+    """
+
+    def __init__(self, limiter: Optional[AIMDLimiter] = None, breaker: Optional[CircuitBreaker] = None):
+        self.limiter = limiter or AIMDLimiter()
+        self.breaker = breaker or CircuitBreaker()
+
+    @asynccontextmanager
+    async def guarded(self):
+        self.breaker.before_call()
+        try:
+            async with self.limiter.slot():
+                yield
+        except LLMUnavailableError:
+            self.breaker.record_ignored()
+            raise
+        except BaseException as e:
+            if is_backend_failure(e):
+                self.breaker.record_failure()
+            else:
+                self.breaker.record_ignored()
+            raise
+        self.breaker.record_success()
+
+    def is_busy(self) -> bool:
+        """
+        새 호출이 대기열에 들어가거나 거절될 상황인지 여부. (shadow 호출처럼 버려도 되는 작업이 양보할 때 사용)
+        """
+        return (
+            self.breaker.state != BREAKER_CLOSED
+            or self.limiter.queue_depth > 0
+            or self.limiter.inflight >= max(1, int(self.limiter.limit))
+        )
+
+    async def call(self, func: Callable[[], Awaitable[Any]]) -> Any:
+        async with self.guarded():
+            return await func()
+
+    def status(self) -> Dict[str, Any]:
+        return {
+            "limit": round(self.limiter.limit, 2),
+            "effective_limit": max(1, int(self.limiter.limit)),
+            "inflight": self.limiter.inflight,
+            "queue_depth": self.limiter.queue_depth,
+            "max_queue": self.limiter.max_queue,
+            "latency_ewma_ms": round(self.limiter.latency_ewma_ms, 1) if self.limiter.latency_ewma_ms is not None else None,
+            "latency_target_ms": self.limiter.latency_target_ms,
+            "rejected_overload": self.limiter.rejected,
+            "breaker_state": self.breaker.state,
+            "consecutive_failures": self.breaker.consecutive_failures,
+            "rejected_circuit_open": self.breaker.rejected,
+            "breaker_retry_after_seconds": self.breaker.retry_after_seconds(),
+        }
+
+
+# 모든 라우트(판단, 리포트, 코칭)가 공유하는 가드
+_llm_guard = LLMGuard()
+
+
+def get_llm_guard() -> LLMGuard:
+    return _llm_guard
+
+
+def reset_llm_guard(limiter: Optional[AIMDLimiter] = None, breaker: Optional[CircuitBreaker] = None) -> LLMGuard:
+    """
+    새 상태의 가드로 교체합니다. (테스트/설정 변경용)
+    """
+    global _llm_guard
+    _llm_guard = LLMGuard(limiter=limiter, breaker=breaker)
+    return _llm_guard
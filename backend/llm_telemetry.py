@@ -0,0 +1,202 @@
+"""
+LLM 호출 텔레메트리.
+
+Ollama 응답의 prompt_eval_count/eval_count/*_duration을 호출마다 모델, 경로(route), 상태와 함께 기록합니다.
+- 메모리 집계: Prometheus 텍스트 형식으로 /metrics에 노출 (metrics_router)
+- 호출별 행: LLM_CALL_METRICS_PERSIST=true이면 llm_call_metrics 테이블에 LLMLog.log_id와 연결해 저장
+
+route는 프롬프트 종류입니다: judge, card, fused(판단 경로 템플릿), prefix(prefix 평가), warmup, report, coaching
+"""
+import os
+import threading
+from contextlib import contextmanager
+from contextvars import ContextVar
+from typing import Dict, Iterator, List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import models
+
+LLM_CALL_METRICS_PERSIST = os.getenv("LLM_CALL_METRICS_PERSIST", "false").lower() == "true"
+
+# 호출 지연(큐 대기 포함, 초) 히스토그램 버킷
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+STATUS_OK = "ok"
+STATUS_ERROR = "error"
+STATUS_REJECTED = "rejected" # 과부하/서킷 open으로 호출하지 않음
+
+
+class LLMCallRecord(NamedTuple):
+    route: str
+    model: str
+    status: str
+    coalesced: bool # 진행 중인 같은 생성 결과를 함께 받은 호출 (GPU 사용량 없음)
+    latency_ms: float
+    prompt_eval_count: Optional[int] = None
+    eval_count: Optional[int] = None
+    total_duration_ms: Optional[float] = None
+    load_duration_ms: Optional[float] = None
+    prompt_eval_duration_ms: Optional[float] = None
+    eval_duration_ms: Optional[float] = None
+
+
+def record_from_response(route: str, model: str, latency_ms: float, response: Optional[dict], status: str = STATUS_OK, coalesced: bool = False) -> LLMCallRecord:
+    """
+    Ollama 최종 응답(비스트리밍 응답 또는 스트림의 done 청크)에서 토큰 수와 시간(ns -> ms)을 꺼냅니다.
+    """
+    response = response or {}
+
+    def ms(key: str) -> Optional[float]:
+        value = response.get(key)
+        return value / 1e6 if value is not None else None
+
+    return LLMCallRecord(
+        route=route, model=model, status=status, coalesced=coalesced, latency_ms=latency_ms,
+        prompt_eval_count=response.get("prompt_eval_count"),
+        eval_count=response.get("eval_count"),
+        total_duration_ms=ms("total_duration"),
+        load_duration_ms=ms("load_duration"),
+        prompt_eval_duration_ms=ms("prompt_eval_duration"),
+        eval_duration_ms=ms("eval_duration"),
+    )
+
+
+class LLMTelemetry:
+    """
+    (model, route)별 누적 카운터와 route별 지연 히스토그램.
+    """
+
+    _SUMS = (
+        ("prompt_eval_count", "llm_prompt_tokens_total", "Prompt tokens evaluated by Ollama.", 1.0),
+        ("eval_count", "llm_completion_tokens_total", "Tokens generated by Ollama.", 1.0),
+        ("total_duration_ms", "llm_total_duration_seconds_total", "Ollama total_duration.", 1e-3),
+        ("load_duration_ms", "llm_load_duration_seconds_total", "Ollama load_duration (model loading).", 1e-3),
+        ("prompt_eval_duration_ms", "llm_prompt_eval_duration_seconds_total", "Ollama prompt_eval_duration.", 1e-3),
+        ("eval_duration_ms", "llm_eval_duration_seconds_total", "Ollama eval_duration.", 1e-3),
+    )
+
+    def __init__(self, buckets: Tuple[float, ...] = LATENCY_BUCKETS):
+        self.buckets = buckets
+        self._lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        self.calls: Dict[Tuple[str, str, str, bool], int] = {}
+        self.sums: Dict[Tuple[str, str], Dict[str, float]] = {}
+        self.latency: Dict[str, List[float]] = {} # route -> [버킷별 개수..., +Inf 개수, 합계]
+        self.cache_hits: Dict[str, int] = {}
+        self.prompt_context: Dict[str, List[int]] = {} # route -> [빌드 수, 사용 토큰, 전체 덤프 기준 토큰]
+
+    def record(self, record: LLMCallRecord):
+        with self._lock:
+            key = (record.model, record.route, record.status, record.coalesced)
+            self.calls[key] = self.calls.get(key, 0) + 1
+            sums = self.sums.setdefault((record.model, record.route), {})
+            for field, _, _, _ in self._SUMS:
+                value = getattr(record, field)
+                if value is not None and not record.coalesced:
+                    sums[field] = sums.get(field, 0.0) + value
+            histogram = self.latency.setdefault(record.route, [0] * (len(self.buckets) + 2))
+            seconds = record.latency_ms / 1000
+            for index, bound in enumerate(self.buckets):
+                if seconds <= bound:
+                    histogram[index] += 1
+            histogram[len(self.buckets)] += 1
+            histogram[-1] += seconds
+
+    def record_cache_hit(self, route: str):
+        with self._lock:
+            self.cache_hits[route] = self.cache_hits.get(route, 0) + 1
+
+    def record_prompt_context(self, route: str, tokens: int, raw_tokens: int):
+        with self._lock:
+            totals = self.prompt_context.setdefault(route, [0, 0, 0])
+            totals[0] += 1
+            totals[1] += tokens
+            totals[2] += raw_tokens
+
+    def render_prometheus(self, prefix: str = "pacer_") -> str:
+        """
+        Prometheus 텍스트 노출 형식(0.0.4)으로 렌더링합니다.
+        """
+        lines = []
+        with self._lock:
+            lines += [f"# HELP {prefix}llm_calls_total LLM generate calls by model, route, status and coalescing.", f"# TYPE {prefix}llm_calls_total counter"]
+            for (model, route, status, coalesced), count in sorted(self.calls.items()):
+                lines.append(f'{prefix}llm_calls_total{{model="{_escape(model)}",route="{route}",status="{status}",coalesced="{str(coalesced).lower()}"}} {count}')
+            for field, name, help_text, scale in self._SUMS:
+                lines += [f"# HELP {prefix}{name} {help_text}", f"# TYPE {prefix}{name} counter"]
+                for (model, route), sums in sorted(self.sums.items()):
+                    if field in sums:
+                        lines.append(f'{prefix}{name}{{model="{_escape(model)}",route="{route}"}} {_number(sums[field] * scale)}')
+            name = f"{prefix}llm_request_duration_seconds"
+            lines += [f"# HELP {name} LLM call latency including queueing, by route.", f"# TYPE {name} histogram"]
+            for route, histogram in sorted(self.latency.items()):
+                for index, bound in enumerate(self.buckets):
+                    lines.append(f'{name}_bucket{{route="{route}",le="{_number(bound)}"}} {histogram[index]}')
+                lines.append(f'{name}_bucket{{route="{route}",le="+Inf"}} {histogram[len(self.buckets)]}')
+                lines.append(f'{name}_sum{{route="{route}"}} {_number(histogram[-1])}')
+                lines.append(f'{name}_count{{route="{route}"}} {histogram[len(self.buckets)]}')
+            lines += [f"# HELP {prefix}llm_cache_hits_total Judgments answered from the judgment cache without an LLM call.", f"# TYPE {prefix}llm_cache_hits_total counter"]
+            for route, count in sorted(self.cache_hits.items()):
+                lines.append(f'{prefix}llm_cache_hits_total{{route="{route}"}} {count}')
+            lines += [f"# HELP {prefix}llm_prompt_context_tokens_total Estimated tokens of budgeted prompt contexts.", f"# TYPE {prefix}llm_prompt_context_tokens_total counter"]
+            for route, (_, tokens, _) in sorted(self.prompt_context.items()):
+                lines.append(f'{prefix}llm_prompt_context_tokens_total{{route="{route}"}} {tokens}')
+            lines += [f"# HELP {prefix}llm_prompt_context_tokens_saved_total Estimated tokens saved versus dumping all data with indent=2.", f"# TYPE {prefix}llm_prompt_context_tokens_saved_total counter"]
+            for route, (_, tokens, raw_tokens) in sorted(self.prompt_context.items()):
+                lines.append(f'{prefix}llm_prompt_context_tokens_saved_total{{route="{route}"}} {max(0, raw_tokens - tokens)}')
+        return "\n".join(lines) + "\n"
+
+
+def _escape(value: str) -> str:
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+
+def _number(value: float) -> str:
+    return repr(float(value)) if value != int(value) else str(int(value))
+
+
+telemetry = LLMTelemetry()
+
+# 현재 요청(판단/카드 작업)에서 일어난 호출을 모읍니다. LLMLog가 저장된 뒤 log_id와 함께 기록하기 위함입니다.
+_call_collector: ContextVar[Optional[List[LLMCallRecord]]] = ContextVar("llm_call_collector", default=None)
+
+
+@contextmanager
+def collect_calls() -> Iterator[List[LLMCallRecord]]:
+    calls: List[LLMCallRecord] = []
+    token = _call_collector.set(calls)
+    try:
+        yield calls
+    finally:
+        _call_collector.reset(token)
+
+
+def record_call(record: LLMCallRecord):
+    telemetry.record(record)
+    calls = _call_collector.get()
+    if calls is not None:
+        calls.append(record)
+
+
+def record_cache_hit(route: str):
+    telemetry.record_cache_hit(route)
+
+
+def record_prompt_context(route: str, tokens: int, raw_tokens: int):
+    telemetry.record_prompt_context(route, tokens, raw_tokens)
+
+
+async def persist_calls(db: AsyncSession, llm_log_id: Optional[int], calls: List[LLMCallRecord]):
+    """
+    LLM_CALL_METRICS_PERSIST가 켜져 있으면 호출별 행을 저장합니다. (요청 트랜잭션과 함께 커밋)
+    """
+    if not LLM_CALL_METRICS_PERSIST or not calls:
+        return
+    await crud.create_llm_call_metrics(db, [
+        models.LLMCallMetric(llm_log_id=llm_log_id, **{key: value for key, value in call._asdict().items()})
+        for call in calls
+    ])
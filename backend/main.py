@@ -10,17 +10,48 @@ from coach_router import router as coach_router
 from report_router import router as report_router
 from parent_router import router as parent_router
 from analysis_router import router as analysis_router
+from metrics_router import router as metrics_router
 
-from database import engine, Base
+from database import engine
 import models # 모든 모델을 임포트하여 Base.metadata에 등록
+import schema_upgrade
+import llm_client
+import kakao_sender
+import card_queue
+import shadow_traffic
+import model_warmup
+import coaching_generator
+import report_generator
+import report_delivery
 
 @asynccontextmanager
 async def lifespan(app: FastAPI):
-    # 애플리케이션 시작 시 DB 테이블 생성
-    async with engine.begin() as conn:
-        await conn.run_sync(Base.metadata.create_all)
+    # 애플리케이션 시작 시 DB 테이블 생성, 기존 DB에는 새 컬럼/인덱스 추가
+    await schema_upgrade.upgrade_database(engine)
+    # 모든 라우터가 공유하는 LLM 클라이언트(커넥션 풀) 생성
+    await llm_client.startup_llm_client()
+    # 리포트 발송에 공유하는 카카오 클라이언트(커넥션 풀, 속도 제한) 생성
+    await kakao_sender.startup_kakao_client()
+    # production/staging 모델을 미리 로드하고 prompt prefix를 평가 (백그라운드)
+    await model_warmup.start_background_warmup()
+    # 지연 카드 생성 작업을 처리하는 백그라운드 워커 시작
+    await card_queue.start_workers()
+    # staging 모델 shadow 판단 워커 시작 (AB_TEST_MODE=shadow일 때만 작업이 들어옴)
+    await shadow_traffic.start_workers()
+    # 오래된 리포트 초안 정리 작업 시작
+    await report_generator.start_draft_pruner()
+    # 리포트 카카오 발송 outbox를 비우는 dispatcher 시작
+    await report_delivery.start_dispatcher()
     yield
-    # 애플리케이션 종료 시 정리 작업 (필요하다면)
+    await report_delivery.stop_dispatcher()
+    await report_generator.stop_draft_pruner()
+    # 애플리케이션 종료 시 정리 작업
+    await shadow_traffic.stop_workers()
+    await card_queue.stop_workers()
+    await model_warmup.cancel_pending_warmups()
+    await coaching_generator.cancel_pending_refreshes()
+    await kakao_sender.shutdown_kakao_client()
+    await llm_client.shutdown_llm_client()
 
 app = FastAPI(lifespan=lifespan)
 
@@ -41,6 +72,7 @@ app.include_router(coach_router)
 app.include_router(report_router)
 app.include_router(parent_router)
 app.include_router(analysis_router)
+app.include_router(metrics_router)
 
 @app.get("/")
 def read_root():
@@ -0,0 +1,37 @@
+from fastapi import APIRouter
+from fastapi.responses import PlainTextResponse
+
+import llm_filter
+import llm_telemetry
+from llm_guard import get_llm_guard, BREAKER_CLOSED
+
+router = APIRouter(tags=["Metrics"])
+
+PROMETHEUS_CONTENT_TYPE = "text/plain; version=0.0.4; charset=utf-8"
+
+
+def render_guard_gauges(prefix: str = "pacer_") -> str:
+    """
+    스크레이프 시점의 LLM 동시성/서킷 상태와 진행 중인 coalescing 키 수를 gauge로 렌더링합니다.
+    """
+    status = get_llm_guard().status()
+    gauges = [
+        ("llm_concurrency_limit", "Current adaptive concurrency limit.", status["limit"]),
+        ("llm_inflight_requests", "LLM calls holding a concurrency slot.", status["inflight"]),
+        ("llm_queue_depth", "LLM calls waiting for a concurrency slot.", status["queue_depth"]),
+        ("llm_circuit_open", "1 if the circuit breaker is not closed.", 0 if status["breaker_state"] == BREAKER_CLOSED else 1),
+        ("llm_singleflight_inflight", "Distinct in-flight coalesced generations.", llm_filter.ollama_singleflight.inflight_count()),
+    ]
+    lines = []
+    for name, help_text, value in gauges:
+        lines += [f"# HELP {prefix}{name} {help_text}", f"# TYPE {prefix}{name} gauge", f"{prefix}{name} {value}"]
+    return "\n".join(lines) + "\n"
+
+
+@router.get("/metrics", response_class=PlainTextResponse)
+async def get_metrics():
+    """
+    Prometheus 텍스트 형식의 LLM 호출 텔레메트리.
+    """
+    body = llm_telemetry.telemetry.render_prometheus() + render_guard_gauges()
+    return PlainTextResponse(body, media_type=PROMETHEUS_CONTENT_TYPE)
@@ -1,18 +1,143 @@
+import bisect
 import json
+import logging
 import os
+import threading
+import time
 from datetime import datetime
-from typing import Dict, Any, Optional, List
+from typing import Dict, Any, Optional, List, Callable, NamedTuple, Tuple
 
 REGISTRY_FILE = "model_registry.json"
+# 다른 프로세스(다른 uvicorn 워커, scripts/deploy_model.py)가 레지스트리 파일을 바꿨는지 확인하는 최소 간격(초)
+REGISTRY_RELOAD_CHECK_SECONDS = float(os.getenv("REGISTRY_RELOAD_CHECK_SECONDS", "1.0"))
+
+DEFAULT_BASE_MODEL = "llama2:latest"
+DEFAULT_MODEL_VERSION = "base_v1"
+
+# metadata의 "kind". LLM 판단 모델 외에 fast_classifier(판단 앞단 경량 분류기)도 같은 레지스트리에 버전으로 등록합니다.
+MODEL_KIND_LLM = "llm"
+MODEL_KIND_FAST_CLASSIFIER = "fast_classifier"
+
+logger = logging.getLogger(__name__)
+
+
+class ModelRoute(NamedTuple):
+    version: str
+    model_name: str # Ollama 모델 이름 (metadata의 base_model)
+    role: str # 'production', 'staging' 또는 'default'
+    judge_mode: Optional[str] = None
+
+
+class RoutingSnapshot(NamedTuple):
+    """
+    A/B 선택에 쓰는 불변 라우팅 테이블. routes와 같은 순서의 누적 가중치로 이진 탐색 추첨을 합니다.
+    """
+    routes: Tuple[ModelRoute, ...]
+    cumulative_weights: Tuple[float, ...]
+    traffic_split: float
+    staging_version: Optional[str]
+
+    def draw(self, rand: float) -> ModelRoute:
+        """
+        rand는 [0, 1) 구간의 값입니다. O(log n)으로 경로를 고릅니다.
+        """
+        if len(self.routes) == 1:
+            return self.routes[0]
+        index = bisect.bisect_right(self.cumulative_weights, rand * self.cumulative_weights[-1])
+        return self.routes[min(index, len(self.routes) - 1)]
+
+
+def model_kind(info: Dict[str, Any]) -> str:
+    return (info.get("metadata") or {}).get("kind", MODEL_KIND_LLM)
+
+
+def _route_of(version: str, info: Dict[str, Any], role: str) -> ModelRoute:
+    metadata = info.get("metadata") or {}
+    return ModelRoute(version=version, model_name=metadata.get("base_model", DEFAULT_BASE_MODEL), role=role, judge_mode=metadata.get("judge_mode"))
+
+
+def _staging_routes(models: Dict[str, Dict[str, Any]], staging_version: Optional[str]) -> Tuple[List[ModelRoute], List[float]]:
+    """
+    staging LLM 모델의 경로와 metadata의 "traffic_weight"(기본 1) 비중을 반환합니다. staging_version이 지정되면 그 모델만.
+    """
+    staging = [
+        (version, info) for version, info in sorted(models.items())
+        if info.get("production_status") == "staging" and model_kind(info) == MODEL_KIND_LLM
+        and (staging_version is None or version == staging_version)
+    ]
+    weights = [max(float((info.get("metadata") or {}).get("traffic_weight", 1.0)), 0.0) for _, info in staging]
+    if not sum(weights):
+        weights = [1.0] * len(staging)
+    return [_route_of(version, info, "staging") for version, info in staging], weights
+
+
+def build_routing_snapshot(models: Dict[str, Dict[str, Any]], active_production_model: Optional[str], traffic_split: float, staging_version: Optional[str] = None) -> RoutingSnapshot:
+    """
+    production 모델에 (1 - traffic_split), staging 모델들에 traffic_split을 나눠 줍니다.
+    staging_version이 지정되면 그 모델만 staging 트래픽을 받습니다. staging 모델 간 비중은 metadata의 "traffic_weight"(기본 1)를 따릅니다.
+    production 모델이 없으면 기본 모델 하나로만 라우팅합니다.
+    """
+    production_info = models.get(active_production_model) if active_production_model else None
+    if production_info is None:
+        routes = (ModelRoute(version=DEFAULT_MODEL_VERSION, model_name=DEFAULT_BASE_MODEL, role="default"),)
+        return RoutingSnapshot(routes, (1.0,), traffic_split, staging_version)
+
+    production_route = _route_of(active_production_model, production_info, "production")
+    staging_routes, staging_weights = _staging_routes(models, staging_version)
+    if staging_version and not staging_routes:
+        logger.warning("ab_test_staging_model_unavailable version=%s fallback=%s", staging_version, active_production_model)
+    if not staging_routes or traffic_split <= 0:
+        return RoutingSnapshot((production_route,), (1.0,), traffic_split, staging_version)
+
+    staging_total = sum(staging_weights)
+    routes, cumulative, running = [production_route], [1.0 - traffic_split], 1.0 - traffic_split
+    for route, weight in zip(staging_routes, staging_weights):
+        running += traffic_split * weight / staging_total
+        routes.append(route)
+        cumulative.append(running)
+    return RoutingSnapshot(tuple(routes), tuple(cumulative), traffic_split, staging_version)
+
+
+def build_staging_snapshot(models: Dict[str, Dict[str, Any]], staging_version: Optional[str] = None) -> Optional[RoutingSnapshot]:
+    """
+    staging 모델만으로 만든 스냅샷(shadow 복제 대상). 라이브 traffic_split과 무관하게 traffic_weight 비중으로 추첨합니다.
+    staging 모델이 없으면 None.
+    """
+    routes, weights = _staging_routes(models, staging_version)
+    if not routes:
+        return None
+    cumulative, running = [], 0.0
+    for weight in weights:
+        running += weight
+        cumulative.append(running)
+    return RoutingSnapshot(tuple(routes), tuple(cumulative), 1.0, staging_version)
+
 
 class ModelRegistry:
-    _models: Dict[str, Dict[str, Any]] = {}
-    _active_production_model: Optional[str] = None
+    # 모델 상태 변경 시 호출되는 콜백 (version, status). 모든 인스턴스가 공유합니다.
+    _status_listeners: List[Callable[[str, str], None]] = []
 
     def __init__(self):
+        self._models: Dict[str, Dict[str, Any]] = {}
+        self._active_production_model: Optional[str] = None
+        self._file_signature: Optional[Tuple[int, int]] = None
+        self._last_reload_check = 0.0
+        self._routing_snapshot: Optional[RoutingSnapshot] = None
+        self._staging_snapshot: Optional[RoutingSnapshot] = None
+        self._lock = threading.RLock()
         self._load_registry()
 
+    def _read_file_signature(self) -> Optional[Tuple[int, int]]:
+        try:
+            stat = os.stat(REGISTRY_FILE)
+        except FileNotFoundError:
+            return None
+        return (stat.st_mtime_ns, stat.st_size)
+
     def _load_registry(self):
+        self._file_signature = self._read_file_signature()
+        self._routing_snapshot = None
+        self._staging_snapshot = None
         if os.path.exists(REGISTRY_FILE):
             try:
                 with open(REGISTRY_FILE, "r", encoding="utf-8") as f:
@@ -24,14 +149,90 @@ class ModelRegistry:
         else:
             print(f"Info: {REGISTRY_FILE} not found. Starting with empty registry.")
 
+    def refresh_if_changed(self, force: bool = False) -> bool:
+        """
+        레지스트리 파일이 다른 프로세스에서 바뀌었으면 다시 읽고, 상태가 바뀐 모델마다 리스너를 호출합니다.
+        파일 확인은 REGISTRY_RELOAD_CHECK_SECONDS 간격으로만 합니다. (force=True면 즉시)
+        """
+        now = time.monotonic()
+        if not force and now - self._last_reload_check < REGISTRY_RELOAD_CHECK_SECONDS:
+            return False
+        self._last_reload_check = now
+        signature = self._read_file_signature()
+        if signature == self._file_signature or signature is None:
+            return False
+
+        with self._lock:
+            previous = {version: info.get("production_status") for version, info in self._models.items()}
+            self._load_registry()
+            changed = [
+                (version, info.get("production_status"))
+                for version, info in self._models.items()
+                if previous.get(version) != info.get("production_status")
+            ]
+        logger.info("model_registry_reloaded file=%s changed=%s", REGISTRY_FILE, ",".join(f"{v}:{s}" for v, s in changed) or "-")
+        for version, status in changed:
+            self._notify_status_change(version, status)
+        return True
+
+    def get_routing_snapshot(self, traffic_split: float, staging_version: Optional[str] = None) -> RoutingSnapshot:
+        """
+        현재 라우팅 스냅샷을 반환합니다. 상태 변경/파일 변경/설정 변경 시에만 다시 만듭니다.
+        """
+        self.refresh_if_changed()
+        snapshot = self._routing_snapshot
+        if snapshot is None or snapshot.traffic_split != traffic_split or snapshot.staging_version != staging_version:
+            with self._lock:
+                snapshot = build_routing_snapshot(self._models, self._active_production_model, traffic_split, staging_version)
+                self._routing_snapshot = snapshot
+            logger.info(
+                "model_routing_rebuilt routes=%s",
+                ",".join(f"{route.version}({route.role})" for route in snapshot.routes)
+            )
+        return snapshot
+
+    def get_staging_snapshot(self, staging_version: Optional[str] = None) -> Optional[RoutingSnapshot]:
+        """
+        shadow 복제에 쓰는 staging 전용 스냅샷을 반환합니다. staging 모델이 없으면 None.
+        """
+        self.refresh_if_changed()
+        snapshot = self._staging_snapshot
+        if snapshot is None or snapshot.staging_version != staging_version:
+            with self._lock:
+                snapshot = build_staging_snapshot(self._models, staging_version)
+                self._staging_snapshot = snapshot
+        return snapshot
+
+    @classmethod
+    def add_status_listener(cls, listener: Callable[[str, str], None]):
+        """
+        Registers a callback invoked with (version, status) whenever a model is registered or its status changes.
+        """
+        if listener not in cls._status_listeners:
+            cls._status_listeners.append(listener)
+
+    def _notify_status_change(self, version: str, status: str):
+        for listener in list(self._status_listeners):
+            try:
+                listener(version, status)
+            except Exception as e:
+                print(f"Warning: Model status listener failed for {version}: {e}")
+
     def _save_registry(self):
-        with open(REGISTRY_FILE, "w", encoding="utf-8") as f:
+        # 다른 프로세스가 반쯤 쓰인 파일을 읽지 않도록 임시 파일에 쓴 뒤 교체합니다.
+        tmp_file = f"{REGISTRY_FILE}.{os.getpid()}.tmp"
+        with open(tmp_file, "w", encoding="utf-8") as f:
             json.dump({"models": self._models, "active_production_model": self._active_production_model}, f, indent=4, ensure_ascii=False)
+        os.replace(tmp_file, REGISTRY_FILE)
+        self._file_signature = self._read_file_signature()
+        self._routing_snapshot = None
+        self._staging_snapshot = None
 
     def register_model(self, version: str, path: str, metrics: Dict[str, Any], metadata: Optional[Dict[str, Any]] = None):
         """
         Registers a new model version in the registry.
         """
+        self.refresh_if_changed(force=True)
         if version in self._models:
             print(f"Warning: Model version {version} already exists. Overwriting.")
         
@@ -43,18 +244,21 @@ class ModelRegistry:
             "production_status": "inactive" # Can be 'inactive', 'staging', 'production'
         }
         self._save_registry()
+        self._notify_status_change(version, "inactive")
         print(f"Model version {version} registered successfully.")
 
     def get_model(self, version: str) -> Optional[Dict[str, Any]]:
         """
         Retrieves a specific model version.
         """
+        self.refresh_if_changed()
         return self._models.get(version)
 
     def get_latest_model(self) -> Optional[Dict[str, Any]]:
         """
         Retrieves the latest registered model based on registration time.
         """
+        self.refresh_if_changed()
         if not self._models:
             return None
         
@@ -71,19 +275,31 @@ class ModelRegistry:
         Sets the production status of a specific model version.
         Valid statuses: 'inactive', 'staging', 'production'.
         Only one model can be 'production' at a time.
+        fast_classifier 모델은 LLM production 모델과 별개로 kind별로 하나만 production이 됩니다.
         """
+        self.refresh_if_changed(force=True)
         if version not in self._models:
             print(f"Error: Model version {version} not found.")
             return False
         
-        if status == "production":
+        if model_kind(self._models[version]) != MODEL_KIND_LLM:
+            if status == "production":
+                kind = model_kind(self._models[version])
+                for other_version, info in self._models.items():
+                    if other_version != version and model_kind(info) == kind and info["production_status"] == "production":
+                        info["production_status"] = "inactive"
+        elif status == "production":
             # Deactivate current production model if any
             if self._active_production_model and self._active_production_model in self._models:
                 self._models[self._active_production_model]["production_status"] = "inactive"
             self._active_production_model = version
+        elif self._active_production_model == version:
+            # production에서 내려온 모델은 더 이상 production 트래픽을 받지 않습니다.
+            self._active_production_model = None
         
         self._models[version]["production_status"] = status
         self._save_registry()
+        self._notify_status_change(version, status)
         print(f"Model {version} production status set to {status}.")
         return True
 
@@ -91,20 +307,33 @@ class ModelRegistry:
         """
         Retrieves the model currently marked as 'production'.
         """
+        self.refresh_if_changed()
         if self._active_production_model and self._active_production_model in self._models:
             return self._models[self._active_production_model]
         return None
 
+    def get_active_fast_classifier(self) -> Optional[Tuple[str, Dict[str, Any]]]:
+        """
+        production 상태인 fast_classifier 모델의 (version, info)를 반환합니다. 없으면 None.
+        """
+        self.refresh_if_changed()
+        for version, info in self._models.items():
+            if model_kind(info) == MODEL_KIND_FAST_CLASSIFIER and info.get("production_status") == "production":
+                return version, info
+        return None
+
     def list_models(self) -> Dict[str, Dict[str, Any]]:
         """
         Lists all registered models.
         """
+        self.refresh_if_changed()
         return self._models
 
     def list_production_models(self) -> List[Dict[str, Any]]:
         """
         Lists models currently in production or staging.
         """
+        self.refresh_if_changed()
         return [info for info in self._models.values() if info["production_status"] in ["staging", "production"]]
 
 # Example Usage (for demonstration)
@@ -0,0 +1,104 @@
+import asyncio
+import os
+import time
+from typing import List, Optional, Set
+
+import httpx
+
+import llm_client
+import llm_filter
+import llm_telemetry
+from prompt_templates import JUDGE_PATH_TEMPLATES
+from backend.model_registry import ModelRegistry, MODEL_KIND_LLM, model_kind
+
+DEFAULT_BASE_MODEL = "llama2:latest"
+# 앱 시작 시 production/staging 모델을 미리 메모리에 올리고 prompt prefix를 평가할지 여부
+MODEL_WARMUP_ON_STARTUP = os.getenv("MODEL_WARMUP_ON_STARTUP", "true").lower() == "true"
+MODEL_WARMUP_TIMEOUT = float(os.getenv("MODEL_WARMUP_TIMEOUT", "120"))
+
+# 실행 중인 warm-up 작업 (GC로 사라지지 않도록 참조를 유지하고, 종료 시 취소합니다)
+_pending_warmups: Set[asyncio.Task] = set()
+
+
+def base_model_of(model_info: Optional[dict]) -> str:
+    return (model_info or {}).get("metadata", {}).get("base_model", DEFAULT_BASE_MODEL)
+
+
+def models_to_warm(registry: ModelRegistry) -> List[str]:
+    """
+    production/staging 모델이 사용하는 Ollama 모델 이름 목록. 등록된 모델이 없으면 기본 모델을 사용합니다.
+    """
+    names = {base_model_of(info) for info in registry.list_production_models() if model_kind(info) == MODEL_KIND_LLM}
+    return sorted(names) or [DEFAULT_BASE_MODEL]
+
+
+async def warm_model(model_name: str, timeout: Optional[float] = None) -> bool:
+    """
+    모델을 keep_alive로 메모리에 올리고, 판단 경로 템플릿의 prefix context를 미리 만들어 둡니다.
+    실패해도 예외를 올리지 않고 False를 반환합니다. (첫 요청에서 다시 시도됨)
+    """
+    timeout = timeout if timeout is not None else MODEL_WARMUP_TIMEOUT
+    try:
+        # 빈 프롬프트 요청은 생성 없이 모델만 로드합니다. (load_duration이 콜드 스타트 비용)
+        started = time.perf_counter()
+        response = await llm_client.get_llm_client().generate(
+            {"model": model_name, "prompt": "", "stream": False, "keep_alive": llm_filter.OLLAMA_KEEP_ALIVE},
+            timeout=timeout
+        )
+        llm_telemetry.record_call(llm_telemetry.record_from_response("warmup", model_name, (time.perf_counter() - started) * 1000, response))
+        if llm_filter.PROMPT_PREFIX_REUSE:
+            for template in JUDGE_PATH_TEMPLATES:
+                await llm_filter.prime_prompt_prefix(template, model_name, timeout=timeout)
+        print(f"Info: Warmed up Ollama model {model_name}.")
+        return True
+    except httpx.HTTPError as e:
+        print(f"Warning: Failed to warm up Ollama model {model_name}: {e}")
+        return False
+
+
+async def warm_registry_models(registry: Optional[ModelRegistry] = None) -> List[str]:
+    registry = registry or llm_filter.model_registry
+    warmed = []
+    for model_name in models_to_warm(registry):
+        if await warm_model(model_name):
+            warmed.append(model_name)
+    return warmed
+
+
+def schedule_warmup(coro) -> Optional[asyncio.Task]:
+    try:
+        loop = asyncio.get_running_loop()
+    except RuntimeError:
+        # 이벤트 루프 밖(관리 스크립트 등)에서의 상태 변경은 다음 앱 시작 시 warm-up 됩니다.
+        coro.close()
+        return None
+    task = loop.create_task(coro)
+    _pending_warmups.add(task)
+    task.add_done_callback(_pending_warmups.discard)
+    return task
+
+
+def on_model_status_change(version: str, status: str):
+    # staging/production으로 승격된 모델은 첫 요청이 느려지지 않도록 바로 warm-up 합니다.
+    # (fast_classifier처럼 Ollama를 쓰지 않는 모델은 제외)
+    model_info = llm_filter.model_registry.get_model(version)
+    if status in ("staging", "production") and model_kind(model_info or {}) == MODEL_KIND_LLM:
+        schedule_warmup(warm_model(base_model_of(model_info)))
+
+
+ModelRegistry.add_status_listener(on_model_status_change)
+
+
+async def start_background_warmup():
+    """
+    앱 시작을 막지 않도록 warm-up을 백그라운드 작업으로 실행합니다.
+    """
+    if MODEL_WARMUP_ON_STARTUP:
+        schedule_warmup(warm_registry_models())
+
+
+async def cancel_pending_warmups():
+    tasks = list(_pending_warmups)
+    for task in tasks:
+        task.cancel()
+    await asyncio.gather(*tasks, return_exceptions=True)
@@ -1,4 +1,4 @@
-from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, Date, JSON, Table
+from sqlalchemy import Column, Integer, String, Text, TIMESTAMP, ForeignKey, Date, JSON, Table, Index, Boolean, Float, UniqueConstraint, text
 from sqlalchemy.orm import relationship
 from sqlalchemy.sql import func
 from database import Base
@@ -28,14 +28,71 @@ class LLMLog(Base):
 
     log_id = Column(Integer, primary_key=True, index=True)
     submission_id = Column(String, nullable=False)
+    # 판단 요청의 student_id. 이전 행은 scripts/backfill_llm_log_student_id.py로 채웁니다.
+    student_id = Column(String, nullable=True)
     coach_id = Column(String, nullable=True)
     concept_name = Column(String, nullable=True)
+    student_mistake_summary = Column(Text, nullable=True) # fast path 분류기 학습용 입력
     model_version = Column(String, nullable=True) # Add this line
+    judge_mode = Column(String, nullable=True) # two_call, fused, fused_fallback, cache, fallback, fast_path
+    latency_ms = Column(Integer, nullable=True) # 판단(카드 생성 포함)에 걸린 시간
     decision = Column(String, nullable=False)
     reason = Column(Text, nullable=True)
     coach_feedback = Column(String, nullable=True)
     reason_code = Column(String, nullable=True)
     memo = Column(Text, nullable=True)
+    # 코치 피드백이 마지막으로 기록/수정된 시각. 코칭/리포트 fingerprint가 피드백 수정도 감지하도록 합니다.
+    feedback_updated_at = Column(TIMESTAMP, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        # 학생별 기간 조회(코치 로그 화면, 리포트, 코칭)와 전체 기간 조회, 모델별 피드백 집계용
+        Index("ix_llm_logs_student_id_created_at", "student_id", "created_at"),
+        Index("ix_llm_logs_created_at", "created_at"),
+        Index("ix_llm_logs_model_version_coach_feedback", "model_version", "coach_feedback"),
+    )
+
+class ShadowJudgment(Base):
+    """
+    staging 모델에 복제(shadow)한 판단 결과. 학생에게는 노출되지 않고, production 판단(LLMLog)과의 일치율 분석에만 사용합니다.
+    """
+    __tablename__ = "shadow_judgments"
+
+    shadow_id = Column(Integer, primary_key=True, index=True)
+    # 판단 요청의 트랜잭션이 커밋되기 전에 기록될 수 있으므로 FK 제약 없이 log_id만 저장합니다.
+    llm_log_id = Column(Integer, nullable=False, index=True)
+    production_model_version = Column(String, nullable=True)
+    production_decision = Column(String, nullable=False)
+    model_version = Column(String, nullable=False)
+    judge_mode = Column(String, nullable=True)
+    decision = Column(String, nullable=False)
+    reason = Column(Text, nullable=True)
+    latency_ms = Column(Integer, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        Index("ix_shadow_judgments_model_version_production", "model_version", "production_model_version"),
+    )
+
+class LLMCallMetric(Base):
+    """
+    Ollama 호출 한 건의 텔레메트리 (LLM_CALL_METRICS_PERSIST=true일 때만 기록). 시간 값은 ms 단위입니다.
+    """
+    __tablename__ = "llm_call_metrics"
+
+    call_id = Column(Integer, primary_key=True, index=True)
+    llm_log_id = Column(Integer, ForeignKey("llm_logs.log_id"), nullable=True, index=True)
+    route = Column(String, nullable=False) # judge, card, fused, prefix, report, coaching ...
+    model = Column(String, nullable=False)
+    status = Column(String, nullable=False) # ok, error, rejected
+    coalesced = Column(Boolean, nullable=False, default=False)
+    latency_ms = Column(Float, nullable=False) # 대기열/coalescing 대기 포함
+    prompt_eval_count = Column(Integer, nullable=True)
+    eval_count = Column(Integer, nullable=True)
+    total_duration_ms = Column(Float, nullable=True)
+    load_duration_ms = Column(Float, nullable=True)
+    prompt_eval_duration_ms = Column(Float, nullable=True)
+    eval_duration_ms = Column(Float, nullable=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
 class AnkiCard(Base):
@@ -53,6 +110,87 @@ class AnkiCard(Base):
     last_reviewed_at = Column(TIMESTAMP, nullable=True)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    __table_args__ = (
+        # 일일 복습 덱: 학생의 기한 지난 카드를 (복습일, ease) 순으로 예산만큼만 읽고 COUNT도 인덱스로 계산
+        Index("ix_anki_cards_student_id_next_review_date_ease_factor", "student_id", "next_review_date", "ease_factor"),
+        # 리포트/일일 요약: 기간 안에 만들어졌거나 복습된 카드 (OR의 각 조건이 인덱스를 사용)
+        Index("ix_anki_cards_student_id_created_at", "student_id", "created_at"),
+        Index("ix_anki_cards_student_id_last_reviewed_at", "student_id", "last_reviewed_at"),
+    )
+
+class CardGenerationJob(Base):
+    __tablename__ = "card_generation_jobs"
+
+    job_id = Column(Integer, primary_key=True, index=True)
+    llm_log_id = Column(Integer, ForeignKey("llm_logs.log_id"), nullable=False, unique=True)
+    student_id = Column(String, nullable=False, index=True)
+    question_type = Column(String, nullable=True)
+    concept_name = Column(String, nullable=False)
+    student_mistake_summary = Column(Text, nullable=False)
+    model_name = Column(String, nullable=False)
+    model_version = Column(String, nullable=True)
+    status = Column(String, nullable=False, default='pending') # 'pending', 'running', 'done', 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(TIMESTAMP, nullable=True)
+    locked_at = Column(TIMESTAMP, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    completed_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        Index("ix_card_generation_jobs_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+class ReportDelivery(Base):
+    """
+    리포트 카카오 발송 outbox. 리포트를 최종 승인하는 트랜잭션에서 학부모별로 한 행씩 쌓이고,
+    백그라운드 dispatcher(report_delivery)가 배치로 가져가 발송합니다.
+    dedupe_key(리포트+학부모)가 유일하므로 같은 리포트를 여러 번 발송 요청해도 수신자당 한 행만 생깁니다.
+    """
+    __tablename__ = "report_deliveries"
+
+    delivery_id = Column(Integer, primary_key=True, index=True)
+    report_id = Column(Integer, ForeignKey("weekly_reports.report_id"), nullable=False)
+    parent_id = Column(Integer, ForeignKey("parents.parent_id"), nullable=False)
+    dedupe_key = Column(String, nullable=False, unique=True)
+    kakao_user_id = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='pending') # 'pending', 'running', 'sent', 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    next_attempt_at = Column(TIMESTAMP, nullable=True)
+    # dispatcher가 가져간 시각과 claim 토큰. lease가 만료된 running 행은 다른 dispatcher가 다시 가져갑니다.
+    locked_at = Column(TIMESTAMP, nullable=True)
+    locked_by = Column(String, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    sent_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("report_id", "parent_id", name="uq_report_deliveries_report_parent"),
+        Index("ix_report_deliveries_status_next_attempt", "status", "next_attempt_at"),
+    )
+
+class ReportBatchItem(Base):
+    """
+    주간 리포트 일괄 생성(scripts/generate_weekly_reports.py)의 학생별 진행 상태. 같은 run_id로 다시 실행하면 done이 아닌 학생만 처리합니다.
+    """
+    __tablename__ = "report_batch_items"
+
+    item_id = Column(Integer, primary_key=True, index=True)
+    run_id = Column(String, nullable=False)
+    student_id = Column(String, nullable=False)
+    status = Column(String, nullable=False, default='pending') # 'pending', 'running', 'done', 'failed'
+    attempts = Column(Integer, nullable=False, default=0)
+    report_id = Column(Integer, nullable=True)
+    duration_ms = Column(Float, nullable=True)
+    last_error = Column(Text, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+    completed_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        UniqueConstraint("run_id", "student_id", name="uq_report_batch_items_run_student"),
+        Index("ix_report_batch_items_run_status", "run_id", "status"),
+    )
+
 class Student(Base):
     __tablename__ = "students"
 
@@ -74,6 +212,32 @@ class CoachMemo(Base):
     memo_text = Column(Text, nullable=False)
     created_at = Column(TIMESTAMP, server_default=func.now())
 
+    __table_args__ = (
+        Index("ix_coach_memos_student_id_created_at", "student_id", "created_at"),
+    )
+
+class DailySummary(Base):
+    """
+    학생의 하루 학습 활동 LLM 요약. 주간 리포트는 이 요약들을 합쳐(reduce) 만듭니다.
+    그날 판단/카드/복습/메모가 새로 생기면 행을 삭제해 다시 요약되도록 합니다.
+    """
+    __tablename__ = "daily_summaries"
+
+    summary_id = Column(Integer, primary_key=True, index=True)
+    student_id = Column(String, ForeignKey("students.student_id"), nullable=False)
+    summary_date = Column(Date, nullable=False)
+    summary = Column(Text, nullable=True) # 활동이 없는 날은 None (LLM 호출 없음)
+    judgments_count = Column(Integer, nullable=False, default=0)
+    reviews_count = Column(Integer, nullable=False, default=0)
+    new_cards_count = Column(Integer, nullable=False, default=0)
+    memos_count = Column(Integer, nullable=False, default=0)
+    model_name = Column(String, nullable=True)
+    created_at = Column(TIMESTAMP, server_default=func.now())
+
+    __table_args__ = (
+        UniqueConstraint("student_id", "summary_date", name="uq_daily_summaries_student_date"),
+    )
+
 class WeeklyReport(Base):
     __tablename__ = "weekly_reports"
 
@@ -97,8 +261,19 @@ class WeeklyReport(Base):
     coach_comment = Column(Text, nullable=True)
     
     # Status
-    status = Column(String, nullable=False, default='draft') # e.g., 'draft', 'finalized'
+    status = Column(String, nullable=False, default='draft') # 'draft', 'finalized', 'sending', 'sent', 'send_failed'
     
+    # 초안을 만들 때의 학생 데이터 fingerprint. 같으면 초안을 재사용하고, LLM 요약에 실패한 초안은 None으로 두어 다시 생성합니다.
+    data_fingerprint = Column(String, nullable=True)
+
     # Timestamps
     created_at = Column(TIMESTAMP, server_default=func.now())
     finalized_at = Column(TIMESTAMP, nullable=True)
+
+    __table_args__ = (
+        # (학생, 기간)별 초안은 하나만: 동시에 생성해도 중복 초안이 생기지 않습니다. 승인/발송된 리포트는 제외.
+        Index(
+            "uq_weekly_reports_draft_period", "student_id", "report_period_start", "report_period_end",
+            unique=True, sqlite_where=text("status = 'draft'"), postgresql_where=text("status = 'draft'"),
+        ),
+    )
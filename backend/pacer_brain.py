@@ -1,22 +1,33 @@
-from typing import List
+from typing import List, Optional
 from datetime import date
 
 import models
 import schemas
 
+DEFAULT_ANKI_BUDGET_PER_DAY = 20
+
+def daily_budget(student: models.Student) -> int:
+    return student.settings.get("anki_budget_per_day", DEFAULT_ANKI_BUDGET_PER_DAY)
+
 async def get_daily_review_deck(
     student: models.Student,
     due_cards: List[models.AnkiCard],
-    today: date = date.today()
+    today: date = date.today(),
+    total_due: Optional[int] = None
 ) -> schemas.DailyReviewDeckResponse:
     """
     학생의 일일 복습 예산에 맞춰 Anki 카드 덱을 생성합니다.
+    due_cards는 DB에서 우선순위 순으로 예산만큼만 읽은 카드이고, total_due는 전체 기한 카드 수(COUNT)입니다.
+    total_due를 주지 않으면 due_cards가 기한 카드 전체라고 보고 개수를 셉니다.
     """
-    budget_per_day = student.settings.get("anki_budget_per_day", 20) # 기본값 20개
+    budget_per_day = daily_budget(student) # 기본값 20개
+    if total_due is None:
+        total_due = len(due_cards)
 
     # 1. 우선순위 정렬 (가장 오래된 복습일, 낮은 난이도 계수 순)
     # SM2 알고리즘에 따라, ease_factor가 낮을수록 어려운 카드이므로 우선순위가 높음
     # next_review_date가 오래될수록 우선순위 높음
+    # crud.get_due_anki_cards가 같은 순서로 반환하므로 예산 이하의 카드만 다시 확인합니다.
     sorted_cards = sorted(due_cards, key=lambda card: (card.next_review_date, card.ease_factor))
 
     # 2. 예산 필터링
@@ -25,7 +36,7 @@ async def get_daily_review_deck(
     return schemas.DailyReviewDeckResponse(
         student_id=student.student_id,
         due_cards=[schemas.AnkiCardResponse.from_orm(card) for card in deck_cards],
-        budget_applied=len(due_cards) > budget_per_day,
-        total_due=len(due_cards),
+        budget_applied=total_due > budget_per_day,
+        total_due=total_due,
         cards_in_deck=len(deck_cards)
     )
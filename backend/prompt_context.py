@@ -0,0 +1,216 @@
+"""
+리포트/코칭 프롬프트용 학생 데이터 컨텍스트 빌더.
+
+로그/카드/메모 전체를 json.dumps(indent=2)로 넣으면 데이터가 쌓일수록 프롬프트와 LLM 지연이 끝없이 커집니다.
+ContextBuilder는 토큰 예산 안에서 컨텍스트를 만듭니다.
+- 개념(concept)별 집계(판단 수, APPROVE/REJECT, BAD 피드백, 카드 수, 평균 ease)는 전체 데이터로 계산합니다.
+- 원본 항목은 섹션별로 중요도 순으로 정렬해 두고, 예산이 찰 때까지 섹션을 번갈아 가며 채웁니다.
+- 공백 없는 JSON으로 직렬화하고 긴 텍스트는 잘라 넣으며, 빠진 항목 수는 "omitted"에 남깁니다.
+"""
+import json
+import math
+import os
+from collections import OrderedDict
+from datetime import date, datetime
+from typing import Any, Dict, Iterable, List, NamedTuple, Optional, Sequence, Tuple
+
+import models
+
+# 학생 데이터 부분(지시문 제외)에 허용하는 추정 토큰 수
+PROMPT_CONTEXT_TOKEN_BUDGET = int(os.getenv("PROMPT_CONTEXT_TOKEN_BUDGET", "2000"))
+# reason/memo/question 같은 자유 텍스트 필드의 최대 글자 수
+PROMPT_CONTEXT_TEXT_MAX_CHARS = int(os.getenv("PROMPT_CONTEXT_TEXT_MAX_CHARS", "160"))
+
+
+def estimate_tokens(text: str) -> int:
+    """
+    토크나이저 없이 보수적으로 추정합니다. ASCII는 4글자당 1토큰, 한글 등 그 밖의 글자는 글자당 1토큰.
+    """
+    ascii_chars = sum(1 for char in text if char < "\x80")
+    return math.ceil(ascii_chars / 4) + (len(text) - ascii_chars)
+
+
+def compact_json(value: Any) -> str:
+    return json.dumps(value, ensure_ascii=False, separators=(",", ":"), default=str)
+
+
+def clip(text: Optional[str], max_chars: int = None) -> Optional[str]:
+    max_chars = max_chars if max_chars is not None else PROMPT_CONTEXT_TEXT_MAX_CHARS
+    if text is None or len(text) <= max_chars:
+        return text
+    return text[:max_chars - 1] + "…"
+
+
+class PromptContext(NamedTuple):
+    text: str # 프롬프트에 넣을 compact JSON
+    tokens: int
+    raw_tokens: int # 같은 데이터를 전부 indent=2로 넣었을 때의 추정 토큰 수
+    included: Dict[str, int]
+    omitted: Dict[str, int]
+
+    @property
+    def tokens_saved(self) -> int:
+        return max(0, self.raw_tokens - self.tokens)
+
+
+class ContextBuilder:
+    """
+    header(항상 포함)와 정렬된 섹션들을 받아 토큰 예산 안의 컨텍스트를 만듭니다.
+
+        builder = ContextBuilder(token_budget=1500)
+        builder.set_header(student_name="홍길동", analysis_period="...")
+        builder.add_section("concept_summary", concepts, raw_items=None)
+        builder.add_section("coach_memos", [memo_item(m) for m in memos], raw_items=[...])
+        context = builder.build()
+    """
+
+    def __init__(self, token_budget: Optional[int] = None):
+        self.token_budget = token_budget if token_budget is not None else PROMPT_CONTEXT_TOKEN_BUDGET
+        self._header: Dict[str, Any] = {}
+        self._sections: "OrderedDict[str, List[dict]]" = OrderedDict()
+        self._raw: Dict[str, Any] = {}
+
+    def set_header(self, **fields):
+        self._header.update(fields)
+        self._raw.update(fields)
+
+    def add_section(self, name: str, items: Sequence[dict], raw_items: Optional[Iterable[dict]] = None):
+        """
+        items는 중요한 순서로 정렬된 compact 항목입니다. raw_items는 절감량 계산에 쓰는 기존 형식의 전체 항목입니다.
+        """
+        self._sections[name] = list(items)
+        if raw_items is not None:
+            self._raw[name] = list(raw_items)
+
+    def add_raw(self, name: str, raw_items: Iterable[dict]):
+        """
+        프롬프트에는 넣지 않고(다른 섹션이 요약으로 대신함) 절감량 계산에만 쓰는 기존 형식의 항목입니다.
+        """
+        self._raw[name] = list(raw_items)
+
+    def _render(self, chosen: Dict[str, List[dict]]) -> str:
+        context = dict(self._header)
+        context.update((name, items) for name, items in chosen.items())
+        omitted = {name: len(items) - len(chosen[name]) for name, items in self._sections.items() if len(items) > len(chosen[name])}
+        if omitted:
+            context["omitted"] = omitted
+        return compact_json(context)
+
+    def build(self) -> PromptContext:
+        chosen = OrderedDict((name, []) for name in self._sections)
+        used = estimate_tokens(self._render(chosen))
+        # 섹션을 번갈아 한 항목씩 채웁니다. 예산을 넘는 항목을 만난 섹션은 거기서 멈춥니다.
+        active = [name for name, items in self._sections.items() if items]
+        order: List[str] = []
+        position = 0
+        while active:
+            for name in list(active):
+                item_tokens = estimate_tokens(compact_json(self._sections[name][position])) + 1
+                if used + item_tokens > self.token_budget:
+                    active.remove(name)
+                    continue
+                chosen[name].append(self._sections[name][position])
+                order.append(name)
+                used += item_tokens
+                if position + 1 >= len(self._sections[name]):
+                    active.remove(name)
+            position += 1
+
+        # 조각별 추정치의 반올림과 "omitted" 요약이 더해진 실제 길이로 한 번 더 확인합니다.
+        text = self._render(chosen)
+        tokens = estimate_tokens(text)
+        while tokens > self.token_budget and order:
+            chosen[order.pop()].pop()
+            text = self._render(chosen)
+            tokens = estimate_tokens(text)
+
+        raw_tokens = estimate_tokens(json.dumps(self._raw, ensure_ascii=False, indent=2, default=str))
+        return PromptContext(
+            text=text,
+            tokens=tokens,
+            raw_tokens=raw_tokens,
+            included={name: len(items) for name, items in chosen.items()},
+            omitted={name: len(items) - len(chosen[name]) for name, items in self._sections.items() if len(items) > len(chosen[name])},
+        )
+
+
+def aggregate_by_concept(
+    logs: Iterable[models.LLMLog],
+    cards: Iterable[Tuple[models.AnkiCard, Optional[str]]],
+    today: Optional[date] = None,
+) -> List[dict]:
+    """
+    개념별 집계. cards는 (카드, 카드를 만든 판단의 concept_name) 쌍입니다.
+    판단 수와 카드 수가 많은 개념부터 정렬합니다.
+    """
+    today = today or date.today()
+    summary: Dict[str, dict] = {}
+
+    def entry(concept: Optional[str]) -> dict:
+        concept = concept or "N/A"
+        if concept not in summary:
+            summary[concept] = {"concept": concept, "judged": 0, "approve": 0, "reject": 0, "bad_feedback": 0, "cards": 0, "due": 0, "_ease_sum": 0}
+        return summary[concept]
+
+    for log in logs:
+        item = entry(log.concept_name)
+        item["judged"] += 1
+        if log.decision == "APPROVE":
+            item["approve"] += 1
+        elif log.decision == "REJECT":
+            item["reject"] += 1
+        if log.coach_feedback == "BAD":
+            item["bad_feedback"] += 1
+    for card, concept in cards:
+        item = entry(concept)
+        item["cards"] += 1
+        item["_ease_sum"] += card.ease_factor or 0
+        if card.next_review_date and card.next_review_date <= today:
+            item["due"] += 1
+
+    result = []
+    for item in summary.values():
+        ease_sum = item.pop("_ease_sum")
+        # ease_factor는 SM2 ease * 100으로 저장되어 있습니다.
+        item["avg_ease"] = round(ease_sum / item["cards"] / 100, 2) if item["cards"] else None
+        result.append(item)
+    result.sort(key=lambda item: (-(item["judged"] + item["cards"]), item["concept"]))
+    return result
+
+
+def _iso(value: Optional[Any]) -> Optional[str]:
+    if isinstance(value, datetime):
+        return value.isoformat(timespec="minutes")
+    return value.isoformat() if value else None
+
+
+def log_item(log: models.LLMLog) -> dict:
+    item = {"concept": log.concept_name, "decision": log.decision, "reason": clip(log.reason)}
+    if log.coach_feedback:
+        item["feedback"] = log.coach_feedback
+    return item
+
+
+def card_item(card: models.AnkiCard, concept: Optional[str] = None) -> dict:
+    item = {"q": clip(card.question), "reps": card.repetitions, "ease": round((card.ease_factor or 0) / 100, 2), "next": _iso(card.next_review_date)}
+    if concept:
+        item["concept"] = concept
+    return item
+
+
+def memo_item(memo: models.CoachMemo) -> dict:
+    return {"memo": clip(memo.memo_text), "at": _iso(memo.created_at)}
+
+
+def rank_logs(logs: Iterable[models.LLMLog]) -> List[models.LLMLog]:
+    # 코치가 BAD로 표시한 판단, 그다음 최근 판단 순
+    return sorted(logs, key=lambda log: (log.coach_feedback != "BAD", -(log.created_at.timestamp() if log.created_at else 0)))
+
+
+def rank_cards(cards: Iterable[Tuple[models.AnkiCard, Optional[str]]]) -> List[Tuple[models.AnkiCard, Optional[str]]]:
+    # 어려워하는 카드(낮은 ease), 그다음 복습일이 이른 카드 순
+    return sorted(cards, key=lambda pair: (pair[0].ease_factor or 0, pair[0].next_review_date or date.max))
+
+
+def rank_memos(memos: Iterable[models.CoachMemo]) -> List[models.CoachMemo]:
+    return sorted(memos, key=lambda memo: memo.created_at or datetime.min, reverse=True)
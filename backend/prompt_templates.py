@@ -0,0 +1,168 @@
+import hashlib
+import threading
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+
+class ChatFormat(NamedTuple):
+    """
+    Ollama raw 모드로 보낼 때 프롬프트를 감싸는 채팅 템플릿 (시스템 프롬프트 없는 사용자 한 턴).
+    raw가 아니면 Ollama가 prefix와 suffix를 각각 다른 턴으로 감싸므로, prefix 재사용 시에는 직접 감싸서 raw로 보냅니다.
+    """
+    user_start: str
+    assistant_start: str
+
+
+# 모델 계열 -> Ollama 라이브러리 기본 템플릿과 같은 채팅 형식. 없는 계열은 prefix를 재사용하지 않습니다.
+CHAT_FORMATS: Dict[str, ChatFormat] = {
+    "llama2": ChatFormat("[INST] ", " [/INST]"),
+    "mistral": ChatFormat("[INST] ", " [/INST]"),
+    "llama3": ChatFormat("<|start_header_id|>user<|end_header_id|>\n\n", "<|eot_id|><|start_header_id|>assistant<|end_header_id|>\n\n"),
+    "qwen": ChatFormat("<|im_start|>user\n", "<|im_end|>\n<|im_start|>assistant\n"),
+}
+
+
+def chat_format_for(model_name: str) -> Optional[ChatFormat]:
+    """
+    "llama3.1:8b", "library/qwen2.5:7b"처럼 태그와 버전이 붙은 모델 이름에서 계열을 찾아 채팅 형식을 반환합니다.
+    """
+    family = model_name.split(":", 1)[0].rsplit("/", 1)[-1]
+    for prefix in sorted(CHAT_FORMATS, key=len, reverse=True):
+        if family.startswith(prefix):
+            return CHAT_FORMATS[prefix]
+    return None
+
+
+class PromptTemplate:
+    """
+    정적인 prefix(시스템 지시문, 규칙, few-shot 예시)와 요청마다 바뀌는 suffix로 나눈 프롬프트.
+    prefix는 모델별로 한 번만 평가해 Ollama가 돌려준 context를 재사용합니다.
+    suffix는 str.format 형식이며, 전체 프롬프트는 prefix + suffix 입니다.
+    """
+
+    def __init__(self, name: str, prefix: str, suffix: str):
+        self.name = name
+        self.prefix = prefix
+        self.suffix = suffix
+        self.prefix_hash = hashlib.sha256(prefix.encode("utf-8")).hexdigest()[:16]
+
+    def render_suffix(self, **fields) -> str:
+        return self.suffix.format(**fields)
+
+    def render(self, **fields) -> str:
+        return self.prefix + self.render_suffix(**fields)
+
+    def render_raw_prefix(self, chat: ChatFormat) -> str:
+        return chat.user_start + self.prefix
+
+    def render_raw_suffix(self, chat: ChatFormat, **fields) -> str:
+        # render_raw_prefix와 이어 붙이면 전체 프롬프트를 사용자 한 턴으로 감싼 것과 같습니다.
+        return self.render_suffix(**fields) + chat.assistant_start
+
+
+class PrefixContextCache:
+    """
+    (모델 이름, 템플릿 이름) -> prefix를 평가한 Ollama context 토큰.
+    prefix 내용이 바뀌면(prefix_hash 불일치) 저장된 context를 사용하지 않습니다.
+    """
+
+    def __init__(self):
+        self._contexts: Dict[Tuple[str, str], Tuple[str, List[int]]] = {}
+        self._lock = threading.Lock()
+
+    def get(self, model_name: str, template: PromptTemplate) -> Optional[List[int]]:
+        with self._lock:
+            entry = self._contexts.get((model_name, template.name))
+        if entry is None or entry[0] != template.prefix_hash:
+            return None
+        return entry[1]
+
+    def set(self, model_name: str, template: PromptTemplate, context: List[int]):
+        with self._lock:
+            self._contexts[(model_name, template.name)] = (template.prefix_hash, context)
+
+    def discard(self, model_name: str, template: PromptTemplate):
+        with self._lock:
+            self._contexts.pop((model_name, template.name), None)
+
+    def clear(self):
+        with self._lock:
+            self._contexts.clear()
+
+    def __len__(self) -> int:
+        return len(self._contexts)
+
+
+# V1 경량화 원칙에 따라, LLM에 전달할 간결한 판단 프롬프트
+JUDGE_TEMPLATE = PromptTemplate(
+    name="judge",
+    prefix="""[SYSTEM]
+You are a helpful AI assistant that functions as a JSON API. You must only answer in JSON format. Do not add any other text. Your task is to decide if a student's mistake is worth creating a review card (Anki card).
+
+[INSTRUCTIONS]
+- Analyze the user's mistake based on the provided context.
+- The JSON output must contain two keys: "decision" (string) and "reason" (string).
+- The value for "decision" must be either "APPROVE" or "REJECT".
+- "APPROVE" if the mistake is a core concept error, a misunderstanding of a definition, or a critical factual error.
+- "REJECT" if the mistake is a simple calculation error, a typo, or not educationally significant.
+- The "reason" must be a short explanation in Korean.
+
+[EXAMPLE 1]
+User Mistake Context: { "concept": "Pythagorean theorem", "mistake": "Student used a+b=c instead of a^2+b^2=c^2" }
+Your JSON Response: {"decision": "APPROVE", "reason": "핵심적인 개념인 피타고라스의 정리를 잘못 이해하고 있습니다."}
+
+[EXAMPLE 2]
+User Mistake Context: { "concept": "Addition", "mistake": "Student calculated 123 + 456 as 578" }
+Your JSON Response: {"decision": "REJECT", "reason": "개념 이해보다는 단순 계산 실수에 가깝습니다."}
+
+[CURRENT TASK]
+""",
+    suffix="""User Mistake Context: {{ "concept": "{concept_name}", "mistake": "{student_mistake_summary}" }}
+Your JSON Response:""",
+)
+
+# LLM에게 Anki 카드 질문과 답변 생성을 요청하는 프롬프트
+CARD_TEMPLATE = PromptTemplate(
+    name="card",
+    prefix="""[SYSTEM]
+You are an AI assistant that generates Anki flashcards. Your output must be in JSON format with two keys: "question" (string) and "answer" (string). Do not add any other text.
+
+[INSTRUCTIONS]
+- Based on the provided concept and student's mistake, create a concise Anki flashcard.
+- The question should test the core concept the student misunderstood.
+- The answer should clearly explain the concept or correct the mistake.
+- Both question and answer should be in Korean.
+
+[CURRENT TASK]
+""",
+    suffix="""Concept: {concept_name}
+Student's Mistake Summary: {student_mistake_summary}
+Your JSON Response:""",
+)
+
+# 판단과 카드 생성을 한 번의 생성으로 처리하는 fused 모드 프롬프트
+FUSED_TEMPLATE = PromptTemplate(
+    name="fused",
+    prefix="""[SYSTEM]
+You are a helpful AI assistant that functions as a JSON API. You must only answer in JSON format. Do not add any other text. Your task is to decide if a student's mistake is worth creating a review card (Anki card) and, if so, to write that card.
+
+[INSTRUCTIONS]
+- The JSON output must contain four keys: "decision" (string), "reason" (string), "question" (string) and "answer" (string).
+- The value for "decision" must be either "APPROVE" or "REJECT".
+- "APPROVE" if the mistake is a core concept error, a misunderstanding of a definition, or a critical factual error.
+- "REJECT" if the mistake is a simple calculation error, a typo, or not educationally significant.
+- The "reason" must be a short explanation in Korean.
+- If "decision" is "APPROVE", "question" must test the core concept the student misunderstood and "answer" must clearly explain it, both in Korean.
+- If "decision" is "REJECT", "question" and "answer" must be empty strings.
+
+[EXAMPLE]
+User Mistake Context: { "concept": "Pythagorean theorem", "mistake": "Student used a+b=c instead of a^2+b^2=c^2" }
+Your JSON Response: {"decision": "APPROVE", "reason": "핵심적인 개념인 피타고라스의 정리를 잘못 이해하고 있습니다.", "question": "직각삼각형의 세 변 a, b, c(빗변) 사이의 관계식은?", "answer": "a^2 + b^2 = c^2 (피타고라스의 정리)"}
+
+[CURRENT TASK]
+""",
+    suffix="""User Mistake Context: {{ "concept": "{concept_name}", "mistake": "{student_mistake_summary}" }}
+Your JSON Response:""",
+)
+
+# 판단 경로에서 사용하는 템플릿 (모델 warm-up 시 prefix를 미리 평가)
+JUDGE_PATH_TEMPLATES = (JUDGE_TEMPLATE, CARD_TEMPLATE, FUSED_TEMPLATE)
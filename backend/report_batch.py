@@ -0,0 +1,197 @@
+"""
+전체(또는 지정한) 학생의 주간 리포트 초안 일괄 생성.
+
+일요일 밤 배치(scripts/generate_weekly_reports.py)에서 사용합니다.
+- 학생별 진행 상태를 report_batch_items에 run_id 단위로 기록하므로, 중단된 뒤 같은 run_id로 다시 실행하면
+  done이 아닌 학생(pending, 중단된 running, failed)만 처리합니다.
+- concurrency개의 워커가 큐에서 학생을 꺼내 report_generator.generate_weekly_report_draft로 초안을 만듭니다.
+  동시 LLM 호출 수는 워커 수로 제한되고, 워커마다 DB 세션 하나를 끝까지 사용하며 학생마다 커밋합니다.
+- 끝나면 처리 시간, 처리량, 리포트당 지연(p50/p95)을 BatchStats로 반환합니다.
+"""
+import asyncio
+import math
+import os
+import time
+from datetime import date, datetime, timezone
+from typing import Callable, Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import func, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import models
+import report_generator
+from database import SessionLocal
+
+REPORT_BATCH_CONCURRENCY = int(os.getenv("REPORT_BATCH_CONCURRENCY", "4"))
+REPORT_BATCH_PROGRESS_INTERVAL_SECONDS = float(os.getenv("REPORT_BATCH_PROGRESS_INTERVAL_SECONDS", "10"))
+
+PENDING = "pending"
+RUNNING = "running"
+DONE = "done"
+FAILED = "failed"
+
+Item = models.ReportBatchItem
+
+
+def default_run_id(start_date: date, end_date: date) -> str:
+    return f"weekly-{start_date.isoformat()}-{end_date.isoformat()}"
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def _percentile(sorted_values: Sequence[float], fraction: float) -> Optional[float]:
+    if not sorted_values:
+        return None
+    return round(sorted_values[min(len(sorted_values) - 1, math.ceil(fraction * len(sorted_values)) - 1)], 1)
+
+
+class BatchStats(NamedTuple):
+    run_id: str
+    total: int # run에 속한 전체 학생 수
+    skipped: int # 이전 실행에서 이미 done이었던 학생
+    done: int # 이번 실행에서 성공
+    failed: int # 이번 실행에서 실패
+    elapsed_seconds: float
+    latencies_ms: List[float] # 이번 실행에서 성공한 리포트별 생성 시간
+
+    @property
+    def reports_per_minute(self) -> float:
+        return self.done / self.elapsed_seconds * 60 if self.elapsed_seconds > 0 else 0.0
+
+    def to_dict(self) -> dict:
+        latencies = sorted(self.latencies_ms)
+        return {
+            "run_id": self.run_id,
+            "total": self.total,
+            "skipped": self.skipped,
+            "done": self.done,
+            "failed": self.failed,
+            "elapsed_seconds": round(self.elapsed_seconds, 2),
+            "reports_per_minute": round(self.reports_per_minute, 2),
+            "latency_ms": {
+                "p50": _percentile(latencies, 0.5),
+                "p95": _percentile(latencies, 0.95),
+                "max": round(latencies[-1], 1) if latencies else None,
+            },
+        }
+
+
+async def prepare_run(db: AsyncSession, run_id: str, student_ids: Optional[Sequence[str]] = None) -> List[str]:
+    """
+    run의 진행 행을 만들고, 이번에 처리할(done이 아닌) 학생 ID를 반환합니다.
+    student_ids가 없으면 등록된 모든 학생을 대상으로 합니다. 이미 있는 행은 그대로 둡니다.
+    """
+    if student_ids is None:
+        student_ids = (await db.execute(select(models.Student.student_id).order_by(models.Student.student_id))).scalars().all()
+    existing = set((await db.execute(select(Item.student_id).where(Item.run_id == run_id))).scalars().all())
+    db.add_all(Item(run_id=run_id, student_id=student_id, status=PENDING) for student_id in dict.fromkeys(student_ids) if student_id not in existing)
+    await db.commit()
+    result = await db.execute(
+        select(Item.student_id).where(Item.run_id == run_id, Item.status != DONE).order_by(Item.student_id)
+    )
+    return result.scalars().all()
+
+
+async def _mark(db: AsyncSession, run_id: str, student_id: str, **values):
+    await db.execute(update(Item).where(Item.run_id == run_id, Item.student_id == student_id).values(**values))
+    await db.commit()
+
+
+async def get_run_counts(db: AsyncSession, run_id: str) -> Dict[str, int]:
+    result = await db.execute(select(Item.status, func.count(Item.item_id)).where(Item.run_id == run_id).group_by(Item.status))
+    return dict(result.all())
+
+
+async def run_batch(
+    start_date: date,
+    end_date: date,
+    run_id: Optional[str] = None,
+    student_ids: Optional[Sequence[str]] = None,
+    concurrency: int = REPORT_BATCH_CONCURRENCY,
+    regenerate: bool = False,
+    session_factory=SessionLocal,
+    progress_interval_seconds: float = REPORT_BATCH_PROGRESS_INTERVAL_SECONDS,
+    on_progress: Optional[Callable[[dict], None]] = None,
+) -> BatchStats:
+    run_id = run_id or default_run_id(start_date, end_date)
+    async with session_factory() as db:
+        todo = await prepare_run(db, run_id, student_ids)
+        total = sum((await get_run_counts(db, run_id)).values())
+
+    queue: "asyncio.Queue[str]" = asyncio.Queue()
+    for student_id in todo:
+        queue.put_nowait(student_id)
+    latencies_ms: List[float] = []
+    failed = [0]
+    started = time.perf_counter()
+
+    async def worker():
+        # 워커 하나가 세션 하나를 끝까지 사용합니다. (학생마다 세션을 열지 않음)
+        async with session_factory() as db:
+            while True:
+                try:
+                    student_id = queue.get_nowait()
+                except asyncio.QueueEmpty:
+                    return
+                await _mark(db, run_id, student_id, status=RUNNING, attempts=Item.attempts + 1)
+                report_started = time.perf_counter()
+                try:
+                    report = await report_generator.generate_weekly_report_draft(db, student_id, start_date, end_date, regenerate=regenerate)
+                    report_id = report.report_id
+                    await db.commit()
+                except Exception as e:
+                    await db.rollback()
+                    failed[0] += 1
+                    print(f"Warning: Failed to generate weekly report for {student_id}: {e}")
+                    await _mark(db, run_id, student_id, status=FAILED, last_error=str(e)[:1000], completed_at=_utcnow())
+                    continue
+                duration_ms = (time.perf_counter() - report_started) * 1000
+                latencies_ms.append(duration_ms)
+                await _mark(db, run_id, student_id, status=DONE, report_id=report_id, duration_ms=round(duration_ms, 1), last_error=None, completed_at=_utcnow())
+
+    def snapshot() -> dict:
+        processed = len(latencies_ms) + failed[0]
+        elapsed = time.perf_counter() - started
+        rate = processed / elapsed if elapsed > 0 else 0.0
+        remaining = len(todo) - processed
+        return {
+            "run_id": run_id,
+            "processed": processed,
+            "todo": len(todo),
+            "done": len(latencies_ms),
+            "failed": failed[0],
+            "elapsed_seconds": round(elapsed, 1),
+            "eta_seconds": round(remaining / rate, 1) if rate > 0 else None,
+        }
+
+    async def reporter():
+        while True:
+            await asyncio.sleep(progress_interval_seconds)
+            if on_progress:
+                on_progress(snapshot())
+
+    workers = [asyncio.create_task(worker()) for _ in range(max(1, min(concurrency, len(todo))))]
+    progress_task = asyncio.create_task(reporter()) if on_progress and progress_interval_seconds > 0 else None
+    try:
+        await asyncio.gather(*workers)
+    finally:
+        for task in workers:
+            task.cancel()
+        if progress_task:
+            progress_task.cancel()
+        await asyncio.gather(*workers, *([progress_task] if progress_task else []), return_exceptions=True)
+    if on_progress:
+        on_progress(snapshot())
+
+    return BatchStats(
+        run_id=run_id,
+        total=total,
+        skipped=total - len(todo),
+        done=len(latencies_ms),
+        failed=failed[0],
+        elapsed_seconds=time.perf_counter() - started,
+        latencies_ms=latencies_ms,
+    )
@@ -0,0 +1,53 @@
+"""
+리포트/일일 요약용 학생 기간 데이터 로더.
+
+학생 한 명의 기간 내 판단, 카드(생성 또는 복습), 코치 메모를 학생 범위 인덱스로 읽습니다.
+(llm_logs (student_id, created_at), anki_cards (student_id, created_at)/(student_id, last_reviewed_at),
+coach_memos (student_id, created_at)) 따라서 읽는 양은 다른 학생의 활동량과 무관합니다.
+카드의 concept_name은 SQL join으로 붙이고, 새 카드/복습 카드 분류와 개수는 카드를 한 번 훑으며 계산합니다.
+"""
+from datetime import date, datetime
+from typing import List, NamedTuple, Optional, Tuple
+
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import models
+
+
+class ReportData(NamedTuple):
+    logs: List[models.LLMLog] # 최근 순
+    cards: List[Tuple[models.AnkiCard, Optional[str]]] # (카드, concept_name), 최근 생성 순
+    memos: List[models.CoachMemo] # 최근 순
+    new_cards: List[Tuple[models.AnkiCard, Optional[str]]]
+    reviewed_cards: List[Tuple[models.AnkiCard, Optional[str]]]
+
+    @property
+    def judgments_count(self) -> int:
+        return len(self.logs)
+
+    @property
+    def new_cards_count(self) -> int:
+        return len(self.new_cards)
+
+    @property
+    def reviewed_cards_count(self) -> int:
+        return len(self.reviewed_cards)
+
+
+def _in_period(value: Optional[datetime], start_date: date, end_date: date) -> bool:
+    return value is not None and start_date <= value.date() <= end_date
+
+
+async def load_report_data(db: AsyncSession, student_id: str, start_date: date, end_date: date) -> ReportData:
+    logs = await crud.get_llm_logs(db, student_id=student_id, start_date=start_date, end_date=end_date, limit=None)
+    cards = await crud.get_anki_cards_with_concepts(db, student_id=student_id, start_date=start_date, end_date=end_date)
+    memos = await crud.get_coach_memos(db, student_id=student_id, start_date=start_date, end_date=end_date, limit=None)
+
+    new_cards, reviewed_cards = [], []
+    for card, concept in cards:
+        if _in_period(card.created_at, start_date, end_date):
+            new_cards.append((card, concept))
+        if _in_period(card.last_reviewed_at, start_date, end_date):
+            reviewed_cards.append((card, concept))
+    return ReportData(logs, cards, memos, new_cards, reviewed_cards)
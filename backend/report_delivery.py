@@ -0,0 +1,335 @@
+"""
+주간 리포트 카카오 발송 (transactional outbox).
+
+1. 리포트를 최종 승인하거나 발송을 요청하면 같은 트랜잭션 안에서 학부모별 report_deliveries 행(outbox)을 쌓고 바로 응답합니다.
+   INSERT ... SELECT 한 번으로 쌓으므로 HTTP 요청의 비용은 학부모 수와 무관하고 카카오 API를 기다리지 않습니다.
+   dedupe_key(리포트+학부모)가 유일하므로 중복 요청이 와도 수신자당 한 행만 생깁니다.
+2. 백그라운드 dispatcher가 발송할 행을 배치로 claim(running + lease)하고, 트랜잭션 없이 공유 KakaoClient로 동시에 보낸 뒤
+   결과를 기록합니다. 일시적 실패는 backoff 후 다시 pending이 되고, 재시도할 수 없는 실패나 최대 시도 횟수를 넘으면 failed가 됩니다.
+3. dispatcher가 발송 중에 죽으면 lease가 만료된 running 행을 다른 dispatcher가 다시 가져갑니다. (at-least-once)
+   발송 후 결과를 기록하기 전에 죽은 경우에만 같은 학부모가 메시지를 두 번 받을 수 있습니다.
+4. 리포트 상태는 발송 진행 상황을 따라갑니다: 대기/발송 중인 행이 있으면 'sending', 모두 발송되면 'sent',
+   남은 행 없이 실패한 행이 있으면 'send_failed'. 실패한 리포트를 다시 발송 요청하면 실패한 학부모만 다시 대기열에 넣습니다.
+"""
+import asyncio
+import os
+import uuid
+from datetime import datetime, timedelta, timezone
+from typing import Dict, List, NamedTuple, Optional, Sequence
+
+from sqlalchemy import String, and_, cast, exists, func, insert, literal, or_, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import models
+import schemas
+from database import SessionLocal
+from kakao_sender import KakaoClient, KakaoSendError, build_report_template, get_kakao_client
+
+# 한 번에 claim해서 동시에 보내는 발송 수 (0이면 dispatcher를 시작하지 않음)
+REPORT_DELIVERY_BATCH_SIZE = int(os.getenv("REPORT_DELIVERY_BATCH_SIZE", "50"))
+REPORT_DELIVERY_POLL_INTERVAL_SECONDS = float(os.getenv("REPORT_DELIVERY_POLL_INTERVAL_SECONDS", "1"))
+# running 상태가 이 시간보다 오래 지속되면 dispatcher가 중단된 것으로 보고 다시 가져갑니다.
+REPORT_DELIVERY_LEASE_SECONDS = float(os.getenv("REPORT_DELIVERY_LEASE_SECONDS", "300"))
+REPORT_DELIVERY_MAX_ATTEMPTS = int(os.getenv("REPORT_DELIVERY_MAX_ATTEMPTS", "6"))
+# 클라이언트 재시도가 모두 실패한 뒤의 재시도 간격: base * 2^(attempts-1), 최대 max 초
+REPORT_DELIVERY_BACKOFF_BASE_SECONDS = float(os.getenv("REPORT_DELIVERY_BACKOFF_BASE_SECONDS", "30"))
+REPORT_DELIVERY_BACKOFF_MAX_SECONDS = float(os.getenv("REPORT_DELIVERY_BACKOFF_MAX_SECONDS", "1800"))
+
+PENDING = "pending"
+RUNNING = "running"
+SENT = "sent"
+FAILED = "failed"
+
+# 발송 진행에 따른 리포트 상태
+REPORT_SENDING = "sending"
+REPORT_SENT = "sent"
+REPORT_SEND_FAILED = "send_failed"
+# 발송을 (다시) 요청할 수 있는 리포트 상태
+SENDABLE_REPORT_STATUSES = ("finalized", REPORT_SENDING, REPORT_SEND_FAILED, REPORT_SENT)
+
+Delivery = models.ReportDelivery
+
+
+class ClaimedDelivery(NamedTuple):
+    """
+    세션이 닫힌 뒤에도 사용할 수 있도록 복사해 둔 발송 정보. attempts와 token은 결과 기록 시 lease를 잃지 않았는지 확인하는 데 사용합니다.
+    """
+    delivery_id: int
+    report_id: int
+    kakao_user_id: str
+    attempts: int
+    token: str
+
+
+class DeliveryResult(NamedTuple):
+    delivery: ClaimedDelivery
+    sent: bool
+    retryable: bool = False
+    error: Optional[str] = None
+
+
+def _utcnow() -> datetime:
+    return datetime.now(timezone.utc).replace(tzinfo=None)
+
+
+def dedupe_key(report_id: int, parent_id: int) -> str:
+    return f"weekly-report:{report_id}:parent:{parent_id}"
+
+
+def backoff_seconds(attempts: int) -> float:
+    return min(REPORT_DELIVERY_BACKOFF_BASE_SECONDS * (2 ** max(attempts - 1, 0)), REPORT_DELIVERY_BACKOFF_MAX_SECONDS)
+
+
+def _is_runnable(now: datetime):
+    # 발송할 행: 재시도 시각이 지난 pending 행, 또는 lease가 만료된 running 행
+    return or_(
+        and_(Delivery.status == PENDING, or_(Delivery.next_attempt_at.is_(None), Delivery.next_attempt_at <= now)),
+        and_(Delivery.status == RUNNING, Delivery.locked_at < now - timedelta(seconds=REPORT_DELIVERY_LEASE_SECONDS))
+    )
+
+
+async def enqueue_report_deliveries(db: AsyncSession, report_ids: Sequence[int]) -> int:
+    """
+    리포트의 카카오 ID가 있는 학부모마다 outbox 행을 쌓고, 실패했던 행은 다시 pending으로 되돌립니다.
+    발송할 행이 생긴 리포트는 'sending'이 됩니다. 대기열에 넣은 행 수를 반환합니다. (호출자가 commit)
+    """
+    if not report_ids:
+        return 0
+    association = models.student_parent_association
+    key = literal("weekly-report:") + cast(models.WeeklyReport.report_id, String) + literal(":parent:") + cast(models.Parent.parent_id, String)
+    recipients = (
+        select(models.WeeklyReport.report_id, models.Parent.parent_id, key, models.Parent.kakao_user_id, literal(PENDING), literal(0))
+        .join(association, association.c.student_id == models.WeeklyReport.student_id)
+        .join(models.Parent, models.Parent.parent_id == association.c.parent_id)
+        .where(
+            models.WeeklyReport.report_id.in_(report_ids),
+            models.Parent.kakao_user_id.is_not(None),
+            models.Parent.kakao_user_id != "",
+            ~exists().where(Delivery.dedupe_key == key),
+        )
+    )
+    inserted = await db.execute(
+        insert(Delivery).from_select(["report_id", "parent_id", "dedupe_key", "kakao_user_id", "status", "attempts"], recipients)
+    )
+    retried = await db.execute(
+        update(Delivery)
+        .where(Delivery.report_id.in_(report_ids), Delivery.status == FAILED)
+        .values(status=PENDING, attempts=0, next_attempt_at=None, locked_at=None, locked_by=None)
+        .execution_options(synchronize_session=False)
+    )
+    await db.execute(
+        update(models.WeeklyReport)
+        .where(
+            models.WeeklyReport.report_id.in_(report_ids),
+            exists().where(Delivery.report_id == models.WeeklyReport.report_id, Delivery.status.in_([PENDING, RUNNING])),
+        )
+        .values(status=REPORT_SENDING)
+        .execution_options(synchronize_session=False)
+    )
+    return inserted.rowcount + retried.rowcount
+
+
+async def enqueue_finalized_reports(db: AsyncSession, limit: Optional[int] = None) -> schemas.ReportDeliveryQueued:
+    """
+    아직 발송 요청되지 않은 'finalized' 리포트를 오래된 순으로 대기열에 넣습니다.
+    outbox 행이 이미 있거나 카카오 수신자가 없는 리포트는 제외해, limit이 있어도 같은 리포트만 반복해서 고르지 않습니다.
+    """
+    association = models.student_parent_association
+    has_recipient = exists().where(
+        association.c.student_id == models.WeeklyReport.student_id,
+        association.c.parent_id == models.Parent.parent_id,
+        models.Parent.kakao_user_id.is_not(None),
+        models.Parent.kakao_user_id != "",
+    )
+    query = (
+        select(models.WeeklyReport.report_id)
+        .where(
+            models.WeeklyReport.status == 'finalized',
+            ~exists().where(Delivery.report_id == models.WeeklyReport.report_id),
+            has_recipient,
+        )
+        .order_by(models.WeeklyReport.finalized_at, models.WeeklyReport.report_id)
+    )
+    if limit is not None:
+        query = query.limit(limit)
+    report_ids = (await db.execute(query)).scalars().all()
+    queued = await enqueue_report_deliveries(db, report_ids)
+    return schemas.ReportDeliveryQueued(reports=len(report_ids), queued=queued)
+
+
+async def get_delivery_status(db: AsyncSession, report: models.WeeklyReport) -> schemas.ReportDeliveryStatus:
+    counts = dict((await db.execute(
+        select(Delivery.status, func.count()).where(Delivery.report_id == report.report_id).group_by(Delivery.status)
+    )).all())
+    return schemas.ReportDeliveryStatus(
+        report_id=report.report_id,
+        status=report.status,
+        pending=counts.get(PENDING, 0),
+        running=counts.get(RUNNING, 0),
+        sent=counts.get(SENT, 0),
+        failed=counts.get(FAILED, 0),
+    )
+
+
+async def claim_deliveries(db: AsyncSession, limit: int) -> List[ClaimedDelivery]:
+    """
+    발송할 행을 최대 limit개 running 상태로 바꾸고 스냅샷을 반환합니다. (호출자가 commit)
+    """
+    now = _utcnow()
+    token = uuid.uuid4().hex
+    candidates = (await db.execute(
+        select(Delivery.delivery_id).where(_is_runnable(now)).order_by(Delivery.delivery_id).limit(limit)
+    )).scalars().all()
+    if not candidates:
+        return []
+    # 다른 dispatcher가 먼저 가져가지 않은 행만 claim 합니다.
+    await db.execute(
+        update(Delivery)
+        .where(Delivery.delivery_id.in_(candidates), _is_runnable(now))
+        .values(status=RUNNING, locked_at=now, locked_by=token, attempts=Delivery.attempts + 1)
+        .execution_options(synchronize_session=False)
+    )
+    rows = (await db.execute(
+        select(Delivery.delivery_id, Delivery.report_id, Delivery.kakao_user_id, Delivery.attempts)
+        .where(Delivery.locked_by == token, Delivery.status == RUNNING)
+        .order_by(Delivery.delivery_id)
+    )).all()
+    return [ClaimedDelivery(delivery_id, report_id, kakao_user_id, attempts, token) for delivery_id, report_id, kakao_user_id, attempts in rows]
+
+
+async def send_claimed(deliveries: Sequence[ClaimedDelivery], templates: Dict[int, dict], client: Optional[KakaoClient] = None) -> List[DeliveryResult]:
+    client = client or get_kakao_client()
+
+    async def send(delivery: ClaimedDelivery) -> DeliveryResult:
+        try:
+            await client.send_message(delivery.kakao_user_id, templates[delivery.report_id])
+        except KakaoSendError as e:
+            print(f"Warning: Kakao delivery {delivery.delivery_id} (report {delivery.report_id}) failed (attempt {delivery.attempts}): {e}")
+            return DeliveryResult(delivery, False, e.retryable, str(e)[:1000])
+        return DeliveryResult(delivery, True)
+
+    return await asyncio.gather(*(send(delivery) for delivery in deliveries))
+
+
+async def record_results(db: AsyncSession, results: Sequence[DeliveryResult]) -> int:
+    """
+    발송 결과를 기록합니다. lease를 잃은 행(다른 dispatcher가 다시 가져간 행)은 건너뜁니다. 기록한 행 수를 반환합니다.
+    """
+    now = _utcnow()
+    recorded = 0
+    for result in results:
+        delivery = result.delivery
+        if result.sent:
+            values = dict(status=SENT, sent_at=now, last_error=None)
+        elif result.retryable and delivery.attempts < REPORT_DELIVERY_MAX_ATTEMPTS:
+            values = dict(status=PENDING, next_attempt_at=now + timedelta(seconds=backoff_seconds(delivery.attempts)), last_error=result.error)
+        else:
+            values = dict(status=FAILED, last_error=result.error)
+        updated = await db.execute(
+            update(Delivery)
+            .where(Delivery.delivery_id == delivery.delivery_id, Delivery.status == RUNNING, Delivery.locked_by == delivery.token, Delivery.attempts == delivery.attempts)
+            .values(locked_at=None, locked_by=None, **values)
+            .execution_options(synchronize_session=False)
+        )
+        recorded += updated.rowcount
+    return recorded
+
+
+async def refresh_report_statuses(db: AsyncSession, report_ids: Sequence[int]):
+    """
+    outbox 행 상태로 리포트 상태를 맞춥니다: 남은 행이 있으면 'sending', 모두 발송되면 'sent', 아니면 'send_failed'.
+    """
+    counts: Dict[int, Dict[str, int]] = {}
+    for report_id, status, count in (await db.execute(
+        select(Delivery.report_id, Delivery.status, func.count()).where(Delivery.report_id.in_(report_ids)).group_by(Delivery.report_id, Delivery.status)
+    )).all():
+        counts.setdefault(report_id, {})[status] = count
+    for report_id, by_status in counts.items():
+        if by_status.get(PENDING) or by_status.get(RUNNING):
+            status = REPORT_SENDING
+        elif by_status.get(FAILED):
+            status = REPORT_SEND_FAILED
+        else:
+            status = REPORT_SENT
+        await db.execute(
+            update(models.WeeklyReport)
+            .where(models.WeeklyReport.report_id == report_id, models.WeeklyReport.status.in_(SENDABLE_REPORT_STATUSES))
+            .values(status=status)
+            .execution_options(synchronize_session=False)
+        )
+
+
+async def dispatch_once(session_factory=SessionLocal, batch_size: Optional[int] = None, client: Optional[KakaoClient] = None) -> int:
+    """
+    outbox에서 한 배치를 가져와 발송합니다. 가져온 행 수를 반환합니다. (0이면 보낼 것이 없음)
+    카카오 API 호출 동안에는 DB 트랜잭션을 열어 두지 않습니다.
+    """
+    async with session_factory() as db:
+        claimed = await claim_deliveries(db, batch_size or REPORT_DELIVERY_BATCH_SIZE)
+        reports = (await db.execute(
+            select(models.WeeklyReport).where(models.WeeklyReport.report_id.in_({delivery.report_id for delivery in claimed}))
+        )).scalars().all() if claimed else []
+        templates = {report.report_id: build_report_template(report) for report in reports}
+        await db.commit()
+    if not claimed:
+        return 0
+
+    results = await send_claimed(claimed, templates, client)
+
+    async with session_factory() as db:
+        await record_results(db, results)
+        await refresh_report_statuses(db, list(templates))
+        await db.commit()
+    return len(claimed)
+
+
+class DeliveryDispatcher:
+    """
+    발송 outbox를 비우는 인프로세스 dispatcher. lifespan에서 시작/종료합니다.
+    """
+
+    def __init__(self, batch_size: int = REPORT_DELIVERY_BATCH_SIZE, session_factory=SessionLocal):
+        self.batch_size = batch_size
+        self.session_factory = session_factory
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            await asyncio.gather(self._task, return_exceptions=True)
+            self._task = None
+
+    async def _run(self):
+        while True:
+            try:
+                processed = await dispatch_once(self.session_factory, self.batch_size)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"Warning: Report delivery dispatcher error: {e}")
+                processed = 0
+            # 배치가 가득 찼으면 남은 행이 있을 수 있으므로 바로 다음 배치를 가져옵니다.
+            if processed < self.batch_size:
+                await asyncio.sleep(REPORT_DELIVERY_POLL_INTERVAL_SECONDS)
+
+
+dispatcher: Optional[DeliveryDispatcher] = None
+
+
+async def start_dispatcher(batch_size: int = REPORT_DELIVERY_BATCH_SIZE):
+    global dispatcher
+    if batch_size <= 0 or dispatcher is not None:
+        return
+    dispatcher = DeliveryDispatcher(batch_size=batch_size)
+    dispatcher.start()
+
+
+async def stop_dispatcher():
+    global dispatcher
+    if dispatcher is not None:
+        await dispatcher.stop()
+        dispatcher = None
@@ -1,100 +1,114 @@
 from sqlalchemy.ext.asyncio import AsyncSession
-from sqlalchemy.future import select
-from datetime import date, timedelta, datetime
+from datetime import date, datetime, timedelta, timezone
 from typing import List, Optional
+import asyncio
 import json
+import os
 
 import schemas
 import models
 import crud
+from database import SessionLocal
 from llm_filter import call_ollama_api # Import the LLM call function
+from llm_telemetry import record_prompt_context
+from prompt_context import ContextBuilder, aggregate_by_concept, memo_item, rank_memos
+from daily_summary import ensure_daily_summaries, daily_summary_item
+from report_data import load_report_data
+
+# 리포트 요약은 프롬프트가 길어 판단 호출보다 긴 타임아웃을 사용합니다.
+REPORT_LLM_TIMEOUT = float(os.getenv("REPORT_LLM_TIMEOUT", "60"))
+# 마지막으로 생성된 뒤 이 기간이 지난 초안은 백그라운드 작업이 삭제합니다. (승인/발송된 리포트는 유지)
+REPORT_DRAFT_RETENTION_DAYS = float(os.getenv("REPORT_DRAFT_RETENTION_DAYS", "14"))
+REPORT_DRAFT_PRUNE_INTERVAL_SECONDS = float(os.getenv("REPORT_DRAFT_PRUNE_INTERVAL_SECONDS", "3600"))
+
+async def report_data_fingerprint(db: AsyncSession, student_id: str, start_date: date, end_date: date) -> str:
+    return json.dumps(await crud.get_student_data_fingerprint(db, student_id, start_date, end_date), default=str)
 
 async def generate_weekly_report_draft(
     db: AsyncSession,
     student_id: str,
     start_date: date,
-    end_date: date
+    end_date: date,
+    regenerate: bool = False
 ) -> models.WeeklyReport:
+    """
+    (학생, 기간)의 리포트 초안을 반환합니다. 학생 데이터가 바뀌지 않았으면 저장된 초안을 LLM 호출 없이 재사용하고,
+    바뀌었거나 regenerate=True이면 같은 초안을 다시 생성합니다.
+    """
     student = await crud.get_student(db, student_id=student_id)
     if not student:
         raise ValueError("Student not found")
 
-    # Fetch LLM Logs for the period
-    llm_logs_query = select(models.LLMLog).where(
-        models.LLMLog.created_at.between(start_date, end_date + timedelta(days=1)) # +1 day to include end_date
-    ).order_by(models.LLMLog.created_at.desc())
-    llm_logs_result = await db.execute(llm_logs_query)
-    llm_logs = llm_logs_result.scalars().all()
-
-    # Fetch Anki Cards reviewed or created in the period
-    anki_cards_query = select(models.AnkiCard).where(
-        models.AnkiCard.student_id == student_id,
-        (models.AnkiCard.created_at.between(start_date, end_date + timedelta(days=1))) | 
-        (models.AnkiCard.last_reviewed_at.between(start_date, end_date + timedelta(days=1)))
-    ).order_by(models.AnkiCard.created_at.desc())
-    anki_cards_result = await db.execute(anki_cards_query)
-    anki_cards = anki_cards_result.scalars().all()
-
-    # Fetch Coach Memos for the period
-    coach_memos_query = select(models.CoachMemo).where(
-        models.CoachMemo.student_id == student_id,
-        models.CoachMemo.created_at.between(start_date, end_date + timedelta(days=1))
-    ).order_by(models.CoachMemo.created_at.desc())
-    coach_memos_result = await db.execute(coach_memos_query)
-    coach_memos = coach_memos_result.scalars().all()
+    # 생성 전에 fingerprint를 읽으므로, 생성 중에 들어온 데이터는 다음 요청에서 다시 반영됩니다.
+    fingerprint = await report_data_fingerprint(db, student_id, start_date, end_date)
+    draft = await crud.get_report_draft(db, student_id, start_date, end_date)
+    if draft is not None and not regenerate and draft.data_fingerprint == fingerprint:
+        return draft
+
+    # 학생 범위 인덱스로 기간 데이터를 읽고, 카드의 concept_name은 SQL join으로 붙입니다.
+    data = await load_report_data(db, student_id, start_date, end_date)
+    llm_logs, coach_memos = data.logs, data.memos
 
     # Aggregate data
     total_submissions = 0 # We don't have a Submission model yet, so this is a placeholder
-    llm_judgments_count = len(llm_logs)
-    anki_cards_reviewed_count = sum(1 for card in anki_cards if card.last_reviewed_at and card.last_reviewed_at.date() >= start_date and card.last_reviewed_at.date() <= end_date)
-    new_anki_cards_created_count = sum(1 for card in anki_cards if card.created_at and card.created_at.date() >= start_date and card.created_at.date() <= end_date)
+    llm_judgments_count = data.judgments_count
+    anki_cards_reviewed_count = data.reviewed_cards_count
+    new_anki_cards_created_count = data.new_cards_count
 
-    anki_card_summaries = [schemas.ReportAnkiCardSummary.model_validate(card) for card in anki_cards]
+    anki_card_summaries = [schemas.ReportAnkiCardSummary.model_validate(card) for card, _ in data.cards]
     llm_log_summaries = [schemas.ReportLLMLogSummary.model_validate(log) for log in llm_logs]
     coach_memo_summaries = [schemas.ReportCoachMemoSummary.model_validate(memo) for memo in coach_memos]
 
     # --- LLM-powered Overall Summary and Coach Comment Suggestion ---
-    report_context = {
-        "student_name": student.name,
-        "report_period": f"{start_date} ~ {end_date}",
-        "llm_judgments": [{
-            "concept_name": log.concept_name,
-            "decision": log.decision,
-            "reason": log.reason,
-            "coach_feedback": log.coach_feedback
-        } for log in llm_logs],
-        "anki_card_reviews": [{
-            "question": card.question,
-            "repetitions": card.repetitions,
-            "next_review_date": card.next_review_date.isoformat() if card.next_review_date else None
-        } for card in anki_cards if card.last_reviewed_at and card.last_reviewed_at.date() >= start_date and card.last_reviewed_at.date() <= end_date],
-        "new_anki_cards": [{
-            "question": card.question,
-            "concept_name": llm_log.concept_name if (llm_log := next((l for l in llm_logs if l.log_id == card.llm_log_id), None)) else "N/A"
-        } for card in anki_cards if card.created_at and card.created_at.date() >= start_date and card.created_at.date() <= end_date],
-        "coach_memos": [{
-            "memo_text": memo.memo_text,
-            "created_at": memo.created_at.isoformat()
-        } for memo in coach_memos]
-    }
+    # 판단/카드 원본 대신 일일 요약(map)을 합쳐(reduce) 주간 요약을 만듭니다. 이미 요약된 날은 다시 요약하지 않습니다.
+    daily_summaries = await ensure_daily_summaries(db, student, start_date, end_date, data=data)
+
+    builder = ContextBuilder()
+    builder.set_header(student_name=student.name, report_period=f"{start_date} ~ {end_date}")
+    builder.add_section("concept_summary", aggregate_by_concept(llm_logs, data.cards, today=end_date))
+    builder.add_section("daily_summaries", [daily_summary_item(daily) for daily in daily_summaries if daily.summary or daily.judgments_count or daily.reviews_count or daily.new_cards_count or daily.memos_count])
+    builder.add_raw("llm_judgments", ({
+        "concept_name": log.concept_name,
+        "decision": log.decision,
+        "reason": log.reason,
+        "coach_feedback": log.coach_feedback
+    } for log in llm_logs))
+    builder.add_raw("anki_card_reviews", ({
+        "question": card.question,
+        "repetitions": card.repetitions,
+        "next_review_date": card.next_review_date.isoformat() if card.next_review_date else None
+    } for card, _ in data.reviewed_cards))
+    builder.add_raw("new_anki_cards", ({
+        "question": card.question,
+        "concept_name": concept or "N/A"
+    } for card, concept in data.new_cards))
+    builder.add_section("coach_memos", [memo_item(memo) for memo in rank_memos(coach_memos)], raw_items=({
+        "memo_text": memo.memo_text,
+        "created_at": memo.created_at.isoformat()
+    } for memo in coach_memos))
+    report_context = builder.build()
+    record_prompt_context("report", report_context.tokens, report_context.raw_tokens)
 
     llm_report_prompt = f"""[SYSTEM]
 You are an AI assistant that generates insightful weekly learning reports for students and suggests coach comments. Your output must be in JSON format with two keys: "overall_summary" (string) and "coach_comment_suggestion" (string). Do not add any other text.
 
 [INSTRUCTIONS]
 - Analyze the provided student learning data for the week.
+- "daily_summaries" are per-day summaries of the week with activity counts; "concept_summary" aggregates the whole week per concept. "omitted" counts items left out.
 - The "overall_summary" should be a concise, encouraging summary of the student's progress, highlighting key achievements and areas for improvement based on LLM judgments, Anki reviews, and new cards.
 - The "coach_comment_suggestion" should be a professional and actionable comment for the coach to review and potentially use, focusing on personalized advice.
 - Both outputs should be in Korean.
 
 [STUDENT LEARNING DATA]
-{json.dumps(report_context, ensure_ascii=False, indent=2)}
+{report_context.text}
 
 Your JSON Response:"""
 
     llm_report_response = {"overall_summary": "LLM 요약 생성 실패", "coach_comment_suggestion": "LLM 코멘트 생성 실패"}
+    generated = False
     try:
-        llm_report_response = await call_ollama_api(llm_report_prompt)
+        llm_report_response = await call_ollama_api(llm_report_prompt, timeout=REPORT_LLM_TIMEOUT, route="report")
+        generated = "overall_summary" in llm_report_response
     except Exception as e:
         print(f"Warning: Failed to generate LLM report summary: {e}. Using fallback.")
 
@@ -122,6 +136,40 @@ Your JSON Response:"""
         finalized_at=None
     )
 
-    # Create the report in the database
-    created_report = await crud.create_weekly_report(db, report_data=report_data)
-    return created_report
\ No newline at end of file
+    # Create (or update) the draft in the database. LLM 요약에 실패한 초안은 다음 요청에서 다시 생성합니다.
+    return await crud.save_weekly_report_draft(db, report_data, data_fingerprint=fingerprint if generated else None, draft=draft)
+
+async def prune_stale_drafts(session_factory=SessionLocal, retention_days: float = None) -> int:
+    retention_days = REPORT_DRAFT_RETENTION_DAYS if retention_days is None else retention_days
+    # created_at(server_default)은 UTC로 저장됩니다.
+    created_before = datetime.now(timezone.utc).replace(tzinfo=None) - timedelta(days=retention_days)
+    async with session_factory() as db:
+        pruned = await crud.prune_stale_report_drafts(db, created_before)
+        await db.commit()
+    return pruned
+
+async def _run_draft_pruner():
+    while True:
+        try:
+            pruned = await prune_stale_drafts()
+            if pruned:
+                print(f"Pruned {pruned} stale weekly report drafts.")
+        except asyncio.CancelledError:
+            raise
+        except Exception as e:
+            print(f"Warning: Failed to prune stale weekly report drafts: {e}")
+        await asyncio.sleep(REPORT_DRAFT_PRUNE_INTERVAL_SECONDS)
+
+_draft_pruner: Optional[asyncio.Task] = None
+
+async def start_draft_pruner():
+    global _draft_pruner
+    if REPORT_DRAFT_PRUNE_INTERVAL_SECONDS > 0 and _draft_pruner is None:
+        _draft_pruner = asyncio.create_task(_run_draft_pruner())
+
+async def stop_draft_pruner():
+    global _draft_pruner
+    if _draft_pruner is not None:
+        _draft_pruner.cancel()
+        await asyncio.gather(_draft_pruner, return_exceptions=True)
+        _draft_pruner = None
\ No newline at end of file
@@ -1,11 +1,12 @@
 from fastapi import APIRouter, Depends, HTTPException, Query
 from sqlalchemy.ext.asyncio import AsyncSession
 from datetime import date
+from typing import Optional
 
 import schemas
 import crud
 import report_generator
-import kakao_sender
+import report_delivery
 from llm_filter import get_db
 
 router = APIRouter(
@@ -18,10 +19,11 @@ async def get_weekly_report(
     student_id: str,
     start_date: date = Query(..., description="Start date of the report period (YYYY-MM-DD)"),
     end_date: date = Query(..., description="End date of the report period (YYYY-MM-DD)"),
+    regenerate: bool = Query(False, description="Rebuild the draft even if the student's data has not changed"),
     db: AsyncSession = Depends(get_db)
 ):
     try:
-        report = await report_generator.generate_weekly_report_draft(db, student_id, start_date, end_date)
+        report = await report_generator.generate_weekly_report_draft(db, student_id, start_date, end_date, regenerate=regenerate)
         return report
     except ValueError as e:
         raise HTTPException(status_code=404, detail=str(e))
@@ -39,34 +41,45 @@ async def finalize_report(
         raise HTTPException(status_code=400, detail=f"Report is already in '{report.status}' status and cannot be finalized.")
 
     updated_report = await crud.finalize_weekly_report(db, report_id=report_id, final_data=final_data)
+    # 승인과 같은 트랜잭션에서 학부모별 발송을 outbox에 쌓습니다. 실제 발송은 백그라운드 dispatcher가 합니다.
+    await report_delivery.enqueue_report_deliveries(db, [report_id])
+    await db.refresh(updated_report)
     return updated_report
 
-@router.post("/{report_id}/send", status_code=200)
+@router.post("/send-finalized", response_model=schemas.ReportDeliveryQueued, status_code=202)
+async def send_finalized_reports(
+    limit: Optional[int] = Query(None, ge=1, description="Maximum number of finalized reports to queue in this call"),
+    db: AsyncSession = Depends(get_db)
+):
+    """
+    아직 발송 요청되지 않은 최종 승인 리포트를 모두 발송 대기열에 넣습니다.
+    """
+    return await report_delivery.enqueue_finalized_reports(db, limit=limit)
+
+@router.post("/{report_id}/send", response_model=schemas.ReportDeliveryStatus, status_code=202)
 async def send_report(
     report_id: int,
     db: AsyncSession = Depends(get_db)
 ):
     db_report = await crud.get_weekly_report(db, report_id=report_id)
-    if not db_report or db_report.status != 'finalized':
+    if not db_report or db_report.status not in report_delivery.SENDABLE_REPORT_STATUSES:
         raise HTTPException(status_code=400, detail="리포트가 최종 승인 상태가 아닙니다.")
 
     db_student = await crud.get_student(db, student_id=db_report.student_id)
     if not db_student.parents:
         raise HTTPException(status_code=404, detail="리포트를 수신할 학부모가 등록되지 않았습니다.")
 
-    # 모든 연결된 학부모에게 발송
-    sent_count = 0
-    for parent in db_student.parents:
-        if parent.kakao_user_id:
-            try:
-                await kakao_sender.send_report_via_kakao(parent.kakao_user_id, db_report)
-                sent_count += 1
-            except Exception as e:
-                # 특정 학부모에게 발송 실패 시 로깅 (추후 구현)
-                print(f"카카오 메시지 발송 실패: {e}")
-    
-    # 발송 완료 후 리포트 상태 변경
-    db_report.status = 'sent'
-    await db.commit()
+    # 아직 outbox에 없는 학부모와 발송에 실패한 학부모를 대기열에 넣고 바로 응답합니다.
+    await report_delivery.enqueue_report_deliveries(db, [report_id])
+    await db.refresh(db_report)
+    return await report_delivery.get_delivery_status(db, db_report)
 
-    return {"message": f"총 {len(db_student.parents)}명의 학부모 중 {sent_count}명에게 리포트가 발송되었습니다."}
+@router.get("/{report_id}/delivery", response_model=schemas.ReportDeliveryStatus)
+async def get_report_delivery(
+    report_id: int,
+    db: AsyncSession = Depends(get_db)
+):
+    db_report = await crud.get_weekly_report(db, report_id=report_id)
+    if not db_report:
+        raise HTTPException(status_code=404, detail="Report not found")
+    return await report_delivery.get_delivery_status(db, db_report)
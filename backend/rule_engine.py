@@ -0,0 +1,232 @@
+"""
+과제 제출물 분석용 선언적 규칙 엔진.
+
+규칙은 rules/*.json 파일에 과제(assignment_id)별로 정의합니다.
+
+    {
+      "assignments": [
+        {
+          "assignment_id": "history-01",
+          "rules": [
+            {"all": ["1592", "1692"], "error_context": {"question_type": "HISTORY", ...}},
+            {"all": ["임진왜란"], "none": ["1592"], "error_context": {...}}
+          ]
+        }
+      ]
+    }
+
+- all: 모든 키워드가 답안에 있어야 함, any: 하나 이상 있어야 함, none: 하나도 없어야 함
+- 과제 안에서는 위에서부터 처음 일치한 규칙 하나만 적용됩니다. (기존 if/elif 순서와 동일)
+
+과제별 키워드는 Aho–Corasick 오토마톤으로 컴파일해 답안을 한 번만 훑고,
+규칙 조건은 일치한 키워드의 비트마스크로 평가합니다. 규칙 파일이 바뀌면 재시작 없이 다시 읽습니다.
+"""
+import glob
+import json
+import os
+import threading
+import time
+from collections import deque
+from typing import Dict, List, NamedTuple, Optional, Tuple
+
+import schemas
+
+RULES_DIR = os.getenv("RULES_DIR", os.path.join(os.path.dirname(os.path.abspath(__file__)), "rules"))
+# 규칙 파일 변경 여부를 확인하는 최소 간격(초)
+RULES_RELOAD_CHECK_SECONDS = float(os.getenv("RULES_RELOAD_CHECK_SECONDS", "1.0"))
+
+
+class RuleFormatError(ValueError):
+    pass
+
+
+class AhoCorasick:
+    """
+    여러 키워드를 한 번의 순회로 찾는 Aho–Corasick 오토마톤.
+    search()는 답안에 나타난 키워드 번호들의 비트마스크를 반환합니다. (겹치는 키워드도 모두 찾음)
+    """
+
+    def __init__(self, keywords: List[str]):
+        self._goto: List[Dict[str, int]] = [{}]
+        self._output: List[int] = [0]
+        for index, keyword in enumerate(keywords):
+            state = 0
+            for char in keyword:
+                next_state = self._goto[state].get(char)
+                if next_state is None:
+                    next_state = len(self._goto)
+                    self._goto[state][char] = next_state
+                    self._goto.append({})
+                    self._output.append(0)
+                state = next_state
+            self._output[state] |= 1 << index
+
+        # 실패 링크를 BFS로 만들고, 실패 경로의 출력을 미리 합쳐 둡니다.
+        self._fail = [0] * len(self._goto)
+        queue = deque(self._goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for char, next_state in self._goto[state].items():
+                fallback = self._fail[state]
+                while fallback and char not in self._goto[fallback]:
+                    fallback = self._fail[fallback]
+                self._fail[next_state] = self._goto[fallback].get(char, 0)
+                self._output[next_state] |= self._output[self._fail[next_state]]
+                queue.append(next_state)
+
+    def search(self, text: str) -> int:
+        goto, fail, output = self._goto, self._fail, self._output
+        state, matched = 0, 0
+        for char in text:
+            while state and char not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(char, 0)
+            matched |= output[state]
+        return matched
+
+
+class CompiledRule(NamedTuple):
+    all_mask: int
+    any_mask: int
+    none_mask: int
+    error_context: schemas.ErrorContext
+
+    def matches(self, matched: int) -> bool:
+        if matched & self.all_mask != self.all_mask:
+            return False
+        if self.any_mask and not matched & self.any_mask:
+            return False
+        return not matched & self.none_mask
+
+
+class CompiledAssignment:
+    def __init__(self, assignment_id: str, rules: List[dict]):
+        self.assignment_id = assignment_id
+        keyword_index: Dict[str, int] = {}
+
+        def mask_of(keywords: List[str]) -> int:
+            mask = 0
+            for keyword in keywords:
+                if not isinstance(keyword, str) or not keyword:
+                    raise RuleFormatError(f"{assignment_id}: keywords must be non-empty strings, got {keyword!r}")
+                mask |= 1 << keyword_index.setdefault(keyword, len(keyword_index))
+            return mask
+
+        compiled = []
+        for rule in rules:
+            try:
+                error_context = schemas.ErrorContext(**rule["error_context"])
+            except (KeyError, TypeError, ValueError) as e:
+                raise RuleFormatError(f"{assignment_id}: invalid error_context in rule {rule!r}: {e}")
+            compiled.append(CompiledRule(
+                all_mask=mask_of(rule.get("all", [])),
+                any_mask=mask_of(rule.get("any", [])),
+                none_mask=mask_of(rule.get("none", [])),
+                error_context=error_context
+            ))
+        self.rules: Tuple[CompiledRule, ...] = tuple(compiled)
+        self.keywords = list(keyword_index)
+        self._matcher = AhoCorasick(self.keywords)
+
+    def analyze(self, answer: str) -> Optional[schemas.ErrorContext]:
+        matched = self._matcher.search(answer)
+        for rule in self.rules:
+            if rule.matches(matched):
+                return rule.error_context
+        return None
+
+
+def compile_rule_documents(documents: List[dict]) -> Dict[str, CompiledAssignment]:
+    """
+    규칙 문서들을 assignment_id별로 모아 컴파일합니다. 같은 과제가 여러 파일에 있으면 파일 순서대로 규칙을 이어 붙입니다.
+    """
+    rules_by_assignment: Dict[str, List[dict]] = {}
+    for document in documents:
+        for assignment in document.get("assignments", []):
+            if "assignment_id" not in assignment:
+                raise RuleFormatError(f"assignment without assignment_id: {assignment!r}")
+            rules_by_assignment.setdefault(assignment["assignment_id"], []).extend(assignment.get("rules", []))
+    return {assignment_id: CompiledAssignment(assignment_id, rules) for assignment_id, rules in rules_by_assignment.items()}
+
+
+class RuleEngine:
+    """
+    규칙 디렉터리를 읽어 컴파일한 결과(과제별 인덱스)를 보관합니다.
+    파일 목록/수정 시각이 바뀌면 다시 컴파일하고, 새 규칙에 오류가 있으면 이전 규칙을 계속 사용합니다.
+    """
+
+    def __init__(self, rules_dir: str = RULES_DIR, reload_check_seconds: float = RULES_RELOAD_CHECK_SECONDS):
+        self.rules_dir = rules_dir
+        self.reload_check_seconds = reload_check_seconds
+        self._assignments: Dict[str, CompiledAssignment] = {}
+        self._signature: Optional[tuple] = None
+        self._last_check = 0.0
+        self._lock = threading.Lock()
+        self.reload(force=True)
+
+    def _rule_files(self) -> List[str]:
+        return sorted(glob.glob(os.path.join(self.rules_dir, "*.json")))
+
+    def _read_signature(self) -> tuple:
+        signature = []
+        for path in self._rule_files():
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            signature.append((path, stat.st_mtime_ns, stat.st_size))
+        return tuple(signature)
+
+    def reload(self, force: bool = False) -> bool:
+        """
+        규칙 파일이 바뀌었으면 다시 컴파일합니다. 새 규칙을 적용했으면 True를 반환합니다.
+        """
+        now = time.monotonic()
+        if not force and now - self._last_check < self.reload_check_seconds:
+            return False
+        self._last_check = now
+        signature = self._read_signature()
+        if not force and signature == self._signature:
+            return False
+
+        with self._lock:
+            if not force and signature == self._signature:
+                return False
+            try:
+                documents = []
+                for path, _, _ in signature:
+                    with open(path, "r", encoding="utf-8") as f:
+                        documents.append(json.load(f))
+                assignments = compile_rule_documents(documents)
+            except (OSError, json.JSONDecodeError, RuleFormatError) as e:
+                print(f"Warning: Failed to load rules from {self.rules_dir}: {e}. Keeping previous rules.")
+                self._signature = signature # 같은 잘못된 파일을 매번 다시 읽지 않습니다.
+                return False
+            self._assignments = assignments
+            self._signature = signature
+        print(f"Info: Loaded {sum(len(a.rules) for a in assignments.values())} rules for {len(assignments)} assignments from {self.rules_dir}.")
+        return True
+
+    def analyze(self, assignment_id: str, answer: str) -> Optional[schemas.ErrorContext]:
+        self.reload()
+        assignment = self._assignments.get(assignment_id)
+        if assignment is None:
+            return None
+        return assignment.analyze(answer)
+
+    def stats(self) -> dict:
+        return {
+            "assignments": len(self._assignments),
+            "rules": sum(len(a.rules) for a in self._assignments.values()),
+            "keywords": sum(len(a.keywords) for a in self._assignments.values()),
+        }
+
+
+_rule_engine: Optional[RuleEngine] = None
+
+
+def get_rule_engine() -> RuleEngine:
+    global _rule_engine
+    if _rule_engine is None:
+        _rule_engine = RuleEngine()
+    return _rule_engine
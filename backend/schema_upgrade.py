@@ -0,0 +1,87 @@
+"""
+기존 DB 스키마 업그레이드.
+
+Base.metadata.create_all은 없는 테이블만 만들고, 이미 있는 테이블에는 새 컬럼이나 인덱스를 추가하지 않습니다.
+그래서 이전 버전으로 만든 DB(pacer.db)에서는 새 컬럼을 조회하는 순간 "no such column" 오류가 납니다.
+upgrade_database는 create_all 뒤에 모델과 실제 테이블을 비교해
+1. 기존 테이블에 없는 컬럼을 ALTER TABLE ... ADD COLUMN으로 추가하고 (새 컬럼은 모두 nullable이어야 합니다)
+2. 모델에 선언된 인덱스를 checkfirst=True로 만듭니다. 유일 인덱스는 필요하면 먼저 중복 행을 정리합니다.
+여러 번 실행해도 안전하며(idempotent), 앱 시작(main.lifespan)과 DB를 직접 여는 스크립트에서 실행합니다.
+"""
+from typing import List
+
+from sqlalchemy import inspect, text
+from sqlalchemy.engine import Connection
+from sqlalchemy.ext.asyncio import AsyncEngine
+
+from database import Base
+import models  # noqa: F401 모든 모델을 Base.metadata에 등록
+
+
+def _add_missing_columns(connection: Connection) -> List[str]:
+    inspector = inspect(connection)
+    existing_tables = set(inspector.get_table_names())
+    added = []
+    for table in Base.metadata.sorted_tables:
+        if table.name not in existing_tables:
+            continue
+        existing_columns = {column["name"] for column in inspector.get_columns(table.name)}
+        for column in table.columns:
+            if column.name in existing_columns:
+                continue
+            if not column.nullable and column.server_default is None:
+                raise RuntimeError(f"{table.name}.{column.name}은 NOT NULL이고 기본값이 없어 기존 테이블에 추가할 수 없습니다.")
+            column_type = column.type.compile(dialect=connection.dialect)
+            connection.execute(text(f"ALTER TABLE {table.name} ADD COLUMN {column.name} {column_type}"))
+            added.append(f"{table.name}.{column.name}")
+    return added
+
+
+def _dedupe_report_drafts(connection: Connection):
+    # 유일 인덱스 전에 만들어진 DB에는 같은 (학생, 기간)의 초안이 여러 개 있을 수 있습니다. 가장 최근 초안만 남깁니다.
+    deleted = connection.execute(text(
+        "DELETE FROM weekly_reports WHERE status = 'draft' AND report_id NOT IN ("
+        " SELECT MAX(report_id) FROM weekly_reports WHERE status = 'draft'"
+        " GROUP BY student_id, report_period_start, report_period_end)"
+    ))
+    if deleted.rowcount:
+        print(f"Schema upgrade: removed {deleted.rowcount} duplicate weekly report drafts")
+
+
+# 유일 인덱스를 만들기 전에 기존 데이터를 정리하는 단계
+BEFORE_INDEX_CREATE = {
+    "uq_weekly_reports_draft_period": _dedupe_report_drafts,
+}
+
+
+def _create_missing_indexes(connection: Connection) -> List[str]:
+    created = []
+    for table in Base.metadata.sorted_tables:
+        existing_indexes = {index["name"] for index in inspect(connection).get_indexes(table.name)}
+        for index in table.indexes:
+            if index.name not in existing_indexes:
+                if index.name in BEFORE_INDEX_CREATE:
+                    BEFORE_INDEX_CREATE[index.name](connection)
+                index.create(connection, checkfirst=True)
+                created.append(index.name)
+    return created
+
+
+def upgrade_schema(connection: Connection) -> List[str]:
+    """
+    기존 테이블에 빠진 컬럼과 인덱스를 추가하고, 바뀐 항목 목록을 반환합니다. (conn.run_sync로 실행)
+    """
+    changes = _add_missing_columns(connection)
+    changes += _create_missing_indexes(connection)
+    for change in changes:
+        print(f"Schema upgrade: added {change}")
+    return changes
+
+
+async def upgrade_database(engine: AsyncEngine) -> List[str]:
+    """
+    없는 테이블을 만들고(create_all) 기존 테이블을 현재 모델에 맞게 업그레이드합니다.
+    """
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+        return await conn.run_sync(upgrade_schema)
@@ -26,6 +26,24 @@ class JudgeResponse(BaseModel):
     log_id: str
     decision: str
     reason: str
+    card_status: Optional[str] = None # "created", "queued" or None (REJECT)
+
+class JudgeBatchRequest(BaseModel):
+    items: List[JudgeRequest] = Field(..., min_length=1, max_length=1000)
+    concurrency: Optional[int] = Field(None, ge=1, description="Max concurrent LLM judgments for this batch.")
+
+class JudgeBatchItemResult(BaseModel):
+    index: int
+    status: str # "ok" or "error"
+    log_id: Optional[str] = None
+    decision: Optional[str] = None
+    reason: Optional[str] = None
+    error: Optional[str] = None
+
+class JudgeBatchResponse(BaseModel):
+    results: List[JudgeBatchItemResult]
+    succeeded: int
+    failed: int
 
 class FeedbackRequest(BaseModel):
     log_id: str
@@ -38,11 +56,60 @@ class FeedbackResponse(BaseModel):
     status: str
     log_id: str
 
+class JudgeCacheStatsResponse(BaseModel):
+    hits: int
+    misses: int
+    hit_rate: float
+    size: int
+    max_entries: int
+    ttl_seconds: float
+    evictions: int
+    invalidations: int
+
+class LLMGuardStatusResponse(BaseModel):
+    limit: float # AIMD가 조정하는 현재 동시성 한도
+    effective_limit: int
+    inflight: int
+    queue_depth: int
+    max_queue: int
+    latency_ewma_ms: Optional[float] = None
+    latency_target_ms: float
+    rejected_overload: int
+    breaker_state: str # "closed", "open", "half_open"
+    consecutive_failures: int
+    rejected_circuit_open: int
+    breaker_retry_after_seconds: Optional[float] = None
+
+class FastPathStatsResponse(BaseModel):
+    enabled: bool
+    classifier_version: Optional[str] = None
+    confidence_threshold: float
+    total: int
+    bypassed: int # 분류기가 LLM 없이 응답한 판단 수
+    uncertain: int # 확신도가 threshold 미만이라 LLM으로 넘긴 판단 수
+    unavailable: int # production 분류기가 없거나 불러오지 못해 LLM으로 넘긴 판단 수
+    bypass_rate: float
+    bypassed_by_decision: Dict[str, int]
+
+class StreamingMetricsResponse(BaseModel):
+    total_streams: int
+    stopped_early: int # stop_after 필드가 모두 완성되어 생성을 중단한 스트림 수
+    window: int
+    ttft_ms_p50: Optional[float] = None
+    ttft_ms_p95: Optional[float] = None
+    time_to_decision_ms_p50: Optional[float] = None
+    time_to_decision_ms_p95: Optional[float] = None
+    total_ms_p50: Optional[float] = None
+    total_ms_p95: Optional[float] = None
+
 class LLMLogResponse(BaseModel):
     log_id: int
     submission_id: str
+    student_id: Optional[str] = None
     concept_name: Optional[str] = None
     model_version: Optional[str] = None
+    judge_mode: Optional[str] = None
+    latency_ms: Optional[int] = None
     decision: str
     reason: Optional[str]
     coach_feedback: Optional[str]
@@ -74,6 +141,15 @@ class AnkiCardResponse(BaseModel):
 class CardReviewRequest(BaseModel):
     quality: int = Field(..., ge=0, le=5, description="Student\'s self-assessed quality of recall (0-5). 5: perfect recall, 0: complete blackout.")
 
+class CardGenerationQueueStatus(BaseModel):
+    pending: int
+    running: int
+    done: int
+    failed: int
+    backlog: int # pending + running
+    oldest_pending_age_seconds: Optional[float] = None
+    workers: int
+
 # Student Schemas
 class StudentCreate(BaseModel):
     student_id: str
@@ -184,6 +260,18 @@ class WeeklyReportResponse(BaseModel):
 class WeeklyReportFinalize(BaseModel):
     coach_comment: str
 
+class ReportDeliveryQueued(BaseModel):
+    reports: int # 발송을 요청한 리포트 수
+    queued: int # 이번에 outbox에 쌓이거나 다시 대기 상태가 된 학부모별 발송 수
+
+class ReportDeliveryStatus(BaseModel):
+    report_id: int
+    status: str # 리포트 상태 ('finalized', 'sending', 'sent', 'send_failed')
+    pending: int
+    running: int
+    sent: int
+    failed: int
+
 class LLMLogFilterParams(BaseModel):
     start_date: Optional[date] = None
     end_date: Optional[date] = None
@@ -198,5 +286,6 @@ class CoachingSuggestionsResponse(BaseModel):
     student_id: str
     overall_assessment: str
     suggestions: List[CoachingSuggestion]
+    cache_status: Optional[str] = None # hit, miss, stale
 
     model_config = ConfigDict(from_attributes=True)
\ No newline at end of file
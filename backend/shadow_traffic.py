@@ -0,0 +1,192 @@
+"""
+staging 모델 shadow 트래픽.
+
+AB_TEST_MODE=shadow이면 학생 요청은 모두 production 모델이 응답하고(llm_filter.select_judge_model),
+저장된 판단 중 SHADOW_TRAFFIC_RATE 비율을 staging 모델에 백그라운드로 복제해 결과를 shadow_judgments에 기록합니다.
+복제는 응답 경로를 막지 않도록 크기 제한 큐에 넣기만 하고, 큐가 가득 찼거나 LLM 백엔드가 바쁘면 버립니다.
+"""
+import asyncio
+import os
+import random
+import time
+from typing import List, NamedTuple, Optional
+
+import crud
+import models
+import schemas
+import llm_filter
+from database import SessionLocal
+from llm_guard import get_llm_guard
+from backend.model_registry import ModelRoute
+
+SHADOW_TRAFFIC_RATE = float(os.getenv("SHADOW_TRAFFIC_RATE", "0.1"))
+SHADOW_QUEUE_MAX = int(os.getenv("SHADOW_QUEUE_MAX", "100"))
+SHADOW_WORKERS = int(os.getenv("SHADOW_WORKERS", "2"))
+
+
+class ShadowJob(NamedTuple):
+    llm_log_id: int
+    production_model_version: Optional[str]
+    production_decision: str
+    error_context: schemas.ErrorContext
+    route: ModelRoute
+
+
+def pick_shadow_route(rand: float) -> Optional[ModelRoute]:
+    """
+    registry의 staging 모델 중에서 traffic_weight 비중으로 추첨합니다. staging 모델이 없으면 None.
+    shadow 복제는 학생 응답에 쓰이지 않으므로 라이브 트래픽 비중(AB_TEST_TRAFFIC_SPLIT)과 무관합니다. (split=0이어도 복제)
+    """
+    snapshot = llm_filter.model_registry.get_staging_snapshot(llm_filter.AB_TEST_STAGING_MODEL_VERSION)
+    if snapshot is None:
+        return None
+    return snapshot.draw(rand)
+
+
+class ShadowTrafficMirror:
+    """
+    shadow 판단 작업 큐와 워커. lifespan에서 시작/종료합니다.
+    """
+
+    def __init__(self, workers: int = SHADOW_WORKERS, max_queue: int = SHADOW_QUEUE_MAX, session_factory=SessionLocal):
+        self.workers = workers
+        self.max_queue = max_queue
+        self.session_factory = session_factory
+        self._queue: "asyncio.Queue[ShadowJob]" = asyncio.Queue(maxsize=max_queue)
+        self._tasks: List[asyncio.Task] = []
+        self.enqueued = 0
+        self.dropped_queue_full = 0
+        self.dropped_busy = 0
+        self.completed = 0
+        self.failed = 0
+
+    @property
+    def queue_depth(self) -> int:
+        return self._queue.qsize()
+
+    def offer(self, db_log: models.LLMLog, error_context: schemas.ErrorContext) -> bool:
+        """
+        판단 응답 경로에서 호출됩니다. 블로킹 없이 큐에 넣거나 버리고, 넣었으면 True를 반환합니다.
+        """
+        if llm_filter.AB_TEST_MODE != llm_filter.AB_TEST_MODE_SHADOW or random.random() >= SHADOW_TRAFFIC_RATE:
+            return False
+        route = pick_shadow_route(random.random())
+        if route is None or route.version == db_log.model_version:
+            return False
+        if get_llm_guard().is_busy():
+            self.dropped_busy += 1
+            return False
+        try:
+            self._queue.put_nowait(ShadowJob(db_log.log_id, db_log.model_version, db_log.decision, error_context, route))
+        except asyncio.QueueFull:
+            self.dropped_queue_full += 1
+            return False
+        self.enqueued += 1
+        return True
+
+    async def process(self, job: ShadowJob) -> bool:
+        """
+        staging 모델로 판단하고 결과를 저장합니다. 그 사이 백엔드가 바빠졌으면 호출하지 않고 버립니다.
+        """
+        if get_llm_guard().is_busy():
+            self.dropped_busy += 1
+            return False
+        started = time.perf_counter()
+        judgment = await llm_filter.run_judgment(
+            job.error_context, job.route.model_name, job.route.version, llm_filter.judge_mode_of(job.route), generate_card=False
+        )
+        if judgment["judge_mode"] == llm_filter.JUDGE_MODE_FALLBACK:
+            # 과부하로 판단하지 못한 결과는 일치율을 왜곡하므로 저장하지 않습니다.
+            self.dropped_busy += 1
+            return False
+        async with self.session_factory() as db:
+            await crud.create_shadow_judgment(db, models.ShadowJudgment(
+                llm_log_id=job.llm_log_id,
+                production_model_version=job.production_model_version,
+                production_decision=job.production_decision,
+                model_version=job.route.version,
+                judge_mode=judgment["judge_mode"],
+                decision=judgment["decision"],
+                reason=judgment["reason"],
+                latency_ms=int((time.perf_counter() - started) * 1000)
+            ))
+            await db.commit()
+        self.completed += 1
+        return True
+
+    async def drain(self):
+        """
+        큐에 남은 작업을 현재 태스크에서 모두 처리합니다. (테스트/종료 직전 정리용)
+        """
+        while not self._queue.empty():
+            job = self._queue.get_nowait()
+            try:
+                await self.process(job)
+            except Exception as e:
+                self.failed += 1
+                print(f"Warning: Shadow judgment for log {job.llm_log_id} failed: {e}")
+            finally:
+                self._queue.task_done()
+
+    def start(self):
+        self._tasks = [asyncio.create_task(self._run(worker_id)) for worker_id in range(self.workers)]
+
+    async def stop(self):
+        # 남은 shadow 작업은 버립니다. (사용자 응답과 무관)
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        self._tasks = []
+
+    async def _run(self, worker_id: int):
+        while True:
+            job = await self._queue.get()
+            try:
+                await self.process(job)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                self.failed += 1
+                print(f"Warning: Shadow worker {worker_id} failed for log {job.llm_log_id}: {e}")
+            finally:
+                self._queue.task_done()
+
+    def status(self) -> dict:
+        return {
+            "mode": llm_filter.AB_TEST_MODE,
+            "traffic_rate": SHADOW_TRAFFIC_RATE,
+            "workers": len(self._tasks),
+            "queue_depth": self.queue_depth,
+            "max_queue": self.max_queue,
+            "enqueued": self.enqueued,
+            "dropped_queue_full": self.dropped_queue_full,
+            "dropped_busy": self.dropped_busy,
+            "completed": self.completed,
+            "failed": self.failed,
+        }
+
+
+shadow_mirror: Optional[ShadowTrafficMirror] = None
+
+
+def on_judgment(db_log: models.LLMLog, error_context: schemas.ErrorContext):
+    if shadow_mirror is not None:
+        shadow_mirror.offer(db_log, error_context)
+
+
+llm_filter.add_judgment_listener(on_judgment)
+
+
+async def start_workers(workers: int = SHADOW_WORKERS):
+    global shadow_mirror
+    if workers <= 0:
+        return
+    shadow_mirror = ShadowTrafficMirror(workers=workers)
+    shadow_mirror.start()
+
+
+async def stop_workers():
+    global shadow_mirror
+    if shadow_mirror is not None:
+        await shadow_mirror.stop()
+        shadow_mirror = None
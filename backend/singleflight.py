@@ -0,0 +1,46 @@
+import asyncio
+from typing import Any, Awaitable, Callable, Dict, Hashable
+
+
+class SingleFlight:
+    """
+    같은 키로 동시에 들어온 요청을 하나의 실행으로 합칩니다(request coalescing).
+
+    - 첫 호출자(leader)만 실제 작업을 실행하고, 나머지는 같은 Task의 결과를 기다립니다.
+    - 작업이 실패하면 기다리던 모든 호출자에게 같은 예외가 전달됩니다.
+    - 기다리던 호출자 하나가 취소되어도 공유 작업은 취소되지 않습니다(asyncio.shield).
+    """
+
+    def __init__(self):
+        self._inflight: Dict[Hashable, asyncio.Task] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def _forget(self, key: Hashable, task: asyncio.Task):
+        if self._inflight.get(key) is task:
+            del self._inflight[key]
+        # 모든 대기자가 취소된 경우에도 "exception was never retrieved" 경고가 남지 않도록 소비합니다.
+        if not task.cancelled():
+            task.exception()
+
+    async def do(self, key: Hashable, func: Callable[[], Awaitable[Any]]) -> Any:
+        loop = asyncio.get_running_loop()
+        task = self._inflight.get(key)
+        if task is None or task.done() or task.get_loop() is not loop:
+            task = loop.create_task(func())
+            self._inflight[key] = task
+            task.add_done_callback(lambda t: self._forget(key, t))
+            self.leaders += 1
+        else:
+            self.coalesced += 1
+        return await asyncio.shield(task)
+
+    def is_inflight(self, key: Hashable) -> bool:
+        """
+        같은 키의 작업이 진행 중인지(= 지금 do()를 호출하면 기존 결과를 함께 기다리는지) 반환합니다.
+        """
+        task = self._inflight.get(key)
+        return task is not None and not task.done()
+
+    def inflight_count(self) -> int:
+        return len(self._inflight)
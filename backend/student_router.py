@@ -6,6 +6,7 @@ from typing import List # 추가
 import crud
 import schemas
 import pacer_brain
+import card_queue
 from llm_filter import get_db # DB 세션 재사용
 
 router = APIRouter(
@@ -32,9 +33,14 @@ async def get_daily_review_deck(student_id: str, db: AsyncSession = Depends(get_
     if not student:
         raise HTTPException(status_code=404, detail="Student not found")
     
-    due_cards = await crud.get_due_anki_cards(db, student_id=student_id, today=date.today())
+    # 아직 생성되지 않은 카드가 덱에서 빠지지 않도록 남은 카드 생성 작업을 먼저 마무리합니다.
+    await card_queue.ensure_cards_for_student(db, student_id)
+    # 기한 카드 전체를 읽지 않고 개수는 COUNT로, 카드는 우선순위 순으로 예산만큼만 읽습니다.
+    today = date.today()
+    total_due = await crud.count_due_anki_cards(db, student_id=student_id, today=today)
+    due_cards = await crud.get_due_anki_cards(db, student_id=student_id, today=today, limit=pacer_brain.daily_budget(student))
     
-    deck = await pacer_brain.get_daily_review_deck(student, due_cards)
+    deck = await pacer_brain.get_daily_review_deck(student, due_cards, today=today, total_due=total_due)
     return deck
 
 @router.put("/{student_id}", response_model=schemas.StudentResponse)
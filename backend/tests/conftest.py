@@ -10,9 +10,15 @@ from typing import AsyncGenerator
 from fastapi.testclient import TestClient # httpx.AsyncClient 대신 TestClient 임포트
 from sqlalchemy.ext.asyncio import create_async_engine, AsyncSession, async_sessionmaker
 
+import httpx
 from main import app
 from database import Base # Import Base from your app
 from llm_filter import get_db # 추가
+import llm_client
+import llm_guard
+import fake_ollama
+import fake_kakao
+import kakao_sender
 
 # Use an in-memory SQLite database for testing
 TEST_DATABASE_URL = "sqlite+aiosqlite:///:memory:"
@@ -26,6 +32,36 @@ def event_loop():
     yield loop
     loop.close()
 
+@pytest.fixture(scope="session", autouse=True)
+def fake_ollama_transport():
+    """Route every LLM call to the in-process fake Ollama instead of a live server."""
+    fake_ollama.configure()
+    llm_client.set_transport(httpx.ASGITransport(app=fake_ollama.app))
+    yield fake_ollama
+    llm_client.set_transport(None)
+
+@pytest.fixture(scope="session", autouse=True)
+def fake_kakao_transport():
+    """Route every Kakao message to the in-process fake Kakao API."""
+    api_key = kakao_sender.KAKAO_API_KEY
+    kakao_sender.KAKAO_API_KEY = "test-app-key"
+    kakao_sender.set_transport(httpx.ASGITransport(app=fake_kakao.app))
+    yield fake_kakao
+    kakao_sender.set_transport(None)
+    kakao_sender.KAKAO_API_KEY = api_key
+
+@pytest.fixture(autouse=True)
+def reset_fake_kakao():
+    fake_kakao.configure()
+    # 클라이언트의 토큰 버킷/세마포어 상태가 테스트 사이에 이어지지 않도록 새로 만듭니다.
+    kakao_sender.set_transport(kakao_sender.KAKAO_TRANSPORT)
+
+@pytest.fixture(autouse=True)
+def reset_fake_ollama():
+    """Each test starts with a fast, failure-free fake Ollama, a zeroed request counter and a closed circuit breaker."""
+    fake_ollama.configure()
+    llm_guard.reset_llm_guard()
+
 @pytest_asyncio.fixture(scope="session")
 async def async_engine():
     """Session-scoped fixture for the async SQLAlchemy engine."""
@@ -57,3 +93,35 @@ async def client_with_db(async_session: AsyncSession):
     client = TestClient(app) # TestClient 사용
     yield client
     app.dependency_overrides.clear() # Clear overrides after tests
+
+
+class _TestSessionFactory:
+    """
+    워커가 테스트 트랜잭션 안에서 동작하도록 같은 세션을 돌려주고, commit은 flush로 대신합니다.
+    """
+
+    def __init__(self, session: AsyncSession):
+        self.session = session
+
+    def __call__(self):
+        return self
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        return False
+
+    async def commit(self):
+        await self.session.flush()
+
+    def __getattr__(self, name):
+        return getattr(self.session, name)
+
+
+@pytest.fixture(scope="function")
+def session_factory(async_session: AsyncSession):
+    """
+    SessionLocal 대신 워커에 넘길 수 있는, async_session을 공유하는 세션 팩토리.
+    """
+    return _TestSessionFactory(async_session)
@@ -0,0 +1,19 @@
+import pytest
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+
+@pytest.mark.asyncio
+async def test_judge_mode_summary_compares_latency_per_mode(client_with_db: TestClient, async_session: AsyncSession):
+    await crud.create_llm_log(async_session, submission_id="mode-1", decision="APPROVE", reason="r", concept_name="c", model_version="mode_v1", judge_mode="fused", latency_ms=100)
+    await crud.create_llm_log(async_session, submission_id="mode-2", decision="APPROVE", reason="r", concept_name="c", model_version="mode_v1", judge_mode="fused", latency_ms=300)
+    await crud.create_llm_log(async_session, submission_id="mode-3", decision="REJECT", reason="r", concept_name="c", model_version="mode_v1", judge_mode="two_call", latency_ms=500)
+
+    response = client_with_db.get("/api/v1/analysis/judge-mode-summary")
+
+    assert response.status_code == 200
+    rows = {(row["model_version"], row["judge_mode"]): row for row in response.json()}
+    assert rows[("mode_v1", "fused")]["total_logs"] == 2
+    assert rows[("mode_v1", "fused")]["avg_latency_ms"] == 200.0
+    assert rows[("mode_v1", "two_call")]["avg_latency_ms"] == 500.0
@@ -0,0 +1,167 @@
+import pytest
+import time
+from datetime import timedelta
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import card_queue
+import llm_filter
+import models
+
+
+def _judge(client: TestClient, student_id: str):
+    response = client.post("/api/v1/filter/judge", json={
+        "student_id": student_id,
+        "submission_id": f"{student_id}-science-01",
+        "error_context": {
+            "question_type": "SCIENCE",
+            "concept_name": "광합성",
+            "student_mistake_summary": f"{student_id}: 밤에 일어난다고 답변함."
+        }
+    })
+    assert response.status_code == 200
+    assert response.json()["card_status"] == "queued"
+    return int(response.json()["log_id"])
+
+
+async def _job_for(session: AsyncSession, log_id: int) -> models.CardGenerationJob:
+    result = await session.execute(
+        select(models.CardGenerationJob)
+        .where(models.CardGenerationJob.llm_log_id == log_id)
+        .execution_options(populate_existing=True)
+    )
+    return result.scalars().first()
+
+
+async def _card_for(session: AsyncSession, log_id: int) -> models.AnkiCard:
+    result = await session.execute(select(models.AnkiCard).where(models.AnkiCard.llm_log_id == log_id))
+    return result.scalars().first()
+
+
+@pytest.mark.asyncio
+async def test_worker_retries_failed_job_with_backoff(client_with_db: TestClient, async_session: AsyncSession, session_factory, fake_ollama_transport):
+    llm_filter.judgment_cache.clear()
+    log_id = _judge(client_with_db, "queue-retry-1")
+
+    fake_ollama_transport.configure(failure_rate=1.0)
+    assert await card_queue.run_once(session_factory) is True
+    job = await _job_for(async_session, log_id)
+    assert job.status == "pending"
+    assert job.attempts == 1
+    assert job.last_error
+    assert job.next_attempt_at > card_queue._utcnow()
+    assert await _card_for(async_session, log_id) is None
+
+    # backoff 시간이 지나기 전에는 다시 가져가지 않습니다.
+    assert await card_queue.run_once(session_factory) is False
+
+    job.next_attempt_at = card_queue._utcnow() - timedelta(seconds=1)
+    await async_session.flush()
+    fake_ollama_transport.configure()
+    assert await card_queue.run_once(session_factory) is True
+
+    job = await _job_for(async_session, log_id)
+    assert job.status == "done"
+    assert job.attempts == 2
+    card = await _card_for(async_session, log_id)
+    assert card.student_id == "queue-retry-1"
+    assert "LLM 응답 실패" not in card.answer
+
+    status = client_with_db.get("/api/v1/cards/generation-queue").json()
+    assert status["done"] >= 1
+    assert status["backlog"] == 0
+
+
+@pytest.mark.asyncio
+async def test_job_falls_back_after_max_attempts(client_with_db: TestClient, async_session: AsyncSession, session_factory, fake_ollama_transport, monkeypatch):
+    llm_filter.judgment_cache.clear()
+    monkeypatch.setattr(card_queue, "CARD_JOB_MAX_ATTEMPTS", 1)
+    log_id = _judge(client_with_db, "queue-giveup-1")
+
+    status = client_with_db.get("/api/v1/cards/generation-queue").json()
+    assert status["pending"] == 1
+    assert status["oldest_pending_age_seconds"] is not None
+
+    fake_ollama_transport.configure(failure_rate=1.0)
+    assert await card_queue.run_once(session_factory) is True
+
+    job = await _job_for(async_session, log_id)
+    assert job.status == "failed"
+    assert job.last_error
+    card = await _card_for(async_session, log_id)
+    assert "LLM 응답 실패" in card.answer # 카드는 fallback 문구로라도 생성됩니다.
+
+
+@pytest.mark.asyncio
+async def test_stale_worker_cannot_complete_reclaimed_job(client_with_db: TestClient, async_session: AsyncSession, monkeypatch):
+    llm_filter.judgment_cache.clear()
+    log_id = _judge(client_with_db, "queue-lease-1")
+
+    first_claim = await card_queue.claim_next_job(async_session)
+    assert first_claim.llm_log_id == log_id
+    assert await card_queue.claim_next_job(async_session) is None # 처리 중인 작업은 다시 가져가지 않습니다.
+
+    # lease가 만료되면 다른 워커가 작업을 회수합니다.
+    monkeypatch.setattr(card_queue, "CARD_JOB_LEASE_SECONDS", -1)
+    second_claim = await card_queue.claim_next_job(async_session)
+    assert second_claim.job_id == first_claim.job_id
+    assert second_claim.attempts == first_claim.attempts + 1
+
+    assert await card_queue.complete_job(async_session, first_claim, "Q-old", "A-old", from_llm=False) is False
+    assert await card_queue.complete_job(async_session, second_claim, "Q-new", "A-new", from_llm=False) is True
+    card = await _card_for(async_session, log_id)
+    assert card.question == "Q-new"
+
+
+@pytest.mark.asyncio
+async def test_deck_request_sends_failures_through_retry_backoff(client_with_db: TestClient, async_session: AsyncSession, fake_ollama_transport):
+    llm_filter.judgment_cache.clear()
+    log_id = _judge(client_with_db, "queue-deck-fail-1")
+
+    # 덱 요청 안에서 실패해도 첫 시도에 fallback 카드를 만들지 않고 워커처럼 backoff 후 재시도합니다.
+    fake_ollama_transport.configure(failure_rate=1.0)
+    await card_queue.ensure_cards_for_student(async_session, "queue-deck-fail-1")
+    job = await _job_for(async_session, log_id)
+    assert (job.status, job.attempts) == ("pending", 1)
+    assert job.next_attempt_at > card_queue._utcnow()
+    assert await _card_for(async_session, log_id) is None
+
+    # backoff 중인 작업은 다음 덱 요청에서 다시 호출하지 않습니다.
+    fake_ollama_transport.configure()
+    await card_queue.ensure_cards_for_student(async_session, "queue-deck-fail-1")
+    assert fake_ollama_transport.request_count == 0
+    assert (await _job_for(async_session, log_id)).attempts == 1
+
+
+@pytest.mark.asyncio
+async def test_deck_request_stops_generating_after_the_deadline(client_with_db: TestClient, async_session: AsyncSession, fake_ollama_transport):
+    llm_filter.judgment_cache.clear()
+    log_ids = [_judge(client_with_db, f"queue-deck-slow-{index}") for index in range(2)]
+    for log_id in log_ids:
+        (await _job_for(async_session, log_id)).student_id = "queue-deck-slow"
+    await async_session.flush()
+
+    fake_ollama_transport.configure()
+    await card_queue.ensure_cards_for_student(async_session, "queue-deck-slow", timeout=0)
+
+    assert fake_ollama_transport.request_count == 0
+    assert [(await _job_for(async_session, log_id)).attempts for log_id in log_ids] == [0, 0]
+
+
+@pytest.mark.asyncio
+async def test_deck_request_generates_cards_concurrently(client_with_db: TestClient, async_session: AsyncSession, fake_ollama_transport, monkeypatch):
+    llm_filter.judgment_cache.clear()
+    monkeypatch.setattr(card_queue, "CARD_QUEUE_ENSURE_CONCURRENCY", 4)
+    log_ids = [_judge(client_with_db, f"queue-deck-many-{index}") for index in range(4)]
+    for log_id in log_ids:
+        (await _job_for(async_session, log_id)).student_id = "queue-deck-many"
+    await async_session.flush()
+
+    fake_ollama_transport.configure(latency_ms=300)
+    started = time.monotonic()
+    await card_queue.ensure_cards_for_student(async_session, "queue-deck-many")
+
+    # 4개를 순서대로 만들면 1.2초 이상 걸립니다.
+    assert time.monotonic() - started < 1.0
+    assert [(await _job_for(async_session, log_id)).status for log_id in log_ids] == ["done"] * 4
@@ -6,6 +6,8 @@ from sqlalchemy.future import select
 import crud
 import schemas
 import models
+import coaching_generator
+import fake_ollama
 
 @pytest.mark.asyncio
 async def test_create_coach_memo(client_with_db: TestClient, async_session: AsyncSession):
@@ -89,3 +91,49 @@ async def test_get_memos_for_student_filtered_by_coach(client_with_db: TestClien
     assert all(m["coach_id"] == coach1_id for m in memos)
     assert any(m["memo_text"] == memo1_data.memo_text for m in memos)
     assert any(m["memo_text"] == memo3_data.memo_text for m in memos)
+
+@pytest.mark.asyncio
+async def test_coaching_suggestions_are_cached_until_student_data_changes(client_with_db: TestClient, async_session: AsyncSession):
+    student_id = "student-coaching-cache"
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="Coaching Cache Student"))
+    await crud.create_coach_memo(async_session, schemas.CoachMemoCreate(coach_id="coach-001", student_id=student_id, memo_text="첫 메모"))
+    coaching_generator.coaching_cache.clear()
+
+    first = client_with_db.get(f"/api/v1/coach/student/{student_id}/coaching-suggestions")
+    second = client_with_db.get(f"/api/v1/coach/student/{student_id}/coaching-suggestions")
+    assert (first.json()["cache_status"], second.json()["cache_status"]) == ("miss", "hit")
+    assert second.json()["suggestions"] == first.json()["suggestions"]
+    assert fake_ollama.request_count == 1
+
+    # 새 메모가 생기면 fingerprint가 바뀌어 다시 생성합니다.
+    await crud.create_coach_memo(async_session, schemas.CoachMemoCreate(coach_id="coach-001", student_id=student_id, memo_text="두 번째 메모"))
+    third = client_with_db.get(f"/api/v1/coach/student/{student_id}/coaching-suggestions")
+    assert third.json()["cache_status"] == "miss"
+    assert fake_ollama.request_count == 2
+
+    # 기존 로그의 코치 피드백만 바뀌어도 fingerprint가 바뀌어 다시 생성합니다.
+    log = await crud.create_llm_log(async_session, submission_id=f"{student_id}-1", student_id=student_id, decision="REJECT", reason="단순 실수", concept_name="분수", model_version="v1")
+    assert client_with_db.get(f"/api/v1/coach/student/{student_id}/coaching-suggestions").json()["cache_status"] == "miss"
+    for feedback in ("GOOD", "BAD"):
+        await crud.update_llm_log_feedback(async_session, schemas.FeedbackRequest(log_id=str(log.log_id), coach_id="coach-001", feedback=feedback))
+        assert client_with_db.get(f"/api/v1/coach/student/{student_id}/coaching-suggestions").json()["cache_status"] == "miss"
+    assert client_with_db.get(f"/api/v1/coach/student/{student_id}/coaching-suggestions").json()["cache_status"] == "hit"
+
+@pytest.mark.asyncio
+async def test_coaching_suggestions_stale_while_revalidate(async_session: AsyncSession, session_factory, monkeypatch):
+    student_id = "student-coaching-swr"
+    student = await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="SWR Student"))
+    coaching_generator.coaching_cache.clear()
+    monkeypatch.setattr(coaching_generator, "session_factory", session_factory)
+
+    _, status = await coaching_generator.get_coaching_suggestions(async_session, student, 7, stale_while_revalidate=True)
+    assert status == "miss"
+    await crud.create_coach_memo(async_session, schemas.CoachMemoCreate(coach_id="coach-001", student_id=student_id, memo_text="새 메모"))
+
+    # 데이터가 바뀌어도 이전 결과를 바로 반환하고, 백그라운드 갱신이 끝나면 최신 fingerprint로 적중합니다.
+    _, status = await coaching_generator.get_coaching_suggestions(async_session, student, 7, stale_while_revalidate=True)
+    assert status == "stale"
+    await coaching_generator.wait_for_refreshes()
+    assert fake_ollama.request_count == 2
+    _, status = await coaching_generator.get_coaching_suggestions(async_session, student, 7, stale_while_revalidate=True)
+    assert status == "hit"
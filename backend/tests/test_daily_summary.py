@@ -0,0 +1,63 @@
+import pytest
+from datetime import date, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import crud
+import fake_ollama
+import models
+import schemas
+
+
+def _report(client: TestClient, student_id: str, start_date: date, end_date: date):
+    response = client.get(f"/api/v1/report/student/{student_id}/period", params={"start_date": start_date.isoformat(), "end_date": end_date.isoformat()})
+    assert response.status_code == 200
+    return response.json()
+
+
+@pytest.mark.asyncio
+async def test_weekly_report_reuses_daily_summaries_until_the_day_changes(client_with_db: TestClient, async_session: AsyncSession):
+    student_id = "daily-student"
+    today = crud.activity_day(None)
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="일일 요약 학생"))
+    log = await crud.create_llm_log(async_session, submission_id=f"{student_id}-1", student_id=student_id, decision="APPROVE", reason="개념 혼동", concept_name="광합성", model_version="v1")
+    await crud.create_anki_card(async_session, schemas.AnkiCardCreate(student_id=student_id, llm_log_id=log.log_id, question="광합성은 어디서?", answer="엽록체"))
+
+    # 활동이 있는 오늘만 요약(LLM 1회)하고, 나머지 날은 빈 요약으로 저장한 뒤 주간 요약(LLM 1회)을 만듭니다.
+    _report(client_with_db, student_id, today - timedelta(days=6), today)
+    assert fake_ollama.request_count == 2
+    summaries = (await async_session.execute(select(models.DailySummary).where(models.DailySummary.student_id == student_id))).scalars().all()
+    assert len(summaries) == 7
+    assert [daily.summary_date for daily in summaries if daily.summary] == [today]
+
+    # 다시 생성하거나 기간을 늘려도 이미 요약된 날은 다시 요약하지 않습니다. (같은 기간은 초안을 그대로 재사용)
+    _report(client_with_db, student_id, today - timedelta(days=6), today)
+    assert fake_ollama.request_count == 2
+    _report(client_with_db, student_id, today - timedelta(days=9), today)
+    assert fake_ollama.request_count == 3
+
+    # 새 메모가 생긴 날의 요약은 무효화되어 다음 리포트에서 그날만 다시 요약됩니다.
+    await crud.create_coach_memo(async_session, schemas.CoachMemoCreate(coach_id="coach", student_id=student_id, memo_text="복습 태도가 좋아졌습니다."))
+    today_summary = (await async_session.execute(select(models.DailySummary).where(models.DailySummary.student_id == student_id, models.DailySummary.summary_date == today))).scalars().first()
+    assert today_summary is None
+    _report(client_with_db, student_id, today - timedelta(days=6), today)
+    assert fake_ollama.request_count == 5
+    refreshed = (await async_session.execute(select(models.DailySummary).where(models.DailySummary.student_id == student_id, models.DailySummary.summary_date == today))).scalars().one()
+    assert (refreshed.judgments_count, refreshed.new_cards_count, refreshed.memos_count) == (1, 1, 1)
+
+
+@pytest.mark.asyncio
+async def test_coach_feedback_invalidates_the_logs_daily_summary(client_with_db: TestClient, async_session: AsyncSession):
+    student_id = "feedback-summary-student"
+    today = crud.activity_day(None)
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="피드백 학생"))
+    log = await crud.create_llm_log(async_session, submission_id=f"{student_id}-1", student_id=student_id, decision="REJECT", reason="단순 실수", concept_name="분수", model_version="v1")
+    _report(client_with_db, student_id, today - timedelta(days=6), today)
+    assert fake_ollama.request_count == 2
+
+    await crud.update_llm_log_feedback(async_session, schemas.FeedbackRequest(log_id=str(log.log_id), coach_id="coach", feedback="BAD", reason_code="CONCEPT_ERROR", memo="개념 오류입니다."))
+
+    summary_days = (await async_session.execute(select(models.DailySummary.summary_date).where(models.DailySummary.student_id == student_id))).scalars().all()
+    assert today not in summary_days and len(summary_days) == 6
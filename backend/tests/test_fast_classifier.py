@@ -0,0 +1,106 @@
+import random
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from fastapi.testclient import TestClient
+
+import backend.model_registry as registry_module
+import llm_filter
+import models
+from backend.model_registry import ModelRegistry
+from fast_classifier import FastPathClassifier, TrainingExample, train_classifier, evaluate
+
+
+def _examples(count: int = 200, seed: int = 7):
+    rng = random.Random(seed)
+    examples = []
+    for _ in range(count):
+        if rng.random() < 0.5:
+            examples.append(TrainingExample("임진왜란 발발 연도", f"1592년을 {rng.choice(['1692', '1492', '1593'])}년으로 잘못 기재함.", "APPROVE"))
+        else:
+            examples.append(TrainingExample("덧셈", f"{rng.randint(1, 9)}+{rng.randint(1, 9)} 계산 실수 (오타)", "REJECT"))
+    return examples
+
+
+@pytest.fixture
+def registry(tmp_path, monkeypatch):
+    monkeypatch.setattr(registry_module, "REGISTRY_FILE", str(tmp_path / "model_registry.json"))
+    monkeypatch.setattr(registry_module, "REGISTRY_RELOAD_CHECK_SECONDS", 0.0)
+    registry = ModelRegistry()
+    monkeypatch.setattr(llm_filter, "model_registry", registry)
+    llm_filter._fast_classifiers.clear()
+    llm_filter.fast_path_stats.reset()
+    llm_filter.judgment_cache.clear()
+    yield registry
+    llm_filter._fast_classifiers.clear()
+
+
+def test_classifier_learns_and_round_trips(tmp_path):
+    classifier = train_classifier(_examples())
+    metrics = evaluate(classifier, _examples(50, seed=99), threshold=0.9)
+    assert metrics["accuracy"] == 1.0
+    assert metrics["coverage"] > 0.5
+
+    path = tmp_path / "fast_v1.json"
+    classifier.save(str(path))
+    loaded = FastPathClassifier.load(str(path))
+    assert loaded.predict("임진왜란 발발 연도", "1592년을 1692년으로 잘못 기재함.") == classifier.predict("임진왜란 발발 연도", "1592년을 1692년으로 잘못 기재함.")
+    assert loaded.predict("덧셈", "3+4 계산 실수").decision == "REJECT"
+
+
+def test_fast_classifier_is_versioned_without_taking_llm_traffic(registry, tmp_path):
+    registry.register_model("v1", "/models/v1", {}, {"base_model": "llama2:latest"})
+    registry.set_model_production_status("v1", "production")
+    registry.register_model("fast_v1", str(tmp_path / "fast_v1.json"), {}, {"kind": "fast_classifier"})
+    registry.set_model_production_status("fast_v1", "production")
+    registry.register_model("fast_v2", str(tmp_path / "fast_v2.json"), {}, {"kind": "fast_classifier"})
+    registry.set_model_production_status("fast_v2", "staging")
+
+    assert registry.get_active_production_model()["metadata"]["base_model"] == "llama2:latest"
+    assert registry.get_active_fast_classifier()[0] == "fast_v1"
+    assert [route.version for route in registry.get_routing_snapshot(0.2).routes] == ["v1"]
+
+    registry.set_model_production_status("fast_v2", "production")
+    assert registry.get_active_fast_classifier()[0] == "fast_v2"
+    assert registry.get_model("fast_v1")["production_status"] == "inactive"
+
+
+@pytest.mark.asyncio
+async def test_judge_uses_fast_path_for_confident_cases(client_with_db: TestClient, async_session: AsyncSession, registry, tmp_path, fake_ollama_transport, monkeypatch):
+    path = tmp_path / "fast_v1.json"
+    train_classifier(_examples()).save(str(path))
+    registry.register_model("fast_v1", str(path), {}, {"kind": "fast_classifier"})
+    registry.set_model_production_status("fast_v1", "production")
+    monkeypatch.setattr(llm_filter, "FAST_PATH_CONFIDENCE_THRESHOLD", 0.8)
+
+    def judge(submission_id: str, concept_name: str, mistake: str):
+        return client_with_db.post("/api/v1/filter/judge", json={
+            "student_id": "fast-student",
+            "submission_id": submission_id,
+            "error_context": {"question_type": "HISTORY", "concept_name": concept_name, "student_mistake_summary": mistake}
+        })
+
+    confident = judge("fast-student-1", "임진왜란 발발 연도", "1592년을 1692년으로 잘못 기재함.")
+    assert confident.status_code == 200
+    assert confident.json()["decision"] == "APPROVE"
+    assert confident.json()["card_status"] == "queued" # 카드 내용은 여전히 LLM 작업 큐에서 생성
+    assert fake_ollama_transport.request_count == 0
+
+    # 확신도가 낮은 입력은 Ollama로 넘깁니다.
+    uncertain = judge("fast-student-2", "광합성", "엽록체의 역할을 설명하지 못함.")
+    assert uncertain.status_code == 200
+    assert fake_ollama_transport.request_count == 1
+
+    logs = (await async_session.execute(
+        select(models.LLMLog).where(models.LLMLog.submission_id.like("fast-student-%")).order_by(models.LLMLog.log_id)
+    )).scalars().all()
+    assert [(log.model_version, log.judge_mode) for log in logs] == [
+        ("fast_v1", llm_filter.JUDGE_MODE_FAST_PATH),
+        (registry_module.DEFAULT_MODEL_VERSION, llm_filter.JUDGE_MODE_TWO_CALL),
+    ]
+    assert logs[0].student_mistake_summary == "1592년을 1692년으로 잘못 기재함."
+
+    stats = client_with_db.get("/api/v1/filter/fast-path/stats").json()
+    assert stats["classifier_version"] == "fast_v1"
+    assert (stats["bypassed"], stats["uncertain"], stats["bypass_rate"]) == (1, 1, 0.5)
@@ -0,0 +1,42 @@
+import pytest
+
+import httpx
+from fastapi import HTTPException
+
+import llm_client
+import fake_ollama
+from llm_filter import call_ollama_api
+
+
+@pytest.mark.asyncio
+async def test_shared_client_is_reused_and_closed_on_shutdown():
+    client = await llm_client.startup_llm_client(transport=httpx.ASGITransport(app=fake_ollama.app))
+    try:
+        assert llm_client.get_llm_client() is client
+
+        fake_ollama.configure()
+        first = await call_ollama_api("[CURRENT TASK] 개념 오류", model_name="llama2:latest")
+        second = await call_ollama_api("[CURRENT TASK] 단순 계산 실수", model_name="llama2:latest", timeout=5.0)
+
+        assert first["decision"] == "APPROVE"
+        assert second["decision"] == "REJECT"
+        assert fake_ollama.request_count == 2
+        assert llm_client.get_llm_client() is client # 호출마다 새 클라이언트를 만들지 않음
+    finally:
+        await llm_client.shutdown_llm_client()
+
+    assert client.closed
+
+
+@pytest.mark.asyncio
+async def test_ollama_unavailable_maps_to_503():
+    def refuse(request: httpx.Request):
+        raise httpx.ConnectError("connection refused", request=request)
+
+    client = await llm_client.startup_llm_client(transport=httpx.MockTransport(refuse))
+    try:
+        with pytest.raises(HTTPException) as exc_info:
+            await call_ollama_api("[CURRENT TASK] test")
+        assert exc_info.value.status_code == 503
+    finally:
+        await llm_client.shutdown_llm_client()
@@ -8,12 +8,14 @@ from main import app
 from llm_filter import get_db
 import models
 import schemas
+import card_queue
 
 # This is the overridden dependency for testing
 # This will be handled by the client_with_db fixture in conftest.py
 
 client = TestClient(app)
 
+
 @pytest.mark.asyncio
 async def test_judge_and_feedback_e2e(client_with_db: TestClient, async_session: AsyncSession):
     # 1. Judge API를 호출하여 로그를 생성합니다.
@@ -37,8 +39,10 @@ async def test_judge_and_feedback_e2e(client_with_db: TestClient, async_session:
     assert log_in_db is not None
     assert log_in_db.decision == judge_data["decision"]
 
-    # 2.1. LLM 결정이 APPROVE였다면, Anki 카드가 생성되었는지 확인합니다.
+    # 2.1. LLM 결정이 APPROVE였다면, 카드 생성 작업을 마무리한 뒤 Anki 카드가 생성되었는지 확인합니다.
     if log_in_db.decision == "APPROVE":
+        assert judge_data["card_status"] == "queued"
+        await card_queue.ensure_cards_for_student(async_session, judge_request_data["student_id"])
         anki_card_result = await async_session.execute(select(models.AnkiCard).where(models.AnkiCard.llm_log_id == int(log_id)))
         anki_card_in_db = anki_card_result.scalars().first()
         assert anki_card_in_db is not None
@@ -59,6 +63,7 @@ async def test_judge_and_feedback_e2e(client_with_db: TestClient, async_session:
     assert log_in_db.coach_feedback == "BAD"
     assert log_in_db.reason_code == "WRONG_JUDGEMENT"
 
+
 @pytest.mark.asyncio
 async def test_get_llm_logs_with_date_filter(client_with_db: TestClient, async_session: AsyncSession):
     from datetime import datetime, date, timedelta
@@ -95,4 +100,142 @@ async def test_get_llm_logs_with_date_filter(client_with_db: TestClient, async_s
     assert response.status_code == 200
     logs = response.json()
     assert len(logs) == 1
-    assert logs[0]["submission_id"] == "sub-date-4"
\ No newline at end of file
+    assert logs[0]["submission_id"] == "sub-date-4"
+
+
+@pytest.mark.asyncio
+async def test_judge_reuses_cached_judgment_for_repeated_mistake(client_with_db: TestClient, async_session: AsyncSession, fake_ollama_transport):
+    import llm_filter
+    llm_filter.judgment_cache.clear()
+    fake_ollama_transport.configure()
+
+    def judge(student_id: str, mistake: str):
+        return client_with_db.post("/api/v1/filter/judge", json={
+            "student_id": student_id,
+            "submission_id": f"{student_id}-history-01",
+            "error_context": {
+                "question_type": "HISTORY",
+                "concept_name": "임진왜란 발발 연도",
+                "student_mistake_summary": mistake
+            }
+        })
+
+    first = judge("cache-student-1", "1592년을 1692년으로 잘못 기재함.")
+    assert first.status_code == 200
+    assert first.json()["card_status"] == "queued"
+    assert fake_ollama_transport.request_count == 1 # 판단만 (카드는 작업 큐에서 생성)
+    await card_queue.ensure_cards_for_student(async_session, "cache-student-1")
+    assert fake_ollama_transport.request_count == 2 # 판단 + 카드 생성
+
+    # 공백/문장부호만 다른 같은 오답은 LLM을 호출하지 않습니다.
+    second = judge("cache-student-2", "  1592년을   1692년으로 잘못 기재함 ")
+    assert second.status_code == 200
+    assert second.json()["decision"] == first.json()["decision"]
+    assert second.json()["card_status"] == "created" # 캐시에 저장된 카드 내용을 바로 사용
+    assert fake_ollama_transport.request_count == 2
+
+    stats = client_with_db.get("/api/v1/filter/cache/stats").json()
+    assert stats["hits"] >= 1
+    assert stats["size"] == 1
+
+    result = await async_session.execute(select(models.AnkiCard).where(models.AnkiCard.llm_log_id == int(second.json()["log_id"])))
+    cached_card = result.scalars().first()
+    assert cached_card is not None
+    assert cached_card.student_id == "cache-student-2"
+
+    # 모델 상태가 바뀌면 캐시가 무효화됩니다.
+    llm_filter.model_registry._notify_status_change("v-test", "staging")
+    assert len(llm_filter.judgment_cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_judge_batch_persists_in_order_with_partial_failure(client_with_db: TestClient, async_session: AsyncSession, monkeypatch):
+    import llm_filter
+    from fastapi import HTTPException
+    llm_filter.judgment_cache.clear()
+
+    original_run_judgment = llm_filter.run_judgment
+
+    async def flaky_run_judgment(error_context, *args, **kwargs):
+        if error_context.concept_name == "실패 개념":
+            raise HTTPException(status_code=503, detail="Ollama service is unavailable")
+        return await original_run_judgment(error_context, *args, **kwargs)
+
+    monkeypatch.setattr(llm_filter, "run_judgment", flaky_run_judgment)
+
+    def item(student_id: str, concept: str, mistake: str):
+        return {
+            "student_id": student_id,
+            "submission_id": f"{student_id}-exam-01",
+            "error_context": {"question_type": "MATH", "concept_name": concept, "student_mistake_summary": mistake}
+        }
+
+    response = client_with_db.post("/api/v1/filter/judge/batch", json={
+        "items": [
+            item("batch-1", "이차방정식 근의 공식", "판별식 부호를 반대로 이해함."),
+            item("batch-2", "실패 개념", "아무 내용"),
+            item("batch-3", "덧셈", "단순 계산 실수로 578이라고 씀."),
+        ],
+        "concurrency": 2
+    })
+
+    assert response.status_code == 200
+    body = response.json()
+    assert body["succeeded"] == 2
+    assert body["failed"] == 1
+    assert [r["index"] for r in body["results"]] == [0, 1, 2]
+    assert body["results"][0]["decision"] == "APPROVE"
+    assert body["results"][1]["status"] == "error"
+    assert "unavailable" in body["results"][1]["error"]
+    assert body["results"][2]["decision"] == "REJECT"
+
+    approved_log_id = int(body["results"][0]["log_id"])
+    await card_queue.ensure_cards_for_student(async_session, "batch-1")
+    card_result = await async_session.execute(select(models.AnkiCard).where(models.AnkiCard.llm_log_id == approved_log_id))
+    assert card_result.scalars().first().student_id == "batch-1"
+    rejected_log_id = int(body["results"][2]["log_id"])
+    card_result = await async_session.execute(select(models.AnkiCard).where(models.AnkiCard.llm_log_id == rejected_log_id))
+    assert card_result.scalars().first() is None
+
+
+@pytest.mark.asyncio
+async def test_fused_judge_mode_uses_single_call_and_falls_back_when_incomplete(async_session: AsyncSession, monkeypatch):
+    import llm_filter
+    llm_filter.judgment_cache.clear()
+    # 전체 프롬프트로 호출되도록 prefix 재사용을 끕니다. (call_ollama_api를 대체하기 위함)
+    monkeypatch.setattr(llm_filter, "PROMPT_PREFIX_REUSE", False)
+    context = schemas.ErrorContext(question_type="SCIENCE", concept_name="광합성 장소", student_mistake_summary="미토콘드리아에서 일어난다고 답함.")
+
+    calls = []
+    async def fake_call(prompt, model_name="llama2:latest", timeout=None, route="generic"):
+        calls.append(prompt)
+        if '"question" (string) and "answer" (string). Do not add' in prompt:
+            return {"question": "광합성이 일어나는 세포 소기관은?", "answer": "엽록체"}
+        return {"decision": "APPROVE", "reason": "핵심 개념 오류입니다.", "question": "광합성이 일어나는 곳은?", "answer": "엽록체"}
+    monkeypatch.setattr(llm_filter, "call_ollama_api", fake_call)
+
+    judgment = await llm_filter.run_judgment(context, "llama2:latest", "v-fused", llm_filter.JUDGE_MODE_FUSED)
+    assert judgment["judge_mode"] == "fused"
+    assert judgment["question"] == "광합성이 일어나는 곳은?"
+    assert len(calls) == 1
+
+    # 카드 내용이 빠진 fused 출력은 카드 생성 호출로만 보완합니다.
+    async def incomplete_call(prompt, model_name="llama2:latest", timeout=None, route="generic"):
+        calls.append(prompt)
+        if '"question" (string) and "answer" (string). Do not add' in prompt:
+            return {"question": "광합성이 일어나는 세포 소기관은?", "answer": "엽록체"}
+        return {"decision": "APPROVE", "reason": "핵심 개념 오류입니다.", "question": "", "answer": ""}
+    monkeypatch.setattr(llm_filter, "call_ollama_api", incomplete_call)
+    calls.clear()
+
+    judgment = await llm_filter.run_judgment(context, "llama2:latest", "v-fused-2", llm_filter.JUDGE_MODE_FUSED)
+    assert judgment["judge_mode"] == "fused_fallback"
+    assert judgment["question"] == "광합성이 일어나는 세포 소기관은?"
+    assert len(calls) == 2
+
+    # 같은 컨텍스트는 캐시에서 응답하고, 기록되는 모드도 cache 입니다.
+    calls.clear()
+    judgment = await llm_filter.run_judgment(context, "llama2:latest", "v-fused-2", llm_filter.JUDGE_MODE_FUSED)
+    assert judgment["judge_mode"] == "cache"
+    assert calls == []
+    assert judgment["latency_ms"] >= 0
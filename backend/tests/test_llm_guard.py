@@ -0,0 +1,118 @@
+import asyncio
+import time
+import pytest
+from datetime import date
+
+import httpx
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import llm_filter
+import llm_guard
+import schemas
+from llm_guard import AIMDLimiter, CircuitBreaker, LLMUnavailableError
+
+
+def _server_error():
+    request = httpx.Request("POST", "http://ollama/api/generate")
+    return httpx.HTTPStatusError("500", request=request, response=httpx.Response(500, request=request))
+
+
+@pytest.mark.asyncio
+async def test_limiter_increases_on_fast_success_and_backs_off_on_failure():
+    limiter = AIMDLimiter(initial_limit=4, min_limit=1, max_limit=8, latency_target_ms=1000, backoff_ratio=0.5, decrease_cooldown_seconds=0)
+
+    for _ in range(4):
+        async with limiter.slot():
+            pass
+    assert limiter.limit > 4
+
+    grown = limiter.limit
+    with pytest.raises(httpx.HTTPStatusError):
+        async with limiter.slot():
+            raise _server_error()
+    assert limiter.limit == pytest.approx(grown * 0.5)
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_limiter_queues_then_sheds_load():
+    limiter = AIMDLimiter(initial_limit=1, max_limit=1, max_queue=1, queue_timeout_seconds=0.05)
+    release = asyncio.Event()
+
+    async def hold_slot():
+        async with limiter.slot():
+            await release.wait()
+
+    holder = asyncio.create_task(hold_slot())
+    await asyncio.sleep(0)
+    waiter = asyncio.create_task(limiter.acquire())
+    await asyncio.sleep(0)
+    assert limiter.queue_depth == 1
+
+    # 대기열이 가득 차면 바로 거절합니다.
+    with pytest.raises(LLMUnavailableError):
+        await limiter.acquire()
+    # 대기 시간을 넘기면 거절합니다.
+    with pytest.raises(LLMUnavailableError):
+        await waiter
+    assert limiter.queue_depth == 0
+    assert limiter.rejected == 2
+
+    release.set()
+    await holder
+    assert limiter.inflight == 0
+
+
+@pytest.mark.asyncio
+async def test_breaker_opens_after_consecutive_failures_and_recovers_via_half_open():
+    guard = llm_guard.reset_llm_guard(breaker=CircuitBreaker(failure_threshold=2, reset_seconds=30))
+
+    async def failing():
+        raise _server_error()
+
+    for _ in range(2):
+        with pytest.raises(httpx.HTTPStatusError):
+            await guard.call(failing)
+    assert guard.breaker.state == llm_guard.BREAKER_OPEN
+
+    calls = []
+    async def succeeding():
+        calls.append(1)
+        return "ok"
+
+    with pytest.raises(LLMUnavailableError):
+        await guard.call(succeeding)
+    assert calls == [] # open 상태에서는 백엔드를 호출하지 않습니다.
+
+    guard.breaker.opened_at -= 31
+    assert await guard.call(succeeding) == "ok"
+    assert guard.breaker.state == llm_guard.BREAKER_CLOSED
+
+
+@pytest.mark.asyncio
+async def test_open_breaker_falls_back_to_reject_and_report_fallback(client_with_db: TestClient, async_session: AsyncSession, fake_ollama_transport):
+    llm_filter.judgment_cache.clear()
+    guard = llm_guard.reset_llm_guard(breaker=CircuitBreaker(failure_threshold=1, reset_seconds=30))
+    guard.breaker.record_failure()
+
+    context = schemas.ErrorContext(question_type="SCIENCE", concept_name="광합성", student_mistake_summary="밤에 일어난다고 답변함.")
+    judgment = await llm_filter.run_judgment(context, "llama2:latest", "v-guard")
+    assert judgment["decision"] == "REJECT"
+    assert judgment["judge_mode"] == llm_filter.JUDGE_MODE_FALLBACK
+    assert len(llm_filter.judgment_cache) == 0 # fallback 판단은 캐시하지 않습니다.
+    assert fake_ollama_transport.request_count == 0
+
+    await crud.create_student(async_session, schemas.StudentCreate(student_id="guard-student-1", name="Guard Student"))
+    today = date.today().isoformat()
+    report = client_with_db.get(f"/api/v1/report/student/guard-student-1/period?start_date={today}&end_date={today}")
+    assert report.status_code == 200
+    assert report.json()["overall_summary"] == "LLM 요약 생성 실패"
+    assert fake_ollama_transport.request_count == 0
+
+    status = client_with_db.get("/api/v1/filter/llm/guard").json()
+    assert status["breaker_state"] == "open"
+    assert status["rejected_circuit_open"] >= 1
+    assert status["queue_depth"] == 0
+    assert status["breaker_retry_after_seconds"] > 0
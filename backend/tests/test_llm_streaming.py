@@ -0,0 +1,69 @@
+import pytest
+
+import llm_filter
+import schemas
+from incremental_json import IncrementalJSONObjectParser
+
+
+def test_incremental_parser_emits_fields_as_soon_as_they_complete():
+    parser = IncrementalJSONObjectParser()
+    text = '{"decision": "APPROVE", "score": 123, "reason": "핵심 \\"개념\\" 오류"}'
+
+    emitted = []
+    for char in text:
+        for key, value in parser.feed(char).items():
+            emitted.append((key, value, parser._buffer))
+
+    assert [key for key, _, _ in emitted] == ["decision", "score", "reason"]
+    # decision은 reason이 시작되기 전에 확정됩니다.
+    assert "reason" not in emitted[0][2]
+    # 숫자는 구분자를 본 뒤에 확정되므로 잘린 값(1, 12)이 나오지 않습니다.
+    assert emitted[1][1] == 123
+    assert emitted[2][1] == '핵심 "개념" 오류'
+    assert parser.done
+    assert parser.result() == {"decision": "APPROVE", "score": 123, "reason": '핵심 "개념" 오류'}
+
+
+def test_incremental_parser_rejects_non_object():
+    with pytest.raises(ValueError):
+        IncrementalJSONObjectParser().feed('["APPROVE"]')
+
+
+@pytest.mark.asyncio
+async def test_streaming_call_reports_decision_early_and_records_metrics(fake_ollama_transport):
+    llm_filter.stream_metrics.reset()
+    fake_ollama_transport.configure(token_latency_ms=1)
+    prompt = "[CURRENT TASK] 개념 오류"
+
+    seen = []
+    response = await llm_filter.call_ollama_api_streaming(prompt, on_field=lambda key, value: seen.append(key))
+    assert response == {"decision": "APPROVE", "reason": "핵심 개념을 잘못 이해하고 있습니다."}
+    assert seen == ["decision", "reason"]
+
+    # reason이 필요 없으면 decision만 받고 생성을 중단합니다.
+    response = await llm_filter.call_ollama_api_streaming(prompt, stop_after={"decision"})
+    assert response == {"decision": "APPROVE"}
+
+    metrics = llm_filter.stream_metrics.summary()
+    assert metrics["total_streams"] == 2
+    assert metrics["stopped_early"] == 1
+    assert metrics["ttft_ms_p50"] is not None
+    assert metrics["time_to_decision_ms_p50"] <= metrics["total_ms_p95"]
+
+
+@pytest.mark.asyncio
+async def test_streaming_judge_starts_card_generation_on_decision(fake_ollama_transport, monkeypatch):
+    llm_filter.judgment_cache.clear()
+    monkeypatch.setattr(llm_filter, "JUDGE_STREAMING", True)
+    context = schemas.ErrorContext(question_type="SCIENCE", concept_name="광합성 장소", student_mistake_summary="미토콘드리아에서 일어난다고 답함.")
+
+    judgment = await llm_filter.run_judgment(context, "llama2:latest", "v-stream")
+    assert judgment["decision"] == "APPROVE"
+    assert judgment["question"] == "이 개념의 정확한 정의는 무엇인가요?"
+    assert fake_ollama_transport.request_count == 2
+
+    reject_context = schemas.ErrorContext(question_type="MATH", concept_name="덧셈", student_mistake_summary="단순 계산 실수")
+    judgment = await llm_filter.run_judgment(reject_context, "llama2:latest", "v-stream")
+    assert judgment["decision"] == "REJECT"
+    assert judgment["question"] is None
+    assert fake_ollama_transport.request_count == 3
@@ -0,0 +1,74 @@
+import asyncio
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from fastapi.testclient import TestClient
+
+import fake_ollama
+import llm_filter
+import llm_telemetry
+import models
+
+
+@pytest.fixture
+def telemetry(monkeypatch):
+    fresh = llm_telemetry.LLMTelemetry()
+    monkeypatch.setattr(llm_telemetry, "telemetry", fresh)
+    llm_filter.judgment_cache.clear()
+    return fresh
+
+
+def test_record_from_response_converts_ollama_durations():
+    record = llm_telemetry.record_from_response("judge", "llama2:latest", 12.5, {
+        "prompt_eval_count": 40, "eval_count": 8, "total_duration": 30_000_000, "load_duration": 2_000_000,
+    })
+    assert (record.prompt_eval_count, record.eval_count) == (40, 8)
+    assert (record.total_duration_ms, record.load_duration_ms) == (30.0, 2.0)
+    assert record.eval_duration_ms is None
+
+
+@pytest.mark.asyncio
+async def test_coalesced_calls_are_flagged_and_counted_once_for_tokens(telemetry):
+    fake_ollama.configure(latency_ms=100)
+    prompt = "telemetry coalescing prompt"
+
+    with llm_telemetry.collect_calls() as calls:
+        await asyncio.gather(*(llm_filter.call_ollama_api(prompt, route="report") for _ in range(3)))
+
+    assert fake_ollama.request_count == 1
+    assert sorted(call.coalesced for call in calls) == [False, True, True]
+    leader = next(call for call in calls if not call.coalesced)
+    assert leader.prompt_eval_count and leader.total_duration_ms
+    assert all(call.prompt_eval_count is None for call in calls if call.coalesced)
+
+    text = telemetry.render_prometheus()
+    assert 'pacer_llm_calls_total{model="llama2:latest",route="report",status="ok",coalesced="true"} 2' in text
+    assert f'pacer_llm_prompt_tokens_total{{model="llama2:latest",route="report"}} {leader.prompt_eval_count}' in text
+    assert 'pacer_llm_request_duration_seconds_count{route="report"} 3' in text
+
+
+@pytest.mark.asyncio
+async def test_judge_calls_are_exposed_on_metrics_and_persisted_with_log_id(client_with_db: TestClient, async_session: AsyncSession, telemetry, monkeypatch):
+    monkeypatch.setattr(llm_telemetry, "LLM_CALL_METRICS_PERSIST", True)
+    monkeypatch.setattr(llm_filter, "FAST_PATH_ENABLED", False)
+    request = {
+        "student_id": "telemetry-student",
+        "submission_id": "telemetry-1",
+        "error_context": {"question_type": "HISTORY", "concept_name": "임진왜란 발발 연도", "student_mistake_summary": "텔레메트리 확인용 오답"}
+    }
+    log_id = int(client_with_db.post("/api/v1/filter/judge", json=request).json()["log_id"])
+    # 같은 판단은 캐시에서 응답하므로 LLM 호출 없이 cache hit만 늘어납니다.
+    client_with_db.post("/api/v1/filter/judge", json={**request, "submission_id": "telemetry-2"})
+
+    response = client_with_db.get("/metrics")
+    assert response.status_code == 200
+    assert response.headers["content-type"].startswith("text/plain")
+    assert 'route="judge",status="ok",coalesced="false"} 1' in response.text
+    assert 'pacer_llm_completion_tokens_total{model="llama2:latest",route="judge"}' in response.text
+    assert 'pacer_llm_cache_hits_total{route="judge"} 1' in response.text
+    assert "pacer_llm_queue_depth 0" in response.text
+
+    rows = (await async_session.execute(select(models.LLMCallMetric).where(models.LLMCallMetric.llm_log_id == log_id))).scalars().all()
+    assert {row.route for row in rows} >= {"judge"}
+    assert all(row.status == "ok" and row.eval_count is not None for row in rows if row.route == "judge")
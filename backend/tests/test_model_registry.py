@@ -0,0 +1,86 @@
+import os
+import pytest
+
+import backend.model_registry as registry_module
+import llm_filter
+from backend.model_registry import ModelRegistry, build_routing_snapshot
+
+
+@pytest.fixture
+def registry_file(tmp_path, monkeypatch):
+    path = tmp_path / "model_registry.json"
+    monkeypatch.setattr(registry_module, "REGISTRY_FILE", str(path))
+    monkeypatch.setattr(registry_module, "REGISTRY_RELOAD_CHECK_SECONDS", 0.0)
+    return path
+
+
+def _models():
+    return {
+        "v1": {"production_status": "production", "metadata": {"base_model": "llama2:latest"}},
+        "v2": {"production_status": "staging", "metadata": {"base_model": "mistral:latest", "judge_mode": "fused"}},
+        "v3": {"production_status": "staging", "metadata": {"base_model": "qwen:latest", "traffic_weight": 3}},
+        "v4": {"production_status": "inactive", "metadata": {}},
+    }
+
+
+def test_snapshot_precomputes_weighted_cumulative_splits():
+    snapshot = build_routing_snapshot(_models(), "v1", traffic_split=0.2)
+
+    assert [route.version for route in snapshot.routes] == ["v1", "v2", "v3"]
+    assert snapshot.cumulative_weights == pytest.approx((0.8, 0.85, 1.0))
+    assert snapshot.draw(0.5).version == "v1"
+    assert snapshot.draw(0.82) == registry_module.ModelRoute("v2", "mistral:latest", "staging", "fused")
+    assert snapshot.draw(0.9).version == "v3"
+    assert snapshot.draw(0.999999).version == "v3"
+
+    # 지정한 staging 모델만 트래픽을 받고, 없으면 production으로만 보냅니다.
+    assert [route.version for route in build_routing_snapshot(_models(), "v1", 0.2, staging_version="v3").routes] == ["v1", "v3"]
+    assert [route.version for route in build_routing_snapshot(_models(), "v1", 0.2, staging_version="v9").routes] == ["v1"]
+    # production이 없으면 기본 모델을 사용합니다.
+    assert build_routing_snapshot(_models(), None, 0.2).routes[0].version == registry_module.DEFAULT_MODEL_VERSION
+
+
+def test_snapshot_is_reused_until_status_or_file_changes(registry_file, monkeypatch):
+    api_worker = ModelRegistry()
+    api_worker.register_model("v1", "/models/v1", {}, {"base_model": "llama2:latest"})
+    api_worker.register_model("v2", "/models/v2", {}, {"base_model": "mistral:latest"})
+    api_worker.set_model_production_status("v1", "production")
+
+    snapshot = api_worker.get_routing_snapshot(0.2)
+    assert api_worker.get_routing_snapshot(0.2) is snapshot
+    assert [route.version for route in snapshot.routes] == ["v1"]
+
+    notified = []
+    monkeypatch.setattr(ModelRegistry, "_status_listeners", list(ModelRegistry._status_listeners))
+    ModelRegistry.add_status_listener(lambda version, status: notified.append((version, status)))
+
+    # 다른 프로세스(예: scripts/deploy_model.py)가 파일을 바꾸면 재시작 없이 반영됩니다.
+    deploy_script = ModelRegistry()
+    deploy_script.set_model_production_status("v2", "staging")
+    notified.clear()
+    os.utime(registry_file, ns=(0, os.stat(registry_file).st_mtime_ns + 1_000_000))
+
+    rebuilt = api_worker.get_routing_snapshot(0.2)
+    assert rebuilt is not snapshot
+    assert [route.version for route in rebuilt.routes] == ["v1", "v2"]
+    assert ("v2", "staging") in notified
+
+    # production에서 내린 모델은 더 이상 라우팅되지 않습니다.
+    api_worker.set_model_production_status("v1", "inactive")
+    assert api_worker.get_routing_snapshot(0.2).routes[0].role == "default"
+
+
+def test_select_judge_model_returns_route_version(registry_file, monkeypatch):
+    registry = ModelRegistry()
+    registry.register_model("v1", "/models/v1", {}, {"base_model": "llama2:latest"})
+    registry.register_model("v2", "/models/v2", {}, {"base_model": "mistral:latest", "judge_mode": "fused"})
+    registry.set_model_production_status("v1", "production")
+    registry.set_model_production_status("v2", "staging")
+    monkeypatch.setattr(llm_filter, "model_registry", registry)
+    monkeypatch.setattr(llm_filter, "AB_TEST_TRAFFIC_SPLIT", 0.2)
+    monkeypatch.setattr(llm_filter, "AB_TEST_STAGING_MODEL_VERSION", None)
+
+    monkeypatch.setattr(llm_filter.random, "random", lambda: 0.95)
+    assert llm_filter.select_judge_model() == ("mistral:latest", "v2", "fused")
+    monkeypatch.setattr(llm_filter.random, "random", lambda: 0.1)
+    assert llm_filter.select_judge_model() == ("llama2:latest", "v1", llm_filter.DEFAULT_JUDGE_MODE)
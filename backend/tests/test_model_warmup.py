@@ -0,0 +1,120 @@
+import asyncio
+import httpx
+import pytest
+
+import llm_client
+import llm_filter
+import model_warmup
+import schemas
+from prompt_templates import JUDGE_TEMPLATE, JUDGE_PATH_TEMPLATES, chat_format_for
+
+
+class _StubRegistry:
+    def __init__(self, models):
+        self.models = models
+
+    def list_production_models(self):
+        return self.models
+
+    def get_model(self, version):
+        return next((m for m in self.models if m["version"] == version), None)
+
+
+@pytest.mark.asyncio
+async def test_judge_reuses_prefix_context_after_first_call(fake_ollama_transport, monkeypatch):
+    monkeypatch.setattr(llm_filter, "PROMPT_PREFIX_REUSE", True)
+    llm_filter.judgment_cache.clear()
+    llm_filter.prefix_contexts.clear()
+
+    first = schemas.ErrorContext(question_type="HISTORY", concept_name="임진왜란", student_mistake_summary="1692년이라고 씀.")
+    second = schemas.ErrorContext(question_type="MATH", concept_name="덧셈", student_mistake_summary="단순 계산 실수")
+
+    judgment = await llm_filter.run_judgment(first, "llama2:latest", "v-prefix", generate_card=False)
+    assert judgment["decision"] == "APPROVE"
+    assert fake_ollama_transport.warmup_count == 1 # judge prefix를 한 번 평가
+    assert llm_filter.prefix_contexts.get("llama2:latest", JUDGE_TEMPLATE) is not None
+
+    # 이후 호출은 prefix를 다시 평가하지 않고 suffix만 보냅니다. (fake는 context로 원래 프롬프트를 복원)
+    judgment = await llm_filter.run_judgment(second, "llama2:latest", "v-prefix", generate_card=False)
+    assert judgment["decision"] == "REJECT"
+    assert fake_ollama_transport.warmup_count == 1
+    assert fake_ollama_transport.request_count == 2
+    assert fake_ollama_transport.loaded_models["llama2:latest"] == llm_filter.OLLAMA_KEEP_ALIVE
+
+    # 모델 상태가 바뀌면 prefix context를 다시 만듭니다.
+    llm_filter.model_registry._notify_status_change("v-prefix", "inactive")
+    assert len(llm_filter.prefix_contexts) == 0
+
+
+@pytest.mark.asyncio
+async def test_warm_registry_models_loads_production_and_staging_models(fake_ollama_transport, monkeypatch):
+    monkeypatch.setattr(llm_filter, "PROMPT_PREFIX_REUSE", True)
+    llm_filter.prefix_contexts.clear()
+    registry = _StubRegistry([
+        {"version": "v1", "production_status": "production", "metadata": {"base_model": "llama2:latest"}},
+        {"version": "v2", "production_status": "staging", "metadata": {"base_model": "mistral:latest"}},
+    ])
+
+    warmed = await model_warmup.warm_registry_models(registry)
+
+    assert warmed == ["llama2:latest", "mistral:latest"]
+    assert set(fake_ollama_transport.loaded_models) == {"llama2:latest", "mistral:latest"}
+    # 모델당 로드 1회 + 판단 경로 템플릿 prefix 평가
+    assert fake_ollama_transport.warmup_count == 2 * (1 + len(JUDGE_PATH_TEMPLATES))
+    assert fake_ollama_transport.request_count == 0
+    assert llm_filter.prefix_contexts.get("mistral:latest", JUDGE_TEMPLATE) is not None
+
+
+@pytest.mark.asyncio
+async def test_promotion_schedules_warmup(fake_ollama_transport, monkeypatch):
+    registry = _StubRegistry([{"version": "v3", "production_status": "production", "metadata": {"base_model": "qwen:latest"}}])
+    monkeypatch.setattr(llm_filter, "model_registry", registry)
+
+    model_warmup.on_model_status_change("v3", "production")
+    await asyncio.gather(*model_warmup._pending_warmups)
+
+    assert "qwen:latest" in fake_ollama_transport.loaded_models
+
+
+@pytest.mark.asyncio
+async def test_prefix_reuse_sends_one_raw_chat_turn(fake_ollama_transport, monkeypatch):
+    monkeypatch.setattr(llm_filter, "PROMPT_PREFIX_REUSE", True)
+    llm_filter.judgment_cache.clear()
+    llm_filter.prefix_contexts.clear()
+    payloads = []
+    client = llm_client.get_llm_client()
+    original_generate = client.generate
+
+    async def recording_generate(payload, timeout=None):
+        payloads.append(payload)
+        return await original_generate(payload, timeout=timeout)
+
+    monkeypatch.setattr(client, "generate", recording_generate)
+    fields = {"concept_name": "임진왜란", "student_mistake_summary": "1692년이라고 씀."}
+    await llm_filter.call_ollama_template(JUDGE_TEMPLATE, fields, model_name="llama2:latest")
+
+    # Ollama가 채팅 템플릿을 prefix와 suffix에 따로 적용하지 않도록 둘 다 raw로 보내고, 이어 붙이면 전체 프롬프트의 한 턴이 됩니다.
+    prime, judge = payloads
+    assert prime["raw"] is True and judge["raw"] is True
+    chat = chat_format_for("llama2:latest")
+    assert prime["prompt"] + judge["prompt"] == chat.user_start + JUDGE_TEMPLATE.render(**fields) + chat.assistant_start
+
+    # 채팅 형식을 모르는 모델은 prefix를 재사용하지 않고 전체 프롬프트를 Ollama 템플릿으로 보냅니다.
+    payloads.clear()
+    await llm_filter.call_ollama_template(JUDGE_TEMPLATE, fields, model_name="unknown-model:latest")
+    assert [("raw" in payload, "context" in payload) for payload in payloads] == [(False, False)]
+
+
+@pytest.mark.asyncio
+async def test_prefix_reuse_does_not_resend_full_prompt_on_server_errors(fake_ollama_transport, monkeypatch):
+    monkeypatch.setattr(llm_filter, "PROMPT_PREFIX_REUSE", True)
+    llm_filter.prefix_contexts.clear()
+    fields = {"concept_name": "덧셈", "student_mistake_summary": "단순 계산 실수"}
+    await llm_filter.prime_prompt_prefix(JUDGE_TEMPLATE, "llama2:latest")
+
+    # Ollama 5xx는 context 거부가 아니므로 전체 프롬프트로 다시 보내 부하를 두 배로 만들지 않습니다.
+    fake_ollama_transport.configure(failure_rate=1.0)
+    with pytest.raises(httpx.HTTPStatusError):
+        await llm_filter.call_ollama_template(JUDGE_TEMPLATE, fields, model_name="llama2:latest")
+    assert fake_ollama_transport.request_count == 1
+    assert llm_filter.prefix_contexts.get("llama2:latest", JUDGE_TEMPLATE) is not None
@@ -66,4 +66,28 @@ async def test_get_daily_review_deck_with_budget(client_with_db: TestClient, asy
     # 우선순위가 높은 카드 2개가 반환되었는지 확인 (next_review_date, ease_factor 순)
     # SM2 초기값은 모두 같으므로, card_id 순서대로 반환될 것
     assert deck_data["due_cards"][0]["card_id"] == card1.card_id
-    assert deck_data["due_cards"][1]["card_id"] == card2.card_id
\ No newline at end of file
+    assert deck_data["due_cards"][1]["card_id"] == card2.card_id
+
+@pytest.mark.asyncio
+async def test_daily_review_deck_reads_only_budget_in_priority_order(client_with_db: TestClient, async_session: AsyncSession):
+    student_id = "student-budget-002"
+    await crud.create_student(async_session, student=schemas.StudentCreate(student_id=student_id, name="밀린 학생", settings={"anki_budget_per_day": 3}))
+    today = date.today()
+
+    # (복습일, ease) 조합: 오래된 복습일, 그다음 낮은 ease가 우선
+    schedule = [(3, 250), (10, 250), (10, 130), (1, 130), (0, 250), (-1, 130)]
+    cards = []
+    for index, (days_overdue, ease_factor) in enumerate(schedule):
+        card = await crud.create_anki_card(async_session, card=schemas.AnkiCardCreate(student_id=student_id, llm_log_id=index + 1, question=f"Q{index}", answer="A"))
+        card.next_review_date = today - timedelta(days=days_overdue)
+        card.ease_factor = ease_factor
+        cards.append(card)
+    await async_session.flush()
+
+    response = client_with_db.get(f"/api/v1/student/{student_id}/daily_review_deck")
+
+    assert response.status_code == 200
+    deck_data = response.json()
+    assert deck_data["total_due"] == 5 # 내일 기한인 카드 제외
+    assert deck_data["budget_applied"] is True
+    assert [card["card_id"] for card in deck_data["due_cards"]] == [cards[2].card_id, cards[1].card_id, cards[0].card_id]
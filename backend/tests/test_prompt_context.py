@@ -0,0 +1,71 @@
+import json
+import pytest
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import coaching_generator
+import crud
+import llm_telemetry
+import models
+import schemas
+from prompt_context import ContextBuilder, estimate_tokens
+
+CONCEPTS = [f"개념 {index}" for index in range(10)]
+
+
+def test_builder_round_robins_sections_and_reports_omitted_items():
+    builder = ContextBuilder(token_budget=120)
+    builder.set_header(student_name="홍길동")
+    builder.add_section("a", [{"n": index} for index in range(50)], raw_items=[{"n": index, "padding": "x" * 40} for index in range(50)])
+    builder.add_section("b", [{"m": index} for index in range(50)])
+    context = builder.build()
+
+    assert context.tokens <= 120
+    data = json.loads(context.text)
+    assert abs(context.included["a"] - context.included["b"]) <= 1
+    assert data["omitted"] == {"a": 50 - context.included["a"], "b": 50 - context.included["b"]}
+    assert context.tokens_saved > 0
+
+
+@pytest.mark.asyncio
+async def test_coaching_prompt_stays_under_budget_with_5000_cards(client_with_db: TestClient, async_session: AsyncSession, monkeypatch):
+    student_id = "context-student"
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="컨텍스트 학생"))
+    logs = [
+        models.LLMLog(submission_id=f"{student_id}-{index}", student_id=student_id, concept_name=CONCEPTS[index % 10], decision="APPROVE", reason="핵심 개념을 잘못 이해하고 있습니다. " * 5)
+        for index in range(50)
+    ]
+    await crud.create_llm_logs_bulk(async_session, logs)
+    async_session.add_all([
+        models.AnkiCard(
+            student_id=student_id, llm_log_id=logs[index % 50].log_id,
+            question=f"{CONCEPTS[index % 10]}에 대한 복습 질문 {index}", answer="정답 설명",
+            next_review_date=date.today() + timedelta(days=index % 7), ease_factor=130 + index % 120, repetitions=index % 5
+        )
+        for index in range(5000)
+    ])
+    await crud.create_coach_memo(async_session, schemas.CoachMemoCreate(coach_id="coach", student_id=student_id, memo_text="집중력이 좋아졌습니다."))
+    await async_session.flush()
+
+    prompts = []
+
+    async def capture(prompt, model_name="llama2:latest", timeout=None, route="generic"):
+        prompts.append(prompt)
+        return {"overall_assessment": "ok", "suggestions": []}
+
+    monkeypatch.setattr(coaching_generator, "call_ollama_api", capture)
+    coaching_generator.coaching_cache.clear()
+    monkeypatch.setattr(llm_telemetry, "telemetry", llm_telemetry.LLMTelemetry())
+    response = client_with_db.get(f"/api/v1/coach/student/{student_id}/coaching-suggestions")
+
+    assert response.status_code == 200
+    data_text = prompts[0].split("[STUDENT LEARNING DATA]\n", 1)[1].split("\n\nYour JSON Response:", 1)[0]
+    assert estimate_tokens(data_text) <= coaching_generator.ContextBuilder().token_budget
+    data = json.loads(data_text)
+    # 집계는 잘린 항목과 관계없이 전체 카드를 반영합니다.
+    assert sum(item["cards"] for item in data["concept_summary"]) == 5000
+    assert data["omitted"]["anki_card_progress"] > 4000
+    assert data["coach_memos"][0]["memo"] == "집중력이 좋아졌습니다."
+    assert 'pacer_llm_prompt_context_tokens_saved_total{route="coaching"}' in llm_telemetry.telemetry.render_prometheus()
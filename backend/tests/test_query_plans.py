@@ -0,0 +1,80 @@
+import pytest
+from contextlib import contextmanager
+from datetime import date, timedelta
+
+from sqlalchemy import event
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+
+
+@contextmanager
+def captured_selects(session: AsyncSession):
+    """
+    세션에서 실행된 SELECT 문과 파라미터를 모읍니다.
+    """
+    statements = []
+
+    def before_cursor_execute(conn, cursor, statement, parameters, context, executemany):
+        if statement.lstrip().upper().startswith("SELECT"):
+            statements.append((statement, parameters))
+
+    sync_engine = session.bind.sync_engine
+    event.listen(sync_engine, "before_cursor_execute", before_cursor_execute)
+    try:
+        yield statements
+    finally:
+        event.remove(sync_engine, "before_cursor_execute", before_cursor_execute)
+
+
+async def query_plan(session: AsyncSession, statement: str, parameters) -> str:
+    connection = await session.connection()
+    rows = (await connection.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}", parameters)).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_student_log_queries_use_student_created_at_index(async_session: AsyncSession):
+    today = date.today()
+    with captured_selects(async_session) as statements:
+        await crud.get_llm_logs(async_session, student_id="plan-student", start_date=today - timedelta(days=6), end_date=today)
+        await crud.get_student_data_fingerprint(async_session, "plan-student", today - timedelta(days=6), today)
+
+    log_plan = await query_plan(async_session, *statements[0])
+    assert "USING INDEX ix_llm_logs_student_id_created_at (student_id=? AND created_at>? AND created_at<?)" in log_plan
+    assert "TEMP B-TREE" not in log_plan # created_at 정렬도 인덱스 순서로 처리
+
+    fingerprint_plan = await query_plan(async_session, *statements[1])
+    assert "ix_llm_logs_student_id_created_at" in fingerprint_plan
+    assert "SCAN llm_logs" not in fingerprint_plan
+
+
+@pytest.mark.asyncio
+async def test_coach_log_view_and_feedback_summary_avoid_full_scans(async_session: AsyncSession):
+    today = date.today()
+    with captured_selects(async_session) as statements:
+        await crud.get_llm_logs(async_session, start_date=today - timedelta(days=6), end_date=today)
+        await crud.get_feedback_summary_by_model_version(async_session)
+
+    view_plan = await query_plan(async_session, *statements[0])
+    assert "ix_llm_logs_created_at" in view_plan
+    assert "SCAN llm_logs\n" not in view_plan + "\n"
+
+    summary_plan = await query_plan(async_session, *statements[1])
+    assert "COVERING INDEX ix_llm_logs_model_version_coach_feedback" in summary_plan
+    assert "TEMP B-TREE" not in summary_plan
+
+
+@pytest.mark.asyncio
+async def test_due_card_queries_use_due_index_without_sorting(async_session: AsyncSession):
+    today = date.today()
+    with captured_selects(async_session) as statements:
+        await crud.count_due_anki_cards(async_session, "plan-student", today)
+        await crud.get_due_anki_cards(async_session, "plan-student", today, limit=20)
+
+    count_plan = await query_plan(async_session, *statements[0])
+    assert "COVERING INDEX ix_anki_cards_student_id_next_review_date_ease_factor (student_id=? AND next_review_date<?)" in count_plan
+
+    deck_plan = await query_plan(async_session, *statements[1])
+    assert "ix_anki_cards_student_id_next_review_date_ease_factor (student_id=? AND next_review_date<?)" in deck_plan
+    assert "TEMP B-TREE" not in deck_plan # ORDER BY ... LIMIT이 인덱스 순서로 처리되어 예산만큼만 읽음
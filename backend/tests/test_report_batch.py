@@ -0,0 +1,66 @@
+import pytest
+import pytest_asyncio
+from datetime import date, timedelta
+
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+from sqlalchemy.future import select
+
+import crud
+import models
+import report_batch
+import report_generator
+import schemas
+from database import Base
+
+
+@pytest_asyncio.fixture
+async def batch_session_factory(tmp_path):
+    # 워커마다 자기 세션(연결)을 쓰므로 테스트 트랜잭션을 공유하지 않는 파일 DB를 사용합니다.
+    engine = create_async_engine(f"sqlite+aiosqlite:///{tmp_path / 'batch.db'}")
+    async with engine.begin() as conn:
+        await conn.run_sync(Base.metadata.create_all)
+    factory = async_sessionmaker(engine, class_=AsyncSession, expire_on_commit=False)
+    async with factory() as db:
+        for index in range(6):
+            student_id = f"batch-{index}"
+            await crud.create_student(db, schemas.StudentCreate(student_id=student_id, name=f"학생{index}"))
+            await crud.create_llm_log(db, submission_id=f"{student_id}-1", student_id=student_id, decision="REJECT", reason="혼동", concept_name="개념", model_version="v1")
+        await db.commit()
+    yield factory
+    await engine.dispose()
+
+
+@pytest.mark.asyncio
+async def test_run_batch_generates_all_drafts_and_resumes_failed_students(batch_session_factory, monkeypatch):
+    start_date, end_date = date.today() - timedelta(days=6), date.today()
+    generate = report_generator.generate_weekly_report_draft
+
+    async def flaky_generate(db, student_id, *args, **kwargs):
+        if student_id == "batch-3":
+            raise RuntimeError("LLM server went away")
+        return await generate(db, student_id, *args, **kwargs)
+
+    monkeypatch.setattr(report_generator, "generate_weekly_report_draft", flaky_generate)
+    progress = []
+    stats = await report_batch.run_batch(start_date, end_date, concurrency=3, session_factory=batch_session_factory, on_progress=progress.append)
+
+    assert (stats.total, stats.done, stats.failed, stats.skipped) == (6, 5, 1, 0)
+    assert len(stats.latencies_ms) == 5
+    assert stats.to_dict()["latency_ms"]["p95"] is not None
+    assert progress[-1]["processed"] == 6
+    async with batch_session_factory() as db:
+        items = {item.student_id: item for item in (await db.execute(select(models.ReportBatchItem))).scalars().all()}
+        drafts = (await db.execute(select(models.WeeklyReport))).scalars().all()
+    assert items["batch-3"].status == report_batch.FAILED and "went away" in items["batch-3"].last_error
+    assert {item.status for student_id, item in items.items() if student_id != "batch-3"} == {report_batch.DONE}
+    assert sorted(draft.student_id for draft in drafts) == ["batch-0", "batch-1", "batch-2", "batch-4", "batch-5"]
+
+    # 같은 기간을 다시 실행하면 done인 학생은 건너뛰고 실패한 학생만 처리합니다.
+    monkeypatch.setattr(report_generator, "generate_weekly_report_draft", generate)
+    resumed = await report_batch.run_batch(start_date, end_date, concurrency=3, session_factory=batch_session_factory)
+
+    assert (resumed.total, resumed.done, resumed.failed, resumed.skipped) == (6, 1, 0, 5)
+    async with batch_session_factory() as db:
+        retried = (await db.execute(select(models.ReportBatchItem).where(models.ReportBatchItem.student_id == "batch-3"))).scalars().one()
+    assert (retried.status, retried.attempts, retried.last_error) == (report_batch.DONE, 2, None)
+    assert retried.report_id is not None
@@ -0,0 +1,89 @@
+import pytest
+from contextlib import asynccontextmanager
+from datetime import date, datetime, timedelta
+
+from sqlalchemy import insert
+from sqlalchemy.ext.asyncio import AsyncSession
+
+import crud
+import models
+import schemas
+from report_data import load_report_data
+from tests.test_query_plans import captured_selects, query_plan
+
+OTHER_STUDENTS = 10_000
+
+
+@asynccontextmanager
+async def counted_vm_steps(session: AsyncSession):
+    """
+    SQLite가 실행한 VM 명령 수(10단위)를 셉니다. 실행 시간과 달리 환경에 따라 흔들리지 않아 읽은 양의 비교에 씁니다.
+    """
+    steps = [0]
+
+    def progress():
+        steps[0] += 1
+        return 0
+
+    raw_connection = await (await session.connection()).get_raw_connection()
+    await raw_connection.driver_connection.set_progress_handler(progress, 10)
+    try:
+        yield steps
+    finally:
+        await raw_connection.driver_connection.set_progress_handler(None, 10)
+
+
+async def seed_school(session: AsyncSession, student_count: int, now: datetime):
+    # 다른 학생마다 기간 안의 판단 3건, 카드 2장(1장은 복습), 메모 1건
+    await session.execute(insert(models.Student), [{"student_id": f"other-{index:05d}", "name": f"학생{index}", "settings": {}} for index in range(student_count)])
+    await session.execute(insert(models.LLMLog), [
+        {"submission_id": f"other-{index:05d}-{n}", "student_id": f"other-{index:05d}", "decision": "REJECT", "concept_name": f"concept-{n}", "created_at": now}
+        for index in range(student_count) for n in range(3)
+    ])
+    await session.execute(insert(models.AnkiCard), [
+        {"student_id": f"other-{index:05d}", "llm_log_id": 1, "question": "Q", "answer": "A", "next_review_date": now.date(), "created_at": now, "last_reviewed_at": now if n else None}
+        for index in range(student_count) for n in range(2)
+    ])
+    await session.execute(insert(models.CoachMemo), [
+        {"coach_id": "coach", "student_id": f"other-{index:05d}", "memo_text": "memo", "created_at": now}
+        for index in range(student_count)
+    ])
+
+
+@pytest.mark.asyncio
+async def test_report_data_is_scoped_to_the_student(async_session: AsyncSession):
+    student_id = "report-data-001"
+    today = date.today()
+    start_date, end_date = today - timedelta(days=6), today
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="리포트 학생"))
+
+    # 기간 전의 판단으로 만든 카드를 이번 기간에 복습: concept_name은 join으로 채워야 합니다.
+    old_log = await crud.create_llm_log(async_session, submission_id=f"{student_id}-old", student_id=student_id, decision="REJECT", reason="연도 혼동", concept_name="임진왜란", model_version="test_v1.0")
+    old_log.created_at = datetime.now() - timedelta(days=30)
+    old_card = await crud.create_anki_card(async_session, schemas.AnkiCardCreate(student_id=student_id, llm_log_id=old_log.log_id, question="Q-old", answer="A"))
+    old_card.created_at = datetime.now() - timedelta(days=30)
+    await async_session.flush()
+    await crud.update_anki_card_schedule(async_session, card_id=old_card.card_id, quality=4)
+
+    new_log = await crud.create_llm_log(async_session, submission_id=f"{student_id}-new", student_id=student_id, decision="REJECT", reason="인물 혼동", concept_name="병자호란", model_version="test_v1.0")
+    await crud.create_anki_card(async_session, schemas.AnkiCardCreate(student_id=student_id, llm_log_id=new_log.log_id, question="Q-new", answer="A"))
+    await crud.create_coach_memo(async_session, schemas.CoachMemoCreate(coach_id="coach", student_id=student_id, memo_text="이번 주 메모"))
+
+    async with counted_vm_steps(async_session) as steps_alone:
+        alone = await load_report_data(async_session, student_id, start_date, end_date)
+
+    await seed_school(async_session, OTHER_STUDENTS, datetime.now())
+    with captured_selects(async_session) as statements:
+        async with counted_vm_steps(async_session) as steps_in_school:
+            data = await load_report_data(async_session, student_id, start_date, end_date)
+
+    assert [log.log_id for log in data.logs] == [log.log_id for log in alone.logs] == [new_log.log_id]
+    assert {card.question: concept for card, concept in data.cards} == {"Q-old": "임진왜란", "Q-new": "병자호란"}
+    assert (data.judgments_count, data.new_cards_count, data.reviewed_cards_count, len(data.memos)) == (1, 1, 1, 1)
+
+    # 다른 학생 10,000명의 활동(판단 30,000건, 카드 20,000장, 메모 10,000건)이 더해져도 읽는 양은 그대로입니다.
+    assert steps_in_school[0] <= steps_alone[0] * 2 + 5
+    for statement, parameters in statements:
+        plan = await query_plan(async_session, statement, parameters)
+        for table in ("llm_logs", "anki_cards", "coach_memos"):
+            assert f"SCAN {table}" not in plan, plan
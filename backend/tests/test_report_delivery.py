@@ -0,0 +1,191 @@
+import asyncio
+import pytest
+import time
+from datetime import date, datetime, timedelta
+
+from fastapi.testclient import TestClient
+from sqlalchemy import event, update
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+
+import crud
+import fake_kakao
+import kakao_sender
+import models
+import report_delivery
+import schemas
+
+
+REPORT_FIELDS = dict(total_submissions=0, llm_judgments_count=3, anki_cards_reviewed_count=2, new_anki_cards_created_count=1,
+                     anki_card_summaries=[], llm_log_summaries=[], coach_memo_summaries=[], overall_summary="요약", coach_comment=None)
+
+
+async def create_draft(db: AsyncSession, student_id: str, kakao_ids) -> int:
+    await crud.create_student(db, schemas.StudentCreate(student_id=student_id, name=f"{student_id} 학생"))
+    for index, kakao_id in enumerate(kakao_ids):
+        parent = await crud.create_parent(db, schemas.ParentCreate(name=f"{student_id} 학부모{index}", kakao_user_id=kakao_id))
+        await crud.assign_parent_to_student(db, student_id, parent.parent_id)
+    report = models.WeeklyReport(student_id=student_id, student_name=f"{student_id} 학생", report_period_start=date.today() - timedelta(days=6),
+                                 report_period_end=date.today(), status="draft", **REPORT_FIELDS)
+    db.add(report)
+    await db.flush()
+    return report.report_id
+
+
+async def report_statuses(db: AsyncSession) -> dict:
+    return dict((await db.execute(select(models.WeeklyReport.student_id, models.WeeklyReport.status).execution_options(populate_existing=True))).all())
+
+
+@pytest.mark.asyncio
+async def test_finalize_queues_deliveries_without_calling_kakao(client_with_db: TestClient, async_session: AsyncSession):
+    small = await create_draft(async_session, "family-small", ["kakao-s1", None])
+    large = await create_draft(async_session, "family-large", [f"kakao-l{index}" for index in range(20)])
+
+    statement_counts = []
+    for report_id in (small, large):
+        statements = []
+        listener = lambda conn, cursor, statement, *args: statements.append(statement)
+        event.listen(async_session.bind.sync_engine, "before_cursor_execute", listener)
+        try:
+            response = client_with_db.put(f"/api/v1/report/{report_id}/finalize", json={"coach_comment": "잘했어요"})
+        finally:
+            event.remove(async_session.bind.sync_engine, "before_cursor_execute", listener)
+        assert response.status_code == 200
+        assert response.json()["status"] == report_delivery.REPORT_SENDING
+        statement_counts.append(len(statements))
+
+    # 학부모 수와 관계없이 같은 수의 SQL 문으로 outbox를 쌓고, 카카오 API는 호출하지 않습니다.
+    assert statement_counts[0] == statement_counts[1]
+    assert fake_kakao.request_count == 0
+    deliveries = (await async_session.execute(select(models.ReportDelivery).order_by(models.ReportDelivery.delivery_id))).scalars().all()
+    assert len(deliveries) == 21
+    assert {delivery.status for delivery in deliveries} == {report_delivery.PENDING}
+    assert deliveries[0].dedupe_key == report_delivery.dedupe_key(small, deliveries[0].parent_id)
+
+    # 다시 발송을 요청해도 dedupe_key로 같은 수신자 행을 중복해서 만들지 않습니다.
+    response = client_with_db.post(f"/api/v1/report/{large}/send")
+    assert response.status_code == 202
+    assert response.json() == {"report_id": large, "status": "sending", "pending": 20, "running": 0, "sent": 0, "failed": 0}
+    assert client_with_db.post("/api/v1/report/send-finalized").json() == {"reports": 0, "queued": 0}
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_drains_outbox_and_tracks_report_status(client_with_db: TestClient, async_session: AsyncSession, session_factory):
+    fake_kakao.configure(invalid_receivers={"kakao-gone"})
+    report_ids = {
+        student_id: await create_draft(async_session, student_id, kakao_ids)
+        for student_id, kakao_ids in {"family-a": ["kakao-a1", "kakao-a2"], "family-b": ["kakao-b1", "kakao-gone"], "family-c": ["kakao-c1"]}.items()
+    }
+    for report_id in report_ids.values():
+        await crud.finalize_weekly_report(async_session, report_id, schemas.WeeklyReportFinalize(coach_comment="잘했어요"))
+    # 이전 방식으로 승인만 되어 있던 리포트도 send-finalized로 대기열에 넣을 수 있습니다.
+    assert client_with_db.post("/api/v1/report/send-finalized").json() == {"reports": 3, "queued": 5}
+
+    assert await report_delivery.dispatch_once(session_factory, batch_size=3) == 3
+    assert await report_delivery.dispatch_once(session_factory, batch_size=3) == 2
+    assert await report_delivery.dispatch_once(session_factory, batch_size=3) == 0
+
+    assert sorted(message["receiver_uuid"] for message in fake_kakao.sent_messages) == ["kakao-a1", "kakao-a2", "kakao-b1", "kakao-c1"]
+    assert await report_statuses(async_session) == {"family-a": "sent", "family-b": "send_failed", "family-c": "sent"}
+    response = client_with_db.get(f"/api/v1/report/{report_ids['family-b']}/delivery")
+    assert response.json() == {"report_id": report_ids["family-b"], "status": "send_failed", "pending": 0, "running": 0, "sent": 1, "failed": 1}
+
+    # 실패한 리포트를 다시 발송 요청하면 실패한 학부모에게만 다시 보냅니다.
+    fake_kakao.configure()
+    response = client_with_db.post(f"/api/v1/report/{report_ids['family-b']}/send")
+    assert response.json()["pending"] == 1 and response.json()["status"] == "sending"
+    assert await report_delivery.dispatch_once(session_factory) == 1
+    assert [message["receiver_uuid"] for message in fake_kakao.sent_messages] == ["kakao-gone"]
+    assert (await report_statuses(async_session))["family-b"] == "sent"
+
+
+@pytest.mark.asyncio
+async def test_dispatcher_retries_transient_failures_and_recovers_expired_leases(async_session: AsyncSession, session_factory, monkeypatch):
+    monkeypatch.setattr(kakao_sender, "KAKAO_BACKOFF_BASE_SECONDS", 0.001)
+    report_id = await create_draft(async_session, "family-retry", ["kakao-r1", "kakao-r2"])
+    await crud.finalize_weekly_report(async_session, report_id, schemas.WeeklyReportFinalize(coach_comment="잘했어요"))
+    await report_delivery.enqueue_report_deliveries(async_session, [report_id])
+
+    # 클라이언트 재시도까지 모두 실패하면 backoff 후 다시 보낼 수 있도록 pending으로 돌아갑니다.
+    fake_kakao.configure(failure_rate=1.0)
+    assert await report_delivery.dispatch_once(session_factory) == 2
+    deliveries = (await async_session.execute(select(models.ReportDelivery).execution_options(populate_existing=True))).scalars().all()
+    assert {(delivery.status, delivery.attempts) for delivery in deliveries} == {(report_delivery.PENDING, 1)}
+    assert all(delivery.next_attempt_at > datetime.utcnow() and "503" in delivery.last_error for delivery in deliveries)
+    assert await report_delivery.dispatch_once(session_factory) == 0
+
+    # dispatcher가 claim한 뒤 중단되면 lease가 만료된 행을 다시 가져가 보냅니다.
+    await async_session.execute(update(models.ReportDelivery).values(next_attempt_at=None))
+    stuck = await report_delivery.claim_deliveries(async_session, limit=1)
+    await async_session.execute(
+        update(models.ReportDelivery)
+        .where(models.ReportDelivery.delivery_id == stuck[0].delivery_id)
+        .values(locked_at=datetime.utcnow() - timedelta(seconds=report_delivery.REPORT_DELIVERY_LEASE_SECONDS + 1))
+    )
+    fake_kakao.configure()
+    assert await report_delivery.dispatch_once(session_factory) == 2
+    # 중단된 dispatcher가 뒤늦게 결과를 기록하려 해도 lease를 잃었으므로 무시됩니다.
+    assert await report_delivery.record_results(async_session, [report_delivery.DeliveryResult(stuck[0], False, False, "late")]) == 0
+
+    assert sorted(message["receiver_uuid"] for message in fake_kakao.sent_messages) == ["kakao-r1", "kakao-r2"]
+    assert (await report_statuses(async_session))["family-retry"] == "sent"
+
+
+@pytest.mark.asyncio
+async def test_kakao_client_retries_transient_failures(monkeypatch):
+    monkeypatch.setattr(kakao_sender, "KAKAO_BACKOFF_BASE_SECONDS", 0.001)
+    fake_kakao.configure(failure_rate=0.5, seed=7)
+    client = kakao_sender.KakaoClient(rate_per_second=0, max_attempts=10)
+
+    results = [await client.send_message(f"kakao-{index}", {"object_type": "text"}) for index in range(10)]
+
+    assert len(fake_kakao.sent_messages) == 10
+    assert fake_kakao.request_count == sum(result["attempts"] for result in results) > 10
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_kakao_client_stays_under_the_rate_limit():
+    # 토큰 버킷은 어느 1초 구간에서도 burst + rate개까지만 보내므로, 그 합을 카카오 초당 한도 이하로 맞춥니다.
+    fake_kakao.configure(rate_limit_per_second=10)
+    client = kakao_sender.KakaoClient(rate_per_second=5, burst=5, max_concurrent_sends=4)
+
+    started = time.monotonic()
+    await asyncio.gather(*(client.send_message(f"kakao-{index}", {"object_type": "text"}) for index in range(10)))
+    elapsed = time.monotonic() - started
+
+    # 5개는 바로, 나머지 5개는 초당 5개씩 보내 1초 가까이 걸리고 429는 한 번도 받지 않습니다.
+    assert len(fake_kakao.sent_messages) == 10
+    assert fake_kakao.rate_limited_count == 0
+    assert elapsed >= 0.9
+    assert fake_kakao.max_inflight <= 4
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_kakao_client_does_not_retry_invalid_receivers():
+    fake_kakao.configure(invalid_receivers={"kakao-gone"})
+    client = kakao_sender.KakaoClient(rate_per_second=0)
+
+    with pytest.raises(kakao_sender.KakaoSendError) as error:
+        await client.send_message("kakao-gone", {"object_type": "text"})
+
+    assert (error.value.retryable, error.value.status_code, error.value.attempts) == (False, 400, 1)
+    assert fake_kakao.request_count == 1
+    await client.aclose()
+
+
+@pytest.mark.asyncio
+async def test_send_finalized_pages_past_reports_without_recipients(client_with_db: TestClient, async_session: AsyncSession):
+    # 수신자가 없는 오래된 리포트가 limit을 채워도 뒤의 리포트가 대기열에 들어갑니다.
+    report_ids = [
+        await create_draft(async_session, student_id, kakao_ids)
+        for student_id, kakao_ids in [("page-none-1", [None]), ("page-none-2", []), ("page-kakao-1", ["kakao-p1"]), ("page-kakao-2", ["kakao-p2"])]
+    ]
+    for report_id in report_ids:
+        await crud.finalize_weekly_report(async_session, report_id, schemas.WeeklyReportFinalize(coach_comment="잘했어요"))
+
+    assert client_with_db.post("/api/v1/report/send-finalized?limit=1").json() == {"reports": 1, "queued": 1}
+    assert client_with_db.post("/api/v1/report/send-finalized?limit=1").json() == {"reports": 1, "queued": 1}
+    assert client_with_db.post("/api/v1/report/send-finalized?limit=1").json() == {"reports": 0, "queued": 0}
+    assert (await report_statuses(async_session)) == {"page-none-1": "finalized", "page-none-2": "finalized", "page-kakao-1": "sending", "page-kakao-2": "sending"}
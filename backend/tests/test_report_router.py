@@ -1,7 +1,8 @@
 import pytest
 from fastapi.testclient import TestClient
 from sqlalchemy.ext.asyncio import AsyncSession
-from datetime import date, timedelta
+from datetime import date, datetime, timedelta
+from sqlalchemy.future import select
 
 import crud
 import schemas
@@ -18,8 +19,8 @@ async def test_generate_weekly_report(client_with_db: TestClient, async_session:
     await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="Report Test Student"))
 
     # Create LLM Logs
-    await crud.create_llm_log(async_session, submission_id="sub-001", decision="APPROVE", reason="Concept error", concept_name="Test Concept 1", model_version="test_v1.0")
-    await crud.create_llm_log(async_session, submission_id="sub-002", decision="REJECT", reason="Typo", concept_name="Test Concept 2", model_version="test_v1.0")
+    await crud.create_llm_log(async_session, submission_id="sub-001", student_id=student_id, decision="APPROVE", reason="Concept error", concept_name="Test Concept 1", model_version="test_v1.0")
+    await crud.create_llm_log(async_session, submission_id="sub-002", student_id=student_id, decision="REJECT", reason="Typo", concept_name="Test Concept 2", model_version="test_v1.0")
 
     # Create Anki Cards and simulate review
     card1 = await crud.create_anki_card(async_session, schemas.AnkiCardCreate(student_id=student_id, llm_log_id=1, question="Q1", answer="A1"))
@@ -70,3 +71,79 @@ async def test_generate_weekly_report_student_not_found(client_with_db: TestClie
 
     assert response.status_code == 404
     assert "Student not found" in response.json()["detail"]
+
+@pytest.mark.asyncio
+async def test_weekly_report_draft_is_reused_until_data_changes(client_with_db: TestClient, async_session: AsyncSession):
+    import fake_ollama
+
+    student_id = "student-report-reuse"
+    params = {"start_date": (date.today() - timedelta(days=6)).isoformat(), "end_date": date.today().isoformat()}
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="Reuse Student"))
+    await crud.create_llm_log(async_session, submission_id=f"{student_id}-1", student_id=student_id, decision="REJECT", reason="Typo", concept_name="Concept", model_version="test_v1.0")
+
+    first = client_with_db.get(f"/api/v1/report/student/{student_id}/period", params=params).json()
+    calls_after_first = fake_ollama.request_count
+    assert calls_after_first >= 1
+
+    # 새로고침: 데이터가 그대로면 LLM 호출 없이 같은 초안
+    second = client_with_db.get(f"/api/v1/report/student/{student_id}/period", params=params).json()
+    assert second["report_id"] == first["report_id"]
+    assert fake_ollama.request_count == calls_after_first
+
+    # 데이터가 바뀌면 같은 초안을 다시 생성
+    await crud.create_coach_memo(async_session, schemas.CoachMemoCreate(coach_id="coach-1", student_id=student_id, memo_text="New memo"))
+    third = client_with_db.get(f"/api/v1/report/student/{student_id}/period", params=params).json()
+    assert third["report_id"] == first["report_id"]
+    assert len(third["coach_memo_summaries"]) == 1
+    calls_after_third = fake_ollama.request_count
+    assert calls_after_third > calls_after_first
+
+    # regenerate=true는 데이터가 같아도 다시 생성
+    fourth = client_with_db.get(f"/api/v1/report/student/{student_id}/period", params={**params, "regenerate": "true"}).json()
+    assert fourth["report_id"] == first["report_id"]
+    assert fake_ollama.request_count == calls_after_third + 1
+
+    drafts = (await async_session.execute(select(models.WeeklyReport).where(models.WeeklyReport.student_id == student_id))).scalars().all()
+    assert len(drafts) == 1
+
+@pytest.mark.asyncio
+async def test_concurrent_draft_insert_returns_existing_draft(async_session: AsyncSession):
+    student_id = "student-report-race"
+    start_date, end_date = date.today() - timedelta(days=6), date.today()
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="Race Student"))
+    report_data = schemas.WeeklyReportResponse(
+        report_id=0, student_id=student_id, student_name="Race Student", report_period_start=start_date, report_period_end=end_date,
+        total_submissions=0, llm_judgments_count=0, anki_cards_reviewed_count=0, new_anki_cards_created_count=0,
+        anki_card_summaries=[], llm_log_summaries=[], coach_memo_summaries=[], overall_summary="summary",
+        status="draft", created_at=datetime.now(),
+    )
+
+    first = await crud.save_weekly_report_draft(async_session, report_data, data_fingerprint="a")
+    # 다른 요청이 기존 초안을 보지 못하고 같은 기간의 초안을 삽입하려는 경우
+    second = await crud.save_weekly_report_draft(async_session, report_data, data_fingerprint="b")
+    assert second.report_id == first.report_id
+
+    # 승인된 리포트는 유니크 인덱스 대상이 아니므로 새 초안을 만들 수 있습니다.
+    first.status = "finalized"
+    await async_session.flush()
+    third = await crud.save_weekly_report_draft(async_session, report_data, data_fingerprint="c")
+    assert third.report_id != first.report_id
+
+@pytest.mark.asyncio
+async def test_prune_stale_report_drafts_keeps_finalized_reports(async_session: AsyncSession, session_factory):
+    import report_generator
+
+    student_id = "student-report-prune"
+    await crud.create_student(async_session, schemas.StudentCreate(student_id=student_id, name="Prune Student"))
+    fields = dict(student_id=student_id, student_name="Prune Student", total_submissions=0, llm_judgments_count=0, anki_cards_reviewed_count=0,
+                  new_anki_cards_created_count=0, anki_card_summaries=[], llm_log_summaries=[], coach_memo_summaries=[], overall_summary="summary")
+    old = datetime.utcnow() - timedelta(days=30)
+    stale_draft = models.WeeklyReport(**fields, report_period_start=date(2026, 1, 5), report_period_end=date(2026, 1, 11), status="draft", created_at=old)
+    finalized = models.WeeklyReport(**fields, report_period_start=date(2026, 1, 12), report_period_end=date(2026, 1, 18), status="finalized", created_at=old)
+    fresh_draft = models.WeeklyReport(**fields, report_period_start=date(2026, 1, 19), report_period_end=date(2026, 1, 25), status="draft")
+    async_session.add_all([stale_draft, finalized, fresh_draft])
+    await async_session.flush()
+
+    assert await report_generator.prune_stale_drafts(session_factory=session_factory, retention_days=14) == 1
+    remaining = (await async_session.execute(select(models.WeeklyReport.status).where(models.WeeklyReport.student_id == student_id))).scalars().all()
+    assert sorted(remaining) == ["draft", "finalized"]
@@ -0,0 +1,63 @@
+import json
+import os
+import pytest
+
+import ai_module
+import schemas
+from rule_engine import AhoCorasick, RuleEngine
+
+
+def _write_rules(path, assignment_id, rules):
+    path.write_text(json.dumps({"assignments": [{"assignment_id": assignment_id, "rules": rules}]}, ensure_ascii=False), encoding="utf-8")
+
+
+def _context(summary):
+    return {"question_type": "HISTORY", "concept_name": "임진왜란 발발 연도", "student_mistake_summary": summary}
+
+
+def test_aho_corasick_finds_overlapping_keywords():
+    keywords = ["he", "she", "his", "hers", "임진", "임진왜란"]
+    matcher = AhoCorasick(keywords)
+
+    matched = matcher.search("ushers 임진왜란")
+    found = {keyword for index, keyword in enumerate(keywords) if matched >> index & 1}
+
+    assert found == {"he", "she", "hers", "임진", "임진왜란"}
+    assert matcher.search("nothing here") == 1 # "he"
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize("answer, expected_summary", [
+    ("임진왜란은 1592년? 1692년?", "1592년을 1692년으로 잘못 기재함."),
+    ("임진왜란은 조선 시대에 일어났다.", "임진왜란 연도를 정확히 알지 못함."),
+    ("임진왜란은 1592년에 일어났다.", None),
+    ("병자호란", None),
+])
+async def test_bundled_history_rules_match_previous_behaviour(answer, expected_summary):
+    result = await ai_module.analyze_submission(schemas.SubmissionRequest(student_id="s", assignment_id="history-01", answer=answer))
+
+    assert (result.student_mistake_summary if result else None) == expected_summary
+
+
+@pytest.mark.asyncio
+async def test_unknown_assignment_has_no_error_context():
+    assert await ai_module.analyze_submission(schemas.SubmissionRequest(student_id="s", assignment_id="math-99", answer="1592 1692")) is None
+
+
+def test_rules_hot_reload_and_keep_previous_rules_on_error(tmp_path):
+    rules_file = tmp_path / "rules.json"
+    _write_rules(rules_file, "quiz-01", [{"any": ["사과", "배"], "error_context": _context("과일")}])
+    engine = RuleEngine(str(tmp_path), reload_check_seconds=0.0)
+
+    assert engine.analyze("quiz-01", "배가 고프다").student_mistake_summary == "과일"
+    assert engine.analyze("quiz-01", "포도") is None
+
+    _write_rules(rules_file, "quiz-01", [{"any": ["포도"], "error_context": _context("포도")}])
+    os.utime(rules_file, ns=(0, os.stat(rules_file).st_mtime_ns + 1_000_000_000))
+    assert engine.analyze("quiz-01", "포도").student_mistake_summary == "포도"
+
+    # 잘못된 규칙 파일은 적용하지 않고 이전 규칙을 유지합니다.
+    _write_rules(rules_file, "quiz-01", [{"any": ["귤"], "error_context": {"question_type": "HISTORY"}}])
+    os.utime(rules_file, ns=(0, os.stat(rules_file).st_mtime_ns + 1_000_000_000))
+    assert engine.analyze("quiz-01", "포도").student_mistake_summary == "포도"
+    assert engine.analyze("quiz-01", "귤") is None
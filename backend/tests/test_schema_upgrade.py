@@ -0,0 +1,164 @@
+import sqlite3
+
+import pytest
+import pytest_asyncio
+from fastapi.testclient import TestClient
+from sqlalchemy import inspect, text
+from sqlalchemy.ext.asyncio import AsyncSession, async_sessionmaker, create_async_engine
+
+import schema_upgrade
+from database import Base
+from llm_filter import get_db
+from main import app
+
+
+# 이 변경 이전 버전의 create_all로 만들어진 pacer.db의 스키마
+BASELINE_SCHEMA = """
+CREATE TABLE coach_memos (
+    memo_id INTEGER NOT NULL, coach_id VARCHAR NOT NULL, student_id VARCHAR NOT NULL, memo_text TEXT NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (memo_id)
+);
+CREATE INDEX ix_coach_memos_memo_id ON coach_memos (memo_id);
+CREATE TABLE llm_logs (
+    log_id INTEGER NOT NULL, submission_id VARCHAR NOT NULL, coach_id VARCHAR, concept_name VARCHAR, model_version VARCHAR,
+    decision VARCHAR NOT NULL, reason TEXT, coach_feedback VARCHAR, reason_code VARCHAR, memo TEXT,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, PRIMARY KEY (log_id)
+);
+CREATE INDEX ix_llm_logs_log_id ON llm_logs (log_id);
+CREATE TABLE parents (parent_id INTEGER NOT NULL, name VARCHAR NOT NULL, kakao_user_id VARCHAR, PRIMARY KEY (parent_id));
+CREATE UNIQUE INDEX ix_parents_kakao_user_id ON parents (kakao_user_id);
+CREATE INDEX ix_parents_parent_id ON parents (parent_id);
+CREATE TABLE students (student_id VARCHAR NOT NULL, name VARCHAR NOT NULL, settings JSON NOT NULL, PRIMARY KEY (student_id));
+CREATE INDEX ix_students_student_id ON students (student_id);
+CREATE TABLE anki_cards (
+    card_id INTEGER NOT NULL, student_id VARCHAR NOT NULL, llm_log_id INTEGER NOT NULL, question TEXT NOT NULL, answer TEXT NOT NULL,
+    next_review_date DATE NOT NULL, interval_days INTEGER NOT NULL, ease_factor INTEGER NOT NULL, repetitions INTEGER NOT NULL,
+    last_reviewed_at TIMESTAMP, created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP,
+    PRIMARY KEY (card_id), FOREIGN KEY(llm_log_id) REFERENCES llm_logs (log_id)
+);
+CREATE INDEX ix_anki_cards_card_id ON anki_cards (card_id);
+CREATE TABLE student_parent_association (
+    student_id VARCHAR NOT NULL, parent_id INTEGER NOT NULL, PRIMARY KEY (student_id, parent_id),
+    FOREIGN KEY(student_id) REFERENCES students (student_id), FOREIGN KEY(parent_id) REFERENCES parents (parent_id)
+);
+CREATE TABLE weekly_reports (
+    report_id INTEGER NOT NULL, student_id VARCHAR NOT NULL, student_name VARCHAR NOT NULL,
+    report_period_start DATE NOT NULL, report_period_end DATE NOT NULL, total_submissions INTEGER NOT NULL,
+    llm_judgments_count INTEGER NOT NULL, anki_cards_reviewed_count INTEGER NOT NULL, new_anki_cards_created_count INTEGER NOT NULL,
+    anki_card_summaries JSON NOT NULL, llm_log_summaries JSON NOT NULL, coach_memo_summaries JSON NOT NULL,
+    overall_summary TEXT NOT NULL, coach_comment TEXT, status VARCHAR NOT NULL,
+    created_at TIMESTAMP DEFAULT CURRENT_TIMESTAMP, finalized_at TIMESTAMP,
+    PRIMARY KEY (report_id), FOREIGN KEY(student_id) REFERENCES students (student_id)
+);
+CREATE INDEX ix_weekly_reports_report_id ON weekly_reports (report_id);
+INSERT INTO students VALUES ('legacy-student', '기존 학생', '{}');
+INSERT INTO llm_logs (log_id, submission_id, concept_name, model_version, decision, reason, coach_feedback, created_at)
+VALUES (1, 'legacy-student-1', '광합성', 'v1', 'APPROVE', '개념 오류', 'GOOD', '2026-01-05 10:00:00');
+"""
+
+
+@pytest_asyncio.fixture
+async def baseline_engine(tmp_path):
+    path = tmp_path / "baseline.db"
+    connection = sqlite3.connect(path)
+    connection.executescript(BASELINE_SCHEMA)
+    connection.close()
+    engine = create_async_engine(f"sqlite+aiosqlite:///{path}")
+    yield engine
+    await engine.dispose()
+
+
+def schema_of(connection):
+    inspector = inspect(connection)
+    return {
+        table: ({column["name"] for column in inspector.get_columns(table)}, {index["name"] for index in inspector.get_indexes(table)})
+        for table in inspector.get_table_names()
+    }
+
+
+@pytest.mark.asyncio
+async def test_upgrade_brings_baseline_db_to_current_models(baseline_engine):
+    changes = await schema_upgrade.upgrade_database(baseline_engine)
+
+    assert {"llm_logs.judge_mode", "llm_logs.latency_ms", "llm_logs.student_mistake_summary", "llm_logs.student_id", "weekly_reports.data_fingerprint"} <= set(changes)
+    async with baseline_engine.connect() as conn:
+        schema = await conn.run_sync(schema_of)
+    for table in Base.metadata.sorted_tables:
+        columns, indexes = schema[table.name]
+        assert {column.name for column in table.columns} <= columns, table.name
+        assert {index.name for index in table.indexes} <= indexes, table.name
+
+    # 다시 실행해도 바꿀 것이 없습니다.
+    assert await schema_upgrade.upgrade_database(baseline_engine) == []
+
+
+@pytest.mark.asyncio
+async def test_app_serves_judge_and_logs_on_upgraded_baseline_db(baseline_engine):
+    # main.lifespan과 같은 시작 단계로 기존 DB를 업그레이드한 뒤, 그 DB로 API를 호출합니다.
+    await schema_upgrade.upgrade_database(baseline_engine)
+    session_factory = async_sessionmaker(baseline_engine, class_=AsyncSession)
+
+    async def override_get_db():
+        async with session_factory() as db:
+            yield db
+            await db.commit()
+
+    app.dependency_overrides[get_db] = override_get_db
+    try:
+        client = TestClient(app)
+        response = client.post("/api/v1/filter/judge", json={
+            "student_id": "legacy-student",
+            "submission_id": "legacy-student-2",
+            "error_context": {"question_type": "SCIENCE", "concept_name": "광합성", "student_mistake_summary": "밤에 일어난다고 답변함."},
+        })
+        assert response.status_code == 200
+        logs = client.get("/api/v1/filter/logs?start_date=2026-01-01")
+        assert logs.status_code == 200
+        assert {log["submission_id"] for log in logs.json()} == {"legacy-student-1", "legacy-student-2"}
+    finally:
+        app.dependency_overrides.clear()
+
+
+@pytest.mark.asyncio
+async def test_upgrade_keeps_latest_draft_per_period_before_unique_index(baseline_engine):
+    async with baseline_engine.begin() as conn:
+        for report_id, status, start in [(1, "draft", "2026-01-05"), (2, "draft", "2026-01-05"), (3, "finalized", "2026-01-05"), (4, "draft", "2026-01-12")]:
+            await conn.execute(text(
+                "INSERT INTO weekly_reports (report_id, student_id, student_name, report_period_start, report_period_end, total_submissions,"
+                " llm_judgments_count, anki_cards_reviewed_count, new_anki_cards_created_count, anki_card_summaries, llm_log_summaries,"
+                " coach_memo_summaries, overall_summary, status) VALUES (:report_id, 'legacy-student', '기존 학생', :start, :start, 0, 0, 0, 0,"
+                " '[]', '[]', '[]', '요약', :status)"
+            ), {"report_id": report_id, "status": status, "start": start})
+
+    assert "uq_weekly_reports_draft_period" in await schema_upgrade.upgrade_database(baseline_engine)
+
+    async with baseline_engine.connect() as conn:
+        remaining = (await conn.execute(text("SELECT report_id FROM weekly_reports ORDER BY report_id"))).scalars().all()
+    assert remaining == [2, 3, 4]
+
+
+async def explain(engine, statement: str) -> str:
+    async with engine.connect() as conn:
+        rows = (await conn.exec_driver_sql(f"EXPLAIN QUERY PLAN {statement}")).all()
+    return "\n".join(row[-1] for row in rows)
+
+
+@pytest.mark.asyncio
+async def test_upgraded_baseline_db_uses_due_card_index(baseline_engine):
+    await schema_upgrade.upgrade_database(baseline_engine)
+
+    plan = await explain(baseline_engine, "SELECT card_id FROM anki_cards WHERE student_id = 's' AND next_review_date <= '2026-01-05' ORDER BY next_review_date, ease_factor LIMIT 20")
+
+    assert "ix_anki_cards_student_id_next_review_date_ease_factor" in plan
+    assert "TEMP B-TREE" not in plan
+
+
+@pytest.mark.asyncio
+async def test_upgraded_baseline_db_uses_report_period_indexes(baseline_engine):
+    await schema_upgrade.upgrade_database(baseline_engine)
+
+    memo_plan = await explain(baseline_engine, "SELECT memo_id FROM coach_memos WHERE student_id = 's' AND created_at >= '2026-01-05' AND created_at < '2026-01-12'")
+    card_plan = await explain(baseline_engine, "SELECT card_id FROM anki_cards WHERE student_id = 's' AND (created_at >= '2026-01-05' OR last_reviewed_at >= '2026-01-05')")
+
+    assert "ix_coach_memos_student_id_created_at" in memo_plan
+    assert "ix_anki_cards_student_id_created_at" in card_plan and "ix_anki_cards_student_id_last_reviewed_at" in card_plan
@@ -0,0 +1,96 @@
+import pytest
+
+from sqlalchemy.ext.asyncio import AsyncSession
+from sqlalchemy.future import select
+from fastapi.testclient import TestClient
+
+import backend.model_registry as registry_module
+import llm_filter
+import llm_guard
+import models
+import schemas
+import shadow_traffic
+from backend.model_registry import ModelRegistry
+
+
+@pytest.fixture
+def shadow_setup(tmp_path, monkeypatch, session_factory):
+    monkeypatch.setattr(registry_module, "REGISTRY_FILE", str(tmp_path / "model_registry.json"))
+    monkeypatch.setattr(registry_module, "REGISTRY_RELOAD_CHECK_SECONDS", 0.0)
+    registry = ModelRegistry()
+    registry.register_model("v1", "/models/v1", {}, {"base_model": "llama2:latest"})
+    registry.register_model("v2", "/models/v2", {}, {"base_model": "mistral:latest"})
+    registry.set_model_production_status("v1", "production")
+    registry.set_model_production_status("v2", "staging")
+    monkeypatch.setattr(llm_filter, "model_registry", registry)
+    monkeypatch.setattr(llm_filter, "AB_TEST_MODE", llm_filter.AB_TEST_MODE_SHADOW)
+    monkeypatch.setattr(llm_filter, "AB_TEST_TRAFFIC_SPLIT", 0.5)
+    monkeypatch.setattr(llm_filter, "AB_TEST_STAGING_MODEL_VERSION", None)
+    monkeypatch.setattr(shadow_traffic, "SHADOW_TRAFFIC_RATE", 1.0)
+    llm_filter.judgment_cache.clear()
+
+    mirror = shadow_traffic.ShadowTrafficMirror(workers=0, max_queue=10, session_factory=session_factory)
+    monkeypatch.setattr(shadow_traffic, "shadow_mirror", mirror)
+    return mirror
+
+
+def _judge(client: TestClient, index: int):
+    response = client.post("/api/v1/filter/judge", json={
+        "student_id": "shadow-student",
+        "submission_id": f"shadow-student-{index}",
+        "error_context": {"question_type": "HISTORY", "concept_name": "임진왜란 발발 연도", "student_mistake_summary": f"1592년을 1692년으로 잘못 기재함. #{index}"}
+    })
+    assert response.status_code == 200
+    return int(response.json()["log_id"])
+
+
+@pytest.mark.asyncio
+async def test_shadow_mode_serves_production_and_records_staging_judgments(client_with_db: TestClient, async_session: AsyncSession, shadow_setup, fake_ollama_transport):
+    log_ids = [_judge(client_with_db, index) for index in range(3)]
+
+    # 학생 응답은 모두 production 모델이 만들고, staging 호출은 아직 일어나지 않았습니다.
+    logs = (await async_session.execute(select(models.LLMLog).where(models.LLMLog.log_id.in_(log_ids)))).scalars().all()
+    assert {log.model_version for log in logs} == {"v1"}
+    assert fake_ollama_transport.request_count == 3
+    assert shadow_setup.queue_depth == 3
+
+    await shadow_setup.drain()
+    assert fake_ollama_transport.request_count == 6
+    shadows = (await async_session.execute(select(models.ShadowJudgment).order_by(models.ShadowJudgment.llm_log_id))).scalars().all()
+    assert [shadow.llm_log_id for shadow in shadows] == sorted(log_ids)
+    assert {(shadow.model_version, shadow.production_model_version) for shadow in shadows} == {("v2", "v1")}
+
+    summary = client_with_db.get("/api/v1/analysis/shadow-agreement").json()
+    assert summary["models"][0]["model_version"] == "v2"
+    assert summary["models"][0]["total"] == 3
+    assert summary["models"][0]["agreement_rate"] == 1.0
+    assert summary["mirror"]["completed"] == 3
+
+
+@pytest.mark.asyncio
+async def test_shadow_jobs_are_dropped_when_queue_is_full_or_backend_is_busy(client_with_db: TestClient, shadow_setup, monkeypatch):
+    monkeypatch.setattr(shadow_setup, "_queue", shadow_traffic.asyncio.Queue(maxsize=1))
+    _judge(client_with_db, 10)
+    _judge(client_with_db, 11)
+    assert (shadow_setup.enqueued, shadow_setup.dropped_queue_full) == (1, 1)
+
+    # 서킷이 열려 있으면 큐에 넣지 않습니다.
+    breaker = llm_guard.CircuitBreaker(failure_threshold=1)
+    breaker.record_failure()
+    llm_guard.reset_llm_guard(breaker=breaker)
+    log = models.LLMLog(log_id=999, model_version="v1", decision="APPROVE")
+    assert shadow_setup.offer(log, schemas.ErrorContext(question_type="HISTORY", concept_name="c", student_mistake_summary="m")) is False
+    assert shadow_setup.dropped_busy == 1
+
+
+@pytest.mark.asyncio
+async def test_shadow_mode_mirrors_staging_with_zero_traffic_split(client_with_db: TestClient, shadow_setup, monkeypatch):
+    # staging 모델을 학생에게 전혀 노출하지 않고(split=0) 복제만 하는 설정
+    monkeypatch.setattr(llm_filter, "AB_TEST_TRAFFIC_SPLIT", 0.0)
+
+    assert shadow_traffic.pick_shadow_route(0.5).version == "v2"
+    _judge(client_with_db, 20)
+    assert shadow_setup.enqueued == 1
+
+    llm_filter.model_registry.set_model_production_status("v2", "inactive")
+    assert shadow_traffic.pick_shadow_route(0.5) is None
@@ -0,0 +1,57 @@
+import asyncio
+import pytest
+
+import httpx
+
+import fake_ollama
+from llm_filter import call_ollama_api, ollama_singleflight
+
+PROMPT = "[CURRENT TASK] User Mistake Context: { \"concept\": \"임진왜란 발발 연도\", \"mistake\": \"연도 혼동\" }"
+
+
+@pytest.mark.asyncio
+async def test_identical_concurrent_prompts_hit_ollama_once():
+    fake_ollama.configure(latency_ms=200) # 느린 stub 서버
+
+    results = await asyncio.gather(*(call_ollama_api(PROMPT) for _ in range(20)))
+
+    assert fake_ollama.request_count == 1
+    assert all(result == {"decision": "APPROVE", "reason": "핵심 개념을 잘못 이해하고 있습니다."} for result in results)
+    # 호출자마다 독립된 dict를 받습니다.
+    assert len({id(result) for result in results}) == 20
+    assert ollama_singleflight.inflight_count() == 0
+
+
+@pytest.mark.asyncio
+async def test_different_prompts_are_not_coalesced():
+    fake_ollama.configure(latency_ms=50)
+
+    await asyncio.gather(call_ollama_api(PROMPT), call_ollama_api(PROMPT, model_name="other:latest"), call_ollama_api(PROMPT + " "))
+
+    assert fake_ollama.request_count == 3
+
+
+@pytest.mark.asyncio
+async def test_errors_are_delivered_to_every_waiter():
+    fake_ollama.configure(latency_ms=100, failure_rate=1.0)
+
+    results = await asyncio.gather(*(call_ollama_api(PROMPT) for _ in range(5)), return_exceptions=True)
+
+    assert fake_ollama.request_count == 1
+    assert all(isinstance(result, httpx.HTTPStatusError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_waiter_does_not_cancel_shared_call():
+    fake_ollama.configure(latency_ms=200)
+
+    waiters = [asyncio.create_task(call_ollama_api(PROMPT)) for _ in range(3)]
+    await asyncio.sleep(0.05)
+    waiters[0].cancel()
+
+    results = await asyncio.gather(*waiters, return_exceptions=True)
+
+    assert isinstance(results[0], asyncio.CancelledError)
+    assert results[1]["decision"] == "APPROVE"
+    assert results[2]["decision"] == "APPROVE"
+    assert fake_ollama.request_count == 1
@@ -36,7 +36,9 @@ async def test_submit_assignment_and_create_card(client_with_db: TestClient, asy
     assert llm_log is not None
     assert llm_log.decision == "APPROVE"
 
-    # Check AnkiCard
+    # Check AnkiCard (복습 덱 조회 시 남은 카드 생성 작업이 마무리됩니다)
+    deck_response = client_with_db.get(f"/api/v1/student/{student_id}/daily_review_deck")
+    assert deck_response.status_code == 200
     anki_card_result = await async_session.execute(
         select(models.AnkiCard).where(models.AnkiCard.llm_log_id == llm_log.log_id)
     )
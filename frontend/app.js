@@ -146,7 +146,7 @@ document.addEventListener('DOMContentLoaded', () => {
             const shareKakaoBtn = document.getElementById('share-kakao-btn');
             coachReviewSection.dataset.reportId = report.report_id;
 
-            reportDisplayDiv.innerHTML = `<h3>${report.student_name} 학생 주간 리포트 (${report.report_period_start} ~ ${report.report_period_end})</h3><p><strong>리포트 상태:</strong> <span style="font-weight: bold; color: ${report.status === 'draft' ? '#ff9800' : (report.status === 'finalized' ? '#28a745' : '#0056b3')}">${report.status}</span></p><p><strong>AI 생성 전체 요약:</strong></p><p style="background-color: #f9f9f9; padding: 10px; border-radius: 5px;">${report.overall_summary.replace(/\n/g, '<br>')}</p>`;
+            reportDisplayDiv.innerHTML = `<h3>${report.student_name} 학생 주간 리포트 (${report.report_period_start} ~ ${report.report_period_end})</h3><p><strong>리포트 상태:</strong> <span style="font-weight: bold; color: ${report.status === 'draft' ? '#ff9800' : (report.status === 'send_failed' ? '#dc3545' : (report.status === 'sent' ? '#0056b3' : '#28a745'))}">${report.status}</span></p><p><strong>AI 생성 전체 요약:</strong></p><p style="background-color: #f9f9f9; padding: 10px; border-radius: 5px;">${report.overall_summary.replace(/\n/g, '<br>')}</p>`;
             if (report.coach_comment) {
                 reportDisplayDiv.innerHTML += `<h4>코치 최종 코멘트:</h4><p style="background-color: #e7f3ff; padding: 10px; border-radius: 5px;">${report.coach_comment}</p>`;
             }
@@ -157,7 +157,7 @@ document.addEventListener('DOMContentLoaded', () => {
                 finalizeBtn.disabled = false;
                 shareKakaoBtn.classList.add('hidden');
                 document.getElementById('finalize-status').textContent = '';
-            } else if (report.status === 'finalized') {
+            } else if (['finalized', 'sending', 'sent', 'send_failed'].includes(report.status)) {
                 coachReviewSection.classList.add('hidden');
                 shareKakaoBtn.classList.remove('hidden');
                 shareKakaoBtn.dataset.report = JSON.stringify(report);
@@ -0,0 +1,91 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from typing import Optional, Set
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+from sqlalchemy import update, bindparam  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+# backend.models는 테이블을 `database` 모듈의 Base에 등록하므로 같은 모듈의 engine/Base를 사용합니다.
+from database import SessionLocal, engine  # noqa: E402
+import models  # noqa: E402
+from schema_upgrade import upgrade_database  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def resolve_student_id(submission_id: str, student_ids: Set[str]) -> Optional[str]:
+    """
+    submission_id("{student_id}-{...}")에서 등록된 학생 ID를 찾습니다. 학생 ID에도 '-'가 들어갈 수 있으므로
+    가장 긴 접두사부터 확인합니다. (예: "s-1-2-7"은 "s-1-2"가 있으면 "s-1"보다 우선)
+    """
+    position = len(submission_id)
+    while (position := submission_id.rfind("-", 0, position)) > 0:
+        if submission_id[:position] in student_ids:
+            return submission_id[:position]
+    return None
+
+
+async def backfill(batch_size: int, pause_seconds: float, dry_run: bool = False):
+    """
+    student_id가 비어 있는 llm_logs 행을 log_id 순서로 batch_size개씩 채우고 batch마다 커밋합니다.
+    짧은 트랜잭션과 batch 사이의 대기로 서비스 중에도 쓰기 잠금을 오래 잡지 않으며, 중단 후 다시 실행하면 남은 행만 처리합니다.
+    """
+    # llm_logs.student_id를 포함해 이전 스키마에 없는 컬럼과 인덱스를 앱 시작 시와 같은 방식으로 추가합니다.
+    await upgrade_database(engine)
+
+    async with SessionLocal() as db:
+        student_ids = set((await db.execute(select(models.Student.student_id))).scalars().all())
+    logging.info(f"Loaded {len(student_ids)} student ids.")
+
+    statement = (
+        update(models.LLMLog.__table__)
+        .where(models.LLMLog.__table__.c.log_id == bindparam("target_log_id"))
+        .values(student_id=bindparam("resolved_student_id"))
+    )
+    last_log_id, updated, unmatched, batches = 0, 0, 0, 0
+    while True:
+        async with SessionLocal() as db:
+            rows = (await db.execute(
+                select(models.LLMLog.log_id, models.LLMLog.submission_id)
+                .where(models.LLMLog.log_id > last_log_id, models.LLMLog.student_id.is_(None))
+                .order_by(models.LLMLog.log_id)
+                .limit(batch_size)
+            )).all()
+            if not rows:
+                break
+            last_log_id = rows[-1].log_id
+            params = []
+            for log_id, submission_id in rows:
+                student_id = resolve_student_id(submission_id or "", student_ids)
+                if student_id is None:
+                    unmatched += 1
+                else:
+                    params.append({"target_log_id": log_id, "resolved_student_id": student_id})
+            if params and not dry_run:
+                await db.execute(statement, params)
+                await db.commit()
+            updated += len(params)
+        batches += 1
+        if batches % 10 == 0:
+            logging.info(f"Processed up to log_id {last_log_id}: {updated} updated, {unmatched} unmatched.")
+        if pause_seconds:
+            await asyncio.sleep(pause_seconds)
+
+    action = "Would update" if dry_run else "Updated"
+    logging.info(f"{action} {updated} logs in {batches} batches. {unmatched} logs did not match a registered student and were left empty.")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Upgrade the schema (llm_logs.student_id and every other new column/index) and backfill student_id from submission_id in small batches.")
+    parser.add_argument("--batch_size", type=int, default=1000, help="Rows updated per transaction.")
+    parser.add_argument("--pause_seconds", type=float, default=0.05, help="Sleep between batches so concurrent writers are not starved.")
+    parser.add_argument("--dry_run", action="store_true", help="Only report how many rows would be updated.")
+    args = parser.parse_args()
+
+    asyncio.run(backfill(args.batch_size, args.pause_seconds, args.dry_run))
@@ -0,0 +1,126 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+DUE_INDEX = "ix_anki_cards_student_id_next_review_date_ease_factor"
+
+
+def seed_cards(db_path: str, card_count: int, student_count: int, behind_students: int, rng: random.Random):
+    """
+    card_count개의 카드를 student_count명에게 나눠 넣습니다. 앞의 behind_students명은 복습이 밀려 대부분의 카드가 기한이 지났습니다.
+    ORM을 거치지 않고 sqlite3 executemany로 넣어 100만 건도 수십 초 안에 준비합니다.
+    """
+    today = date.today()
+    per_student = card_count // student_count
+    with sqlite3.connect(db_path) as conn:
+        conn.executemany(
+            "INSERT INTO students (student_id, name, settings) VALUES (?, ?, ?)",
+            ((f"student-{index:05d}", f"학생{index}", '{"anki_budget_per_day": 20}') for index in range(student_count)),
+        )
+        conn.execute("INSERT INTO llm_logs (log_id, submission_id, decision) VALUES (1, 'bench-1', 'APPROVE')")
+
+        def rows():
+            for student_index in range(student_count):
+                behind = student_index < behind_students
+                for _ in range(per_student):
+                    # 밀린 학생은 90%가 최대 1년 지난 기한, 나머지 학생은 10%만 최근 2주 안에 기한
+                    if rng.random() < (0.9 if behind else 0.1):
+                        next_review = today - timedelta(days=rng.randint(0, 365 if behind else 14))
+                    else:
+                        next_review = today + timedelta(days=rng.randint(1, 60))
+                    yield (f"student-{student_index:05d}", 1, "Q", "A", next_review.isoformat(), 1, rng.randint(130, 300), 1)
+
+        conn.executemany(
+            "INSERT INTO anki_cards (student_id, llm_log_id, question, answer, next_review_date, interval_days, ease_factor, repetitions) VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+            rows(),
+        )
+        conn.execute("ANALYZE")
+
+
+async def load_full(crud, db, student, today):
+    # 이전 방식: 기한 카드 전체를 읽어 Python에서 정렬하고 자릅니다.
+    due_cards = await crud.get_due_anki_cards(db, student_id=student.student_id, today=today)
+    deck = sorted(due_cards, key=lambda card: (card.next_review_date, card.ease_factor))[:20]
+    return len(due_cards), [card.card_id for card in deck]
+
+
+async def load_budgeted(crud, pacer_brain, db, student, today):
+    total_due = await crud.count_due_anki_cards(db, student_id=student.student_id, today=today)
+    deck = await crud.get_due_anki_cards(db, student_id=student.student_id, today=today, limit=pacer_brain.daily_budget(student))
+    return total_due, [card.card_id for card in deck]
+
+
+async def time_students(label, loader, session_factory, students, today, repeat):
+    started = time.perf_counter()
+    results = {}
+    for _ in range(repeat):
+        for student in students:
+            async with session_factory() as db:
+                results[student.student_id] = await loader(db, student, today)
+    elapsed = time.perf_counter() - started
+    per_call_ms = elapsed / (repeat * len(students)) * 1000
+    logging.info(f"{label}: {per_call_ms:.2f}ms per deck")
+    return results, per_call_ms
+
+
+async def run_benchmark(card_count: int, student_count: int, behind_students: int, repeat: int, seed: int):
+    with tempfile.TemporaryDirectory() as work_dir:
+        db_path = os.path.join(work_dir, "due_cards.db")
+        # database 모듈이 import 시점에 DATABASE_URL로 엔진을 만들므로 import 전에 지정합니다.
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+        from sqlalchemy import text
+        from database import SessionLocal, engine, Base
+        import crud
+        import pacer_brain
+
+        async with engine.begin() as conn:
+            await conn.run_sync(Base.metadata.create_all)
+        started = time.perf_counter()
+        seed_cards(db_path, card_count, student_count, behind_students, random.Random(seed))
+        logging.info(f"Seeded {card_count} cards for {student_count} students in {time.perf_counter() - started:.1f}s")
+
+        today = date.today()
+        async with SessionLocal() as db:
+            students = [await crud.get_student(db, f"student-{index:05d}") for index in range(behind_students)]
+            students.append(await crud.get_student(db, f"student-{student_count - 1:05d}"))
+
+        full, full_ms = await time_students("indexed, load all + sort", lambda db, s, d: load_full(crud, db, s, d), SessionLocal, students, today, repeat)
+        budgeted, budgeted_ms = await time_students("indexed, COUNT + LIMIT", lambda db, s, d: load_budgeted(crud, pacer_brain, db, s, d), SessionLocal, students, today, repeat)
+
+        # 인덱스가 없던 이전 스키마와 비교합니다.
+        async with engine.begin() as conn:
+            await conn.execute(text(f"DROP INDEX {DUE_INDEX}"))
+        _, unindexed_ms = await time_students("no index, load all + sort (before)", lambda db, s, d: load_full(crud, db, s, d), SessionLocal, students, today, repeat)
+        await engine.dispose()
+
+    mismatches = sum(1 for student_id, result in full.items() if budgeted[student_id] != result)
+    total_due = [result[0] for result in budgeted.values()]
+    logging.info(f"due cards per benchmarked student: min {min(total_due)}, max {max(total_due)}")
+    logging.info(f"speedup vs before: {unindexed_ms / budgeted_ms:.1f}x, vs load all with index: {full_ms / budgeted_ms:.1f}x, mismatches: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark daily review deck queries (COUNT + ORDER BY/LIMIT on the due-card index) on a large card table.")
+    parser.add_argument("--cards", type=int, default=1_000_000, help="Total number of generated cards.")
+    parser.add_argument("--students", type=int, default=1_000, help="Number of students the cards are spread over.")
+    parser.add_argument("--behind_students", type=int, default=5, help="Students with a large review backlog (benchmarked together with one regular student).")
+    parser.add_argument("--repeat", type=int, default=5, help="Deck builds per student.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.cards, args.students, args.behind_students, args.repeat, args.seed))
@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+import httpx
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), '..', 'backend')))
+from llm_client import LLMClient  # noqa: E402
+from fake_ollama import FakeOllamaServer  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+JUDGE_PROMPT = "[SYSTEM] ... [CURRENT TASK] User Mistake Context: { \"concept\": \"임진왜란 발발 연도\", \"mistake\": \"1592년을 1692년으로 잘못 기재함.\" }"
+CARD_PROMPT = "[SYSTEM] Anki flashcard \"question\" \"answer\" [CURRENT TASK] Concept: 임진왜란 발발 연도"
+
+
+def _payload(prompt: str) -> dict:
+    return {"model": "llama2:latest", "prompt": prompt, "format": "json", "stream": False}
+
+
+async def _judge_per_call_client(base_url: str):
+    # 기존 방식: 호출마다 httpx.AsyncClient를 새로 생성
+    for prompt in (JUDGE_PROMPT, CARD_PROMPT):
+        async with httpx.AsyncClient(timeout=30.0) as client:
+            response = await client.post(f"{base_url}/api/generate", json=_payload(prompt))
+            response.raise_for_status()
+
+
+async def _judge_pooled_client(client: LLMClient):
+    for prompt in (JUDGE_PROMPT, CARD_PROMPT):
+        await client.generate(_payload(prompt))
+
+
+async def _run_round(judge_coro_factory, concurrency: int) -> list:
+    async def timed():
+        started = time.perf_counter()
+        await judge_coro_factory()
+        return (time.perf_counter() - started) * 1000
+
+    return await asyncio.gather(*(timed() for _ in range(concurrency)))
+
+
+def _summarize(label: str, latencies: list) -> dict:
+    ordered = sorted(latencies)
+    summary = {
+        "mean": statistics.mean(ordered),
+        "p50": ordered[len(ordered) // 2],
+        "p95": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+    }
+    logging.info(f"{label:>16}: mean={summary['mean']:.2f}ms p50={summary['p50']:.2f}ms p95={summary['p95']:.2f}ms (n={len(ordered)})")
+    return summary
+
+
+async def run_benchmark(concurrency: int, rounds: int, latency_ms: float):
+    with FakeOllamaServer(latency_ms=latency_ms) as server:
+        logging.info(f"Fake Ollama listening on {server.url} (latency={latency_ms}ms). {rounds} rounds x {concurrency} concurrent judges (2 LLM calls each).")
+
+        per_call = []
+        for _ in range(rounds):
+            per_call += await _run_round(lambda: _judge_per_call_client(server.url), concurrency)
+
+        pooled = []
+        client = LLMClient(base_url=server.url, max_connections=concurrency, max_keepalive_connections=concurrency)
+        try:
+            await _run_round(lambda: _judge_pooled_client(client), concurrency)  # 풀 워밍업
+            for _ in range(rounds):
+                pooled += await _run_round(lambda: _judge_pooled_client(client), concurrency)
+        finally:
+            await client.aclose()
+
+    before = _summarize("per-call client", per_call)
+    after = _summarize("pooled client", pooled)
+    saved = before["mean"] - after["mean"]
+    logging.info(f"Per-judge latency saved: {saved:.2f}ms ({saved / before['mean'] * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark per-call httpx clients against the pooled LLM client.")
+    parser.add_argument("--concurrency", type=int, default=50, help="Number of concurrent judge requests per round.")
+    parser.add_argument("--rounds", type=int, default=10, help="Number of rounds to run for each mode.")
+    parser.add_argument("--latency_ms", type=float, default=20.0, help="Simulated generation latency of the fake Ollama.")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.concurrency, args.rounds, args.latency_ms))
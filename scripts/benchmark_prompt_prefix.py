@@ -0,0 +1,89 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+from contextlib import nullcontext
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+import llm_client  # noqa: E402
+import llm_filter  # noqa: E402
+import schemas  # noqa: E402
+from fake_ollama import FakeOllamaServer  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def _context(index: int) -> schemas.ErrorContext:
+    # 판단 캐시에 걸리지 않도록 매번 다른 오답 요약을 사용합니다.
+    return schemas.ErrorContext(question_type="HISTORY", concept_name="임진왜란 발발 연도", student_mistake_summary=f"1592년을 1692년으로 잘못 기재함. #{index}")
+
+
+async def _run_mode(client: llm_client.LLMClient, model_name: str, reuse: bool, judges: int) -> list:
+    """
+    판단 호출(generate)의 Ollama 응답에서 prompt_eval_duration(ms)과 prompt_eval_count를 모읍니다.
+    prefix 평가(warm-up) 호출은 한 번뿐이므로 따로 보고합니다.
+    """
+    llm_filter.PROMPT_PREFIX_REUSE = reuse
+    llm_filter.prefix_contexts.clear()
+    llm_filter.judgment_cache.clear()
+
+    samples, priming = [], []
+    original_generate = client.generate
+
+    async def recording_generate(payload, timeout=None):
+        response = await original_generate(payload, timeout=timeout)
+        target = priming if (payload.get("options") or {}).get("num_predict") == 0 else samples
+        target.append((response.get("prompt_eval_duration", 0) / 1e6, response.get("prompt_eval_count", 0)))
+        return response
+
+    client.generate = recording_generate
+    try:
+        for index in range(judges):
+            await llm_filter.run_judgment(_context(index), model_name, "bench", generate_card=False)
+    finally:
+        client.generate = original_generate
+
+    label = "prefix reuse" if reuse else "full prompt"
+    durations = [duration for duration, _ in samples]
+    logging.info(
+        f"{label:>13}: prompt_eval_duration mean={statistics.mean(durations):.2f}ms p50={sorted(durations)[len(durations) // 2]:.2f}ms, "
+        f"prompt_eval_count mean={statistics.mean(count for _, count in samples):.0f} (n={len(samples)})"
+    )
+    if priming:
+        logging.info(f"{'':>13}  one-off prefix evaluation: {sum(duration for duration, _ in priming):.2f}ms")
+    return durations
+
+
+async def run_benchmark(judges: int, model_name: str, ollama_url: str, prompt_token_latency_ms: float):
+    server = FakeOllamaServer(prompt_token_latency_ms=prompt_token_latency_ms) if not ollama_url else nullcontext()
+    with server:
+        base_url = ollama_url or server.url
+        logging.info(f"Ollama at {base_url}, model {model_name}, {judges} judges per mode.")
+        if not ollama_url:
+            # fake는 채팅 템플릿을 적용하지 않고 context 토큰을 다시 평가하지 않으므로, 절감 효과는 구성상 항상 나타납니다.
+            logging.warning("Fake Ollama only checks the request shape. Measure with --ollama_url before enabling PROMPT_PREFIX_REUSE.")
+        client = await llm_client.startup_llm_client(base_url=base_url)
+        try:
+            before = await _run_mode(client, model_name, False, judges)
+            after = await _run_mode(client, model_name, True, judges)
+        finally:
+            await llm_client.shutdown_llm_client()
+
+    saved = statistics.mean(before) - statistics.mean(after)
+    logging.info(f"prompt_eval_duration saved per judge: {saved:.2f}ms ({saved / statistics.mean(before) * 100:.1f}%)")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Measure Ollama prompt_eval_duration with and without prompt-prefix context reuse.")
+    parser.add_argument("--judges", type=int, default=20, help="Number of judge calls per mode.")
+    parser.add_argument("--model", type=str, default="llama2:latest", help="Ollama model name.")
+    parser.add_argument("--ollama_url", type=str, default=None, help="Real Ollama base URL. Uses the fake Ollama when omitted.")
+    parser.add_argument("--prompt_token_latency_ms", type=float, default=0.5, help="Fake Ollama prompt evaluation cost per token.")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.judges, args.model, args.ollama_url, args.prompt_token_latency_ms))
@@ -0,0 +1,106 @@
+import argparse
+import json
+import logging
+import os
+import random
+import sys
+import tempfile
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+from rule_engine import RuleEngine  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+WORDS = ["임진왜란", "병자호란", "세종", "훈민정음", "고려", "조선", "삼국", "통일", "광복", "전쟁", "조약", "개혁"]
+
+
+def _keyword(rng: random.Random) -> str:
+    return f"{rng.choice(WORDS)}{rng.randint(0, 999)}"
+
+
+def generate_rules(rule_count: int, assignment_count: int, rng: random.Random) -> dict:
+    assignments = {}
+    for index in range(rule_count):
+        assignment_id = f"assignment-{index % assignment_count:04d}"
+        rule = {
+            "all": [_keyword(rng) for _ in range(rng.randint(1, 2))],
+            "error_context": {"question_type": "HISTORY", "concept_name": f"concept-{index}", "student_mistake_summary": f"rule {index}"},
+        }
+        if rng.random() < 0.5:
+            rule["any"] = [_keyword(rng) for _ in range(rng.randint(1, 3))]
+        if rng.random() < 0.3:
+            rule["none"] = [_keyword(rng)]
+        assignments.setdefault(assignment_id, []).append(rule)
+    return {"assignments": [{"assignment_id": assignment_id, "rules": rules} for assignment_id, rules in assignments.items()]}
+
+
+def generate_submissions(count: int, assignment_count: int, rng: random.Random) -> list:
+    return [
+        (f"assignment-{rng.randrange(assignment_count):04d}", " ".join(_keyword(rng) for _ in range(rng.randint(5, 30))))
+        for _ in range(count)
+    ]
+
+
+def naive_analyze(document: dict, assignment_id: str, answer: str):
+    """
+    기존 if-chain 방식: 모든 과제의 규칙을 순서대로 돌며 키워드마다 answer를 다시 훑습니다.
+    """
+    for assignment in document["assignments"]:
+        if assignment["assignment_id"] != assignment_id:
+            continue
+        for rule in assignment["rules"]:
+            if all(keyword in answer for keyword in rule["all"]) \
+                    and (not rule.get("any") or any(keyword in answer for keyword in rule["any"])) \
+                    and not any(keyword in answer for keyword in rule.get("none", [])):
+                return rule["error_context"]["student_mistake_summary"]
+    return None
+
+
+def run_benchmark(rule_count: int, assignment_count: int, submission_count: int, naive_sample: int, seed: int):
+    rng = random.Random(seed)
+    document = generate_rules(rule_count, assignment_count, rng)
+    submissions = generate_submissions(submission_count, assignment_count, rng)
+
+    with tempfile.TemporaryDirectory() as rules_dir:
+        with open(os.path.join(rules_dir, "bench.json"), "w", encoding="utf-8") as f:
+            json.dump(document, f, ensure_ascii=False)
+        started = time.perf_counter()
+        engine = RuleEngine(rules_dir, reload_check_seconds=3600)
+        logging.info(f"Compiled {engine.stats()} in {(time.perf_counter() - started) * 1000:.1f}ms")
+
+        started = time.perf_counter()
+        compiled_results = [engine.analyze(assignment_id, answer) for assignment_id, answer in submissions]
+        compiled_seconds = time.perf_counter() - started
+
+    sample = submissions[:naive_sample]
+    started = time.perf_counter()
+    naive_results = [naive_analyze(document, assignment_id, answer) for assignment_id, answer in sample]
+    naive_seconds = time.perf_counter() - started
+
+    mismatches = sum(
+        1 for compiled, naive in zip(compiled_results, naive_results)
+        if (compiled.student_mistake_summary if compiled else None) != naive
+    )
+    matched = sum(1 for result in compiled_results if result)
+    compiled_us = compiled_seconds / len(submissions) * 1e6
+    naive_us = naive_seconds / len(sample) * 1e6
+    logging.info(f"compiled: {len(submissions)} submissions in {compiled_seconds:.2f}s ({compiled_us:.1f}us/submission), {matched} matched")
+    logging.info(f"   naive: {len(sample)} submissions in {naive_seconds:.2f}s ({naive_us:.1f}us/submission)")
+    logging.info(f"speedup: {naive_us / compiled_us:.1f}x, mismatches on sample: {mismatches}")
+    if mismatches:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Benchmark the compiled rule engine against a linear if-chain walk.")
+    parser.add_argument("--rules", type=int, default=10_000, help="Number of generated rules.")
+    parser.add_argument("--assignments", type=int, default=200, help="Number of distinct assignment ids.")
+    parser.add_argument("--submissions", type=int, default=100_000, help="Number of generated submissions.")
+    parser.add_argument("--naive_sample", type=int, default=5_000, help="Submissions replayed through the linear walk for comparison.")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed.")
+    args = parser.parse_args()
+
+    run_benchmark(args.rules, args.assignments, args.submissions, args.naive_sample, args.seed)
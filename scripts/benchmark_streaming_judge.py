@@ -0,0 +1,62 @@
+import argparse
+import asyncio
+import logging
+import os
+import statistics
+import sys
+import time
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+import llm_client  # noqa: E402
+import llm_filter  # noqa: E402
+import schemas  # noqa: E402
+from fake_ollama import FakeOllamaServer  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+
+def _context(index: int) -> schemas.ErrorContext:
+    # 캐시에 걸리지 않도록 매번 다른 오답 요약을 사용합니다.
+    return schemas.ErrorContext(question_type="HISTORY", concept_name="임진왜란 발발 연도", student_mistake_summary=f"1592년을 1692년으로 잘못 기재함. #{index}")
+
+
+async def _run_mode(streaming: bool, judges: int) -> list:
+    llm_filter.JUDGE_STREAMING = streaming
+    llm_filter.judgment_cache.clear()
+    latencies = []
+    for index in range(judges):
+        started = time.perf_counter()
+        await llm_filter.run_judgment(_context(index), "llama2:latest", "bench")
+        latencies.append((time.perf_counter() - started) * 1000)
+    return latencies
+
+
+async def run_benchmark(judges: int, latency_ms: float, token_latency_ms: float):
+    with FakeOllamaServer(latency_ms=latency_ms, token_latency_ms=token_latency_ms) as server:
+        logging.info(f"Fake Ollama on {server.url} (ttft={latency_ms}ms, per-token={token_latency_ms}ms). {judges} judges per mode.")
+        await llm_client.startup_llm_client(base_url=server.url)
+        try:
+            buffered = await _run_mode(False, judges)
+            llm_filter.stream_metrics.reset()
+            streamed = await _run_mode(True, judges)
+        finally:
+            await llm_client.shutdown_llm_client()
+
+    before, after = statistics.mean(buffered), statistics.mean(streamed)
+    logging.info(f"   buffered judge+card: mean={before:.1f}ms")
+    logging.info(f"   streaming judge+card: mean={after:.1f}ms ({(before - after) / before * 100:.1f}% faster)")
+    metrics = llm_filter.stream_metrics.summary()
+    logging.info(f"   streaming ttft p50={metrics['ttft_ms_p50']}ms, time-to-decision p50={metrics['time_to_decision_ms_p50']}ms, total p50={metrics['total_ms_p50']}ms")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Compare buffered and streaming judge calls against a slow fake Ollama.")
+    parser.add_argument("--judges", type=int, default=20, help="Number of judgments per mode.")
+    parser.add_argument("--latency_ms", type=float, default=100.0, help="Simulated time to first token.")
+    parser.add_argument("--token_latency_ms", type=float, default=15.0, help="Simulated time per generated token.")
+    args = parser.parse_args()
+
+    asyncio.run(run_benchmark(args.judges, args.latency_ms, args.token_latency_ms))
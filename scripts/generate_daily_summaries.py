@@ -0,0 +1,59 @@
+import argparse
+import asyncio
+import logging
+import os
+import sys
+from datetime import date, timedelta
+from typing import Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+from sqlalchemy.future import select  # noqa: E402
+
+# backend.models는 테이블을 `database` 모듈의 Base에 등록하므로 같은 모듈의 engine/Base를 사용합니다.
+from database import SessionLocal, engine  # noqa: E402
+from schema_upgrade import upgrade_database  # noqa: E402
+import models  # noqa: E402
+import llm_client  # noqa: E402
+from daily_summary import ensure_daily_summaries  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+async def generate_daily_summaries(target_date: date, days: int, student_id: Optional[str] = None):
+    """
+    target_date까지 days일 동안의 일일 요약을 학생별로 미리 만듭니다. 이미 요약된 날은 건너뜁니다.
+    학생마다 커밋하므로 중간에 멈춰도 다시 실행하면 남은 학생/날짜만 처리합니다.
+    """
+    await upgrade_database(engine)
+    start_date = target_date - timedelta(days=days - 1)
+
+    async with SessionLocal() as db:
+        query = select(models.Student).order_by(models.Student.student_id)
+        if student_id:
+            query = query.where(models.Student.student_id == student_id)
+        students = (await db.execute(query)).scalars().all()
+
+    await llm_client.startup_llm_client()
+    summarized = failed = 0
+    try:
+        for student in students:
+            async with SessionLocal() as db:
+                summaries = await ensure_daily_summaries(db, student, start_date, target_date)
+                await db.commit()
+            summarized += sum(1 for daily in summaries if daily.summary)
+            failed += sum(1 for daily in summaries if daily.summary_id is None)
+    finally:
+        await llm_client.shutdown_llm_client()
+    logging.info(f"Daily summaries for {start_date} ~ {target_date}: {len(students)} students, {summarized} days with summaries, {failed} days failed (retried next run).")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Nightly job: pre-generate per-student daily summaries used by weekly reports.")
+    parser.add_argument("--date", type=date.fromisoformat, default=date.today() - timedelta(days=1), help="Last day to summarize (YYYY-MM-DD). Defaults to yesterday.")
+    parser.add_argument("--days", type=int, default=1, help="Number of days up to --date to summarize (backfill).")
+    parser.add_argument("--student_id", type=str, default=None, help="Only summarize this student.")
+    args = parser.parse_args()
+
+    asyncio.run(generate_daily_summaries(args.date, args.days, args.student_id))
@@ -0,0 +1,83 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import sys
+from datetime import date, timedelta
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+
+# backend.models는 테이블을 `database` 모듈의 Base에 등록하므로 같은 모듈의 engine/Base를 사용합니다.
+from database import engine  # noqa: E402
+from schema_upgrade import upgrade_database  # noqa: E402
+import models  # noqa: E402,F401
+import llm_client  # noqa: E402
+import report_batch  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def _log_progress(progress: dict):
+    eta = f"{progress['eta_seconds']:.0f}s" if progress["eta_seconds"] is not None else "-"
+    logging.info(f"[{progress['run_id']}] {progress['processed']}/{progress['todo']} processed ({progress['done']} done, {progress['failed']} failed), elapsed {progress['elapsed_seconds']:.0f}s, ETA {eta}")
+
+
+def _read_student_ids(student_ids: str, student_file: str):
+    if student_file:
+        with open(student_file, encoding="utf-8") as f:
+            return [line.strip() for line in f if line.strip()]
+    if student_ids:
+        return [student_id.strip() for student_id in student_ids.split(",") if student_id.strip()]
+    return None
+
+
+async def generate_weekly_reports(args):
+    await upgrade_database(engine)
+    await llm_client.startup_llm_client()
+    try:
+        stats = await report_batch.run_batch(
+            start_date=args.start_date,
+            end_date=args.end_date,
+            run_id=args.run_id,
+            student_ids=_read_student_ids(args.student_ids, args.student_file),
+            concurrency=args.concurrency,
+            regenerate=args.regenerate,
+            progress_interval_seconds=args.progress_interval,
+            on_progress=_log_progress,
+        )
+    finally:
+        await llm_client.shutdown_llm_client()
+
+    summary = stats.to_dict()
+    logging.info(
+        f"Run {summary['run_id']}: {summary['done']} generated, {summary['failed']} failed, {summary['skipped']} already done (of {summary['total']}) "
+        f"in {summary['elapsed_seconds']}s, {summary['reports_per_minute']} reports/min, "
+        f"p50 {summary['latency_ms']['p50'] or 0:.0f}ms, p95 {summary['latency_ms']['p95'] or 0:.0f}ms"
+    )
+    if args.stats_output:
+        with open(args.stats_output, "w", encoding="utf-8") as f:
+            json.dump(summary, f, ensure_ascii=False, indent=2)
+        logging.info(f"Wrote stats to {args.stats_output}")
+    if stats.failed:
+        logging.warning(f"{stats.failed} reports failed. Run again with --run_id {stats.run_id} to retry only the remaining students.")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    today = date.today()
+    parser = argparse.ArgumentParser(description="Generate weekly report drafts for all (or the given) students with bounded LLM concurrency. Re-running the same run resumes where it stopped.")
+    parser.add_argument("--start_date", type=date.fromisoformat, default=today - timedelta(days=6), help="Report period start (YYYY-MM-DD). Defaults to 6 days ago.")
+    parser.add_argument("--end_date", type=date.fromisoformat, default=today, help="Report period end (YYYY-MM-DD). Defaults to today.")
+    parser.add_argument("--run_id", type=str, default=None, help="Progress key. Defaults to weekly-{start}-{end}, so re-running the same period resumes.")
+    parser.add_argument("--student_ids", type=str, default=None, help="Comma-separated student ids. Defaults to all students.")
+    parser.add_argument("--student_file", type=str, default=None, help="File with one student id per line.")
+    parser.add_argument("--concurrency", type=int, default=report_batch.REPORT_BATCH_CONCURRENCY, help="Concurrent report workers (each holds one DB session).")
+    parser.add_argument("--regenerate", action="store_true", help="Rebuild drafts even if the student's data has not changed.")
+    parser.add_argument("--progress_interval", type=float, default=report_batch.REPORT_BATCH_PROGRESS_INTERVAL_SECONDS, help="Seconds between progress log lines.")
+    parser.add_argument("--stats_output", type=str, default=None, help="Write timing/throughput stats as JSON to this path.")
+    args = parser.parse_args()
+
+    asyncio.run(generate_weekly_reports(args))
@@ -0,0 +1,280 @@
+import argparse
+import asyncio
+import json
+import logging
+import os
+import random
+import sqlite3
+import sys
+import tempfile
+import threading
+import time
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import httpx
+import uvicorn
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+from fake_ollama import FakeOllamaServer, LATENCY_DISTRIBUTIONS  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+logging.getLogger("httpx").setLevel(logging.WARNING)
+
+ROUTES = ("submission", "judge", "review", "deck", "report")
+DEFAULT_MIX = "submission=30,judge=25,review=20,deck=20,report=5"
+
+ANSWERS = [
+    "임진왜란은 1592년? 1692년? 에 일어났다.",
+    "임진왜란은 조선 시대에 일어났다.",
+    "임진왜란은 1592년에 일어났다.",
+]
+MISTAKES = [
+    ("HISTORY", "임진왜란 발발 연도", "1592년을 {year}년으로 잘못 기재함."),
+    ("MATH", "분수의 덧셈", "분모끼리 더함. ({year})"),
+    ("MATH", "덧셈", "{year} 계산 실수 (오타)"),
+]
+
+
+class AppServer:
+    """
+    main.app을 백그라운드 스레드의 uvicorn으로 실행합니다. lifespan(테이블 생성, LLM 클라이언트, 워커)이 그대로 동작합니다.
+    """
+
+    def __init__(self, app, host: str = "127.0.0.1", port: int = 0):
+        self.host = host
+        self.port = port
+        self._server = uvicorn.Server(uvicorn.Config(app, host=host, port=port, log_level="warning"))
+        self._thread: Optional[threading.Thread] = None
+
+    @property
+    def url(self) -> str:
+        return f"http://{self.host}:{self.port}"
+
+    def __enter__(self):
+        self._thread = threading.Thread(target=self._server.run, daemon=True)
+        self._thread.start()
+        while not self._server.started:
+            time.sleep(0.01)
+        self.port = self._server.servers[0].sockets[0].getsockname()[1]
+        return self
+
+    def __exit__(self, *exc):
+        self._server.should_exit = True
+        self._thread.join(timeout=10)
+
+
+def parse_mix(text: str) -> Dict[str, float]:
+    mix = {}
+    for part in text.split(","):
+        route, _, weight = part.partition("=")
+        if route.strip() not in ROUTES:
+            raise ValueError(f"Unknown route in mix: {route!r} (expected one of {', '.join(ROUTES)})")
+        mix[route.strip()] = float(weight)
+    return mix
+
+
+def percentile(ordered: List[float], q: float) -> Optional[float]:
+    if not ordered:
+        return None
+    return round(ordered[min(len(ordered) - 1, int(len(ordered) * q))], 2)
+
+
+def summarize(samples: Dict[str, List[tuple]], elapsed_seconds: float) -> Dict[str, dict]:
+    """
+    route별 (latency_ms, ok) 표본을 요청 수/초당 요청 수/오류율/p50/p95/p99로 요약합니다.
+    """
+    summary = {}
+    for route, route_samples in sorted(samples.items()):
+        latencies = sorted(latency for latency, _ in route_samples)
+        errors = sum(1 for _, ok in route_samples if not ok)
+        summary[route] = {
+            "requests": len(route_samples),
+            "errors": errors,
+            "error_rate": round(errors / len(route_samples), 4) if route_samples else 0.0,
+            "rps": round(len(route_samples) / elapsed_seconds, 2) if elapsed_seconds else 0.0,
+            "p50_ms": percentile(latencies, 0.50),
+            "p95_ms": percentile(latencies, 0.95),
+            "p99_ms": percentile(latencies, 0.99),
+        }
+    return summary
+
+
+def compare_to_baseline(current: Dict[str, dict], baseline: Dict[str, dict], max_latency_regression: float, max_throughput_regression: float, max_error_rate_increase: float) -> List[str]:
+    """
+    baseline 대비 허용치를 넘은 항목을 메시지 목록으로 반환합니다. (비어 있으면 통과)
+    지연 시간은 p50/p95/p99 각각의 증가 비율, 처리량은 rps 감소 비율, 오류율은 절대 증가량으로 비교합니다.
+    """
+    failures = []
+    for route, base in sorted(baseline.items()):
+        now = current.get(route)
+        if now is None:
+            continue
+        for key in ("p50_ms", "p95_ms", "p99_ms"):
+            if base.get(key) and now.get(key) is not None and now[key] > base[key] * (1 + max_latency_regression):
+                failures.append(f"{route} {key} {base[key]:.2f} -> {now[key]:.2f} (> +{max_latency_regression:.0%})")
+        if base.get("rps") and now["rps"] < base["rps"] * (1 - max_throughput_regression):
+            failures.append(f"{route} rps {base['rps']:.2f} -> {now['rps']:.2f} (> -{max_throughput_regression:.0%})")
+        if now["error_rate"] > base.get("error_rate", 0.0) + max_error_rate_increase:
+            failures.append(f"{route} error_rate {base.get('error_rate', 0.0):.4f} -> {now['error_rate']:.4f} (> +{max_error_rate_increase})")
+    return failures
+
+
+class LoadTest:
+    def __init__(self, base_url: str, db_path: str, students: int, mix: Dict[str, float], seed: int):
+        self.base_url = base_url
+        self.db_path = db_path
+        self.student_ids = [f"load-student-{index:04d}" for index in range(students)]
+        self.mix = mix
+        self.rng = random.Random(seed)
+        self.card_ids: List[int] = []
+        self._submission_seq = 0
+
+    def _judge_body(self, student_id: str) -> dict:
+        question_type, concept_name, mistake = self.rng.choice(MISTAKES)
+        self._submission_seq += 1
+        return {
+            "student_id": student_id,
+            "submission_id": f"{student_id}-{self._submission_seq}",
+            # 같은 오답이 반복되도록 연도 후보를 제한합니다. (판단 캐시 적중도 실제와 비슷하게 섞이도록)
+            "error_context": {"question_type": question_type, "concept_name": concept_name, "student_mistake_summary": mistake.format(year=self.rng.randint(1500, 1700))},
+        }
+
+    async def seed(self, client: httpx.AsyncClient, judgments_per_student: int):
+        """
+        학생을 만들고 판단/덱 조회로 복습 카드를 미리 만들어 둡니다. (리뷰 요청에 사용할 card_id 확보)
+        """
+        for student_id in self.student_ids:
+            response = await client.post("/api/v1/student/", json={"student_id": student_id, "name": student_id})
+            response.raise_for_status()
+            for _ in range(judgments_per_student):
+                (await client.post("/api/v1/filter/judge", json=self._judge_body(student_id))).raise_for_status()
+            (await client.get(f"/api/v1/student/{student_id}/daily_review_deck")).raise_for_status()
+        with sqlite3.connect(self.db_path) as conn:
+            self.card_ids = [row[0] for row in conn.execute("SELECT card_id FROM anki_cards")]
+        logging.info(f"Seeded {len(self.student_ids)} students and {len(self.card_ids)} cards.")
+
+    def next_request(self) -> tuple:
+        route = self.rng.choices(list(self.mix), weights=list(self.mix.values()))[0]
+        student_id = self.rng.choice(self.student_ids)
+        if route == "submission":
+            return route, "POST", "/api/v1/submission/", {"student_id": student_id, "assignment_id": "history-01", "answer": self.rng.choice(ANSWERS)}
+        if route == "judge":
+            return route, "POST", "/api/v1/filter/judge", self._judge_body(student_id)
+        if route == "review" and self.card_ids:
+            return route, "POST", f"/api/v1/cards/{self.rng.choice(self.card_ids)}/review", {"quality": self.rng.randint(0, 5)}
+        if route == "report":
+            today = date.today()
+            return route, "GET", f"/api/v1/report/student/{student_id}/period?start_date={today - timedelta(days=6)}&end_date={today}", None
+        return "deck", "GET", f"/api/v1/student/{student_id}/daily_review_deck", None
+
+    async def run(self, client: httpx.AsyncClient, concurrency: int, duration_seconds: float, max_requests: Optional[int]) -> tuple:
+        samples: Dict[str, List[tuple]] = {}
+        deadline = time.monotonic() + duration_seconds
+        issued = 0
+
+        async def worker():
+            nonlocal issued
+            while time.monotonic() < deadline and (max_requests is None or issued < max_requests):
+                issued += 1
+                route, method, url, body = self.next_request()
+                started = time.perf_counter()
+                try:
+                    response = await client.request(method, url, json=body)
+                    ok = response.status_code < 400
+                except httpx.HTTPError:
+                    ok = False
+                samples.setdefault(route, []).append(((time.perf_counter() - started) * 1000, ok))
+
+        started = time.perf_counter()
+        await asyncio.gather(*(worker() for _ in range(concurrency)))
+        return samples, time.perf_counter() - started
+
+
+async def drive(app_url: str, db_path: str, args) -> dict:
+    load_test = LoadTest(app_url, db_path, args.students, parse_mix(args.mix), args.seed)
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    async with httpx.AsyncClient(base_url=app_url, timeout=args.request_timeout, limits=limits) as client:
+        await load_test.seed(client, args.seed_judgments)
+        samples, elapsed = await load_test.run(client, args.concurrency, args.duration_seconds, args.requests)
+    return {"elapsed_seconds": round(elapsed, 2), "routes": summarize(samples, elapsed)}
+
+
+def run_load_test(args) -> int:
+    with tempfile.TemporaryDirectory() as work_dir, FakeOllamaServer(
+        latency_ms=args.latency_ms, jitter_ms=args.jitter_ms, latency_distribution=args.latency_distribution,
+        failure_rate=args.failure_rate, seed=args.seed
+    ) as ollama:
+        db_path = os.path.join(work_dir, "loadtest.db")
+        # 앱 모듈을 불러오기 전에 임시 DB/fake Ollama를 지정하고, 레지스트리 파일도 임시 디렉터리에서 찾도록 합니다.
+        os.environ["DATABASE_URL"] = f"sqlite+aiosqlite:///{db_path}"
+        os.environ["OLLAMA_BASE_URL"] = ollama.url
+        os.chdir(work_dir)
+        from main import app
+
+        with AppServer(app) as server:
+            logging.info(f"App at {server.url}, fake Ollama at {ollama.url} ({args.latency_distribution} latency {args.latency_ms}ms, failure rate {args.failure_rate}).")
+            result = asyncio.run(drive(server.url, db_path, args))
+
+    result["config"] = {
+        key: getattr(args, key) for key in (
+            "concurrency", "duration_seconds", "requests", "students", "mix", "latency_ms", "jitter_ms",
+            "latency_distribution", "failure_rate", "seed"
+        )
+    }
+    total = sum(route["requests"] for route in result["routes"].values())
+    logging.info(f"{total} requests in {result['elapsed_seconds']}s ({total / result['elapsed_seconds']:.1f} req/s)")
+    logging.info(f"{'route':>10} {'requests':>8} {'errors':>6} {'rps':>8} {'p50':>9} {'p95':>9} {'p99':>9}")
+    for route, stats in result["routes"].items():
+        logging.info(
+            f"{route:>10} {stats['requests']:>8} {stats['errors']:>6} {stats['rps']:>8.2f} "
+            f"{stats['p50_ms']:>7.2f}ms {stats['p95_ms']:>7.2f}ms {stats['p99_ms']:>7.2f}ms"
+        )
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(result, f, indent=2, ensure_ascii=False)
+        logging.info(f"Saved results to {args.output}")
+
+    if args.baseline:
+        with open(args.baseline, "r", encoding="utf-8") as f:
+            baseline = json.load(f)
+        changed = {key: (baseline.get("config", {}).get(key), value) for key, value in result["config"].items() if baseline.get("config", {}).get(key) != value}
+        if changed:
+            logging.warning(f"Load test config differs from baseline, results may not be comparable: {changed}")
+        failures = compare_to_baseline(
+            result["routes"], baseline["routes"],
+            args.max_latency_regression, args.max_throughput_regression, args.max_error_rate_increase
+        )
+        for failure in failures:
+            logging.error(f"Regression: {failure}")
+        if failures:
+            return 1
+        logging.info(f"No regression against baseline {args.baseline}.")
+    return 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="End-to-end load test of main.app against a temp SQLite DB and a fake Ollama.")
+    parser.add_argument("--concurrency", type=int, default=16, help="Concurrent virtual clients.")
+    parser.add_argument("--duration_seconds", type=float, default=20.0, help="Measurement duration.")
+    parser.add_argument("--requests", type=int, default=None, help="Stop after this many requests (deterministic runs).")
+    parser.add_argument("--students", type=int, default=50, help="Number of seeded students.")
+    parser.add_argument("--seed_judgments", type=int, default=3, help="Judge calls per student during seeding (creates review cards).")
+    parser.add_argument("--mix", type=str, default=DEFAULT_MIX, help=f"Route weights, e.g. '{DEFAULT_MIX}'.")
+    parser.add_argument("--latency_ms", type=float, default=50.0, help="Fake Ollama latency (mean/median depending on distribution).")
+    parser.add_argument("--jitter_ms", type=float, default=10.0, help="Uniform jitter, or lognormal spread.")
+    parser.add_argument("--latency_distribution", type=str, choices=LATENCY_DISTRIBUTIONS, default="uniform")
+    parser.add_argument("--failure_rate", type=float, default=0.0, help="Share of fake Ollama calls that return HTTP 500.")
+    parser.add_argument("--request_timeout", type=float, default=60.0, help="HTTP timeout per request (seconds).")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the request mix and fake Ollama.")
+    parser.add_argument("--output", type=str, default=None, help="Write results as JSON (use as a future --baseline).")
+    parser.add_argument("--baseline", type=str, default=None, help="Baseline JSON to compare against.")
+    parser.add_argument("--max_latency_regression", type=float, default=0.2, help="Allowed p50/p95/p99 increase ratio.")
+    parser.add_argument("--max_throughput_regression", type=float, default=0.2, help="Allowed rps decrease ratio.")
+    parser.add_argument("--max_error_rate_increase", type=float, default=0.01, help="Allowed absolute error-rate increase.")
+    args = parser.parse_args()
+
+    sys.exit(run_load_test(args))
@@ -0,0 +1,130 @@
+import argparse
+import asyncio
+import logging
+import os
+import random
+import sys
+from datetime import date, timedelta
+from typing import List, Optional
+
+ROOT_DIR = os.path.abspath(os.path.join(os.path.dirname(__file__), '..'))
+sys.path.insert(0, ROOT_DIR)
+sys.path.insert(0, os.path.join(ROOT_DIR, 'backend'))
+from sqlalchemy import and_  # noqa: E402
+from sqlalchemy.future import select  # noqa: E402
+
+# backend.models는 테이블을 `database` 모듈의 Base에 등록하므로 같은 모듈의 engine/Base를 사용합니다.
+from database import SessionLocal, engine  # noqa: E402
+from schema_upgrade import upgrade_database  # noqa: E402
+from backend.models import LLMLog  # noqa: E402
+from backend.model_registry import ModelRegistry, MODEL_KIND_FAST_CLASSIFIER  # noqa: E402
+from backend.fast_classifier import TrainingExample, train_classifier, evaluate  # noqa: E402
+from export_finetuning_data import BAD_FEEDBACK_INFERENCE_MAP  # noqa: E402
+
+logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
+
+
+def label_log(log: LLMLog) -> Optional[str]:
+    """
+    export_finetuning_data와 같은 규칙으로 정답 decision을 정합니다.
+    GOOD이면 기록된 decision, BAD이면 reason_code로 추론하고, 추론할 수 없으면 None(학습에서 제외).
+    """
+    if log.coach_feedback == "GOOD":
+        return log.decision
+    if log.coach_feedback == "BAD":
+        inferred = BAD_FEEDBACK_INFERENCE_MAP.get(log.reason_code)
+        return inferred["decision"] if inferred else None
+    return None
+
+
+async def load_examples(start_date: Optional[date], end_date: Optional[date]) -> List[TrainingExample]:
+    await upgrade_database(engine)
+
+    async with SessionLocal() as db:
+        query = select(LLMLog).where(LLMLog.coach_feedback.isnot(None))
+        conditions = []
+        if start_date:
+            conditions.append(LLMLog.created_at >= start_date)
+        if end_date:
+            conditions.append(LLMLog.created_at < (end_date + timedelta(days=1)))
+        if conditions:
+            query = query.where(and_(*conditions))
+        logs = (await db.execute(query)).scalars().all()
+
+    examples, skipped, without_summary = [], 0, 0
+    for log in logs:
+        # student_mistake_summary 컬럼이 생기기 전의 로그는 입력 문장이 없어 개념명만으로 학습하게 되므로 제외합니다.
+        if not (log.student_mistake_summary or "").strip():
+            without_summary += 1
+            continue
+        decision = label_log(log)
+        if decision not in ("APPROVE", "REJECT"):
+            skipped += 1
+            continue
+        examples.append(TrainingExample(log.concept_name or "", log.student_mistake_summary, decision))
+    logging.info(f"Loaded {len(examples)} labelled logs ({skipped} skipped: feedback could not be mapped to a decision).")
+    if without_summary:
+        logging.warning(f"Skipped {without_summary} logs with feedback but no student_mistake_summary (logged before the summary was stored).")
+    return examples
+
+
+async def train_fast_classifier(
+    version: str,
+    output_dir: str,
+    holdout: float,
+    threshold: float,
+    epochs: int,
+    promote: Optional[str],
+    start_date: Optional[date] = None,
+    end_date: Optional[date] = None,
+    seed: int = 42,
+):
+    examples = await load_examples(start_date, end_date)
+    if len(examples) < 10:
+        logging.error(f"Not enough labelled logs to train ({len(examples)}). Aborting.")
+        return
+
+    rng = random.Random(seed)
+    rng.shuffle(examples)
+    split = max(1, int(len(examples) * holdout))
+    evaluation_set, training_set = examples[:split], examples[split:]
+
+    classifier = train_classifier(training_set, epochs=epochs, seed=seed)
+    metrics = evaluate(classifier, evaluation_set, threshold)
+    metrics["train_examples"] = len(training_set)
+    classifier.metrics = metrics
+    logging.info(f"Holdout metrics: {metrics}")
+
+    os.makedirs(output_dir, exist_ok=True)
+    model_path = os.path.join(output_dir, f"{version}.json")
+    classifier.save(model_path)
+    logging.info(f"Saved classifier with {len(classifier.vocabulary)} features to {model_path}")
+
+    registry = ModelRegistry()
+    registry.register_model(version, model_path, metrics, {
+        "kind": MODEL_KIND_FAST_CLASSIFIER,
+        "trained_at": date.today().isoformat(),
+        "training_window": [start_date.isoformat() if start_date else None, end_date.isoformat() if end_date else None],
+    })
+    if promote:
+        registry.set_model_production_status(version, promote)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="Train the fast-path judge classifier from coach feedback and register it in the model registry.")
+    parser.add_argument("--version", type=str, required=True, help="Model version to register, e.g. fast_v1.")
+    parser.add_argument("--output_dir", type=str, default="models/fast_classifier", help="Directory for the classifier JSON file.")
+    parser.add_argument("--holdout", type=float, default=0.2, help="Share of labelled logs kept for evaluation.")
+    parser.add_argument("--threshold", type=float, default=0.9, help="Confidence threshold used for the coverage metrics.")
+    parser.add_argument("--epochs", type=int, default=20, help="SGD epochs.")
+    parser.add_argument("--promote", type=str, choices=["staging", "production"], default=None,
+                        help="Set the registry status after training. Only 'production' is used by the judge fast path.")
+    parser.add_argument("--start_date", type=date.fromisoformat, help="Start date for filtering logs (YYYY-MM-DD).")
+    parser.add_argument("--end_date", type=date.fromisoformat, help="End date for filtering logs (YYYY-MM-DD).")
+    parser.add_argument("--seed", type=int, default=42, help="Random seed for the split and SGD order.")
+    args = parser.parse_args()
+
+    asyncio.run(train_fast_classifier(
+        args.version, args.output_dir, args.holdout, args.threshold, args.epochs, args.promote,
+        args.start_date, args.end_date, args.seed
+    ))